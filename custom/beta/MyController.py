@@ -29,6 +29,8 @@ class MyController(TopoFind):
         self.sshd_URL = "http://localhost:4888"
         self.sshd = SSHManagerAPIWrapper(port=4888)
         self.file_name = "~/mininet/custom/output.json"
+        # (ofproto_parser, match field set) -> OFPMatchTemplate
+        self.match_templates = {}
         initialize_file(self.file_name)
         self.start_wsgi(**kwargs)
 
@@ -395,11 +397,23 @@ class MyController(TopoFind):
         if multi_flabel_val is not None and multi_flabel_mask is not None:
             match_fields["ipv6_flabel"] = (multi_flabel_val, multi_flabel_mask)
 
-        match = parser.OFPMatch(**match_fields)
+        match = self.build_match(parser, match_fields)
 
         actions = [parser.OFPActionGroup(group_id)]
         self.add_flow(datapath, self.priority, match, actions)
     
+    def build_match(self, parser, match_fields):
+        # 同一組欄位的 match 只編譯一次，之後直接用 template 打包
+        if not hasattr(parser, 'OFPMatchTemplate'):
+            return parser.OFPMatch(**match_fields)
+
+        fields = tuple((k, isinstance(v, tuple)) for k, v in match_fields.items())
+        template = self.match_templates.get((parser, fields))
+        if template is None:
+            template = parser.OFPMatchTemplate(*fields)
+            self.match_templates[(parser, fields)] = template
+        return template.match(**match_fields)
+
     def send_group_multicast_method(self, datapath, port_weight_list, group_id):
 
         ofp = datapath.ofproto
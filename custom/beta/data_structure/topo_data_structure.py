@@ -83,6 +83,26 @@ class Topology():
                 del self.links[key]
                 logger.info(f"刪除鏈路: {key}")
     
+    def get_port_links(self, sw_id, sw_port) -> List[Tuple[str, str]]:
+        """取得使用 switch sw_id 的 sw_port 的所有鏈路 (雙向)"""
+        sw_id = self.turn_to_key(sw_id)
+        return [(u, v) for (u, v), (port_u, port_v) in self.links.items()
+                if (u == sw_id and port_u == sw_port)
+                or (v == sw_id and port_v == sw_port)]
+
+    def del_port_links(self, sw_id, sw_port, with_host=True) -> List[Tuple[str, str]]:
+        """刪除使用 switch sw_id 的 sw_port 的鏈路，回傳被刪除的鏈路
+        with_host 為 False 時，只刪除 switch 之間的鏈路"""
+        keys_to_delete = self.get_port_links(sw_id, sw_port)
+        if not with_host:
+            keys_to_delete = [(u, v) for u, v in keys_to_delete
+                              if not self.is_host(name=u) and not self.is_host(name=v)]
+        for key in keys_to_delete:
+            del self.links[key]
+            self.link_bw.pop(key, None)
+            logger.info(f"刪除鏈路: {key}")
+        return keys_to_delete
+
     def set_link_bandwidth(self, u, v, bw):
         u, v = self.turn_to_key(u), self.turn_to_key(v)
         if (u, v) in self.link_bw and self.link_bw[(u, v)] is not None:
@@ -14,6 +14,8 @@ from ryu.app.wsgi import WSGIApplication
 from custom.beta.data_structure.topo_data_structure import Topology
 import threading
 import os, re
+import random
+import time
 
 
 from algorithm.Dijkstra import NetworkGraph
@@ -23,10 +25,27 @@ from data_structure.packet import Icmpv6Packet, NDPPacket, LLDPPacket
 class TopoFind(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_5.OFP_VERSION]
 
+    # 拓撲由 EventOFPPortStatus 驅動更新，只對有變動的 port 重送 lldp；
+    # 另外每隔 TOPO_AUDIT_INTERVAL 秒 (加上 +-TOPO_AUDIT_JITTER 比例的隨機抖動，
+    # 避免所有 switch 同時被查詢) 做一次 PortDesc 全面稽核，補上漏掉的事件
+    TOPO_MONITOR_INTERVAL = 5
+    TOPO_AUDIT_INTERVAL = 60
+    TOPO_AUDIT_JITTER = 0.2
+
     def __init__(self, *args, **kwargs):
         super(TopoFind, self).__init__(*args, **kwargs)
         self.topo = Topology()
         self.networkGraph=NetworkGraph()
+        # dp_id -> {port_no: (hw_addr, config, state)}
+        self.port_desc = {}
+        # dp_id -> port_no set seen in the current PortDesc multipart reply
+        self.port_desc_seen = {}
+        # dp_id -> next full audit time
+        self.next_audit = {}
+        # dp_id -> time the pending PortDesc audit request was sent
+        self.audit_sent = {}
+        # (sw, port_no) -> tc bandwidth
+        self.port_bandwidth = {}
         self.topo_monitor_thread = hub.spawn(self._topo_monitor)
         # self.monitor_thread = hub.spawn(self._monitor)
 
@@ -35,6 +54,11 @@ class TopoFind(app_manager.RyuApp):
         self.logger.info("Mininet 停止，Ryu 重新初始化...")
         self.topo.reset()
         self.networkGraph.initialize_graph()
+        self.port_desc.clear()
+        self.port_desc_seen.clear()
+        self.next_audit.clear()
+        self.audit_sent.clear()
+        self.port_bandwidth.clear()
 
     @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
     def state_change_handler(self, ev):
@@ -47,6 +71,10 @@ class TopoFind(app_manager.RyuApp):
             if self.topo.get_datapath(datapath.id):
                 self.topo.del_datapath(datapath=datapath)
                 self.networkGraph.del_node(datapath.id)
+                self.port_desc.pop(datapath.id, None)
+                self.port_desc_seen.pop(datapath.id, None)
+                self.next_audit.pop(datapath.id, None)
+                self.audit_sent.pop(datapath.id, None)
                 self.logger.info(f"交換機 {datapath.id} 已斷開")
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
@@ -68,27 +96,99 @@ class TopoFind(app_manager.RyuApp):
         datapath.send_msg(portRequestmsg)
     
     @set_ev_cls(ofp_event.EventOFPPortDescStatsReply, MAIN_DISPATCHER)
-    def _port_status_handler(self,ev):
-        
+    def _port_desc_stats_reply_handler(self, ev):
+        """ PortDesc 全面稽核：只處理與紀錄不同的 port """
         msg=ev.msg
         dp=msg.datapath
         body=ev.msg.body
-        
-        for p in body:
-            self.logger.info(f'** switch {dp.id} get the PortDesc in Port:{p.port_no}')
-            self.logger.info("Port Attributes: %s", p.__dict__)
 
+        known = self.port_desc.setdefault(dp.id, {})
+        seen = self.port_desc_seen.setdefault(dp.id, set())
 
-            if p.port_no != ofproto_v1_5.OFPP_CONTROLLER and p.port_no != ofproto_v1_5.OFPP_LOCAL:
-                # self.topo.set_port_in_switch(dp.id, p.port_no)
-                self.topo.set_sw_mac_to_context(p.hw_addr, dp.id, p.port_no)
-                self.topo.set_datapath(dp, dp.id)
+        for p in body:
+            if p.port_no == ofproto_v1_5.OFPP_CONTROLLER or p.port_no == ofproto_v1_5.OFPP_LOCAL:
+                continue
+            seen.add(p.port_no)
+
+            if known.get(p.port_no) != self._port_desc_key(p):
+                self._port_changed(dp, p)
+            elif not self._port_is_down(p) and not self.topo.get_port_links(dp.id, p.port_no):
+                # 還沒有找到鏈路的 port，重送 lldp 避免漏接
                 self.send_lldp_out(dp, p.port_no)
-                self.del_link_to_database(p.hw_addr)
-                self.topo.del_host(p.hw_addr)
-            else:
-                self.logger.info(f'*** skip the PortDesc in Port:{p.port_no}')
-    
+
+        if msg.flags & ofproto_v1_5.OFPMPF_REPLY_MORE:
+            return
+
+        # 最後一個 reply：紀錄中有，但這次沒有回報的 port 已被移除
+        for port_no in set(known) - seen:
+            self._port_deleted(dp, port_no)
+        seen.clear()
+        self.audit_sent.pop(dp.id, None)
+        self._schedule_audit(dp.id)
+
+    @set_ev_cls(ofp_event.EventOFPPortStatus, MAIN_DISPATCHER)
+    def _port_status_handler(self, ev):
+        """ port 新增 / 修改 / 刪除時，只更新該 port """
+        msg = ev.msg
+        dp = msg.datapath
+        p = msg.desc
+
+        if p.port_no == ofproto_v1_5.OFPP_CONTROLLER or p.port_no == ofproto_v1_5.OFPP_LOCAL:
+            return
+
+        if msg.reason == ofproto_v1_5.OFPPR_DELETE:
+            self._port_deleted(dp, p.port_no)
+        elif self.port_desc.get(dp.id, {}).get(p.port_no) != self._port_desc_key(p):
+            self._port_changed(dp, p)
+
+    def _port_desc_key(self, p):
+        return (p.hw_addr, p.config, p.state)
+
+    def _port_is_down(self, p):
+        return bool(p.config & ofproto_v1_5.OFPPC_PORT_DOWN
+                    or p.state & ofproto_v1_5.OFPPS_LINK_DOWN)
+
+    def _port_changed(self, dp, p):
+        self.logger.info(f'** switch {dp.id} Port:{p.port_no} changed')
+        self.logger.info("Port Attributes: %s", p.__dict__)
+
+        self.port_desc.setdefault(dp.id, {})[p.port_no] = self._port_desc_key(p)
+        self.port_bandwidth.pop((dp.id, p.port_no), None)
+        self.topo.set_sw_mac_to_context(p.hw_addr, dp.id, p.port_no)
+        self.topo.set_datapath(dp, dp.id)
+
+        if self._port_is_down(p):
+            self._del_port_from_database(dp.id, p.port_no, with_host=True)
+            return
+
+        # 對端可能換了，先刪掉 switch 之間的舊鏈路，再用 lldp 重新探測
+        self._del_port_from_database(dp.id, p.port_no, with_host=False)
+        self.send_lldp_out(dp, p.port_no)
+
+    def _port_deleted(self, dp, port_no):
+        self.logger.info(f'** switch {dp.id} Port:{port_no} deleted')
+        self.port_desc.get(dp.id, {}).pop(port_no, None)
+        self.port_bandwidth.pop((dp.id, port_no), None)
+        self._del_port_from_database(dp.id, port_no, with_host=True)
+
+    def _del_port_from_database(self, sw_id, port_no, with_host):
+        for u, v in self.topo.del_port_links(sw_id, port_no, with_host=with_host):
+            self.networkGraph.del_link(self._graph_node(u), self._graph_node(v))
+
+        if with_host:
+            for name, info in list(self.topo.hosts.items()):
+                if info['sw_id'] == sw_id and info['sw_in_port'] == port_no:
+                    self.networkGraph.del_node(name)
+                    self.topo.del_host(host_mac=info['mac'])
+
+    def _graph_node(self, key):
+        # Topology 用字串當 switch 的 key，networkGraph 用 dpid (int)
+        return int(key) if key.isdigit() else key
+
+    def _schedule_audit(self, dp_id):
+        jitter = random.uniform(-self.TOPO_AUDIT_JITTER, self.TOPO_AUDIT_JITTER)
+        self.next_audit[dp_id] = time.time() + self.TOPO_AUDIT_INTERVAL * (1 + jitter)
+
     @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
     def _packet_in_handler(self, ev):
         
@@ -365,6 +465,16 @@ class TopoFind(app_manager.RyuApp):
         
     
     def get_switch_port_bandwidth(self, sw, port):
+        # tc 的結果在 port 變動前不會改變，快取起來避免每個 lldp 都 shell out
+        bw = self.port_bandwidth.get((int(sw), port))
+        if bw is not None:
+            return bw
+        bw = self._get_tc_bandwidth(sw, port)
+        if bw is not None:
+            self.port_bandwidth[(int(sw), port)] = bw
+        return bw
+
+    def _get_tc_bandwidth(self, sw, port):
         interface = f"s{sw}-eth{port}"
         cmd = f"tc -s class show dev {interface}"
         result = os.popen(cmd).read()
@@ -433,15 +543,26 @@ class TopoFind(app_manager.RyuApp):
             hub.sleep(2) 
 
     def _topo_monitor(self):
-        """ 持續檢查特殊狀況 """
+        """ 持續檢查特殊狀況，並對到期的 switch 做 PortDesc 全面稽核 """
         while True:
-            hub.sleep(5)  # 每 1 秒檢查一次
+            hub.sleep(self.TOPO_MONITOR_INTERVAL)
             if not self.topo.get_datapaths():  # 如果沒有交換機，執行 initialize()
                 self.initialize()
+                continue
 
-            # 讓每個 switch 重新發送 lldp 封包，避免 lldp 漏接
-            for dp in self.topo.get_datapaths().values():
+            now = time.time()
+            for dp in list(self.topo.get_datapaths().values()):
+                if dp.id not in self.next_audit or now < self.next_audit[dp.id]:
+                    # 尚未收到第一次 PortDesc，或還沒到稽核時間
+                    continue
+                sent = self.audit_sent.get(dp.id)
+                if sent is not None:
+                    self.logger.warning("交換機 %s 的 PortDesc 稽核 %.0f 秒沒有回覆，重新送出",
+                                        dp.id, now - sent)
+                    self.port_desc_seen.pop(dp.id, None)
+                # reply 遺失或 switch 回覆 error 時，TOPO_AUDIT_INTERVAL 之後重送
+                self.audit_sent[dp.id] = now
+                self.next_audit[dp.id] = now + self.TOPO_AUDIT_INTERVAL
                 parser = dp.ofproto_parser
                 portRequestmsg = parser.OFPPortDescStatsRequest(dp)
                 dp.send_msg(portRequestmsg)
-
@@ -1,7 +1,17 @@
 from topo_learn import SimpleSwitch15
 from typing import List, Dict, Tuple, Set
 import selection_method_parser as sm_parser
+import time
+from ryu.controller import ofp_event
+from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER
+from ryu.controller.handler import set_ev_cls
+from ryu.lib import hub
+from ryu.lib import ofctl_utils
 from ryu.lib.packet import ethernet, ether_types
+from link_monitor import LinkMonitor
+from flow_stats import TreeFlowStats
+from rule_index import RuleIndex
+from reconciler import Reconciler
 from multi_db import MultiGroupDB
 from multi_flabel import MultiFLabelDB
 from mininet_connect import MininetSSHManager
@@ -9,6 +19,13 @@ from utils import print_dict, append_to_json, initialize_file
 
 class MyController(SimpleSwitch15):
 
+    # port / group stats 的 polling 週期 (秒)
+    MONITOR_INTERVAL = 2
+    # 等 barrier / bundle 回覆的時間 (秒)
+    REPLY_TIMEOUT = 5
+    # migration 時等舊的 tree 沒有流量的最長時間 (秒)
+    MIGRATION_DRAIN_TIMEOUT = 30
+
     def __init__(self, *args, **kwargs):
         super(MyController, self).__init__(*args, **kwargs)
         print("My Controller Initialize")
@@ -18,7 +35,101 @@ class MyController(SimpleSwitch15):
         self.multi_flabel_db = MultiFLabelDB()
         self.mininet = MininetSSHManager()
         self.file_name = "~/mininet/custom/output.json"
+        # ofproto_parser -> OFPMatchTemplate of send_flowMod_to_switch
+        self.match_templates = {}
+        # 每條 link / group bucket 的速率時間序列
+        self.link_monitor = LinkMonitor()
+        # 每台 switch 上的 flow / group 屬於哪個 commodity / tree / generation
+        self.rule_index = RuleIndex()
+        # 每棵 tree 的流量
+        self.tree_stats = TreeFlowStats(self.rule_index)
+        # 每台 switch 應有的 flow / group，switch 重新連線時用來比對
+        self.reconciler = Reconciler(RuleIndex.COOKIE_TAG, RuleIndex.COOKIE_TAG_MASK)
+        # dpid -> {xid: (lock, msgs)}, 給 ofctl_utils 的 stats request 使用
+        self.stats_waiters = {}
+        # (dpid, xid) -> (lock, msgs), 等 barrier / bundle 的回覆
+        self.reply_waiters = {}
+        self.bundle_id_counter = 1
+        # commodity -> source host 使用的 flow label [(val, mask)]，每棵 tree 一個
+        self.host_flabels = {}
+        # commodity -> 目前安裝的 paths
+        self.installed_paths = {}
+        # commodity -> 等著 migration 的 paths
+        self.pending_migrations = {}
         initialize_file(self.file_name)
+        self.monitor_thread = hub.spawn(self._link_monitor_loop)
+
+    def _link_monitor_loop(self):
+        """ 同時對所有 switch 送出 port / group stats request，等全部回覆後再睡 """
+        while True:
+            hub.sleep(self.MONITOR_INTERVAL)
+            futures = []
+            for dp in list(self.topo.datapath.values()):
+                ofp = dp.ofproto
+                parser = dp.ofproto_parser
+                futures.append(ofctl_utils.send_stats_request_async(
+                    dp, parser.OFPPortStatsRequest(dp, 0, ofp.OFPP_ANY), self.stats_waiters))
+                futures.append(ofctl_utils.send_stats_request_async(
+                    dp, parser.OFPGroupStatsRequest(dp, 0, ofp.OFPG_ALL), self.stats_waiters))
+                if self.rule_index.has_rules(dp.id):
+                    # 只取我們安裝的 tree 規則
+                    req = parser.OFPFlowStatsRequest(
+                        dp, cookie=RuleIndex.COOKIE_TAG,
+                        cookie_mask=RuleIndex.COOKIE_TAG_MASK)
+                    futures.append(ofctl_utils.send_stats_request_async(
+                        dp, req, self.stats_waiters))
+            ofctl_utils.wait_stats_futures(futures)
+
+    @set_ev_cls([ofp_event.EventOFPPortStatsReply,
+                 ofp_event.EventOFPGroupStatsReply,
+                 ofp_event.EventOFPFlowStatsReply,
+                 ofp_event.EventOFPFlowDescStatsReply,
+                 ofp_event.EventOFPGroupDescStatsReply], MAIN_DISPATCHER)
+    def _monitor_stats_reply_handler(self, ev):
+        msg = ev.msg
+        dp = msg.datapath
+
+        # 在收到的當下計算速率，時間戳才準確
+        # desc reply 是 reconcile 用的，只交給 waiter
+        if isinstance(msg, dp.ofproto_parser.OFPPortStatsReply):
+            self.link_monitor.update_port_stats(dp.id, msg.body)
+        elif isinstance(msg, dp.ofproto_parser.OFPGroupStatsReply):
+            self.link_monitor.update_group_stats(dp.id, msg.body)
+        elif isinstance(msg, dp.ofproto_parser.OFPFlowStatsReply):
+            self.tree_stats.update_flow_stats(dp.id, msg.body)
+
+        waiters = self.stats_waiters.get(dp.id, {})
+        if msg.xid not in waiters:
+            return
+        lock, msgs = waiters[msg.xid]
+        msgs.append(msg)
+        if msg.flags & dp.ofproto.OFPMPF_REPLY_MORE:
+            return
+        del waiters[msg.xid]
+        lock.set()
+
+    @set_ev_cls(ofp_event.EventOFPStateChange, DEAD_DISPATCHER)
+    def _monitor_state_change_handler(self, ev):
+        if ev.datapath.id is not None:
+            self.link_monitor.remove_datapath(ev.datapath.id)
+            self.tree_stats.remove_datapath(ev.datapath.id)
+            self.stats_waiters.pop(ev.datapath.id, None)
+
+    @set_ev_cls(ofp_event.EventOFPStateChange, MAIN_DISPATCHER)
+    def _reconcile_state_change_handler(self, ev):
+        """ switch 重新連線後，把它的 flow / group 對回我們記錄的狀態 """
+        dp = ev.datapath
+        if dp.id is not None and self.reconciler.has_state(dp.id):
+            hub.spawn(self.reconcile, dp)
+
+    def reconcile(self, datapath):
+        """ 回傳送出的訊息數，無法取得 switch 狀態時回傳 None """
+        count = self.reconciler.reconcile(datapath, self.stats_waiters)
+        if count is None:
+            self.logger.warning("reconcile dpid=%s: no reply from switch", datapath.id)
+        elif count:
+            self.logger.info("reconcile dpid=%s: sent %d messages", datapath.id, count)
+        return count
 
     def test(self):
         # test function
@@ -47,66 +158,361 @@ class MyController(SimpleSwitch15):
         for commodity in commodities:
             paths = self.topo.get_paths(commodity)
             print(f"-- {commodity} --")
-            for tree in paths:
-                switch_to_port_bandwidth = {}
-                switch_to_inport = {}
-                nodes = set()
-                tree_bandwidth = 0
-                print(f"---- tree ----")
-                
-                for (u, v), bw in tree.items():
-                    port_u, port_v = self.topo.get_link(u, v)
-                    
-                    # 判斷每個 switch 要流出的 port，以及其權重
-                    if u not in switch_to_port_bandwidth:
-                        switch_to_port_bandwidth[u] = [(port_u, bw)]
-                        tree_bandwidth = bw
-                    else:
-                        switch_to_port_bandwidth[u].append((port_u, bw))
-                    # 判斷每個 switch 流入口，來當作 match 條件
-                    if v not in switch_to_inport:
-                        switch_to_inport[v] = [port_v]
-                    else:
-                        switch_to_inport[v].append(port_v)
-
-                    if not u.startswith('h'):
-                        nodes.add(u)
-                    if not v.startswith('h'):
-                        nodes.add(v)
-                    
-
-                # multi_ip = self.multi_db.assign_internal_ip(commodity)
-                # if multi_ip is None:
-                #     # 測試用 ip
-                #     multi_ip = "ff38::8888"
-                # print(f"Multi IP:{multi_ip}")
-
-                multi_ip = self.multi_db.get_commodity_ip(commodity)
-                src, dsts = self.multi_db.get_src_host_from_commodity(commodity), self.multi_db.get_dst_hosts_from_commodity(commodity)
-                print(f"Multi IP:{multi_ip}")
-                print(f"src:{src}, dsts:{dsts}")
-                multi_flabel_val, multi_flabel_mask = self.multi_flabel_db.assign_subgroup(commodity)
-                print(f"Multi Flow Label:{multi_flabel_val:05x}, Flow Label Mask:{multi_flabel_mask:05x}")
-                print(f"Multi Flow Bandwidth:{tree_bandwidth}")
-                self.record_data_to_json(commodity, multi_ip, src, dsts, multi_flabel_val, multi_flabel_mask, tree_bandwidth)
-
-                print_dict(tree)
-                for dp_id in nodes:
-                    dp = self.topo.get_datapath(dp_id)
-                    group_id = self.group_id_counter
-                    port_bw_list = switch_to_port_bandwidth[dp_id]
-                    # 處理每個 switch 的 output 流向
-                    if len(port_bw_list) > 1:
-                        self.send_group_multicast_method(dp, port_bw_list, group_id)
-                    else:
-                        self.send_group_selection_method(dp, port_bw_list, group_id)
-                    # 處理每個 switch 的 inport 判斷
-                    for inport in switch_to_inport[dp_id]:
-                        # self.send_flowMod_to_switch(dp, inport, group_id, multi_ip)
-                        self.send_flowMod_to_switch(dp, inport, group_id, multi_ip=multi_ip, multi_flabel_val=multi_flabel_val, multi_flabel_mask=multi_flabel_mask)
-                    
-                    self.group_id_counter+=1
-    
+            if commodity in self.host_flabels:
+                # 已經安裝過的 commodity 換成新的 tree，用 make-before-break 的方式切換
+                if paths != self.installed_paths.get(commodity):
+                    self.migrate_commodity(commodity, paths)
+                continue
+
+            generation = self.rule_index.new_generation(commodity)
+            host_flabels = []
+            for tree_index, tree in enumerate(paths):
+                installed = self._install_tree(commodity, tree_index, tree, generation)
+                host_flabels.append(installed['flabel'])
+            self.host_flabels[commodity] = host_flabels
+            self.installed_paths[commodity] = paths
+
+    def _install_tree(self, commodity, tree_index, tree, generation, migrating=False):
+        """
+        安裝一棵 tree 的 group 與 flow，回傳這棵 tree 的資訊：
+        {'cookie', 'flabel', 'ingress', 'ingress_port', 'group_id', 'datapaths'}
+        migrating 為 True 時不安裝 ingress switch 上從 source host 進來的 flow，
+        由 migration 之後一次切換。
+        """
+        switch_to_port_bandwidth = {}
+        switch_to_inport = {}
+        nodes = set()
+        tree_bandwidth = 0
+        print(f"---- tree ----")
+        
+        for (u, v), bw in tree.items():
+            port_u, port_v = self.topo.get_link(u, v)
+            
+            # 判斷每個 switch 要流出的 port，以及其權重
+            if u not in switch_to_port_bandwidth:
+                switch_to_port_bandwidth[u] = [(port_u, bw)]
+                tree_bandwidth = bw
+            else:
+                switch_to_port_bandwidth[u].append((port_u, bw))
+            # 判斷每個 switch 流入口，來當作 match 條件
+            if v not in switch_to_inport:
+                switch_to_inport[v] = [port_v]
+            else:
+                switch_to_inport[v].append(port_v)
+
+            if not u.startswith('h'):
+                nodes.add(u)
+            if not v.startswith('h'):
+                nodes.add(v)
+            
+
+        # multi_ip = self.multi_db.assign_internal_ip(commodity)
+        # if multi_ip is None:
+        #     # 測試用 ip
+        #     multi_ip = "ff38::8888"
+        # print(f"Multi IP:{multi_ip}")
+
+        multi_ip = self.multi_db.get_commodity_ip(commodity)
+        src, dsts = self.multi_db.get_src_host_from_commodity(commodity), self.multi_db.get_dst_hosts_from_commodity(commodity)
+        print(f"Multi IP:{multi_ip}")
+        print(f"src:{src}, dsts:{dsts}")
+        multi_flabel_val, multi_flabel_mask = self.multi_flabel_db.assign_subgroup(commodity)
+        print(f"Multi Flow Label:{multi_flabel_val:05x}, Flow Label Mask:{multi_flabel_mask:05x}")
+        print(f"Multi Flow Bandwidth:{tree_bandwidth}")
+        if not migrating:
+            # migration 時 host 繼續用原本的 flow label，由 ingress switch 改寫
+            self.record_data_to_json(commodity, multi_ip, src, dsts, multi_flabel_val, multi_flabel_mask, tree_bandwidth)
+        # 這棵 tree 的 ingress switch，用來量測 tree 的流量，也是 migration 切換的地方
+        ingress, ingress_port = next(((v, self.topo.get_link(u, v)[1]) for (u, v) in tree if u == src),
+                                     (None, None))
+        cookie = self.rule_index.new_tree(commodity, tree_index, multi_ip,
+                                          multi_flabel_val, multi_flabel_mask,
+                                          ingress, generation)
+
+        print_dict(tree)
+        installed = {
+            'cookie': cookie,
+            'multi_ip': multi_ip,
+            'flabel': (multi_flabel_val, multi_flabel_mask),
+            'ingress': ingress,
+            'ingress_port': ingress_port,
+            'group_id': None,
+            'datapaths': [],
+        }
+        for dp_id in nodes:
+            dp = self.topo.get_datapath(dp_id)
+            group_id = self.group_id_counter
+            port_bw_list = switch_to_port_bandwidth[dp_id]
+            # 處理每個 switch 的 output 流向
+            if len(port_bw_list) > 1:
+                self.send_group_multicast_method(dp, port_bw_list, group_id)
+            else:
+                self.send_group_selection_method(dp, port_bw_list, group_id)
+            self.rule_index.add_group(dp.id, cookie, group_id)
+            installed['datapaths'].append(dp)
+            if dp_id == ingress:
+                installed['group_id'] = group_id
+            # 處理每個 switch 的 inport 判斷
+            for inport in switch_to_inport[dp_id]:
+                if migrating and dp_id == ingress and inport == ingress_port:
+                    continue
+                # self.send_flowMod_to_switch(dp, inport, group_id, multi_ip)
+                self.send_flowMod_to_switch(dp, inport, group_id, multi_ip=multi_ip, multi_flabel_val=multi_flabel_val, multi_flabel_mask=multi_flabel_mask, cookie=cookie)
+            
+            self.group_id_counter+=1
+        return installed
+
+    def migrate_commodity(self, commodity, paths):
+        """
+        同一個 commodity 同時只跑一個 migration；
+        執行中又收到新的 paths 時，等目前這次結束後再換成最新的 paths。
+        """
+        running = commodity in self.pending_migrations
+        self.pending_migrations[commodity] = paths
+        if not running:
+            hub.spawn(self._migration_worker, commodity)
+
+    def _migration_worker(self, commodity):
+        try:
+            while True:
+                paths = self.pending_migrations[commodity]
+                if commodity in self.host_flabels:
+                    self._migrate(commodity, paths)
+                if self.pending_migrations[commodity] is paths:
+                    return
+        finally:
+            self.pending_migrations.pop(commodity, None)
+
+    def _migrate(self, commodity, paths):
+        """
+        make-before-break:
+        1. 新的 tree 用新的 generation 與新的 flow label subgroup 安裝在除了
+           ingress 以外的地方，和舊的 tree 不會 match 到同樣的封包
+        2. barrier 確認所有 switch 都裝好
+        3. 在 ingress switch 用一個 atomic bundle 加上較高 priority 的 flow，
+           把 host 使用的 flow label 改寫成新的 subgroup 並送進新的 group
+        4. 等舊 generation 的 flow counter 不再增加 (或超時)
+        5. 刪掉舊 generation 的 flow 與 group，再把 ingress flow 降回原本的 priority
+        """
+        old_generation = self.rule_index.generations[commodity]
+        old_cookies = self.rule_index.cookies_of(commodity, old_generation)
+        host_flabels = self.host_flabels[commodity]
+        generation = self.rule_index.new_generation(commodity)
+        self.logger.info("migrate %s: generation %s -> %s", commodity, old_generation, generation)
+
+        try:
+            trees = [self._install_tree(commodity, tree_index, tree, generation, migrating=True)
+                     for tree_index, tree in enumerate(paths)]
+        except ValueError as e:
+            self.logger.warning("migrate %s: %s, abort", commodity, e)
+            self._abort_migration(commodity, old_generation, generation)
+            return
+        ingress = trees[0]['ingress'] if trees else None
+        if ingress is None or any(tree['ingress'] != ingress for tree in trees):
+            self.logger.warning("migrate %s: no common ingress switch, abort", commodity)
+            self._abort_migration(commodity, old_generation, generation)
+            return
+        ingress_dp = self.topo.get_datapath(ingress)
+
+        # 新的 tree 比 host 用的 flow label 多時，多出來的 tree 直接用自己的 label；
+        # 比較少時，多出來的 host label 輪流分給新的 tree
+        for tree in trees[len(host_flabels):]:
+            host_flabels.append(tree['flabel'])
+        flips = [(host_flabel, trees[i % len(trees)]) for i, host_flabel in enumerate(host_flabels)]
+
+        datapaths = {dp.id: dp for tree in trees for dp in tree['datapaths']}
+        if not self.send_barriers(list(datapaths.values())):
+            self.logger.warning("migrate %s: new trees not confirmed, abort", commodity)
+            self._abort_migration(commodity, old_generation, generation)
+            return
+
+        mods = [self._ingress_flow_mod(ingress_dp, host_flabel, tree, self.priority + 1)
+                for host_flabel, tree in flips]
+        if not self.send_bundle(ingress_dp, mods):
+            self.logger.warning("migrate %s: ingress flip failed, abort", commodity)
+            self._abort_migration(commodity, old_generation, generation)
+            return
+        flip_time = time.time()
+        for mod, (host_flabel, tree) in zip(mods, flips):
+            self.reconciler.record_flow(ingress_dp.id, mod)
+            self.rule_index.add_rule(ingress_dp.id, tree['cookie'], mod.priority,
+                                     tree['ingress_port'], tree['multi_ip'], *host_flabel)
+
+        deadline = flip_time + self.MIGRATION_DRAIN_TIMEOUT
+        while not self.tree_stats.drained(old_cookies, flip_time):
+            if time.time() > deadline:
+                self.logger.warning("migrate %s: old trees not drained in %ss",
+                                    commodity, self.MIGRATION_DRAIN_TIMEOUT)
+                break
+            hub.sleep(self.MONITOR_INTERVAL)
+
+        self._remove_generation(commodity, old_generation)
+
+        # 降回原本的 priority：先加同樣的 flow，確認後再刪掉高 priority 的
+        for host_flabel, tree in flips:
+            mod = self._ingress_flow_mod(ingress_dp, host_flabel, tree, self.priority)
+            ingress_dp.send_msg(mod)
+            self.reconciler.record_flow(ingress_dp.id, mod)
+            self.rule_index.add_rule(ingress_dp.id, tree['cookie'], mod.priority,
+                                     tree['ingress_port'], tree['multi_ip'], *host_flabel)
+        self.send_barriers([ingress_dp])
+        for mod, (host_flabel, tree) in zip(mods, flips):
+            self.delete_flow_strict(ingress_dp, mod)
+            self.reconciler.forget_flow(ingress_dp.id, mod)
+            self.rule_index.remove_rule(ingress_dp.id, mod.priority, tree['ingress_port'],
+                                        tree['multi_ip'], *host_flabel)
+
+        self.installed_paths[commodity] = paths
+        self.logger.info("migrate %s: done", commodity)
+
+    def _abort_migration(self, commodity, old_generation, generation):
+        """ 舊的 tree 還在使用，刪掉裝到一半的新 tree 即可 """
+        self._remove_generation(commodity, generation)
+        self.rule_index.generations[commodity] = old_generation
+
+    def _ingress_flow_mod(self, datapath, host_flabel, tree, priority):
+        """ ingress switch 上 match host 的 flow label，改寫成 tree 的 subgroup 後送進 tree 的 group """
+        parser = datapath.ofproto_parser
+        match = parser.OFPMatch(in_port=tree['ingress_port'],
+                                eth_type=ether_types.ETH_TYPE_IPV6,
+                                ipv6_dst=tree['multi_ip'],
+                                ipv6_flabel=host_flabel)
+        actions = []
+        if host_flabel != tree['flabel']:
+            # 只改寫 subgroup 的 bits，後面給 hash 用的 bits 保留
+            actions.append(parser.OFPActionSetField(ipv6_flabel=tree['flabel']))
+        actions.append(parser.OFPActionGroup(tree['group_id']))
+        inst = [parser.OFPInstructionActions(datapath.ofproto.OFPIT_APPLY_ACTIONS, actions)]
+        return parser.OFPFlowMod(datapath=datapath, cookie=tree['cookie'],
+                                 priority=priority, match=match, instructions=inst)
+
+    def remove_commodity(self, commodity):
+        """
+        刪除一個 commodity 安裝的所有 flow 與 group：
+        每台相關的 switch 送一個 cookie mask 的 OFPFC_DELETE，再刪掉它的 group。
+        """
+        if commodity not in self.rule_index.commodity_ids:
+            return False
+        cookie, cookie_mask = self.rule_index.commodity_cookie(commodity)
+        cookies = self.rule_index.cookies_of(commodity)
+        self._delete_rules(cookies, cookie, cookie_mask)
+        self._release_flabels(commodity, cookies)
+
+        self.rule_index.remove_commodity(commodity)
+        self.tree_stats.forget_cookies(cookies)
+        self.topo.del_commodity(commodity)
+        self.host_flabels.pop(commodity, None)
+        self.installed_paths.pop(commodity, None)
+        return True
+
+    def _remove_generation(self, commodity, generation):
+        cookie, cookie_mask = self.rule_index.generation_cookie(commodity, generation)
+        cookies = self.rule_index.cookies_of(commodity, generation)
+        self._delete_rules(cookies, cookie, cookie_mask)
+        # host 還在用的 flow label 由 ingress switch 改寫，不能分給之後的 tree
+        self._release_flabels(commodity, cookies, keep=self.host_flabels.get(commodity, ()))
+        self.rule_index.remove_cookies(cookies)
+        self.tree_stats.forget_cookies(cookies)
+
+    def _release_flabels(self, commodity, cookies, keep=()):
+        """ 規則刪掉之後，把 tree 使用的 flow label subgroup 還給 multi_flabel_db """
+        for cookie in cookies:
+            tree = self.rule_index.trees.get(cookie)
+            if tree is None:
+                continue
+            flabel = (tree['flabel_val'], tree['flabel_mask'])
+            if flabel not in keep:
+                self.multi_flabel_db.release_subgroup(commodity, flabel)
+
+    def _delete_rules(self, cookies, cookie, cookie_mask):
+        for dpid, group_ids in self.rule_index.datapaths_of(cookies).items():
+            # 離線的 switch 也要忘掉，重新連線時 reconcile 會刪掉殘留的規則
+            self.reconciler.forget_flows(dpid, cookie, cookie_mask)
+            for group_id in group_ids:
+                self.reconciler.forget_group(dpid, group_id)
+            dp = self.topo.get_datapath(dpid)
+            if dp is None:
+                continue
+            self.delete_flow(dp, cookie, cookie_mask)
+            for group_id in group_ids:
+                self.delete_group(dp, group_id)
+
+    def delete_group(self, datapath, group_id):
+        ofp = datapath.ofproto
+        parser = datapath.ofproto_parser
+        req = parser.OFPGroupMod(datapath=datapath,
+                                 command=ofp.OFPGC_DELETE,
+                                 group_id=group_id)
+        datapath.send_msg(req)
+
+    def delete_flow_strict(self, datapath, mod):
+        """ 只刪掉 priority 與 match 完全相同的那一條 flow """
+        ofp = datapath.ofproto
+        parser = datapath.ofproto_parser
+        req = parser.OFPFlowMod(datapath=datapath, table_id=mod.table_id,
+                                command=ofp.OFPFC_DELETE_STRICT,
+                                priority=mod.priority, out_port=ofp.OFPP_ANY,
+                                out_group=ofp.OFPG_ANY, match=mod.match)
+        datapath.send_msg(req)
+
+    @set_ev_cls([ofp_event.EventOFPBarrierReply,
+                 ofp_event.EventOFPBundleCtrlMsg,
+                 ofp_event.EventOFPErrorMsg], MAIN_DISPATCHER)
+    def _reply_handler(self, ev):
+        msg = ev.msg
+        waiter = self.reply_waiters.pop((msg.datapath.id, msg.xid), None)
+        if waiter is None:
+            return
+        lock, replies = waiter
+        replies.append(msg)
+        lock.set()
+
+    def send_and_wait(self, requests, timeout=None):
+        """
+        requests: [(datapath, msg)]，全部送出後再一起等回覆，
+        回傳每個 request 的 reply (可能是 error)，超時的為 None。
+        """
+        if timeout is None:
+            timeout = self.REPLY_TIMEOUT
+        waiters = []
+        for dp, msg in requests:
+            dp.set_xid(msg)
+            key = (dp.id, msg.xid)
+            waiter = self.reply_waiters[key] = (hub.Event(), [])
+            waiters.append((key, waiter))
+            dp.send_msg(msg)
+
+        deadline = time.time() + timeout
+        replies = []
+        for key, (lock, msgs) in waiters:
+            lock.wait(max(deadline - time.time(), 0))
+            self.reply_waiters.pop(key, None)
+            replies.append(msgs[0] if msgs else None)
+        return replies
+
+    def send_barriers(self, datapaths) -> bool:
+        replies = self.send_and_wait(
+            [(dp, dp.ofproto_parser.OFPBarrierRequest(dp)) for dp in datapaths])
+        return all(reply is not None
+                   and isinstance(reply, reply.datapath.ofproto_parser.OFPBarrierReply)
+                   for reply in replies)
+
+    def send_bundle(self, datapath, msgs) -> bool:
+        """ 用 atomic bundle 送出 msgs，全部成功或全部不生效 """
+        ofp = datapath.ofproto
+        parser = datapath.ofproto_parser
+        bundle_id = self.bundle_id_counter
+        self.bundle_id_counter += 1
+        flags = ofp.OFPBF_ATOMIC | ofp.OFPBF_ORDERED
+        datapath.send_msg(parser.OFPBundleCtrlMsg(
+            datapath, bundle_id, ofp.OFPBCT_OPEN_REQUEST, flags, []))
+        for msg in msgs:
+            datapath.send_msg(parser.OFPBundleAddMsg(datapath, bundle_id, flags, msg, []))
+        reply, = self.send_and_wait([(datapath, parser.OFPBundleCtrlMsg(
+            datapath, bundle_id, ofp.OFPBCT_COMMIT_REQUEST, flags, []))])
+        return (isinstance(reply, parser.OFPBundleCtrlMsg)
+                and reply.type == ofp.OFPBCT_COMMIT_REPLY)
+
     def connect_to_host_and_send_setting_cmd(self, commodities):
         
         self.mininet.set_hosts(self.topo.get_all_host_single_ipv6())
@@ -127,19 +533,34 @@ class MyController(SimpleSwitch15):
                                group_id, 
                                multi_ip=None, 
                                multi_flabel_val = None,
-                               multi_flabel_mask = None):
+                               multi_flabel_mask = None,
+                               cookie = 0):
         
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
-        match = parser.OFPMatch(
+        match_fields = dict(
             in_port=inport,
             eth_type=ether_types.ETH_TYPE_IPV6,
             ipv6_dst=multi_ip,
             ipv6_flabel = (multi_flabel_val, multi_flabel_mask) # mask 後面 12 bits(3 bytes)，只看前 8 bits
         )
+        if hasattr(parser, 'OFPMatchTemplate'):
+            # 欄位固定，template 只需編譯一次
+            template = self.match_templates.get(parser)
+            if template is None:
+                template = parser.OFPMatchTemplate(
+                    'in_port', 'eth_type', 'ipv6_dst', ('ipv6_flabel', True))
+                self.match_templates[parser] = template
+            match = template.match(**match_fields)
+        else:
+            match = parser.OFPMatch(**match_fields)
         actions = [parser.OFPActionGroup(group_id)]
         # actions = [parser.OFPActionOutput(1)]
-        self.add_flow(datapath, self.priority, match, actions)
+        mod = self.add_flow(datapath, self.priority, match, actions, cookie=cookie)
+        self.reconciler.record_flow(datapath.id, mod)
+        if cookie:
+            self.rule_index.add_rule(datapath.id, cookie, mod.priority, inport, multi_ip,
+                                     multi_flabel_val, multi_flabel_mask)
     
     def send_group_multicast_method(self, datapath, port_weight_list, group_id):
 
@@ -167,6 +588,7 @@ class MyController(SimpleSwitch15):
                                     )
         
         datapath.send_msg(req)
+        self.reconciler.record_group(datapath.id, req)
 
     def send_group_selection_method(self, datapath, port_weight_list, group_id):
 
@@ -189,6 +611,9 @@ class MyController(SimpleSwitch15):
             )
             buckets.append(bucket)
             bucket_id+=1
+        # 記下安裝的權重，之後用 group stats 檢查實際分流比例
+        self.link_monitor.set_bucket_weights(
+            datapath.id, group_id, [weight for _, weight in port_weight_list])
         
         property = sm_parser.OFPGroupPropExperimenter(
             type_=ofp.OFPGPT_EXPERIMENTER,
@@ -207,6 +632,7 @@ class MyController(SimpleSwitch15):
                                     )
         
         datapath.send_msg(req)
+        self.reconciler.record_group(datapath.id, req)
 
     def assign_commodities_hosts_to_multi_ip(self, commodities_data):
         for data in commodities_data:
@@ -0,0 +1,99 @@
+import time
+from typing import Dict, Tuple
+
+from link_monitor import CounterDelta, RateRing
+from rule_index import RuleIndex
+
+
+class TreeFlowStats:
+    """
+    把 flow stats 的 packet / byte count 依 RuleIndex 歸到
+    commodity / tree / subgroup，計算每棵 tree 的速率 (bits/s)。
+    tree 的速率以 ingress switch 上的規則為準。
+    """
+
+    FIELDS = ('bps', 'pps')
+
+    def __init__(self, index: RuleIndex, size=300):
+        self.index = index
+        self.size = size
+        # (cookie, dpid) -> RateRing
+        self.rings: Dict[Tuple[int, int], RateRing] = {}
+        self.counters = CounterDelta()
+
+    def update_flow_stats(self, dpid, body, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        # 同一棵 tree 在一台 switch 上可能有多條規則 (多個 in_port、migration 時不同 priority)，
+        # 每條規則各自計算速率再加總，規則增減時加總的 counter 才不會跳動
+        totals = {}
+        for stat in body:
+            rule = self.index.rule_key(stat.priority, stat.match)
+            cookie = self.index.lookup(dpid, rule)
+            if cookie is None:
+                continue
+            counters = (stat.stats.get('byte_count', 0), stat.stats.get('packet_count', 0))
+            rates = self.counters.rate((cookie, dpid, rule), timestamp, counters)
+            if rates is None:
+                continue
+            prev = totals.get(cookie, (0, 0))
+            totals[cookie] = (prev[0] + rates[0] * 8, prev[1] + rates[1])
+
+        for cookie, rates in totals.items():
+            key = (cookie, dpid)
+            ring = self.rings.get(key)
+            if ring is None:
+                ring = self.rings[key] = RateRing(self.size, len(self.FIELDS))
+            ring.append(timestamp, rates)
+
+    def forget_cookies(self, cookies):
+        cookies = set(cookies)
+        for key in [key for key in self.rings if key[0] in cookies]:
+            del self.rings[key]
+        self.counters.forget(lambda key: key[0] in cookies)
+
+    def drained(self, cookies, since) -> bool:
+        """
+        這些 cookie 的規則在 since 之後都至少取樣過一次，而且最新的 packet 速率都是 0。
+        從來沒有取樣過的規則不列入判斷。
+        """
+        cookies = set(cookies)
+        for (cookie, dpid), ring in self.rings.items():
+            if cookie not in cookies or not len(ring):
+                continue
+            if ring.times()[-1] <= since or ring.latest()[1] > 0:
+                return False
+        return True
+
+    def remove_datapath(self, dpid):
+        for key in [key for key in self.rings if key[1] == dpid]:
+            del self.rings[key]
+        self.counters.forget(lambda key: key[1] == dpid)
+
+    def tree_summary(self) -> Dict:
+        """
+        {commodity: {tree_index: {'multi_ip', 'flabel', 'bps', 'pps', 'switches': {dpid: bps}}}}
+        """
+        summary = {}
+        for cookie, tree in self.index.trees.items():
+            switches = {}
+            for (ring_cookie, dpid), ring in self.rings.items():
+                if ring_cookie == cookie and len(ring):
+                    switches[str(dpid)] = ring.latest()
+            if tree['ingress'] is not None and str(tree['ingress']) in switches:
+                latest = switches[str(tree['ingress'])]
+            elif switches:
+                latest = max(switches.values(), key=lambda rates: rates[0])
+            else:
+                latest = None
+            summary.setdefault(tree['commodity'], {})[str(tree['tree'])] = {
+                'cookie': f"{cookie:#018x}",
+                'generation': tree['generation'],
+                'multi_ip': tree['multi_ip'],
+                'flabel': (f"{tree['flabel_val']:05x}/{tree['flabel_mask']:05x}"
+                           if tree['flabel_val'] is not None else None),
+                'bps': float(latest[0]) if latest is not None else None,
+                'pps': float(latest[1]) if latest is not None else None,
+                'switches': {dpid: float(rates[0]) for dpid, rates in switches.items()},
+            }
+        return summary
@@ -0,0 +1,232 @@
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# OpenFlow 的 port / group counter 都是 64 bits
+COUNTER_MAX = 2 ** 64
+
+
+class RateRing:
+    """
+    固定大小的 ring buffer，保存 (timestamp, 各欄位速率) 的時間序列。
+    記憶體在建立時就配置好，之後 append 不再配置新的空間。
+    """
+
+    def __init__(self, size, width):
+        self.timestamps = np.zeros(size, dtype=np.float64)
+        self.data = np.zeros((size, width), dtype=np.float64)
+        self.size = size
+        self.count = 0
+        self.pos = 0
+
+    def append(self, timestamp, values):
+        self.timestamps[self.pos] = timestamp
+        self.data[self.pos] = values
+        self.pos = (self.pos + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def __len__(self):
+        return self.count
+
+    def values(self) -> np.ndarray:
+        """依時間先後回傳所有樣本 (count x width)"""
+        if self.count < self.size:
+            return self.data[:self.count]
+        return np.roll(self.data, -self.pos, axis=0)
+
+    def times(self) -> np.ndarray:
+        if self.count < self.size:
+            return self.timestamps[:self.count]
+        return np.roll(self.timestamps, -self.pos)
+
+    def latest(self) -> np.ndarray:
+        if self.count == 0:
+            return None
+        return self.data[(self.pos - 1) % self.size]
+
+    def percentile(self, q) -> np.ndarray:
+        """q 可以是單一數值或 list，回傳每個欄位的 percentile"""
+        if self.count == 0:
+            return None
+        return np.percentile(self.data[:self.count], q, axis=0)
+
+
+class CounterDelta:
+    """
+    記錄上一次的 counter，計算兩次 polling 之間的速率。
+    counter 變小時視為 64 bits wrap；差值大到不合理時視為 switch 重置了 counter，
+    這次樣本丟掉，只更新基準值。
+    """
+
+    def __init__(self):
+        # key -> (timestamp, counters)
+        self.last = {}
+
+    def rate(self, key, timestamp, counters):
+        prev = self.last.get(key)
+        self.last[key] = (timestamp, counters)
+        if prev is None:
+            return None
+
+        prev_timestamp, prev_counters = prev
+        interval = timestamp - prev_timestamp
+        if interval <= 0:
+            return None
+
+        rates = []
+        for cur, old in zip(counters, prev_counters):
+            delta = (cur - old) % COUNTER_MAX
+            if delta >= COUNTER_MAX // 2:
+                # counter reset
+                return None
+            rates.append(delta / interval)
+        return rates
+
+    def forget(self, match):
+        for key in [key for key in self.last if match(key)]:
+            del self.last[key]
+
+
+class LinkMonitor:
+    """
+    由 port stats / group stats 計算每個 (dpid, port) 與每個 group bucket 的速率，
+    存在固定大小的 RateRing 中。速率單位為 bits/s。
+    """
+
+    PORT_FIELDS = ('tx_bps', 'rx_bps', 'tx_pps', 'rx_pps')
+    BUCKET_FIELDS = ('bps', 'pps')
+    DEFAULT_PERCENTILES = (50, 95, 99)
+
+    def __init__(self, size=300):
+        self.size = size
+        # (dpid, port_no) -> RateRing
+        self.port_rings: Dict[Tuple[int, int], RateRing] = {}
+        # (dpid, group_id, bucket_index) -> RateRing
+        self.bucket_rings: Dict[Tuple[int, int, int], RateRing] = {}
+        # (dpid, group_id) -> 安裝時給每個 bucket 的 weight
+        self.bucket_weights: Dict[Tuple[int, int], List[int]] = {}
+        self.counters = CounterDelta()
+
+    def update_port_stats(self, dpid, body, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        for stat in body:
+            key = (dpid, stat.port_no)
+            rates = self.counters.rate(
+                ('port',) + key, timestamp,
+                (stat.tx_bytes, stat.rx_bytes, stat.tx_packets, stat.rx_packets))
+            if rates is None:
+                continue
+            rates[0] *= 8
+            rates[1] *= 8
+            ring = self.port_rings.get(key)
+            if ring is None:
+                ring = self.port_rings[key] = RateRing(self.size, len(self.PORT_FIELDS))
+            ring.append(timestamp, rates)
+
+    def update_group_stats(self, dpid, body, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        for stat in body:
+            for index, bucket in enumerate(stat.bucket_stats):
+                key = (dpid, stat.group_id, index)
+                rates = self.counters.rate(
+                    ('bucket',) + key, timestamp,
+                    (bucket.byte_count, bucket.packet_count))
+                if rates is None:
+                    continue
+                rates[0] *= 8
+                ring = self.bucket_rings.get(key)
+                if ring is None:
+                    ring = self.bucket_rings[key] = RateRing(self.size, len(self.BUCKET_FIELDS))
+                ring.append(timestamp, rates)
+
+    def set_bucket_weights(self, dpid, group_id, weights):
+        self.bucket_weights[(dpid, group_id)] = list(weights)
+
+    def remove_datapath(self, dpid):
+        for rings in (self.port_rings, self.bucket_rings):
+            for key in [key for key in rings if key[0] == dpid]:
+                del rings[key]
+        for key in [key for key in self.bucket_weights if key[0] == dpid]:
+            del self.bucket_weights[key]
+        self.counters.forget(lambda key: key[1] == dpid)
+
+    def port_rate(self, dpid, port_no, field='tx_bps'):
+        ring = self.port_rings.get((dpid, port_no))
+        if ring is None or not len(ring):
+            return None
+        return float(ring.latest()[self.PORT_FIELDS.index(field)])
+
+    def port_summary(self, percentiles=DEFAULT_PERCENTILES) -> Dict:
+        """{dpid: {port_no: {field: {'latest': x, 'p50': y, ...}}}}"""
+        return self._summary(self.port_rings, self.PORT_FIELDS, percentiles,
+                             lambda key: (str(key[0]), str(key[1])))
+
+    def group_summary(self, percentiles=DEFAULT_PERCENTILES) -> Dict:
+        """
+        {dpid: {group_id: {'buckets': {index: {...}}, 'share': [...], 'weight_share': [...]}}}
+        share 是各 bucket 最近的 byte 速率佔比，weight_share 是安裝時 weight 的佔比，
+        用來確認 flow label hash 的分流是否符合設定的權重。
+        """
+        summary = self._summary(self.bucket_rings, self.BUCKET_FIELDS, percentiles,
+                                lambda key: (str(key[0]), str(key[1]), str(key[2])))
+        for dpid, groups in summary.items():
+            for group_id, buckets in groups.items():
+                rates = [buckets[str(i)]['bps']['latest'] for i in range(len(buckets))
+                         if str(i) in buckets]
+                total = sum(rates)
+                groups[group_id] = {
+                    'buckets': buckets,
+                    'share': [rate / total if total else 0.0 for rate in rates],
+                }
+                weights = self.bucket_weights.get((int(dpid), int(group_id)))
+                if weights and sum(weights):
+                    groups[group_id]['weight_share'] = [w / sum(weights) for w in weights]
+        return summary
+
+    def link_utilization(self, links, percentile=None) -> Dict[str, float]:
+        """
+        links: topo.links, {(u, v): (port_u, port_v)}
+        回傳 {"u-v": Mbps}，以 u 端 port 的 tx 速率計算；
+        host 端沒有 switch port，改用 v 端 port 的 rx 速率。
+        percentile 為 None 時使用最新的樣本。
+        """
+        utilization = {}
+        for (u, v), (port_u, port_v) in links.items():
+            if str(u).isdigit():
+                key, column = (int(u), port_u), 'tx_bps'
+            elif str(v).isdigit():
+                key, column = (int(v), port_v), 'rx_bps'
+            else:
+                continue
+            ring = self.port_rings.get(key)
+            if ring is None or not len(ring):
+                continue
+            index = self.PORT_FIELDS.index(column)
+            if percentile is None:
+                bps = ring.latest()[index]
+            else:
+                bps = ring.percentile(percentile)[index]
+            utilization[f"{u}-{v}"] = float(bps) / 1e6
+        return utilization
+
+    def _summary(self, rings, fields, percentiles, to_path):
+        summary = {}
+        for key, ring in rings.items():
+            if not len(ring):
+                continue
+            latest = ring.latest()
+            values = ring.percentile(list(percentiles))
+            entry = {}
+            for i, field in enumerate(fields):
+                entry[field] = {'latest': float(latest[i])}
+                for j, q in enumerate(percentiles):
+                    entry[field][f"p{q}"] = float(values[j][i])
+            node = summary
+            path = to_path(key)
+            for name in path[:-1]:
+                node = node.setdefault(name, {})
+            node[path[-1]] = entry
+        return summary
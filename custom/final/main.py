@@ -32,7 +32,10 @@ def run_algorithm(nodes, links, caps, coms) -> Dict[str, Dict[Tuple[str, str], f
 
     return res
 
-def get_bandwidth(links):
+def get_bandwidth(links, utilization=None):
+    """
+    utilization: controller 量測到的 {"u-v": Mbps}，有給的話回傳剩餘頻寬
+    """
     
     capacities = {}
 
@@ -44,6 +47,8 @@ def get_bandwidth(links):
             capacity = 0
         else:
             capacity = 20
+        if utilization:
+            capacity = max(0, capacity - utilization.get(f"{a}-{b}", 0))
         capacities[f"{a}-{b}"] = capacities.get(f"{a}-{b}", capacity)
     return capacities
 
@@ -109,7 +114,8 @@ if __name__ == "__main__":
 
     nodes = parser.get_nodes()
     links = parser.get_links()
-    capacities = get_bandwidth(links)
+    utilization = client.fetch_link_utilization(percentile=95)
+    capacities = get_bandwidth(links, utilization)
     commodities = get_commodity(nodes, 2)
 
     # mininet = MininetSSHManager(parser.get_single_ip_from_all_hosts())
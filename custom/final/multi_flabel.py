@@ -46,6 +46,10 @@ class MultiFLabelDB:
         group = self._get_group_by_commodity(commodity)
         return group.assign_subgroup_flabel()
     
+    def release_subgroup(self, commodity: str, flabel: tuple):
+        group = self._get_group_by_commodity(commodity)
+        group.release_subgroup_flabel(*flabel)
+
     def get_all_subgroup(self, commodity: str):
         group = self._get_group_by_commodity(commodity)
         return group.get_all_subgroups()
@@ -65,6 +69,8 @@ class MultiGroup:
         self.group_id = group_id
         self.assigned_flabel: set[(int, int)] = set() # flow label value & flow label mask
         self.counter = 1
+        # 釋放後可以重新分配的 subgroup 編號
+        self.free_subgroups: List[int] = []
         self.hosts: List[str] = []
         self.match_bits = match_bits
         self.base_flabel_value, self.base_flabel_mask = self.generate_ipv6_flabel(group_id, match_bits) 
@@ -81,14 +87,35 @@ class MultiGroup:
         total_bits = 20
         mask_bits = 20 - self.match_bits*2
 
-        flabel_value = ((self.group_id << (total_bits-self.match_bits))|(self.counter << mask_bits)) & 0xFFFFF
+        # subgroup 只有 match_bits 個 bits，用完之前先重用釋放掉的編號，
+        # 否則會溢位到 group id 的 bits
+        if self.free_subgroups:
+            subgroup = min(self.free_subgroups)
+            self.free_subgroups.remove(subgroup)
+        elif self.counter < (1 << self.match_bits):
+            subgroup = self.counter
+            self.counter += 1
+        else:
+            raise ValueError(f"組 {self.group_id} 的 Flabel subgroup 已用完 "
+                             f"({len(self.assigned_flabel)} 個使用中)")
+
+        flabel_value = ((self.group_id << (total_bits-self.match_bits))|(subgroup << mask_bits)) & 0xFFFFF
         flabel_mask = 0xFFFFF & (~((1 << mask_bits)-1))
 
         self.assigned_flabel.add((flabel_value, flabel_mask))
-        self.counter+=1
 
         return flabel_value, flabel_mask
 
+    def release_subgroup_flabel(self, flabel_value, flabel_mask):
+        """
+        使用這個 Flabel 的規則都刪掉之後，把 subgroup 還回去
+        """
+        if (flabel_value, flabel_mask) not in self.assigned_flabel:
+            return
+        self.assigned_flabel.remove((flabel_value, flabel_mask))
+        mask_bits = 20 - self.match_bits*2
+        self.free_subgroups.append((flabel_value >> mask_bits) & ((1 << self.match_bits) - 1))
+
     def generate_ipv6_flabel(self, group_id: int, match_bits: int) -> tuple:
         """
         生成符合 OpenFlow 匹配規則的 ipv6_flabel 值與掩碼。
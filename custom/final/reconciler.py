@@ -0,0 +1,169 @@
+from typing import Dict, List, Set, Tuple
+
+from ryu.lib import ofctl_utils
+
+
+class Reconciler:
+    """
+    保存每台 switch 應有的 (desired) flow 與 group 狀態。
+    switch 重新連線或需要時，用 multipart request 取得 switch 上實際的狀態，
+    算出最小差異，只送出需要的 add / modify / delete，最後加一個 barrier。
+
+    只管理帶有 cookie_tag 的 flow (我們安裝的 multicast 規則)，
+    table-miss 之類 cookie 為 0 的規則不在比對範圍內。
+    group 沒有 cookie，只管理曾經由 record_group 記錄過的 group id，
+    其他 app 安裝的 group 不會被刪除。
+    """
+
+    def __init__(self, cookie_tag, cookie_tag_mask):
+        self.cookie_tag = cookie_tag
+        self.cookie_tag_mask = cookie_tag_mask
+        # dpid -> {(table_id, priority, match fields): OFPFlowMod}
+        self.flows: Dict[int, Dict[Tuple, object]] = {}
+        # dpid -> {group_id: OFPGroupMod}
+        self.groups: Dict[int, Dict[int, object]] = {}
+        # dpid -> 曾經記錄過的 group id，forget_group 之後仍保留，
+        # 讓 reconcile 可以刪掉離線時沒刪成功的 group
+        self.owned_groups: Dict[int, Set[int]] = {}
+
+    # ---- desired state ----
+
+    def record_flow(self, dpid, mod):
+        if mod.cookie & self.cookie_tag_mask != self.cookie_tag:
+            return
+        self.flows.setdefault(dpid, {})[self._flow_key(mod)] = mod
+
+    def record_group(self, dpid, mod):
+        self.groups.setdefault(dpid, {})[mod.group_id] = mod
+        self.owned_groups.setdefault(dpid, set()).add(mod.group_id)
+
+    def forget_flows(self, dpid, cookie, cookie_mask):
+        flows = self.flows.get(dpid, {})
+        for key in [key for key, mod in flows.items()
+                    if mod.cookie & cookie_mask == cookie & cookie_mask]:
+            del flows[key]
+
+    def forget_flow(self, dpid, mod):
+        self.flows.get(dpid, {}).pop(self._flow_key(mod), None)
+
+    def forget_group(self, dpid, group_id):
+        self.groups.get(dpid, {}).pop(group_id, None)
+
+    def has_state(self, dpid) -> bool:
+        return bool(self.flows.get(dpid) or self.groups.get(dpid))
+
+    # ---- diff ----
+
+    def diff(self, dp, flow_descs, group_descs) -> List:
+        """
+        flow_descs: switch 上帶 cookie_tag 的 OFPFlowDesc
+        group_descs: switch 上所有的 OFPGroupDescStats
+        回傳要送給 switch 的訊息，group 的新增在 flow 之前、刪除在 flow 之後，
+        避免 flow 指到不存在的 group。
+        """
+        ofp = dp.ofproto
+        parser = dp.ofproto_parser
+        desired_flows = self.flows.get(dp.id, {})
+        desired_groups = self.groups.get(dp.id, {})
+
+        group_adds, group_deletes = [], []
+        actual_groups = {}
+        for stats in group_descs:
+            actual_groups[stats.group_id] = stats
+        for group_id, mod in desired_groups.items():
+            actual = actual_groups.get(group_id)
+            if actual is None:
+                group_adds.append(self._group_mod(dp, mod, ofp.OFPGC_ADD))
+            elif (actual.type != mod.type
+                  or self._buckets_bytes(actual.buckets) != self._buckets_bytes(mod.buckets)):
+                group_adds.append(self._group_mod(dp, mod, ofp.OFPGC_MODIFY))
+        owned_groups = self.owned_groups.get(dp.id, set())
+        for group_id in actual_groups:
+            if group_id in owned_groups and group_id not in desired_groups:
+                group_deletes.append(parser.OFPGroupMod(
+                    datapath=dp, command=ofp.OFPGC_DELETE, group_id=group_id))
+
+        flow_mods = []
+        actual_flows = {}
+        for desc in flow_descs:
+            actual_flows[self._flow_key(desc)] = desc
+        for key, mod in desired_flows.items():
+            actual = actual_flows.get(key)
+            if (actual is None or actual.cookie != mod.cookie
+                    or self._instructions_bytes(actual.instructions)
+                    != self._instructions_bytes(mod.instructions)):
+                # 相同 match / priority 的 ADD 會直接覆蓋 (包含 cookie)
+                flow_mods.append(self._flow_mod(dp, mod))
+        for key, desc in actual_flows.items():
+            if key not in desired_flows:
+                flow_mods.append(parser.OFPFlowMod(
+                    datapath=dp, cookie=desc.cookie, cookie_mask=0xffffffffffffffff,
+                    table_id=desc.table_id, command=ofp.OFPFC_DELETE_STRICT,
+                    priority=desc.priority, out_port=ofp.OFPP_ANY,
+                    out_group=ofp.OFPG_ANY, match=desc.match))
+
+        return group_adds + flow_mods + group_deletes
+
+    def reconcile(self, dp, waiters):
+        """
+        同時送出 flow desc 與 group desc request，等回覆後送出差異。
+        回傳送出的訊息數，取得 switch 狀態失敗時回傳 None。
+        """
+        ofp = dp.ofproto
+        parser = dp.ofproto_parser
+        flow_req = parser.OFPFlowDescStatsRequest(
+            dp, cookie=self.cookie_tag, cookie_mask=self.cookie_tag_mask)
+        group_req = parser.OFPGroupDescStatsRequest(dp, 0, ofp.OFPG_ALL)
+        futures = [ofctl_utils.send_stats_request_async(dp, flow_req, waiters),
+                   ofctl_utils.send_stats_request_async(dp, group_req, waiters)]
+        ofctl_utils.wait_stats_futures(futures)
+        if not all(future.done() for future in futures):
+            return None
+
+        flow_descs = [desc for msg in futures[0].msgs for desc in msg.body]
+        group_descs = [stats for msg in futures[1].msgs for stats in msg.body]
+        msgs = self.diff(dp, flow_descs, group_descs)
+        for msg in msgs:
+            dp.send_msg(msg)
+        if msgs:
+            dp.send_msg(parser.OFPBarrierRequest(dp))
+        return len(msgs)
+
+    # ---- helpers ----
+
+    def _flow_key(self, flow):
+        # switch 回傳的 OXM 欄位順序不一定和我們送出的相同，
+        # 重新 parse 後依欄位名稱排序，值也統一成 parser 的格式
+        buf = bytearray()
+        flow.match.serialize(buf, 0)
+        match = flow.match.parser(bytes(buf), 0)
+        return (flow.table_id, flow.priority, tuple(sorted(match.items())))
+
+    def _instructions_bytes(self, instructions):
+        buf = bytearray()
+        for inst in instructions:
+            offset = len(buf)
+            inst.serialize(buf, offset)
+        return bytes(buf)
+
+    def _buckets_bytes(self, buckets):
+        buf = bytearray()
+        for bucket in sorted(buckets, key=lambda b: b.bucket_id):
+            offset = len(buf)
+            bucket.serialize(buf, offset)
+        return bytes(buf)
+
+    def _flow_mod(self, dp, mod):
+        # 原本的 mod 可能綁著舊的 datapath，重新建立一個
+        return dp.ofproto_parser.OFPFlowMod(
+            datapath=dp, cookie=mod.cookie, table_id=mod.table_id,
+            command=dp.ofproto.OFPFC_ADD, idle_timeout=mod.idle_timeout,
+            hard_timeout=mod.hard_timeout, priority=mod.priority,
+            flags=mod.flags, importance=mod.importance,
+            match=mod.match, instructions=mod.instructions)
+
+    def _group_mod(self, dp, mod, command):
+        return dp.ofproto_parser.OFPGroupMod(
+            datapath=dp, command=command, type_=mod.type,
+            group_id=mod.group_id, buckets=mod.buckets,
+            properties=mod.properties)
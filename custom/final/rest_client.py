@@ -1,35 +1,161 @@
 import requests
 import json
+import time
 from utils import tuple_key_to_str
 class RestAPIClient:
     def __init__(self, url):
         self.url = url
+        # 上一次取得的 topology 與它的 ETag，topology 沒變時 server 回 304
+        self.topology_etag = None
+        self.topology = None
 
     def fetch_json_data(self):
         """
         從指定的 REST API URL 取得 JSON 資料。
         """
         try:
-            response = requests.get(self.url + "/topology")
+            headers = {'If-None-Match': self.topology_etag} if self.topology_etag else None
+            response = requests.get(self.url + "/topology", headers=headers)
+            if response.status_code == 304:
+                return self.topology
             response.raise_for_status()  # 檢查是否成功請求
-            return response.json()       # 返回 JSON 資料
+            self.topology = response.json()       # 返回 JSON 資料
+            self.topology_etag = response.headers.get('ETag')
+            return self.topology
         except requests.exceptions.RequestException as e:
             print(f"Error fetching data from API: {e}")
             return None
     
-    def post_json_data(self, data):
+    def fetch_link_utilization(self, percentile=None):
         """
-        將 data (Python dict) 轉為 JSON 後，POST 到 self.url，
-        回傳伺服器的 JSON 回應（若無回傳 JSON，可視需求調整）。
+        取得每條 link 目前的使用量 {"u-v": Mbps}。
+        """
+        params = {'percentile': percentile} if percentile is not None else None
+        try:
+            response = requests.get(self.url + "/link_utilization", params=params)
+            response.raise_for_status()
+            return response.json()['links']
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching link utilization from API: {e}")
+            return None
+
+    def post_json_data(self, data, wait=True, timeout=60):
+        """
+        將 data (Python dict) 轉為 JSON 後，POST 到 self.url。
+        server 在背景安裝，wait 為 True 時等安裝結束並回傳 job 狀態，
+        否則直接回傳 job id。
         """
         json_data = json.dumps(tuple_key_to_str(data), indent=4)
         print(json_data)
         try:
             response = requests.post(self.url + "/upload_algorithm_result", data=json_data)
             response.raise_for_status()  # 若非 2xx，拋出異常
-            return response.text       # 假設伺服器也回傳 JSON
+            job_id = response.json()['job_id']
         except requests.exceptions.RequestException as e:
             print(f"Error posting data to API: {e}")
             return None
+        if not wait:
+            return job_id
+        return self.wait_job(job_id, timeout)
+
+    def fetch_job(self, job_id):
+        try:
+            response = requests.get(self.url + f"/jobs/{job_id}")
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching job {job_id} from API: {e}")
+            return None
+
+    def wait_job(self, job_id, timeout=60, interval=0.5):
+        """ polling job 狀態直到 done / failed 或超時，回傳最後一次的狀態 """
+        deadline = time.time() + timeout
+        while True:
+            job = self.fetch_job(job_id)
+            if job is None or job['status'] in ('done', 'failed') or time.time() > deadline:
+                return job
+            time.sleep(interval)
  
     
+
+
+class TopologyStreamClient:
+    """
+    連到 /topology/ws，維護一份最新的 topology：
+    收到 snapshot 就整份換掉，收到 delta 就套用；
+    version 不連續時送出 resync，由 server 補差異或重送 snapshot。
+
+    需要 websocket-client 套件。
+    """
+
+    def __init__(self, url):
+        # url: http://host:port
+        self.url = url.replace("http://", "ws://", 1).replace("https://", "wss://", 1) + "/topology/ws"
+        self.version = None
+        self.links = {}
+        self.hosts = {}
+        self.datapaths = set()
+        self.ws = None
+        # 已經送出 resync，還在等 server 補
+        self.resyncing = False
+
+    def connect(self):
+        import websocket
+        url = self.url if self.version is None else f"{self.url}?since={self.version}"
+        self.ws = websocket.create_connection(url)
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+            self.ws = None
+
+    def to_dict(self):
+        """ 跟 fetch_json_data 回傳的格式相同 """
+        return {"links": self.links, "hosts": self.hosts}
+
+    def poll(self, timeout=None) -> bool:
+        """ 處理一則訊息，回傳 topology 是否有變；timeout 內沒有訊息時回傳 False """
+        import websocket
+        if self.ws is None:
+            self.connect()
+        self.ws.settimeout(timeout)
+        try:
+            msg = json.loads(self.ws.recv())
+        except websocket.WebSocketTimeoutException:
+            return False
+        except websocket.WebSocketConnectionClosedException:
+            # 重新連線時帶 since，server 只補差異
+            self.ws = None
+            return False
+        return self.apply(msg)
+
+    def apply(self, msg) -> bool:
+        if msg['type'] == 'snapshot':
+            self.links = msg['links']
+            self.hosts = msg['hosts']
+            self.datapaths = set(msg['datapaths'])
+            self.version = msg['version']
+            self.resyncing = False
+            return True
+
+        if msg['version'] <= self.version:
+            return False
+        if msg['version'] != self.version + 1:
+            # 中間漏掉了，請 server 從目前的 version 補
+            if not self.resyncing:
+                self.ws.send(json.dumps({"type": "resync", "since": self.version}))
+                self.resyncing = True
+            return False
+
+        op, key, value = msg['op'], msg['key'], msg['value']
+        if op == 'link_add':
+            self.links[key] = value
+        elif op in ('host_add', 'host_update'):
+            self.hosts[key] = value
+        elif op == 'datapath_add':
+            self.datapaths.add(key)
+        elif op == 'datapath_delete':
+            self.datapaths.discard(key)
+        self.version = msg['version']
+        self.resyncing = False
+        return True
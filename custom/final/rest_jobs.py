@@ -0,0 +1,74 @@
+import itertools
+import time
+import traceback
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from ryu.lib import hub
+
+
+class JobQueue:
+    """
+    REST 上傳的工作 (例如安裝 algorithm 結果) 放到背景的 worker 依序執行，
+    request 只拿到 job id，之後用 get() 查詢狀態，不會卡住其他 REST request。
+
+    job 狀態: queued -> running -> done / failed
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, history=100):
+        # 只保留最近 history 個 job 的狀態
+        self.history = history
+        self.jobs: Dict[int, Dict] = OrderedDict()
+        self.queue = hub.Queue()
+        self.job_ids = itertools.count(1)
+        self.worker = hub.spawn(self._worker)
+
+    def submit(self, name, func, *args, **kwargs) -> int:
+        job_id = next(self.job_ids)
+        self.jobs[job_id] = {
+            'id': job_id,
+            'name': name,
+            'status': self.QUEUED,
+            'error': None,
+            'submitted': time.time(),
+            'started': None,
+            'finished': None,
+        }
+        while len(self.jobs) > self.history:
+            self.jobs.popitem(last=False)
+        self.queue.put((job_id, func, args, kwargs))
+        return job_id
+
+    def get(self, job_id) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return dict(job, position=self._position(job_id))
+
+    def _position(self, job_id):
+        """ 前面還有幾個排隊中的 job，不在排隊中時為 None """
+        if self.jobs[job_id]['status'] != self.QUEUED:
+            return None
+        return sum(1 for other_id, job in self.jobs.items()
+                   if other_id < job_id and job['status'] == self.QUEUED)
+
+    def _worker(self):
+        while True:
+            job_id, func, args, kwargs = self.queue.get()
+            # job 可能因為 history 上限已經被移除，仍然要執行
+            job = self.jobs.get(job_id, {})
+            job['status'] = self.RUNNING
+            job['started'] = time.time()
+            try:
+                func(*args, **kwargs)
+                job['status'] = self.DONE
+            except Exception as e:
+                traceback.print_exc()  # 印出完整堆疊
+                job['status'] = self.FAILED
+                job['error'] = str(e)
+            job['finished'] = time.time()
@@ -0,0 +1,172 @@
+import ipaddress
+from typing import Dict, List, Optional, Tuple
+
+
+class RuleIndex:
+    """
+    記錄我們在每台 switch 上安裝了哪些 flow / group，以及它們屬於哪個
+    commodity / tree / generation。
+
+    cookie 編碼 (64 bits):
+        | tag (16) | commodity id (16) | tree id (16) | generation (16) |
+    tag 固定為 COOKIE_TAG，用來跟其他 app 的規則區分；
+    用 commodity_cookie() 回傳的 cookie/mask 可以一次刪掉或查詢一個 commodity 的所有 flow。
+
+    OpenFlow 1.5 的 flow stats reply 不帶 cookie，所以另外用
+    (dpid, priority, in_port, ipv6_dst, flabel value, flabel mask) 對回 cookie。
+    migration 時 ingress switch 上新舊 generation 的規則 match 相同，只差在 priority。
+    """
+
+    COOKIE_TAG = 0x4d43 << 48
+    COOKIE_TAG_MASK = 0xffff << 48
+    COMMODITY_SHIFT = 32
+    TREE_SHIFT = 16
+    FIELD_MASK = 0xffff
+
+    def __init__(self):
+        # commodity name -> commodity id
+        self.commodity_ids: Dict[str, int] = {}
+        self.commodity_id_counter = 1
+        # commodity name -> 目前使用中的 generation
+        self.generations: Dict[str, int] = {}
+        # cookie -> tree 資訊
+        self.trees: Dict[int, Dict] = {}
+        # dpid -> {(priority, in_port, ipv6_dst, flabel_val, flabel_mask): cookie}
+        self.flows: Dict[int, Dict[Tuple, int]] = {}
+        # dpid -> {group_id: cookie}
+        self.groups: Dict[int, Dict[int, int]] = {}
+
+    # ---- cookie ----
+
+    def encode_cookie(self, commodity_id, tree_id, generation) -> int:
+        return (self.COOKIE_TAG
+                | (commodity_id & self.FIELD_MASK) << self.COMMODITY_SHIFT
+                | (tree_id & self.FIELD_MASK) << self.TREE_SHIFT
+                | (generation & self.FIELD_MASK))
+
+    def decode_cookie(self, cookie) -> Optional[Tuple[int, int, int]]:
+        """回傳 (commodity id, tree id, generation)，不是我們的 cookie 則回傳 None"""
+        if cookie & self.COOKIE_TAG_MASK != self.COOKIE_TAG:
+            return None
+        return ((cookie >> self.COMMODITY_SHIFT) & self.FIELD_MASK,
+                (cookie >> self.TREE_SHIFT) & self.FIELD_MASK,
+                cookie & self.FIELD_MASK)
+
+    def commodity_cookie(self, commodity) -> Tuple[int, int]:
+        """一個 commodity 所有規則的 (cookie, cookie_mask)"""
+        commodity_id = self.commodity_ids[commodity]
+        mask = self.COOKIE_TAG_MASK | self.FIELD_MASK << self.COMMODITY_SHIFT
+        return self.encode_cookie(commodity_id, 0, 0), mask
+
+    def generation_cookie(self, commodity, generation) -> Tuple[int, int]:
+        """一個 commodity 某個 generation 所有規則的 (cookie, cookie_mask)"""
+        cookie, mask = self.commodity_cookie(commodity)
+        return cookie | (generation & self.FIELD_MASK), mask | self.FIELD_MASK
+
+    # ---- 安裝時登記 ----
+
+    def new_generation(self, commodity) -> int:
+        """commodity 每 (重新) 安裝一次就換一個 generation"""
+        if commodity not in self.commodity_ids:
+            self.commodity_ids[commodity] = self.commodity_id_counter
+            self.commodity_id_counter += 1
+        generation = (self.generations.get(commodity, 0) + 1) & self.FIELD_MASK
+        self.generations[commodity] = generation
+        return generation
+
+    def new_tree(self, commodity, tree_index, multi_ip, flabel_val, flabel_mask,
+                 ingress=None, generation=None) -> int:
+        if generation is None:
+            generation = self.generations.get(commodity)
+            if generation is None:
+                generation = self.new_generation(commodity)
+        cookie = self.encode_cookie(self.commodity_ids[commodity], tree_index, generation)
+        self.trees[cookie] = {
+            'commodity': commodity,
+            'tree': tree_index,
+            'generation': generation,
+            'multi_ip': self._normalize_ip(multi_ip),
+            'flabel_val': flabel_val,
+            'flabel_mask': flabel_mask,
+            'ingress': int(ingress) if ingress is not None else None,
+        }
+        return cookie
+
+    def add_rule(self, dpid, cookie, priority, in_port, multi_ip, flabel_val, flabel_mask):
+        key = (priority, in_port, self._normalize_ip(multi_ip), flabel_val, flabel_mask)
+        self.flows.setdefault(dpid, {})[key] = cookie
+
+    def remove_rule(self, dpid, priority, in_port, multi_ip, flabel_val, flabel_mask):
+        """只刪掉一條規則的對應，給 OFPFC_DELETE_STRICT 使用"""
+        key = (priority, in_port, self._normalize_ip(multi_ip), flabel_val, flabel_mask)
+        flows = self.flows.get(dpid, {})
+        flows.pop(key, None)
+        if not flows:
+            self.flows.pop(dpid, None)
+
+    def add_group(self, dpid, cookie, group_id):
+        self.groups.setdefault(dpid, {})[group_id] = cookie
+
+    # ---- 查詢 ----
+
+    def rule_key(self, priority, match) -> Optional[Tuple]:
+        """flow stats reply 的 priority 與 match 轉成 flows 的 key，不是我們的規則則回傳 None"""
+        if 'in_port' not in match or 'ipv6_dst' not in match:
+            return None
+        flabel = match.get('ipv6_flabel')
+        if isinstance(flabel, tuple):
+            flabel_val, flabel_mask = flabel
+        else:
+            flabel_val, flabel_mask = flabel, None
+        return (priority, match['in_port'], self._normalize_ip(match['ipv6_dst']),
+                flabel_val, flabel_mask)
+
+    def lookup(self, dpid, key) -> Optional[int]:
+        """由 rule_key() 找回 cookie"""
+        if key is None:
+            return None
+        return self.flows.get(dpid, {}).get(key)
+
+    def has_rules(self, dpid) -> bool:
+        return bool(self.flows.get(dpid))
+
+    def cookies_of(self, commodity, generation=None) -> List[int]:
+        return [cookie for cookie, tree in self.trees.items()
+                if tree['commodity'] == commodity
+                and (generation is None or tree['generation'] == generation)]
+
+    def datapaths_of(self, cookies) -> Dict[int, List[int]]:
+        """{dpid: [這些 cookie 在該 switch 上的 group id]}，只有 flow 的 switch 對應空 list"""
+        cookies = set(cookies)
+        result = {}
+        for dpid, flows in self.flows.items():
+            if any(cookie in cookies for cookie in flows.values()):
+                result.setdefault(dpid, [])
+        for dpid, groups in self.groups.items():
+            for group_id, cookie in groups.items():
+                if cookie in cookies:
+                    result.setdefault(dpid, []).append(group_id)
+        return result
+
+    # ---- 刪除 ----
+
+    def remove_cookies(self, cookies):
+        cookies = set(cookies)
+        for table in (self.flows, self.groups):
+            for dpid in list(table):
+                entries = table[dpid]
+                for key in [key for key, cookie in entries.items() if cookie in cookies]:
+                    del entries[key]
+                if not entries:
+                    del table[dpid]
+        for cookie in cookies:
+            self.trees.pop(cookie, None)
+
+    def remove_commodity(self, commodity):
+        self.remove_cookies(self.cookies_of(commodity))
+        self.generations.pop(commodity, None)
+
+    def _normalize_ip(self, ip):
+        if isinstance(ip, tuple):
+            ip = ip[0]
+        return ipaddress.ip_address(ip).compressed if ip else ip
@@ -0,0 +1,137 @@
+"""
+make-before-break migration、RuleIndex 的 priority 與 flow label subgroup 重用的測試。
+ryu 的 test runner 不會收集 custom/ 下的檔案，需要在 custom/final 下手動執行：
+    PYTHONPATH=/root/package:. python -m unittest test_migration
+"""
+import time
+import unittest
+from unittest import mock
+
+from ryu.ofproto import ofproto_v1_5
+from ryu.ofproto import ofproto_v1_5_parser
+
+import MyController as controller
+from flow_stats import TreeFlowStats
+from link_monitor import LinkMonitor
+from multi_flabel import MultiFLabelDB
+from reconciler import Reconciler
+from rule_index import RuleIndex
+
+COMMODITY = 'c1'
+MULTI_IP = 'ff38::1'
+
+# 兩組輪流切換的 paths，ingress 都是 switch 1
+PATHS_A = [{('h1', '1'): 10, ('1', '2'): 10, ('2', 'h2'): 10}]
+PATHS_B = [{('h1', '1'): 10, ('1', '3'): 10, ('3', 'h2'): 10}]
+
+
+def _datapath(dpid):
+    dp = mock.MagicMock()
+    dp.id = dpid
+    dp.ofproto = ofproto_v1_5
+    dp.ofproto_parser = ofproto_v1_5_parser
+    return dp
+
+
+class TestMigration(unittest.TestCase):
+
+    def setUp(self):
+        # 不經過 RyuApp 的 __init__，只準備 migration 用到的狀態
+        ctrl = controller.MyController.__new__(controller.MyController)
+        ctrl.logger = mock.MagicMock()
+        ctrl.priority = 100
+        ctrl.group_id_counter = 1
+        ctrl.match_templates = {}
+        ctrl.multi_flabel_db = MultiFLabelDB()
+        ctrl.multi_flabel_db.create_group_for_commodity(COMMODITY)
+        ctrl.rule_index = RuleIndex()
+        ctrl.tree_stats = TreeFlowStats(ctrl.rule_index)
+        ctrl.link_monitor = LinkMonitor()
+        ctrl.reconciler = Reconciler(RuleIndex.COOKIE_TAG, RuleIndex.COOKIE_TAG_MASK)
+        ctrl.host_flabels = {}
+        ctrl.installed_paths = {}
+        ctrl.pending_migrations = {}
+        ctrl.MIGRATION_DRAIN_TIMEOUT = 1
+
+        ctrl.multi_db = mock.MagicMock()
+        ctrl.multi_db.get_commodity_ip.return_value = MULTI_IP
+        ctrl.multi_db.get_src_host_from_commodity.return_value = 'h1'
+        ctrl.multi_db.get_dst_hosts_from_commodity.return_value = ['h2']
+        self.datapaths = {str(dpid): _datapath(dpid) for dpid in (1, 2, 3)}
+        ctrl.topo = mock.MagicMock()
+        ctrl.topo.get_link.return_value = (1, 2)
+        ctrl.topo.get_datapath.side_effect = self.datapaths.get
+        ctrl.record_data_to_json = mock.MagicMock()
+        ctrl.send_barriers = mock.MagicMock(return_value=True)
+        ctrl.send_bundle = mock.MagicMock(return_value=True)
+        self.ctrl = ctrl
+
+        generation = ctrl.rule_index.new_generation(COMMODITY)
+        installed = ctrl._install_tree(COMMODITY, 0, PATHS_A[0], generation)
+        ctrl.host_flabels[COMMODITY] = [installed['flabel']]
+        ctrl.installed_paths[COMMODITY] = PATHS_A
+
+    def _ingress_rules(self):
+        """ switch 1 上從 host 進來的規則: {priority: cookie} """
+        host_flabel = self.ctrl.host_flabels[COMMODITY][0]
+        rules = {}
+        for key, cookie in self.ctrl.rule_index.flows[1].items():
+            if key[1:] == (2, MULTI_IP) + host_flabel:
+                rules[key[0]] = cookie
+        return rules
+
+    def test_repeated_migrations(self):
+        group = self.ctrl.multi_flabel_db.groups[1]
+        with mock.patch.object(controller.hub, 'sleep'):
+            for i in range(20):
+                self.ctrl._migrate(COMMODITY, PATHS_B if i % 2 == 0 else PATHS_A)
+                # host 的 label 與目前 tree 的 label，舊的 generation 已經還回去
+                self.assertEqual(2, len(group.get_all_subgroups()))
+
+        self.assertEqual(21, self.ctrl.rule_index.generations[COMMODITY])
+        for flabel_val, flabel_mask in group.get_all_subgroups():
+            self.assertEqual(group.get_group_value(), flabel_val & group.get_group_mask())
+        # ingress 上只剩原本 priority 的規則，指向最新的 generation
+        cookie = self._ingress_rules()[self.ctrl.priority]
+        self.assertEqual([self.ctrl.priority], list(self._ingress_rules()))
+        self.assertEqual(21, self.ctrl.rule_index.trees[cookie]['generation'])
+
+    def test_subgroups_exhausted(self):
+        group = self.ctrl.multi_flabel_db.groups[1]
+        for _ in range(14):
+            group.assign_subgroup_flabel()
+        with self.assertRaises(ValueError):
+            group.assign_subgroup_flabel()
+
+        # 新的 tree 裝不上去時放棄 migration，舊的 generation 繼續使用
+        self.ctrl._migrate(COMMODITY, PATHS_B)
+        self.assertEqual(1, self.ctrl.rule_index.generations[COMMODITY])
+        self.assertEqual(15, len(group.get_all_subgroups()))
+
+    def test_drain_before_timeout(self):
+        host_flabel = self.ctrl.host_flabels[COMMODITY][0]
+        parser = ofproto_v1_5_parser
+        match = parser.OFPMatch(in_port=2, eth_type=0x86dd, ipv6_dst=MULTI_IP,
+                                ipv6_flabel=host_flabel)
+        counters = {100: 0, 101: 0}
+
+        def poll(timestamp):
+            # 切換之後舊的規則不再有流量，流量都到新的規則
+            counters[101 if self.ctrl.send_bundle.called else 100] += 1000
+            body = [parser.OFPFlowStats(priority=priority, match=match,
+                                        stats=parser.OFPStats(byte_count=count,
+                                                              packet_count=count // 100))
+                    for priority, count in counters.items()]
+            self.ctrl.tree_stats.update_flow_stats(1, body, timestamp)
+
+        poll(time.time() - 2)
+        poll(time.time() - 1)
+        with mock.patch.object(controller.hub, 'sleep',
+                               side_effect=lambda seconds: poll(time.time() + 1)) as sleep:
+            self.ctrl._migrate(COMMODITY, PATHS_B)
+        self.assertEqual(1, sleep.call_count)
+        self.ctrl.logger.warning.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
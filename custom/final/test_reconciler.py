@@ -0,0 +1,59 @@
+"""
+Reconciler 的測試。ryu 的 test runner 不會收集 custom/ 下的檔案，
+需要在 custom/final 下手動執行：
+    PYTHONPATH=/root/package:. python -m unittest test_reconciler
+"""
+import unittest
+from unittest import mock
+
+from ryu.ofproto import ofproto_v1_5
+from ryu.ofproto import ofproto_v1_5_parser as parser
+
+from reconciler import Reconciler
+from rule_index import RuleIndex
+
+COOKIE = RuleIndex.COOKIE_TAG | 1
+FIELDS = [('in_port', 1), ('eth_type', 0x86dd), ('ipv6_dst', 'ff38::1'),
+          ('ipv6_flabel', (0x11000, 0xff000))]
+
+
+class TestReconciler(unittest.TestCase):
+
+    def setUp(self):
+        self.reconciler = Reconciler(RuleIndex.COOKIE_TAG, RuleIndex.COOKIE_TAG_MASK)
+        self.dp = mock.MagicMock()
+        self.dp.id = 1
+        self.dp.ofproto = ofproto_v1_5
+        self.dp.ofproto_parser = parser
+        self.inst = [parser.OFPInstructionActions(
+            ofproto_v1_5.OFPIT_APPLY_ACTIONS, [parser.OFPActionGroup(1)])]
+        self.mod = parser.OFPFlowMod(
+            datapath=self.dp, cookie=COOKIE, priority=100,
+            match=parser.OFPMatch(**dict(FIELDS)), instructions=self.inst)
+        self.reconciler.record_flow(1, self.mod)
+
+    def _desc(self, fields, instructions=None):
+        # switch 回傳的 match 依 switch 自己的欄位順序編碼
+        buf = bytearray()
+        parser.OFPMatch(_ordered_fields=fields).serialize(buf, 0)
+        return parser.OFPFlowDesc(
+            table_id=0, priority=100, cookie=COOKIE,
+            match=parser.OFPMatch.parser(bytes(buf), 0),
+            instructions=instructions or self.inst)
+
+    def test_same_flow_in_other_field_order(self):
+        self.assertEqual([], self.reconciler.diff(self.dp, [self._desc(FIELDS[::-1])], []))
+        # 值的寫法不同 (ff38:0::1) 也視為同一條 flow
+        fields = FIELDS[:2] + [('ipv6_dst', 'ff38:0::1')] + FIELDS[3:]
+        self.assertEqual([], self.reconciler.diff(self.dp, [self._desc(fields)], []))
+
+    def test_modified_flow_in_other_field_order(self):
+        inst = [parser.OFPInstructionActions(
+            ofproto_v1_5.OFPIT_APPLY_ACTIONS, [parser.OFPActionGroup(2)])]
+        msgs = self.reconciler.diff(self.dp, [self._desc(FIELDS[::-1], inst)], [])
+        # 只覆蓋同一條 flow，不會再把它刪掉
+        self.assertEqual([ofproto_v1_5.OFPFC_ADD], [msg.command for msg in msgs])
+
+
+if __name__ == '__main__':
+    unittest.main()
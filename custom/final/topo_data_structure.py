@@ -1,7 +1,8 @@
-from collections import defaultdict as ddict
+from collections import defaultdict as ddict, deque
 from sortedcontainers import SortedList
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 import re
+import json
 import logging
 from utils import tuple_to_str, to_dict, str_to_tuple
 
@@ -18,6 +19,8 @@ class Topology():
 
     MULTI_GROUP_IP_STARTWITH = 'ff38'
     SINGLE_IP_STARTWITH = '2001'
+    # 保留最近幾筆變更，讓斷線的 client 可以只補差異
+    CHANGE_LOG_SIZE = 1024
 
     def __init__(self):
         
@@ -38,6 +41,14 @@ class Topology():
         # save all commodity
         self.commodities = []
         self.host_counter = 0
+        # links / hosts / datapaths 每改變一次就加一，REST 用來判斷 cache 是否過期
+        self.version = 0
+        # 最近的變更 {'version', 'op', 'key', 'value'}
+        self.changes = deque(maxlen=self.CHANGE_LOG_SIZE)
+        # 每次變更都會呼叫 listener(change)
+        self.listeners = []
+        # (version, 序列化後的 JSON)
+        self._json_cache = (None, None)
 
         self.test_datapath = None
         self.test_dpid = None
@@ -56,6 +67,7 @@ class Topology():
             logger.debug(f"Set the same Link: {u}-{v}")
             return 
         self.links[(u, v)] = (port_u, port_v)
+        self._changed('link_add', (u, v), (port_u, port_v))
     
     def get_link(self, u, v) -> Tuple[int, int]:
         u, v = self.turn_to_key(u), self.turn_to_key(v)
@@ -71,6 +83,7 @@ class Topology():
         if name in self.hosts:
             if host_ip not in self.hosts[name]['IPs']:
                 self.hosts[name]['IPs'].add(host_ip)
+                self._changed('host_update', name, self.hosts[name])
                 return 
             logger.warning(f"Set the same Host:{name}, HostIP:{host_ip}, Mac:{host_mac}")
             return
@@ -81,6 +94,7 @@ class Topology():
             'sw_in_port': sw_in_port
         }
         self.hosts[name] = data
+        self._changed('host_add', name, data)
         return
     
     def get_connecting_host_switch_data(self, host_name=None, host_mac=None) -> Tuple[int, int]:
@@ -209,11 +223,24 @@ class Topology():
         id = self.turn_to_key(id)
         if id not in self.datapath:
             self.datapath[id] = datapath
+            self._changed('datapath_add', id)
         else:
             tmp = self.datapath[id]
             self.datapath[id] = datapath
             logger.debug(f"the sw_id:{id} is exist, new datapath:{datapath} overwrites the old datapath:{tmp}")
+            if tmp is not datapath:
+                # switch 重新連線
+                self._changed('datapath_add', id)
         return id
+
+    def datapath_down(self, datapath):
+        """
+        datapath 仍然保留，重新連線時 reconcile 需要用 id 找回它；
+        只有目前記錄的是同一個連線時才通知，避免蓋掉已經重新連上的 datapath
+        """
+        id = self.turn_to_key(datapath.id)
+        if self.datapath.get(id) is datapath:
+            self._changed('datapath_delete', id)
     
     def get_datapath(self, id):
         id = self.turn_to_key(id)
@@ -275,6 +302,11 @@ class Topology():
             self.commodities_to_paths[commodity] = paths
             self.commodities.append(commodity)
 
+    def del_commodity(self, commodity):
+        self.commodities_to_paths.pop(commodity, None)
+        if commodity in self.commodities:
+            self.commodities.remove(commodity)
+
     def is_mac(self, s):
         return bool(re.match(r"^([0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}$", s)) 
     
@@ -298,4 +330,40 @@ class Topology():
         return{
             "links": to_dict(self.links),
             "hosts": to_dict(self.hosts)
-        }
\ No newline at end of file
+        }
+
+    def snapshot(self) -> Dict:
+        """ 完整的 topology 與對應的 version，給 stream 的 client 當作起點 """
+        data = self.data_to_dict()
+        data['datapaths'] = [id for id, dp in self.datapath.items()
+                             if getattr(dp, 'is_active', True)]
+        data['version'] = self.version
+        return data
+
+    def changes_since(self, version) -> Optional[List[Dict]]:
+        """ version 之後的所有變更，change log 已經不夠補時回傳 None """
+        if version == self.version:
+            return []
+        if version > self.version or not self.changes or self.changes[0]['version'] > version + 1:
+            return None
+        return [change for change in self.changes if change['version'] > version]
+
+    def _changed(self, op, key, value=None):
+        self.version += 1
+        change = {
+            'version': self.version,
+            'op': op,
+            'key': to_dict(key),
+            'value': to_dict(value) if value is not None else None,
+        }
+        self.changes.append(change)
+        for listener in self.listeners:
+            listener(change)
+
+    def data_to_json(self) -> Tuple[int, str]:
+        """ 回傳 (version, JSON)，topology 沒變時直接用上次序列化的結果 """
+        version, body = self._json_cache
+        if version != self.version:
+            version, body = self.version, json.dumps(self.data_to_dict(), indent=4)
+            self._json_cache = (version, body)
+        return version, body
\ No newline at end of file
@@ -13,6 +13,8 @@ from ryu.exception import RyuException
 from topo_data_structure import Topology
 from ryu.app.wsgi import WSGIApplication
 from topo_rest_controller import TopologyRestController
+from rest_jobs import JobQueue
+from topo_stream import TopologyStream
 
 
 from ryu.topology import event
@@ -35,7 +37,9 @@ class SimpleSwitch15(app_manager.RyuApp):
             print("WSGI object loaded successfully.")
             wsgi.register(TopologyRestController, {
                 'topology_data': self.topo,
-                'controller': self
+                'controller': self,
+                'jobs': JobQueue(),
+                'stream': TopologyStream(self.topo)
                 })
             print("TopologyController registered.")
         else:
@@ -69,20 +73,21 @@ class SimpleSwitch15(app_manager.RyuApp):
             self.topo.set_test_dp(datapath, datapath.id)
         self.topo.set_datapath(datapath)
     
-    # We are not using this function
-    def delete_flow(self, datapath):
+    def delete_flow(self, datapath, cookie, cookie_mask, match=None):
+        """ 刪除所有 table 中 cookie 符合 cookie/cookie_mask 的 flow """
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
-        for dst in self.mac_to_port[datapath.id].keys():
-            match = parser.OFPMatch(eth_dst=dst)
-            mod = parser.OFPFlowMod(
-                datapath, command=ofproto.OFPFC_DELETE,
-                out_port=ofproto.OFPP_ANY, out_group=ofproto.OFPG_ANY,
-                priority=1, match=match)
-            datapath.send_msg(mod)
+        if match is None:
+            match = parser.OFPMatch()
+        mod = parser.OFPFlowMod(
+            datapath, cookie=cookie, cookie_mask=cookie_mask,
+            table_id=ofproto.OFPTT_ALL, command=ofproto.OFPFC_DELETE,
+            out_port=ofproto.OFPP_ANY, out_group=ofproto.OFPG_ANY,
+            match=match)
+        datapath.send_msg(mod)
 
-    def add_flow(self, datapath, priority, match, actions, buffer_id=None):
+    def add_flow(self, datapath, priority, match, actions, buffer_id=None, cookie=0):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
@@ -90,12 +95,14 @@ class SimpleSwitch15(app_manager.RyuApp):
                                              actions)]
         if buffer_id:
             mod = parser.OFPFlowMod(datapath=datapath, buffer_id=buffer_id,
+                                    cookie=cookie, priority=priority,
+                                    match=match, instructions=inst)
+        else:
+            mod = parser.OFPFlowMod(datapath=datapath, cookie=cookie,
                                     priority=priority, match=match,
                                     instructions=inst)
-        else:
-            mod = parser.OFPFlowMod(datapath=datapath, priority=priority,
-                                    match=match, instructions=inst)
         datapath.send_msg(mod)
+        return mod
 
     def send_pkt_msg(self, datapath, port, data):
         
@@ -135,6 +142,11 @@ class SimpleSwitch15(app_manager.RyuApp):
         data = LLDPPacket.lldp_packet(datapath.id, port)
         self.send_pkt_msg(datapath, port, data)
 
+    @set_ev_cls(ofp_event.EventOFPStateChange, DEAD_DISPATCHER)
+    def switch_dead_handler(self, ev):
+        if ev.datapath.id is not None:
+            self.topo.datapath_down(ev.datapath)
+
     @set_ev_cls(ofp_event.EventOFPPortDescStatsReply, MAIN_DISPATCHER)
     def port_status_handler(self,ev):
         
@@ -1,43 +1,128 @@
-from ryu.app.wsgi import ControllerBase, route
+from ryu.app.wsgi import ControllerBase, route, websocket
 from webob import Response
 from collections import defaultdict
 import json
+import math
+import uuid
+
+# 每次啟動不同；topology 的 version 重新從 0 開始，ETag 才不會和重啟前的相同
+BOOT_ID = uuid.uuid4().hex[:8]
+
 
 class TopologyRestController(ControllerBase):
     def __init__(self, req, link, data, **config):
         super(TopologyRestController, self).__init__(req, link, data, **config)
         self.topology_data = data['topology_data']
         self.controller = data['controller']
+        self.jobs = data['jobs']
+        self.stream = data['stream']
 
     @route('topology', '/topology', methods=['GET'])
     def get_topology(self, req, **kwargs):
-        converted_data = self.topology_data.data_to_dict()
-        body = json.dumps(converted_data, indent=4)
-        return Response(content_type='application/json; charset=UTF-8', body=body)
+        """ topology 沒變時只序列化一次；client 帶 If-None-Match 且沒變時回 304 """
+        version, body = self.topology_data.data_to_json()
+        etag = f"topo-{BOOT_ID}-{version}"
+        if etag in req.if_none_match:
+            return Response(status=304, etag=etag)
+        return Response(content_type='application/json; charset=UTF-8', body=body, etag=etag)
     
     
+    @websocket('topology', '/topology/ws')
+    def topology_stream(self, ws):
+        """ 先送 snapshot (或 ?since= 之後的變更)，之後推送每一筆變更，見 TopologyStream """
+        self.stream.serve(ws, self.req.GET.get('since'))
+
+    @route('monitor', '/link_utilization', methods=['GET'])
+    def get_link_utilization(self, req, **kwargs):
+        """
+        links: {"u-v": Mbps}，percentile 參數 (例如 ?percentile=95) 不給時為最新速率
+        ports: 每個 (dpid, port) 的速率與 percentile
+        """
+        monitor = self.controller.link_monitor
+        percentile = req.GET.get('percentile')
+        try:
+            percentile = float(percentile) if percentile is not None else None
+        except ValueError:
+            return Response(status=400, body=f"Invalid percentile: {percentile}")
+        if percentile is not None and not (math.isfinite(percentile) and 0 <= percentile <= 100):
+            # np.percentile 只接受 0 ~ 100
+            return Response(status=400, body=f"Invalid percentile: {percentile}")
+        converted_data = {
+            'links': monitor.link_utilization(self.topology_data.links, percentile),
+            'ports': monitor.port_summary(),
+        }
+        body = json.dumps(converted_data, indent=4)
+        return Response(content_type='application/json; charset=UTF-8', body=body)
+
+    @route('monitor', '/group_utilization', methods=['GET'])
+    def get_group_utilization(self, req, **kwargs):
+        body = json.dumps(self.controller.link_monitor.group_summary(), indent=4)
+        return Response(content_type='application/json; charset=UTF-8', body=body)
+
+    @route('monitor', '/tree_utilization', methods=['GET'])
+    def get_tree_utilization(self, req, **kwargs):
+        """ 每個 commodity 的每棵 tree (flow label subgroup) 的速率 """
+        body = json.dumps(self.controller.tree_stats.tree_summary(), indent=4)
+        return Response(content_type='application/json; charset=UTF-8', body=body)
+
+    @route('server', '/commodity/{commodity}', methods=['DELETE'])
+    def delete_commodity(self, req, commodity, **kwargs):
+        """ 刪除 commodity 在所有 switch 上的 flow 與 group """
+        if not self.controller.remove_commodity(commodity):
+            return Response(status=404, body=f"Commodity {commodity} not found")
+        return Response(status=200, body=f"Commodity {commodity} deleted")
+
+    @route('server', '/reconcile', methods=['POST'])
+    def reconcile(self, req, **kwargs):
+        """ 對所有 switch (或 ?dpid= 指定的 switch) 比對並修正 flow / group """
+        dpid = req.GET.get('dpid')
+        if dpid is not None:
+            dp = self.topology_data.get_datapath(dpid)
+            if dp is None:
+                return Response(status=404, body=f"Switch {dpid} not found")
+            datapaths = [dp]
+        else:
+            datapaths = list(self.topology_data.datapath.values())
+        result = {str(dp.id): self.controller.reconcile(dp) for dp in datapaths}
+        body = json.dumps(result, indent=4)
+        return Response(content_type='application/json; charset=UTF-8', body=body)
+
     @route('server', '/upload_algorithm_result', methods=['POST'])
     def upload_data(self, req, **kwargs):
         """
         接收客户端发送的数据
+        只檢查格式，安裝交給背景的 job 執行，回傳 202 與 job id，
+        之後用 GET /jobs/{job_id} 查詢安裝進度
         """
         try:
             # 从请求体中解析 JSON 数据
-            body = req.body
-            data = json.loads(body)
-            print("Received data from client:")
-            print(f"data type: {type(data)}")
-            print(json.dumps(data, indent=4, ensure_ascii=False))
-
-            self.topology_data.set_commodities_and_paths(data['commodities_and_paths'])
-            self.controller.run(data['commodities_data'])
-            # self.controller.test()
-            
-
-            # 返回响应
-            return Response(status=200, body="Data received successfully")
-        except Exception as e:
-            import traceback
-            traceback.print_exc()  # 印出完整堆疊
-            return Response(status=500, body=f"Error: {e}")
+            data = json.loads(req.body)
+            commodities_and_paths = data['commodities_and_paths']
+            commodities_data = data['commodities_data']
+        except (ValueError, KeyError, TypeError) as e:
+            return Response(status=400, body=f"Invalid data: {e}")
+
+        print("Received data from client:")
+        print(json.dumps(data, indent=4, ensure_ascii=False))
+        job_id = self.jobs.submit('upload_algorithm_result', self._install,
+                                  commodities_and_paths, commodities_data)
+        body = json.dumps({'job_id': job_id, 'status_url': f"/jobs/{job_id}"})
+        return Response(status=202, content_type='application/json; charset=UTF-8',
+                        body=body, location=f"/jobs/{job_id}")
+
+    def _install(self, commodities_and_paths, commodities_data):
+        self.topology_data.set_commodities_and_paths(commodities_and_paths)
+        self.controller.run(commodities_data)
+        # self.controller.test()
 
+    @route('server', '/jobs/{job_id}', methods=['GET'])
+    def get_job(self, req, job_id, **kwargs):
+        """ job 狀態: queued / running / done / failed """
+        try:
+            job = self.jobs.get(int(job_id))
+        except ValueError:
+            job = None
+        if job is None:
+            return Response(status=404, body=f"Job {job_id} not found")
+        body = json.dumps(job, indent=4)
+        return Response(content_type='application/json; charset=UTF-8', body=body)
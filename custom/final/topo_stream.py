@@ -0,0 +1,105 @@
+import json
+from socket import error as SocketError
+from typing import Dict
+
+from ryu.lib import hub
+
+
+class TopologyStream:
+    """
+    透過 WebSocket 推送 topology 的變更給 GUI / planner。
+
+    server -> client:
+        {"type": "snapshot", "version": v, "links": ..., "hosts": ..., "datapaths": [...]}
+        {"type": "delta", "version": v, "op": "link_add" | "host_add" | "host_update"
+                                              | "datapath_add" | "datapath_delete",
+         "key": ..., "value": ...}
+    client -> server:
+        {"type": "resync", "since": v}   client 發現 version 不連續時送出，
+                                         server 從 change log 補差異，補不到就送 snapshot
+
+    連線時可以帶 ?since=v，從 v 之後開始補。
+    client 太慢、queue 滿了的話，清空 queue 改送一次 snapshot。
+    """
+
+    QUEUE_SIZE = 1000
+
+    def __init__(self, topo):
+        self.topo = topo
+        # ws -> queue
+        self.clients: Dict[object, hub.Queue] = {}
+        topo.listeners.append(self._on_change)
+
+    def _on_change(self, change):
+        for queue in list(self.clients.values()):
+            try:
+                queue.put_nowait(('delta', change))
+            except hub.QueueFull:
+                self._drain(queue)
+                queue.put_nowait(('resync', None))
+
+    def _drain(self, queue):
+        while True:
+            try:
+                queue.get_nowait()
+            except hub.QueueEmpty:
+                return
+
+    def serve(self, ws, since=None):
+        """ 在 WebSocket handler 的 greenthread 中執行，直到連線中斷 """
+        queue = hub.Queue(self.QUEUE_SIZE)
+        # 先註冊再取 snapshot，之間發生的變更用 version 過濾掉
+        self.clients[ws] = queue
+        reader = hub.spawn(self._read_requests, ws, queue)
+        try:
+            version = self._resync(ws, since)
+            while True:
+                kind, item = queue.get()
+                if kind == 'close':
+                    return
+                if kind == 'resync':
+                    version = self._resync(ws, item)
+                elif item['version'] > version:
+                    self._send(ws, dict(item, type='delta'))
+                    version = item['version']
+        except SocketError:
+            return
+        finally:
+            self.clients.pop(ws, None)
+            hub.kill(reader)
+
+    def _read_requests(self, ws, queue):
+        while True:
+            try:
+                msg = ws.wait()
+            except SocketError:
+                msg = None
+            if msg is None:
+                queue.put(('close', None))
+                return
+            try:
+                request = json.loads(msg)
+            except ValueError:
+                continue
+            if request.get('type') == 'resync':
+                # resync 不能因為 queue 滿了就被丟掉
+                self._drain(queue)
+                queue.put(('resync', request.get('since')))
+
+    def _resync(self, ws, since) -> int:
+        """ 補上 since 之後的變更，補不到就送 snapshot；回傳 client 目前的 version """
+        try:
+            changes = self.topo.changes_since(int(since)) if since is not None else None
+        except (TypeError, ValueError):
+            changes = None
+        if changes is None:
+            snapshot = self.topo.snapshot()
+            self._send(ws, dict(snapshot, type='snapshot'))
+            return snapshot['version']
+        # 送出時可能有新的變更進到 queue，version 只算到這次補的最後一筆
+        for change in changes:
+            self._send(ws, dict(change, type='delta'))
+        return changes[-1]['version'] if changes else int(since)
+
+    def _send(self, ws, data):
+        ws.send(json.dumps(data))
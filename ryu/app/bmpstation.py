@@ -14,17 +14,28 @@
 # limitations under the License.
 
 import os
-import socket
 import time
 
 from ryu.base import app_manager
 
+from ryu.lib import bmplib
 from ryu.lib import hub
 from ryu.lib.hub import StreamServer
-from ryu.lib.packet import bmp
 
 
 class BMPStation(app_manager.RyuApp):
+    """
+    Collects BMP streams from routers.
+
+    Route Monitoring messages are decoded in batches by
+    ryu.lib.bmplib.BMPCollector, which keeps the Adj-RIB-In of each
+    monitored peer. Route events are exported to rotating CSV files in
+    RYU_BMP_EXPORT_DIR if set, and logged to RYU_BMP_OUTPUT_FILE
+    otherwise. The other messages are always logged.
+    """
+
+    RECV_SIZE = 65536
+
     def __init__(self):
         super(BMPStation, self).__init__()
         self.name = 'bmpstation'
@@ -33,9 +44,19 @@ class BMPStation(app_manager.RyuApp):
         output_file = os.environ.get('RYU_BMP_OUTPUT_FILE', 'ryu_bmp.log')
         failed_dump = os.environ.get('RYU_BMP_FAILED_DUMP',
                                      'ryu_bmp_failed.dump')
+        export_dir = os.environ.get('RYU_BMP_EXPORT_DIR')
+        self.batch_size = int(os.environ.get('RYU_BMP_BATCH_SIZE', 1000))
 
         self.output_fd = open(output_file, 'w')
-        self.failed_dump_fd = open(failed_dump, 'w')
+        self.failed_dump_fd = open(failed_dump, 'wb')
+
+        self.exporter = None
+        if export_dir:
+            self.exporter = bmplib.RotatingCSVExporter(
+                export_dir,
+                max_rows=int(os.environ.get('RYU_BMP_EXPORT_ROWS', 1000000)),
+                max_seconds=int(os.environ.get('RYU_BMP_EXPORT_SECONDS',
+                                               3600)))
 
         self.failed_pkt_count = 0
 
@@ -47,52 +68,64 @@ class BMPStation(app_manager.RyuApp):
         return hub.spawn(StreamServer((self.server_host, self.server_port),
                                       self.loop).serve_forever)
 
+    def stop(self):
+        if self.exporter is not None:
+            self.exporter.close()
+        super(BMPStation, self).stop()
+
     def loop(self, sock, addr):
         self.logger.debug("BMP client connected, ip=%s, port=%s", addr[0],
                           addr[1])
-        is_active = True
-        buf = bytearray()
-        required_len = bmp.BMPMessage._HDR_LEN
-
-        while is_active:
-            ret = sock.recv(required_len)
+        collector = bmplib.BMPCollector(
+            addr[0], exporter=self.exporter or _RouteLogger(self, addr[0]),
+            batch_size=self.batch_size,
+            message_handler=lambda msg: self._write(addr[0], msg),
+            error_handler=self._failed)
+
+        while True:
+            ret = sock.recv(self.RECV_SIZE)
             if len(ret) == 0:
-                is_active = False
                 break
-            buf += ret
-            while len(buf) >= required_len:
-                version, len_, _ = bmp.BMPMessage.parse_header(buf)
-                if version != bmp.VERSION:
-                    self.logger.error("unsupported bmp version: %d", version)
-                    is_active = False
-                    break
-
-                required_len = len_
-                if len(buf) < required_len:
-                    break
-
-                try:
-                    msg, rest = bmp.BMPMessage.parser(buf)
-                except Exception as e:
-                    pkt = buf[:len_]
-                    self.failed_dump_fd.write(pkt)
-                    self.failed_dump_fd.flush()
-                    buf = buf[len_:]
-                    self.failed_pkt_count += 1
-                    self.logger.error("failed to parse: %s"
-                                      " (total fail count: %d)",
-                                      e, self.failed_pkt_count)
-                else:
-                    t = time.strftime("%Y %b %d %H:%M:%S", time.localtime())
-                    self.logger.debug("%s | %s | %s\n", t, addr[0], msg)
-                    self.output_fd.write("%s | %s | %s\n\n" % (t, addr[0],
-                                                               msg))
-                    self.output_fd.flush()
-                    buf = rest
-
-                required_len = bmp.BMPMessage._HDR_LEN
+            try:
+                collector.feed(ret)
+            except ValueError as e:
+                self.logger.error("%s", e)
+                break
+            # nothing more is buffered by the socket, do not hold the batch
+            collector.flush()
 
+        collector.flush()
         self.logger.debug("BMP client disconnected, ip=%s, port=%s", addr[0],
                           addr[1])
 
         sock.close()
+
+    def _failed(self, frame, e):
+        self.failed_dump_fd.write(frame)
+        self.failed_dump_fd.flush()
+        self.failed_pkt_count += 1
+        self.logger.error("failed to parse: %s (total fail count: %d)",
+                          e, self.failed_pkt_count)
+
+    def _write(self, router, msg):
+        t = time.strftime("%Y %b %d %H:%M:%S", time.localtime())
+        self.logger.debug("%s | %s | %s\n", t, router, msg)
+        self.output_fd.write("%s | %s | %s\n\n" % (t, router, msg))
+        self.output_fd.flush()
+
+
+class _RouteLogger(object):
+    """Logs route events to the output file of BMPStation."""
+
+    def __init__(self, station, router):
+        self.station = station
+        self.router = router
+
+    def write(self, events):
+        t = time.strftime("%Y %b %d %H:%M:%S", time.localtime())
+        self.station.output_fd.write(''.join(
+            "%s | %s | %s %s %s %s\n" % (
+                t, self.router, event.peer.peer_address, event.action,
+                event.prefix, event.attrs.columns if event.attrs else '')
+            for event in events))
+        self.station.output_fd.flush()
@@ -81,6 +81,7 @@ DEFAULT_ZSERV_VERSION = 2  # Version of Ubuntu 16.04 LTS packaged Quagga
 DEFAULT_ZSERV_CLIENT_ROUTE_TYPE = 'BGP'
 DEFAULT_ZSERV_INTERVAL = 10
 DEFAULT_ZSERV_DATABASE = 'sqlite:///zebra.db'
+DEFAULT_ZSERV_ROUTE_STORE = 'sql'
 DEFAULT_ZSERV_ROUTER_ID = '1.1.1.1'
 # For the backward compatibility with Quagga, the default FRRouting version
 # should be None.
@@ -119,6 +120,13 @@ CONF.register_cli_opts([
         'db-url', default=DEFAULT_ZSERV_DATABASE,
         help='URL to database used by Zebra protocol service '
              '(default: %s)' % DEFAULT_ZSERV_DATABASE),
+    cfg.StrOpt(
+        'route-store', default=DEFAULT_ZSERV_ROUTE_STORE,
+        choices=['sql', 'memory'],
+        help='Route table of Zebra protocol service, "sql" to query '
+             'the database or "memory" to keep routes in memory and '
+             'write them behind to the database '
+             '(default: %s)' % DEFAULT_ZSERV_ROUTE_STORE),
     cfg.StrOpt(
         'router-id', default=DEFAULT_ZSERV_ROUTER_ID,
         help='Initial Router ID used by Zebra protocol service '
@@ -14,15 +14,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import socket
+
 import netaddr
 
 
+# The number of recently converted addresses kept by each converter.
+DEFAULT_CACHE_SIZE = 4096
+
+
 class AddressConverter(object):
-    def __init__(self, addr, strat, fallback=None, **kwargs):
+    def __init__(self, addr, strat, fallback=None, cache_size=None,
+                 **kwargs):
         self._addr = addr
         self._strat = strat
         self._fallback = fallback
         self._addr_kwargs = kwargs
+        if cache_size:
+            # Hot addresses (e.g. multicast group addresses and host MACs)
+            # are converted over and over again, so conversion results are
+            # kept in a bounded LRU cache.
+            self.text_to_bin = functools.lru_cache(
+                maxsize=cache_size)(self.text_to_bin)
+            self._cached_bin_to_text = functools.lru_cache(
+                maxsize=cache_size)(self.bin_to_text)
+            self.bin_to_text = self._bin_to_text_cached
+
+    def _bin_to_text_cached(self, bin):
+        if isinstance(bin, (bytearray, memoryview)):
+            # bytearray and memoryview are unhashable.
+            bin = bytes(bin)
+        return self._cached_bin_to_text(bin)
+
+    def cache_clear(self):
+        for func in (self.text_to_bin, self._cached_bin_to_text):
+            func.cache_clear()
 
     def text_to_bin(self, text):
         try:
@@ -41,15 +68,67 @@ class AddressConverter(object):
                               **self._addr_kwargs))
 
 
-ipv4 = AddressConverter(netaddr.IPAddress, netaddr.strategy.ipv4,
-                        fallback=netaddr.IPNetwork, version=4)
-ipv6 = AddressConverter(netaddr.IPAddress, netaddr.strategy.ipv6,
-                        fallback=netaddr.IPNetwork, version=6)
+class IPAddressConverter(AddressConverter):
+    """Converts IP addresses with inet_pton/inet_ntop and falls back to
+    netaddr for the formats they do not accept (e.g. prefixes)."""
+
+    def __init__(self, family, addr, strat, fallback=None, cache_size=None,
+                 **kwargs):
+        self._family = family
+        super(IPAddressConverter, self).__init__(
+            addr, strat, fallback=fallback, cache_size=cache_size, **kwargs)
+
+    def text_to_bin(self, text):
+        try:
+            return socket.inet_pton(self._family, text)
+        except (OSError, TypeError, ValueError):
+            return super(IPAddressConverter, self).text_to_bin(text)
+
+    def bin_to_text(self, bin):
+        try:
+            return socket.inet_ntop(self._family, bin)
+        except (OSError, TypeError, ValueError):
+            return super(IPAddressConverter, self).bin_to_text(bin)
+
+
+class MACAddressConverter(AddressConverter):
+    """Converts MAC addresses in the 'xx:xx:xx:xx:xx:xx' format directly
+    and falls back to netaddr for the other formats."""
+
+    _TEXT_LEN = 17
+    _BIN_LEN = 6
+    _TEXT_FMT = ':'.join(['%02x'] * _BIN_LEN)
+
+    def text_to_bin(self, text):
+        if (len(text) == self._TEXT_LEN and
+                text[2::3] == ':' * (self._BIN_LEN - 1)):
+            try:
+                bin = bytes.fromhex(text.replace(':', ''))
+            except (TypeError, ValueError):
+                pass
+            else:
+                if len(bin) == self._BIN_LEN:
+                    return bin
+        return super(MACAddressConverter, self).text_to_bin(text)
+
+    def bin_to_text(self, bin):
+        if len(bin) == self._BIN_LEN:
+            return self._TEXT_FMT % tuple(bytearray(bin))
+        return super(MACAddressConverter, self).bin_to_text(bin)
+
+
+ipv4 = IPAddressConverter(socket.AF_INET, netaddr.IPAddress,
+                          netaddr.strategy.ipv4, fallback=netaddr.IPNetwork,
+                          cache_size=DEFAULT_CACHE_SIZE, version=4)
+ipv6 = IPAddressConverter(socket.AF_INET6, netaddr.IPAddress,
+                          netaddr.strategy.ipv6, fallback=netaddr.IPNetwork,
+                          cache_size=DEFAULT_CACHE_SIZE, version=6)
 
 
 class mac_mydialect(netaddr.mac_unix):
     word_fmt = '%.2x'
 
 
-mac = AddressConverter(netaddr.EUI, netaddr.strategy.eui48, version=48,
-                       dialect=mac_mydialect)
+mac = MACAddressConverter(netaddr.EUI, netaddr.strategy.eui48,
+                          cache_size=DEFAULT_CACHE_SIZE, version=48,
+                          dialect=mac_mydialect)
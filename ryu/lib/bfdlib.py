@@ -22,20 +22,26 @@ IPv4 single hop BFD (RFC5881).
 
 Please note that:
 
-* Demand mode and echo function are not yet supported.
+* Demand mode is not yet supported. Echo function is only supported as
+  the reflector of the Echo packets of the remote system, which is
+  offloaded to the switch (see ``offload`` of ``add_bfd_session``).
 * Mechanism on negotiating L2/L3 addresses for an established
   session is not yet implemented.
 * The interoperability of authentication support is not tested.
 * Configuring a BFD session with too small interval may lead to
   full of event queue and congestion of Openflow channels.
-  For deploying a low-latency configuration or with a large number
+  BFD sessions share a single timer wheel for transmission and detection,
+  and received BFD Control packets are processed in batches on it, but
+  every BFD Control packet still passes through the controller.
+  For deploying a low-latency configuration with a very large number
   of BFD sessions, use standalone BFD daemon instead.
 """
 
 
+import collections
 import logging
-import time
 import random
+import struct
 
 import six
 
@@ -48,8 +54,9 @@ from ryu.exception import RyuException
 from ryu.ofproto.ether import ETH_TYPE_IP, ETH_TYPE_ARP
 from ryu.ofproto import ofproto_v1_3
 from ryu.ofproto import inet
-from ryu.lib import hub
+from ryu.lib import timerwheel
 from ryu.lib.packet import packet
+from ryu.lib.packet import packet_utils
 from ryu.lib.packet import ethernet
 from ryu.lib.packet import ipv4
 from ryu.lib.packet import udp
@@ -66,6 +73,9 @@ UINT32_MAX = (1 << 32) - 1
 BFD_CONTROL_UDP_PORT = 3784
 BFD_ECHO_UDP_PORT = 3785
 
+# Resolution of the timers of BFD sessions in seconds
+TIMER_RESOLUTION = 0.005
+
 
 class BFDSession(object):
     """BFD Session class.
@@ -79,7 +89,7 @@ class BFDSession(object):
                  detect_mult=3,
                  desired_min_tx_interval=1000000,
                  required_min_rx_interval=1000000,
-                 auth_type=0, auth_keys=None):
+                 auth_type=0, auth_keys=None, offload=False):
         """
         Initialize a BFD session.
 
@@ -110,6 +120,8 @@ class BFDSession(object):
                                   key chain which key is an integer of
                                   *Auth Key ID* and value is a string of
                                   *Password* or *Auth Key*.
+        offload                   (Optional) If True, loop back the BFD Echo
+                                  packets of the remote system on the switch.
         ========================= ============================================
 
         Example::
@@ -162,7 +174,9 @@ class BFDSession(object):
 
         # BFD Runtime Variables
         self._cfg_desired_min_tx_interval = desired_min_tx_interval
-        self._cfg_required_min_echo_rx_interval = 0
+        # The switch loops back the BFD Echo packets, if offloaded.
+        self._cfg_required_min_echo_rx_interval = \
+            required_min_rx_interval if offload else 0
         self._active_role = True
         self._detect_time = 0
         self._xmit_period = None
@@ -172,7 +186,14 @@ class BFDSession(object):
         # _enable_send indicates the switch of the periodic transmission of
         # BFD Control packets.
         self._enable_send = True
-        self._lock = None
+        # Timers of the periodic transmission and of the Detection Time
+        # on the timer wheel of BFDLib.
+        self._send_timer = None
+        self._detect_timer = None
+        # Last transmitted BFD Control packet without authentication,
+        # which is reused until any field other than IPv4 ID changes.
+        self._xmit_cache = (None, None)
+        self.offload = offload
 
         # L2/L3/L4 Header fields
         self.src_mac = src_mac
@@ -193,8 +214,8 @@ class BFDSession(object):
         self.datapath = None
         self.ofport = ofport
 
-        # Spawn a periodic transmission loop for BFD Control packets.
-        hub.spawn(self._send_loop)
+        # Start the periodic transmission of BFD Control packets.
+        self._start_send_timer()
 
         LOG.info("[BFD][%s][INIT] BFD Session initialized.",
                  hex(self._local_discr))
@@ -226,12 +247,46 @@ class BFDSession(object):
         LOG.info("[BFD][%s][REMOTE] Remote address configured: %s, %s.",
                  hex(self._local_discr), self.dst_ip, self.dst_mac)
 
+        self.install_echo_flow()
+
+    def install_echo_flow(self):
+        """
+        Install a flow entry which loops back the BFD Echo packets of the
+        remote system on the switch, if the session is offloaded.
+
+        The remote system sends BFD Echo packets to its own IP address via
+        this interface, then the switch returns them to the remote system
+        like a router without sending them to the controller.
+        Does nothing until the switch connects and the remote addresses
+        are configured.
+        """
+        if not self.offload or self.datapath is None or \
+                not self._remote_addr_config:
+            return
+
+        datapath = self.datapath
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+
+        match = parser.OFPMatch(in_port=self.ofport,
+                                eth_dst=self.src_mac,
+                                eth_type=ETH_TYPE_IP,
+                                ipv4_dst=self.dst_ip,
+                                ip_proto=inet.IPPROTO_UDP,
+                                udp_dst=BFD_ECHO_UDP_PORT)
+        actions = [parser.OFPActionSetField(eth_src=self.src_mac),
+                   parser.OFPActionSetField(eth_dst=self.dst_mac),
+                   parser.OFPActionOutput(ofproto.OFPP_IN_PORT)]
+        self.app.add_flow(datapath, 0xFFFF, match, actions)
+        LOG.info("[BFD][%s][ECHO] BFD Echo offloaded to the switch.",
+                 hex(self._local_discr))
+
     def recv(self, bfd_pkt):
         """
         BFD packet receiver.
         """
         LOG.debug("[BFD][%s][RECV] BFD Control received: %s",
-                  hex(self._local_discr), six.binary_type(bfd_pkt))
+                  hex(self._local_discr), bfd_pkt)
         self._remote_discr = bfd_pkt.my_discr
         self._remote_state = bfd_pkt.state
         self._remote_demand_mode = bfd_pkt.flags & bfd.BFD_FLAG_DEMAND
@@ -282,14 +337,12 @@ class BFDSession(object):
                 self._remote_session_state != bfd.BFD_STATE_UP:
             if not self._enable_send:
                 self._enable_send = True
-                hub.spawn(self._send_loop)
+                self._start_send_timer()
 
         # Update the detection time (RFC5880 Section 6.8.4.)
         if self._detect_time == 0:
             self._detect_time = bfd_pkt.desired_min_tx_interval * \
                 bfd_pkt.detect_mult / 1000000.0
-            # Start the timeout loop.
-            hub.spawn(self._recv_timeout_loop)
 
         if bfd_pkt.flags & bfd.BFD_FLAG_POLL:
             self._pending_final = True
@@ -304,9 +357,11 @@ class BFDSession(object):
             self._rcv_auth_seq = bfd_pkt.auth_cls.seq
             self._auth_seq_known = 1
 
-        # Set the lock.
-        if self._lock is not None:
-            self._lock.set()
+        # Restart the Detection Time.
+        if self._detect_timer is not None:
+            self._detect_timer.cancel()
+        self._detect_timer = self.app.timer_wheel.schedule(
+            self._detect_time, self._detect_time_expired)
 
     def _set_state(self, new_state, diag=None):
         """
@@ -334,34 +389,27 @@ class BFDSession(object):
         self.app.send_event_to_observers(
             EventBFDSessionStateChanged(self, old_state, new_state))
 
-    def _recv_timeout_loop(self):
+    def _detect_time_expired(self):
         """
-        A loop to check timeout of receiving remote BFD packet.
+        Called when no BFD Control packet is received in the Detection Time.
         """
-        while self._detect_time:
-            last_wait = time.time()
-            self._lock = hub.Event()
-
-            self._lock.wait(timeout=self._detect_time)
-
-            if self._lock.is_set():
-                # Authentication variable check (RFC5880 Section 6.8.1.)
-                if getattr(self, "_auth_seq_known", 0):
-                    if last_wait > time.time() + 2 * self._detect_time:
-                        self._auth_seq_known = 0
+        # Packets queued for the next batch may have been received in time.
+        self.app.process_received_packets()
+        if self._detect_timer.active:
+            # Restarted by a received packet.
+            return
 
-            else:
-                # Check Detection Time expiration (RFC5880 section 6.8.4.)
-                LOG.info("[BFD][%s][RECV] BFD Session timed out.",
-                         hex(self._local_discr))
-                if self._session_state not in [bfd.BFD_STATE_DOWN,
-                                               bfd.BFD_STATE_ADMIN_DOWN]:
-                    self._set_state(bfd.BFD_STATE_DOWN,
-                                    bfd.BFD_DIAG_CTRL_DETECT_TIME_EXPIRED)
+        # Detection Time expiration (RFC5880 section 6.8.4.)
+        LOG.info("[BFD][%s][RECV] BFD Session timed out.",
+                 hex(self._local_discr))
+        if self._session_state not in [bfd.BFD_STATE_DOWN,
+                                       bfd.BFD_STATE_ADMIN_DOWN]:
+            self._set_state(bfd.BFD_STATE_DOWN,
+                            bfd.BFD_DIAG_CTRL_DETECT_TIME_EXPIRED)
 
-                # Authentication variable check (RFC5880 Section 6.8.1.)
-                if getattr(self, "_auth_seq_known", 0):
-                    self._auth_seq_known = 0
+        # Authentication variable check (RFC5880 Section 6.8.1.)
+        if getattr(self, "_auth_seq_known", 0):
+            self._auth_seq_known = 0
 
     def _update_xmit_period(self):
         """
@@ -384,28 +432,35 @@ class BFDSession(object):
         LOG.info("[BFD][%s][XMIT] Transmission period changed to %f",
                  hex(self._local_discr), self._xmit_period)
 
-    def _send_loop(self):
+    def _start_send_timer(self):
+        if self._send_timer is not None:
+            self._send_timer.cancel()
+        self._send_timer = self.app.timer_wheel.schedule(
+            self._xmit_period, self._send_timer_expired)
+
+    def _send_timer_expired(self):
         """
-        A loop to proceed periodic BFD packet transmission.
+        Proceed periodic BFD packet transmission.
         """
-        while self._enable_send:
-            hub.sleep(self._xmit_period)
+        if not self._enable_send:
+            return
+        self._start_send_timer()
 
-            # Send BFD packet. (RFC5880 Section 6.8.7.)
+        # Send BFD packet. (RFC5880 Section 6.8.7.)
 
-            if self._remote_discr == 0 and not self._active_role:
-                continue
+        if self._remote_discr == 0 and not self._active_role:
+            return
 
-            if self._remote_min_rx_interval == 0:
-                continue
+        if self._remote_min_rx_interval == 0:
+            return
 
-            if self._remote_demand_mode and \
-                    self._session_state == bfd.BFD_STATE_UP and \
-                    self._remote_session_state == bfd.BFD_STATE_UP and \
-                    not self._is_polling:
-                continue
+        if self._remote_demand_mode and \
+                self._session_state == bfd.BFD_STATE_UP and \
+                self._remote_session_state == bfd.BFD_STATE_UP and \
+                not self._is_polling:
+            return
 
-            self._send()
+        self._send()
 
     def _send(self):
         """
@@ -482,17 +537,27 @@ class BFDSession(object):
         src_port = self.src_port
         dst_port = self.dst_port
 
-        # Construct BFD Control packet
-        data = BFDPacket.bfd_packet(
-            src_mac=src_mac, dst_mac=dst_mac,
-            src_ip=src_ip, dst_ip=dst_ip, ipv4_id=ipv4_id,
-            src_port=src_port, dst_port=dst_port,
-            diag=diag, state=state, flags=flags, detect_mult=detect_mult,
-            my_discr=my_discr, your_discr=your_discr,
-            desired_min_tx_interval=desired_min_tx_interval,
-            required_min_rx_interval=required_min_rx_interval,
-            required_min_echo_rx_interval=required_min_echo_rx_interval,
-            auth_cls=auth_cls)
+        # Reuse the last BFD Control packet if only IPv4 ID differs.
+        key = (src_mac, dst_mac, src_ip, dst_ip, src_port, dst_port,
+               diag, state, flags, detect_mult, my_discr, your_discr,
+               desired_min_tx_interval, required_min_rx_interval,
+               required_min_echo_rx_interval)
+        if auth_cls is None and self._xmit_cache[0] == key:
+            data = BFDPacket.set_ipv4_id(self._xmit_cache[1], ipv4_id)
+        else:
+            # Construct BFD Control packet
+            data = BFDPacket.bfd_packet(
+                src_mac=src_mac, dst_mac=dst_mac,
+                src_ip=src_ip, dst_ip=dst_ip, ipv4_id=ipv4_id,
+                src_port=src_port, dst_port=dst_port,
+                diag=diag, state=state, flags=flags, detect_mult=detect_mult,
+                my_discr=my_discr, your_discr=your_discr,
+                desired_min_tx_interval=desired_min_tx_interval,
+                required_min_rx_interval=required_min_rx_interval,
+                required_min_echo_rx_interval=required_min_echo_rx_interval,
+                auth_cls=auth_cls)
+            if auth_cls is None:
+                self._xmit_cache = (key, data)
 
         # Prepare for a datapath
         datapath = self.datapath
@@ -561,12 +626,34 @@ class BFDPacket(object):
         pkt.serialize()
         return pkt.data
 
+    @staticmethod
+    def set_ipv4_id(data, ipv4_id):
+        """
+        Return a copy of BFD packet generated by bfd_packet() with the given
+        IPv4 identification, without generating the whole packet again.
+        """
+        data = bytearray(data)
+        offset = ethernet.ethernet._MIN_LEN
+        # Identification and Header Checksum fields of IPv4 header.
+        # UDP checksum does not cover IPv4 identification.
+        struct.pack_into('!H', data, offset + 4, ipv4_id)
+        struct.pack_into('!H', data, offset + 10, 0)
+        csum = packet_utils.checksum(data[offset:offset + ipv4.ipv4._MIN_LEN])
+        struct.pack_into('!H', data, offset + 10, csum)
+        return six.binary_type(data)
+
     @staticmethod
     def bfd_parse(data):
         """
         Parse raw packet and return BFD class from packet library.
         """
-        pkt = packet.Packet(data)
+        return BFDPacket.bfd_parse_packet(packet.Packet(data))
+
+    @staticmethod
+    def bfd_parse_packet(pkt):
+        """
+        Return BFD class from packet parsed by packet library.
+        """
         i = iter(pkt)
         eth_pkt = next(i)
 
@@ -701,8 +788,27 @@ class BFDLib(app_manager.RyuApp):
         # value: BFDSession object
         self.session = {}
 
+        # BFD sessions of each interface
+        # key: (Datapath ID, Openflow port number)
+        # value: list of BFDSession objects
+        self._port_sessions = {}
+
+        # Connected switches
+        # key: Datapath ID
+        # value: Datapath object
+        self._datapaths = {}
+
+        # Received BFD Control packets waiting for the next batch
+        self._rx_queue = collections.deque()
+        self._rx_timer = None
+
+        # Timers of all BFD sessions
+        self.timer_wheel = timerwheel.TimerWheel(
+            resolution=TIMER_RESOLUTION, slots=1024)
+        self.timer_wheel.start()
+
     def close(self):
-        pass
+        self.timer_wheel.stop()
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
     def switch_features_handler(self, ev):
@@ -710,10 +816,7 @@ class BFDLib(app_manager.RyuApp):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
-        # Update datapath object in BFD sessions
-        for s in self.session.values():
-            if s.dpid == datapath.id:
-                s.datapath = datapath
+        self._datapaths[datapath.id] = datapath
 
         # Install default flows for capturing ARP & BFD packets.
         match = parser.OFPMatch(eth_type=ETH_TYPE_ARP)
@@ -728,6 +831,12 @@ class BFDLib(app_manager.RyuApp):
                                           ofproto.OFPCML_NO_BUFFER)]
         self.add_flow(datapath, 0xFFFF, match, actions)
 
+        # Update datapath object in BFD sessions
+        for s in self.session.values():
+            if s.dpid == datapath.id:
+                s.datapath = datapath
+                s.install_echo_flow()
+
     def add_flow(self, datapath, priority, match, actions):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
@@ -755,11 +864,8 @@ class BFDLib(app_manager.RyuApp):
         if arp.arp in pkt:
             arp_pkt = ARPPacket.arp_parse(msg.data)
             if arp_pkt.opcode == ARP_REQUEST:
-                for s in self.session.values():
-                    if s.dpid == datapath.id and \
-                            s.ofport == in_port and \
-                            s.src_ip == arp_pkt.dst_ip:
-
+                for s in self._port_sessions.get((datapath.id, in_port), []):
+                    if s.src_ip == arp_pkt.dst_ip:
                         ans = ARPPacket.arp_packet(
                             ARP_REPLY,
                             s.src_mac, s.src_ip,
@@ -784,12 +890,28 @@ class BFDLib(app_manager.RyuApp):
         if udp_hdr.dst_port != BFD_CONTROL_UDP_PORT:
             return
 
-        # Parse BFD packet here.
-        self.recv_bfd_pkt(datapath, in_port, msg.data)
+        # Queue the packet for the next batch, which is processed on the
+        # timer wheel together with the timers of BFD sessions.
+        self._rx_queue.append((datapath, in_port, pkt))
+        if self._rx_timer is None or not self._rx_timer.active:
+            self._rx_timer = self.timer_wheel.schedule(
+                0, self.process_received_packets)
+
+    def process_received_packets(self):
+        """
+        Process the BFD Control packets received since the last batch.
+        """
+        queue = self._rx_queue
+        while queue:
+            datapath, in_port, pkt = queue.popleft()
+            try:
+                self._recv_bfd_pkt(datapath, in_port, pkt)
+            except Exception:
+                LOG.exception("[BFD] Failed to process BFD Control packet.")
 
     def add_bfd_session(self, dpid, ofport, src_mac, src_ip,
                         dst_mac="FF:FF:FF:FF:FF:FF", dst_ip="255.255.255.255",
-                        auth_type=0, auth_keys=None):
+                        auth_type=0, auth_keys=None, offload=False):
         """
         Establish a new BFD session and return My Discriminator of new session.
 
@@ -810,6 +932,14 @@ class BFDLib(app_manager.RyuApp):
         auth_keys        (Optional) A dictionary of authentication key chain
                          which key is an integer of *Auth Key ID* and value
                          is a string of *Password* or *Auth Key*.
+        offload          (Optional) If True, install a flow entry which
+                         loops back the BFD Echo packets of the remote system
+                         on the switch, and advertise Required Min Echo RX
+                         Interval, so that the remote system can detect
+                         failures with BFD Echo packets which never reach
+                         the controller. The remote addresses are required
+                         and learned from the first BFD Control packet if
+                         not configured.
         ================ ======================================================
 
         Example::
@@ -851,14 +981,23 @@ class BFDLib(app_manager.RyuApp):
                           dpid=dpid, ofport=ofport,
                           src_mac=src_mac, src_ip=src_ip, src_port=src_port,
                           dst_mac=dst_mac, dst_ip=dst_ip,
-                          auth_type=auth_type, auth_keys=auth_keys)
+                          auth_type=auth_type, auth_keys=auth_keys,
+                          offload=offload)
 
         self.session[my_discr] = sess
+        self._port_sessions.setdefault((dpid, ofport), []).append(sess)
+
+        # The switch may have connected before.
+        if dpid in self._datapaths:
+            sess.datapath = self._datapaths[dpid]
+            sess.install_echo_flow()
 
         return my_discr
 
     def recv_bfd_pkt(self, datapath, in_port, data):
-        pkt = packet.Packet(data)
+        self._recv_bfd_pkt(datapath, in_port, packet.Packet(data))
+
+    def _recv_bfd_pkt(self, datapath, in_port, pkt):
         eth = pkt.get_protocols(ethernet.ethernet)[0]
 
         if eth.ethertype != ETH_TYPE_IP:
@@ -871,7 +1010,7 @@ class BFDLib(app_manager.RyuApp):
             return
 
         # Parse BFD packet here.
-        bfd_pkt = BFDPacket.bfd_parse(data)
+        bfd_pkt = BFDPacket.bfd_parse_packet(pkt)
 
         if not isinstance(bfd_pkt, bfd.bfd):
             return
@@ -909,10 +1048,9 @@ class BFDLib(app_manager.RyuApp):
 
         if bfd_pkt.your_discr == 0:
             # Select session (Page 34)
-            for s in self.session.values():
-                if s.dpid == datapath.id and s.ofport == in_port:
-                    sess_my_discr = s.my_discr
-                    break
+            for s in self._port_sessions.get((datapath.id, in_port), []):
+                sess_my_discr = s.my_discr
+                break
 
             # BFD Session not found.
             if sess_my_discr is None:
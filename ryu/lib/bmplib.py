@@ -0,0 +1,515 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Library for collecting BGP Monitoring Protocol (BMP) [RFC7854] streams.
+
+BMPFramer splits a byte stream into raw BMP messages, BMPCollector decodes
+the Route Monitoring messages in batches, keeps the Adj-RIB-In of each
+monitored peer and passes the resulting route events to an exporter such
+as RotatingCSVExporter.
+"""
+
+import collections
+import csv
+import gzip
+import io
+import logging
+import os
+import socket
+import struct
+import time
+import weakref
+
+from ryu.lib import addrconv
+from ryu.lib.packet import bgp
+from ryu.lib.packet import bmp
+
+
+LOG = logging.getLogger(__name__)
+
+# Common header (6 bytes) + Per Peer Header (42 bytes)
+_PEER_HDR_OFFSET = bmp.BMPMessage._HDR_LEN
+_PEER_HDR_LEN = struct.calcsize(bmp.BMPPeerMessage._PEER_HDR_PACK_STR)
+_PEER_KEY_LEN = _PEER_HDR_LEN - 8  # without timestamp
+_BGP_OFFSET = _PEER_HDR_OFFSET + _PEER_HDR_LEN
+
+_ORIGIN_STR = {
+    bgp.BGP_ATTR_ORIGIN_IGP: 'i',
+    bgp.BGP_ATTR_ORIGIN_EGP: 'e',
+    bgp.BGP_ATTR_ORIGIN_INCOMPLETE: '?',
+}
+
+ROUTE_ANNOUNCE = 'A'
+ROUTE_WITHDRAW = 'W'
+
+
+class BMPFramer(object):
+    """
+    Splits a BMP byte stream into raw messages without decoding them.
+
+    feed() returns the list of complete messages in the given data, as
+    read-only memoryview slices over the data, so that messages are not
+    copied one by one. The incomplete tail is kept as a copy and joined
+    with the data fed next.
+    Raises ValueError if a message has an unsupported BMP version.
+    """
+
+    _HDR_PACK_STR = bmp.BMPMessage._HDR_PACK_STR
+    _HDR_LEN = bmp.BMPMessage._HDR_LEN
+
+    def __init__(self):
+        self._buf = b''
+
+    def feed(self, data):
+        if self._buf:
+            data = self._buf + data
+        elif not isinstance(data, bytes):
+            data = bytes(data)
+        buf = memoryview(data)
+        frames = []
+        offset = 0
+        end = len(buf)
+        while end - offset >= self._HDR_LEN:
+            version, len_, _ = struct.unpack_from(self._HDR_PACK_STR,
+                                                  buf, offset)
+            if version != bmp.VERSION:
+                raise ValueError("unsupported bmp version: %d" % version)
+            if len_ < self._HDR_LEN:
+                raise ValueError("invalid bmp message length: %d" % len_)
+            if end - offset < len_:
+                break
+            frames.append(buf[offset:offset + len_])
+            offset += len_
+        self._buf = bytes(buf[offset:])
+        return frames
+
+    def __len__(self):
+        """Number of bytes waiting for the rest of their message."""
+        return len(self._buf)
+
+
+BMPPeer = collections.namedtuple(
+    'BMPPeer', ['peer_type', 'peer_distinguisher', 'peer_address',
+                'peer_as', 'peer_bgp_id', 'is_post_policy',
+                'is_adj_rib_out'])
+
+RouteEvent = collections.namedtuple(
+    'RouteEvent', ['timestamp', 'router', 'peer', 'action', 'prefix',
+                   'attrs'])
+
+
+class RouteAttributes(object):
+    """
+    Decoded path attributes of a route.
+
+    Routes announced with the same attributes share one instance,
+    interned by their wire format, so the attributes are decoded once and
+    the Adj-RIB-In only holds references to them.
+    """
+
+    __slots__ = ('path_attributes', 'next_hop', 'columns', '__weakref__')
+
+    _interned = weakref.WeakValueDictionary()
+
+    def __init__(self, path_attributes, next_hop=None):
+        self.path_attributes = dict((attr.type, attr)
+                                    for attr in path_attributes)
+        nexthop_attr = self.path_attributes.get(bgp.BGP_ATTR_TYPE_NEXT_HOP)
+        if next_hop is None and nexthop_attr is not None:
+            next_hop = nexthop_attr.value
+        self.next_hop = next_hop
+        self.columns = self._columns()
+
+    @classmethod
+    def intern(cls, raw, next_hop=None):
+        key = (raw, next_hop)
+        attrs = cls._interned.get(key)
+        if attrs is None:
+            path_attributes = []
+            while raw:
+                attr, raw = bgp._PathAttribute.parser(raw)
+                path_attributes.append(attr)
+            attrs = cls(path_attributes, next_hop)
+            cls._interned[key] = attrs
+        return attrs
+
+    def get(self, type_, default=None):
+        return self.path_attributes.get(type_, default)
+
+    def _columns(self):
+        """(next_hop, as_path, origin, med, local_pref, communities)"""
+        origin = self.get(bgp.BGP_ATTR_TYPE_ORIGIN)
+        as_path = self.get(bgp.BGP_ATTR_TYPE_AS_PATH)
+        med = self.get(bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC)
+        local_pref = self.get(bgp.BGP_ATTR_TYPE_LOCAL_PREF)
+        communities = self.get(bgp.BGP_ATTR_TYPE_COMMUNITIES)
+
+        segs = []
+        for seg in (as_path.value if as_path is not None else []):
+            if isinstance(seg, set):
+                segs.append('{%s}' % ','.join(str(asn)
+                                              for asn in sorted(seg)))
+            else:
+                segs.extend(str(asn) for asn in seg)
+
+        return (self.next_hop or '',
+                ' '.join(segs),
+                _ORIGIN_STR.get(origin.value, '') if origin else '',
+                str(med.value) if med is not None else '',
+                str(local_pref.value) if local_pref is not None else '',
+                ' '.join('%d:%d' % (c >> 16, c & 0xffff)
+                         for c in communities.communities)
+                if communities is not None else '')
+
+
+def _ipv4_prefixes(buf, offset, end):
+    prefixes = []
+    while offset < end:
+        length = buf[offset]
+        size = (length + 7) // 8
+        addr = bytes(buf[offset + 1:offset + 1 + size])
+        prefixes.append('%s/%d' % (socket.inet_ntoa(addr.ljust(4, b'\0')),
+                                   length))
+        offset += 1 + size
+    return prefixes
+
+
+class BMPCollector(object):
+    """
+    Collects the routes monitored by a BMP client (a router).
+
+    Route Monitoring messages are buffered and decoded in batches of
+    batch_size messages or when flush() is called. Other messages flush
+    the batch first, so that events keep the order of the stream.
+
+    The Adj-RIB-In of each monitored peer is kept in ``ribs``, as
+    {peer key: {prefix: RouteAttributes}}, where the peer key is
+    (peer_distinguisher, peer_address, is_post_policy, is_adj_rib_out).
+    When a peer goes down, its routes are reported as withdrawn.
+
+    =============== ================================================
+    Argument        Description
+    =============== ================================================
+    router          Address of the BMP client, reported in events.
+    exporter        (Optional) Object with a write(events) method,
+                    called with the RouteEvents of each batch.
+    batch_size      (Optional) Number of Route Monitoring messages
+                    decoded at once.
+    message_handler (Optional) Called with the other decoded
+                    BMPMessages, e.g. Peer Up Notification.
+    error_handler   (Optional) Called with the raw message and the
+                    exception when a message fails to be decoded.
+    =============== ================================================
+    """
+
+    def __init__(self, router, exporter=None, batch_size=1000,
+                 message_handler=None, error_handler=None):
+        self.router = router
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.message_handler = message_handler
+        self.error_handler = error_handler
+        self.framer = BMPFramer()
+        self.ribs = {}
+        self.route_count = 0
+        self.failed_count = 0
+        self._batch = []
+        # raw Per Peer Header (without timestamp) -> BMPPeer
+        self._peers = {}
+
+    def feed(self, data):
+        for frame in self.framer.feed(data):
+            if frame[5] == bmp.BMP_MSG_ROUTE_MONITORING:
+                self._batch.append(frame)
+                if len(self._batch) >= self.batch_size:
+                    self.flush()
+            else:
+                self.flush()
+                self._handle_message(frame)
+
+    def flush(self):
+        """Decodes the buffered Route Monitoring messages."""
+        batch, self._batch = self._batch, []
+        events = []
+        for frame in batch:
+            try:
+                self._decode_route_monitoring(frame, events)
+            except Exception as e:
+                self._failed(frame, e)
+        self._export(events)
+
+    def rib(self, peer_address, peer_distinguisher=0, is_post_policy=False,
+            is_adj_rib_out=False):
+        return self.ribs.get((peer_distinguisher, peer_address,
+                              is_post_policy, is_adj_rib_out), {})
+
+    def _export(self, events):
+        self.route_count += len(events)
+        if events and self.exporter is not None:
+            self.exporter.write(events)
+
+    def _failed(self, frame, e):
+        self.failed_count += 1
+        if self.error_handler is not None:
+            self.error_handler(bytes(frame), e)
+        else:
+            LOG.error("failed to parse: %s (total fail count: %d)",
+                      e, self.failed_count)
+
+    def _peer(self, frame):
+        raw = bytes(frame[_PEER_HDR_OFFSET:_PEER_HDR_OFFSET + _PEER_KEY_LEN])
+        peer = self._peers.get(raw)
+        if peer is None:
+            (peer_type, peer_flags, peer_distinguisher, peer_address,
+             peer_as, peer_bgp_id) = struct.unpack_from('!BBQ16sI4s', raw)
+            if peer_flags & (1 << 7):
+                peer_address = addrconv.ipv6.bin_to_text(peer_address)
+            else:
+                peer_address = addrconv.ipv4.bin_to_text(peer_address[-4:])
+            peer = BMPPeer(peer_type, peer_distinguisher, peer_address,
+                           peer_as, addrconv.ipv4.bin_to_text(peer_bgp_id),
+                           bool(peer_flags & (1 << 6)),
+                           bool(peer_flags & (1 << 4)))
+            self._peers[raw] = peer
+        return peer
+
+    @staticmethod
+    def _peer_key(peer):
+        return (peer.peer_distinguisher, peer.peer_address,
+                peer.is_post_policy, peer.is_adj_rib_out)
+
+    def _decode_route_monitoring(self, frame, events):
+        peer = self._peer(frame)
+        timestamp1, timestamp2 = struct.unpack_from(
+            '!II', frame, _PEER_HDR_OFFSET + _PEER_KEY_LEN)
+        timestamp = timestamp1 + timestamp2 * (10 ** -6)
+
+        # BGP header: marker, length and type
+        offset = _BGP_OFFSET + 16
+        bgp_len, bgp_type = struct.unpack_from('!HB', frame, offset)
+        if bgp_type != bgp.BGP_MSG_UPDATE:
+            raise ValueError("not a bgp update: type %d" % bgp_type)
+        end = _BGP_OFFSET + bgp_len
+        if end > len(frame):
+            raise ValueError("bgp update exceeds bmp message")
+        offset += 3
+
+        (withdrawn_len,) = struct.unpack_from('!H', frame, offset)
+        offset += 2
+        withdrawn = _ipv4_prefixes(frame, offset, offset + withdrawn_len)
+        offset += withdrawn_len
+        (attrs_len,) = struct.unpack_from('!H', frame, offset)
+        offset += 2
+        attrs_end = offset + attrs_len
+        announced = _ipv4_prefixes(frame, attrs_end, end)
+
+        # MP_(UN)REACH_NLRI carry their own prefixes, so they are decoded
+        # separately and the rest of the attributes is interned.
+        raw_attrs = bytes(frame[offset:attrs_end])
+        mp_attrs = []
+        plain = []
+        while offset < attrs_end:
+            flags, type_ = frame[offset], frame[offset + 1]
+            if flags & bgp.BGP_ATTR_FLAG_EXTENDED_LENGTH:
+                (length,) = struct.unpack_from('!H', frame, offset + 2)
+                length += 4
+            else:
+                length = frame[offset + 2] + 3
+            if type_ in (bgp.BGP_ATTR_TYPE_MP_REACH_NLRI,
+                         bgp.BGP_ATTR_TYPE_MP_UNREACH_NLRI):
+                mp_attrs.append(bytes(frame[offset:offset + length]))
+            else:
+                plain.append(frame[offset:offset + length])
+            offset += length
+        next_hop = None
+        if mp_attrs:
+            raw_attrs = b''.join(plain)
+            for raw in mp_attrs:
+                attr, _ = bgp._PathAttribute.parser(raw)
+                if attr.type == bgp.BGP_ATTR_TYPE_MP_REACH_NLRI:
+                    next_hop = attr.next_hop
+                    announced.extend(n.formatted_nlri_str
+                                     for n in attr.nlri)
+                else:
+                    withdrawn.extend(n.formatted_nlri_str
+                                     for n in attr.withdrawn_routes)
+
+        rib = self.ribs.setdefault(self._peer_key(peer), {})
+        router = self.router
+        for prefix in withdrawn:
+            rib.pop(prefix, None)
+            events.append(RouteEvent(timestamp, router, peer,
+                                     ROUTE_WITHDRAW, prefix, None))
+        if announced:
+            attrs = RouteAttributes.intern(raw_attrs, next_hop)
+            for prefix in announced:
+                rib[prefix] = attrs
+                events.append(RouteEvent(timestamp, router, peer,
+                                         ROUTE_ANNOUNCE, prefix, attrs))
+
+    def _handle_message(self, frame):
+        try:
+            msg, _ = bmp.BMPMessage.parser(bytes(frame))
+        except Exception as e:
+            self._failed(frame, e)
+            return
+
+        if isinstance(msg, bmp.BMPPeerMessage):
+            peer = self._peer(frame)
+            if isinstance(msg, bmp.BMPPeerUpNotification):
+                self.ribs[self._peer_key(peer)] = {}
+            elif isinstance(msg, bmp.BMPPeerDownNotification):
+                self._peer_down(peer, msg.timestamp)
+        if self.message_handler is not None:
+            self.message_handler(msg)
+
+    def _peer_down(self, peer, timestamp):
+        events = []
+        address = (peer.peer_distinguisher, peer.peer_address)
+        for key in [key for key in self.ribs if key[:2] == address]:
+            rib = self.ribs.pop(key)
+            down = peer._replace(is_post_policy=key[2],
+                                 is_adj_rib_out=key[3])
+            for prefix in rib:
+                events.append(RouteEvent(timestamp, self.router, down,
+                                         ROUTE_WITHDRAW, prefix, None))
+        self._export(events)
+
+
+def replay(f, collector, chunk_size=1 << 20):
+    """
+    Feeds a recorded BMP stream from the file object f to collector.
+    Returns the number of route events.
+    """
+    count = collector.route_count
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        collector.feed(data)
+    collector.flush()
+    return collector.route_count - count
+
+
+class RotatingCSVExporter(object):
+    """
+    Writes route events to compact CSV files, rotated after max_rows rows
+    or max_seconds seconds.
+
+    Files are written as ``<prefix>-<YYYYmmdd-HHMMSS>-<seq>.csv[.gz]``
+    and get their final name when they are closed, so that readers only
+    see complete files. Announcements and withdrawals of the same path
+    attributes share the formatted attribute columns.
+
+    ============ ================================================
+    Argument     Description
+    ============ ================================================
+    directory    Directory where files are written.
+    prefix       (Optional) Prefix of file names.
+    max_rows     (Optional) Number of rows per file.
+    max_seconds  (Optional) Maximum lifetime of a file in seconds.
+    compress     (Optional) Compresses files with gzip.
+    ============ ================================================
+    """
+
+    COLUMNS = ('timestamp', 'router', 'peer_address', 'peer_as',
+               'post_policy', 'action', 'prefix', 'next_hop', 'as_path',
+               'origin', 'med', 'local_pref', 'communities')
+
+    _EMPTY_ATTRS = ('',) * 6
+
+    def __init__(self, directory, prefix='bmp', max_rows=1000000,
+                 max_seconds=None, compress=True):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.compress = compress
+        self.files = []
+        self._seq = 0
+        self._fd = None
+        self._path = None
+        self._opened = None
+        self._rows = 0
+
+    def write(self, events):
+        # Peers and path attributes are shared by many events, so their
+        # cells are formatted once per call.
+        peer_cells = {}
+        attrs_cells = {None: self._cells(self._EMPTY_ATTRS)}
+        offset = 0
+        while offset < len(events):
+            if self._fd is None or self._expired():
+                self._rotate()
+            chunk = events[offset:offset + self.max_rows - self._rows]
+            lines = []
+            for event in chunk:
+                peer_key = (event.router, event.peer)
+                peer = peer_cells.get(peer_key)
+                if peer is None:
+                    peer = peer_cells[peer_key] = self._cells(
+                        (event.router, event.peer.peer_address,
+                         event.peer.peer_as,
+                         int(event.peer.is_post_policy)))
+                attrs = attrs_cells.get(event.attrs)
+                if attrs is None:
+                    attrs = attrs_cells[event.attrs] = self._cells(
+                        event.attrs.columns)
+                lines.append('%.6f,%s,%s,%s,%s\r\n' % (
+                    event.timestamp, peer, event.action, event.prefix,
+                    attrs))
+            self._fd.write(''.join(lines))
+            self._rows += len(chunk)
+            offset += len(chunk)
+
+    @staticmethod
+    def _cells(values):
+        buf = io.StringIO()
+        csv.writer(buf).writerow(values)
+        return buf.getvalue()[:-2]
+
+    def _expired(self):
+        if self._rows >= self.max_rows:
+            return True
+        return (self.max_seconds is not None and
+                time.time() - self._opened >= self.max_seconds)
+
+    def _rotate(self):
+        self.close()
+        self._seq += 1
+        name = '%s-%s-%04d.csv' % (self.prefix,
+                                   time.strftime('%Y%m%d-%H%M%S'),
+                                   self._seq)
+        if self.compress:
+            name += '.gz'
+        self._path = os.path.join(self.directory, name)
+        if self.compress:
+            self._fd = io.TextIOWrapper(gzip.open(self._path + '.tmp', 'wb',
+                                                  compresslevel=6),
+                                        newline='')
+        else:
+            self._fd = open(self._path + '.tmp', 'w', newline='')
+        csv.writer(self._fd).writerow(self.COLUMNS)
+        self._opened = time.time()
+        self._rows = 0
+
+    def close(self):
+        if self._fd is None:
+            return
+        self._fd.close()
+        os.rename(self._path + '.tmp', self._path)
+        self.files.append(self._path)
+        self._fd = None
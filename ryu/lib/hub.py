@@ -36,6 +36,7 @@ if HUB_TYPE == 'eventlet':
     import eventlet.queue
     import eventlet.semaphore
     import eventlet.timeout
+    import eventlet.tpool
     import eventlet.wsgi
     from eventlet import websocket
     import greenlet
@@ -49,6 +50,9 @@ if HUB_TYPE == 'eventlet':
     sleep = eventlet.sleep
     listen = eventlet.listen
     connect = eventlet.connect
+    # Runs a blocking function in a native thread; only the calling
+    # greenthread waits for it, the other greenthreads keep running.
+    execute_in_thread = eventlet.tpool.execute
 
     def spawn(*args, **kwargs):
         raise_error = kwargs.pop('raise_error', False)
@@ -106,6 +110,7 @@ if HUB_TYPE == 'eventlet':
 
     Queue = eventlet.queue.LightQueue
     QueueEmpty = eventlet.queue.Empty
+    QueueFull = eventlet.queue.Full
     Semaphore = eventlet.semaphore.Semaphore
     BoundedSemaphore = eventlet.semaphore.BoundedSemaphore
     TaskExit = greenlet.GreenletExit
@@ -25,11 +25,15 @@ from ryu.ofproto import ofproto_v1_0
 from ryu.ofproto import ofproto_v1_2
 from ryu.ofproto import ofproto_v1_3
 from ryu.lib import addrconv
+from ryu.lib import timerwheel
 from ryu.lib.dpid import dpid_to_str
 from ryu.lib.packet import packet
 from ryu.lib.packet import ethernet
 from ryu.lib.packet import slow
 
+# Resolution of the timers of LACP exchange timeout in seconds
+TIMER_RESOLUTION = 0.1
+
 
 class EventPacketIn(event.EventBase):
     """a PacketIn event class using except LACP."""
@@ -53,7 +57,14 @@ class EventSlaveStateChanged(event.EventBase):
 
 
 class LacpLib(app_manager.RyuApp):
-    """LACP exchange library. this works only in a PASSIVE mode."""
+    """LACP exchange library. this works only in a PASSIVE mode.
+
+    the timeout of LACP exchange is detected both by the switch, which
+    removes the flow entry with idle_timeout, and by the timer of each
+    slave i/f on the controller, which works even if the switch does not
+    notify the removal. the response to a LACP which is the same as the
+    last one of the slave i/f is sent without parsing and generating
+    packets again."""
 
     # -------------------------------------------------------------------
     # PUBLIC METHODS
@@ -63,12 +74,19 @@ class LacpLib(app_manager.RyuApp):
         super(LacpLib, self).__init__()
         self.name = 'lacplib'
         self._bonds = []
+        self._slaves = {}
         self._add_flow = {
             ofproto_v1_0.OFP_VERSION: self._add_flow_v1_0,
             ofproto_v1_2.OFP_VERSION: self._add_flow_v1_2,
             ofproto_v1_3.OFP_VERSION: self._add_flow_v1_2,
         }
         self._set_logger()
+        self.timer_wheel = timerwheel.TimerWheel(
+            resolution=TIMER_RESOLUTION, slots=1024)
+        self.timer_wheel.start()
+
+    def close(self):
+        self.timer_wheel.stop()
 
     def add(self, dpid, ports):
         """add a setting of a bonding i/f.
@@ -89,7 +107,9 @@ class LacpLib(app_manager.RyuApp):
         assert len(ports) >= 2
         ifs = {}
         for port in ports:
-            ifs[port] = {'enabled': False, 'timeout': 0}
+            ifs[port] = {'enabled': False, 'timeout': 0, 'timer': None,
+                         'request': None, 'response': None}
+            self._slaves[(dpid, port)] = ifs[port]
         bond = {dpid: ifs}
         self._bonds.append(bond)
 
@@ -100,6 +120,21 @@ class LacpLib(app_manager.RyuApp):
     def packet_in_handler(self, evt):
         """PacketIn event handler. when the received packet was LACP,
         proceed it. otherwise, send a event."""
+        msg = evt.msg
+        datapath = msg.datapath
+        if datapath.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
+            port = msg.in_port
+        else:
+            port = msg.match['in_port']
+        slave = self._get_slave(datapath.id, port)
+        if slave and slave['enabled'] and msg.data == slave['request']:
+            # the same LACP as the last one. reuse the last response.
+            self.logger.debug("SW=%s PORT=%d LACP received and sent.",
+                              dpid_to_str(datapath.id), port)
+            self._start_slave_timer(datapath, port)
+            self._send_response(datapath, port, slave['response'])
+            return
+
         req_pkt = packet.Packet(evt.msg.data)
         if slow.lacp in req_pkt:
             (req_lacp, ) = req_pkt.get_protocols(slow.lacp)
@@ -126,13 +161,11 @@ class LacpLib(app_manager.RyuApp):
             dl_type = match['eth_type']
         if ether.ETH_TYPE_SLOW != dl_type:
             return
-        self.logger.info(
-            "SW=%s PORT=%d LACP exchange timeout has occurred.",
-            dpid_to_str(dpid), port)
-        self._set_slave_enabled(dpid, port, False)
-        self._set_slave_timeout(dpid, port, 0)
-        self.send_event_to_observers(
-            EventSlaveStateChanged(datapath, port, False))
+        slave = self._get_slave(dpid, port)
+        if slave and not slave['enabled']:
+            # the timeout has been detected by the timer.
+            return
+        self._disable_slave(datapath, port)
 
     # -------------------------------------------------------------------
     # PRIVATE METHODS ( RELATED TO LACP )
@@ -142,7 +175,6 @@ class LacpLib(app_manager.RyuApp):
         datapath = msg.datapath
         dpid = datapath.id
         ofproto = datapath.ofproto
-        parser = datapath.ofproto_parser
         if ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
             port = msg.in_port
         else:
@@ -182,17 +214,62 @@ class LacpLib(app_manager.RyuApp):
             assert func
             func(src, port, idle_timeout, datapath)
 
+        # restart the timer of the slave i/f.
+        self._start_slave_timer(datapath, port)
+
         # create a response packet.
         res_pkt = self._create_response(datapath, port, req_lacp)
 
+        # keep the response packet for the same LACP.
+        slave = self._get_slave(dpid, port)
+        if slave:
+            slave['request'] = msg.data
+            slave['response'] = res_pkt.data
+
         # packet-out the response packet.
+        self._send_response(datapath, port, res_pkt.data)
+
+    def _send_response(self, datapath, port, data):
+        """packet-out the response packet to the port."""
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
         out_port = ofproto.OFPP_IN_PORT
         actions = [parser.OFPActionOutput(out_port)]
-        out = datapath.ofproto_parser.OFPPacketOut(
+        out = parser.OFPPacketOut(
             datapath=datapath, buffer_id=ofproto.OFP_NO_BUFFER,
-            data=res_pkt.data, in_port=port, actions=actions)
+            data=data, in_port=port, actions=actions)
         datapath.send_msg(out)
 
+    def _start_slave_timer(self, datapath, port):
+        """(re)start the timer of LACP exchange timeout at some port of
+        some datapath."""
+        slave = self._get_slave(datapath.id, port)
+        if not slave:
+            return
+        if slave['timer'] is not None:
+            slave['timer'].cancel()
+        slave['timer'] = self.timer_wheel.schedule(
+            slave['timeout'], self._disable_slave, datapath, port)
+
+    def _disable_slave(self, datapath, port):
+        """LACP exchange timeout process. set the status of the slave
+        i/f to disabled, and send a event."""
+        dpid = datapath.id
+        self.logger.info(
+            "SW=%s PORT=%d LACP exchange timeout has occurred.",
+            dpid_to_str(dpid), port)
+        self._set_slave_enabled(dpid, port, False)
+        self._set_slave_timeout(dpid, port, 0)
+        slave = self._get_slave(dpid, port)
+        if slave:
+            if slave['timer'] is not None:
+                slave['timer'].cancel()
+            slave['timer'] = None
+            slave['request'] = None
+            slave['response'] = None
+        self.send_event_to_observers(
+            EventSlaveStateChanged(datapath, port, False))
+
     def _create_response(self, datapath, port, req):
         """create a packet including LACP."""
         src = datapath.ports[port].hw_addr
@@ -273,13 +350,7 @@ class LacpLib(app_manager.RyuApp):
 
     def _get_slave(self, dpid, port):
         """get slave i/f at some port of some datapath."""
-        result = None
-        for bond in self._bonds:
-            if dpid in bond:
-                if port in bond[dpid]:
-                    result = bond[dpid][port]
-                    break
-        return result
+        return self._slaves.get((dpid, port))
 
     # -------------------------------------------------------------------
     # PRIVATE METHODS ( RELATED TO OPEN FLOW PROTOCOL )
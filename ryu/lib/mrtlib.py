@@ -19,8 +19,13 @@ Information Export Format [RFC6396].
 """
 
 import abc
+import array
+import collections
 import logging
+import multiprocessing
+import os
 import struct
+import sys
 import time
 
 import netaddr
@@ -929,14 +934,42 @@ class MrtRibEntry(stringify.StringifyMixin):
             _header_size = cls.HEADER_SIZE_ADDPATH
 
         bgp_attr_bin = buf[_header_size:_header_size + attr_len]
-        bgp_attributes = []
-        while bgp_attr_bin:
-            attr, bgp_attr_bin = bgp._PathAttribute.parser(bgp_attr_bin)
-            bgp_attributes.append(attr)
+        bgp_attributes = cls.parse_bgp_attributes(bgp_attr_bin)
 
         return cls(peer_index, originated_time, bgp_attributes,
                    attr_len, path_id), buf[_header_size + attr_len:]
 
+    @classmethod
+    def parse_raw(cls, buf, is_addpath=False):
+        """
+        Same as parse() but leaves BGP Attributes undecoded.
+
+        Returns (peer_index, originated_time, path_id, bgp_attributes_bin)
+        and the rest of buf.
+        """
+        path_id = None
+        if not is_addpath:
+            (peer_index, originated_time,
+             attr_len) = struct.unpack_from(cls._HEADER_FMT, buf)
+            _header_size = cls.HEADER_SIZE
+        else:
+            (peer_index, originated_time, path_id,
+             attr_len) = struct.unpack_from(cls._HEADER_FMT_ADDPATH, buf)
+            _header_size = cls.HEADER_SIZE_ADDPATH
+
+        end = _header_size + attr_len
+        return ((peer_index, originated_time, path_id,
+                 buf[_header_size:end]), buf[end:])
+
+    @staticmethod
+    def parse_bgp_attributes(buf):
+        bgp_attributes = []
+        while buf:
+            attr, buf = bgp._PathAttribute.parser(buf)
+            bgp_attributes.append(attr)
+
+        return bgp_attributes
+
     def serialize(self):
         bgp_attrs_bin = bytearray()
         for attr in self.bgp_attributes:
@@ -1320,6 +1353,435 @@ class Reader(object):
         self.close()
 
 
+def _rib_message_cls(type_, subtype):
+    # Returns the message class of AFI/SAFI-specific RIB records, else None
+    if type_ != MrtRecord.TYPE_TABLE_DUMP_V2:
+        return None
+    msg_cls = TableDump2MrtMessage._lookup_type(subtype)
+    if (msg_cls is None or
+            not issubclass(msg_cls, TableDump2AfiSafiSpecificRibMrtMessage)):
+        return None
+    return msg_cls
+
+
+def _parse_rib_raw(msg_cls, buf):
+    # Returns prefix and raw RIB entries of AFI/SAFI-specific RIB message
+    prefix, rest = msg_cls._PREFIX_CLS.parser(
+        buf[msg_cls.HEADER_SIZE:])
+    (entry_count,) = struct.unpack_from('!H', rest)
+    rest = rest[2:]
+    entries = []
+    for _ in range(entry_count):
+        entry, rest = MrtRibEntry.parse_raw(
+            rest, is_addpath=msg_cls._IS_ADDPATH)
+        entries.append(entry)
+
+    return prefix.prefix, entries
+
+
+class MrtIndex(object):
+    """
+    Offset index of the records in MRT format file.
+
+    The index is built by scanning the records once without decoding them.
+    For the AFI/SAFI-specific RIB records of TABLE_DUMP_V2 type, the prefix
+    and the peer indexes of the RIB entries are indexed as well, in order to
+    look up the records by prefix or by peer.
+
+    ========= ================================================
+    Attribute Description
+    ========= ================================================
+    offsets   Offset of each record in file.
+    sizes     Size of each record including its header.
+    types     MRT Type of each record.
+    subtypes  MRT Subtype of each record.
+    ========= ================================================
+    """
+    _SIDECAR_MAGIC = b'RYUMRTIX'
+    _SIDECAR_VERSION = 1
+    # magic, version, byte order, file size, file mtime (ns), record count
+    _SIDECAR_HEADER_FMT = '!8sBBQQI'
+    _SIDECAR_HEADER_SIZE = struct.calcsize(_SIDECAR_HEADER_FMT)
+    # peer index, record count
+    _SIDECAR_PEER_FMT = '!HI'
+    _SIDECAR_PEER_SIZE = struct.calcsize(_SIDECAR_PEER_FMT)
+
+    def __init__(self):
+        self.offsets = array.array('Q')
+        self.sizes = array.array('I')
+        self.types = array.array('H')
+        self.subtypes = array.array('H')
+        # prefix of each record, '' for the records other than RIB
+        self._prefixes = []
+        # prefix -> record number or list of record numbers
+        self._prefix_index = {}
+        # peer index -> array of record numbers
+        self._peer_index = {}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @classmethod
+    def build(cls, f):
+        """
+        Builds the index of MRT format file object f, reading it from the
+        current position to the end.
+        """
+        index = cls()
+        offset = f.tell()
+        while True:
+            header_buf = f.read(MrtRecord.HEADER_SIZE)
+            if len(header_buf) < MrtRecord.HEADER_SIZE:
+                break
+            required_len = MrtRecord.parse_pre(header_buf)
+            body = f.read(required_len - MrtRecord.HEADER_SIZE)
+            if len(body) < required_len - MrtRecord.HEADER_SIZE:
+                LOG.warning('Truncated MRT record at offset %d', offset)
+                break
+
+            _, type_, subtype, _ = struct.unpack_from(
+                MrtRecord._HEADER_FMT, header_buf)
+            prefix = ''
+            peers = ()
+            msg_cls = _rib_message_cls(type_, subtype)
+            if msg_cls is not None:
+                prefix, entries = _parse_rib_raw(msg_cls, body)
+                peers = set(entry[0] for entry in entries)
+            index._append(offset, required_len, type_, subtype, prefix,
+                          peers)
+            offset += required_len
+
+        return index
+
+    def _append(self, offset, size, type_, subtype, prefix, peers):
+        number = len(self.offsets)
+        self.offsets.append(offset)
+        self.sizes.append(size)
+        self.types.append(type_)
+        self.subtypes.append(subtype)
+        self._prefixes.append(prefix)
+        if prefix:
+            self._index_prefix(prefix, number)
+        for peer_index in peers:
+            records = self._peer_index.get(peer_index)
+            if records is None:
+                records = self._peer_index[peer_index] = array.array('I')
+            records.append(number)
+
+    def _index_prefix(self, prefix, number):
+        numbers = self._prefix_index.get(prefix)
+        if numbers is None:
+            self._prefix_index[prefix] = number
+        elif isinstance(numbers, list):
+            numbers.append(number)
+        else:
+            self._prefix_index[prefix] = [numbers, number]
+
+    def find_prefix(self, prefix):
+        """
+        Returns the record numbers of RIB records for the given prefix
+        (e.g. '10.0.0.0/24').
+        """
+        prefix = str(netaddr.IPNetwork(prefix).cidr)
+        numbers = self._prefix_index.get(prefix, [])
+        if not isinstance(numbers, list):
+            return [numbers]
+        return list(numbers)
+
+    def find_peer(self, peer_index):
+        """
+        Returns the record numbers of RIB records which have RIB entries
+        for the given peer index.
+        """
+        return list(self._peer_index.get(peer_index, []))
+
+    def find_type(self, type_, subtype=None):
+        """
+        Returns the record numbers of the given MRT Type and Subtype.
+        """
+        return [number for number, t in enumerate(self.types)
+                if t == type_ and
+                (subtype is None or self.subtypes[number] == subtype)]
+
+    def save(self, filename, stat):
+        """
+        Saves the index as sidecar file.
+
+        stat is os.stat() result of the indexed MRT file, used to detect
+        the sidecar file which no longer matches it.
+        """
+        byteorder = 0 if sys.byteorder == 'little' else 1
+        with open(filename, 'wb') as f:
+            f.write(struct.pack(
+                self._SIDECAR_HEADER_FMT, self._SIDECAR_MAGIC,
+                self._SIDECAR_VERSION, byteorder, stat.st_size,
+                stat.st_mtime_ns, len(self)))
+            for arr in (self.offsets, self.sizes, self.types, self.subtypes):
+                f.write(arr.tobytes())
+            prefixes = '\n'.join(self._prefixes).encode('ascii')
+            f.write(struct.pack('!I', len(prefixes)))
+            f.write(prefixes)
+            f.write(struct.pack('!I', len(self._peer_index)))
+            for peer_index, records in self._peer_index.items():
+                f.write(struct.pack(self._SIDECAR_PEER_FMT,
+                                    peer_index, len(records)))
+                f.write(records.tobytes())
+
+    @classmethod
+    def load(cls, filename, stat):
+        """
+        Loads the index from sidecar file.
+
+        Returns None if the sidecar file does not exist or does not match
+        the MRT file of which os.stat() result is stat.
+        """
+        try:
+            with open(filename, 'rb') as f:
+                buf = f.read()
+        except (IOError, OSError):
+            return None
+
+        byteorder = 0 if sys.byteorder == 'little' else 1
+        try:
+            (magic, version, buf_byteorder, size, mtime_ns,
+             count) = struct.unpack_from(cls._SIDECAR_HEADER_FMT, buf)
+            if (magic != cls._SIDECAR_MAGIC or
+                    version != cls._SIDECAR_VERSION or
+                    buf_byteorder != byteorder or
+                    size != stat.st_size or mtime_ns != stat.st_mtime_ns):
+                return None
+
+            index = cls()
+            offset = cls._SIDECAR_HEADER_SIZE
+            for arr in (index.offsets, index.sizes, index.types,
+                        index.subtypes):
+                end = offset + count * arr.itemsize
+                arr.frombytes(buf[offset:end])
+                offset = end
+            (prefixes_len,) = struct.unpack_from('!I', buf, offset)
+            offset += 4
+            prefixes = buf[offset:offset + prefixes_len].decode('ascii')
+            offset += prefixes_len
+            index._prefixes = prefixes.split('\n') if count else []
+            for number, prefix in enumerate(index._prefixes):
+                if prefix:
+                    index._index_prefix(prefix, number)
+            (peer_count,) = struct.unpack_from('!I', buf, offset)
+            offset += 4
+            for _ in range(peer_count):
+                peer_index, records_count = struct.unpack_from(
+                    cls._SIDECAR_PEER_FMT, buf, offset)
+                offset += cls._SIDECAR_PEER_SIZE
+                records = array.array('I')
+                end = offset + records_count * records.itemsize
+                records.frombytes(buf[offset:end])
+                offset = end
+                index._peer_index[peer_index] = records
+        except (struct.error, ValueError):
+            return None
+
+        if len(index._prefixes) != count or any(
+                len(arr) != count for arr in (
+                    index.offsets, index.sizes, index.types,
+                    index.subtypes)):
+            return None
+
+        return index
+
+
+RibEntry = collections.namedtuple(
+    'RibEntry', ['subtype', 'prefix', 'peer_index', 'originated_time',
+                 'path_id', 'bgp_attributes'])
+RibEntry.__doc__ = """
+RIB entry of AFI/SAFI-specific RIB record with undecoded BGP Attributes.
+
+bgp_attributes is the binary of BGP Attributes, which
+MrtRibEntry.parse_bgp_attributes() decodes.
+"""
+
+
+def _decode_records(args):
+    # Decodes the records at the given (offset, size)s of file
+    filename, locations, raw = args
+    results = []
+    with open(filename, 'rb') as f:
+        for offset, size in locations:
+            f.seek(offset)
+            buf = f.read(size)
+            if not raw:
+                record, _ = MrtRecord.parse(buf)
+                results.append(record)
+                continue
+
+            _, type_, subtype, _ = struct.unpack_from(
+                MrtRecord._HEADER_FMT, buf)
+            msg_cls = _rib_message_cls(type_, subtype)
+            if msg_cls is None:
+                continue
+            prefix, entries = _parse_rib_raw(
+                msg_cls, buf[MrtRecord.HEADER_SIZE:])
+            results.extend(RibEntry(subtype, prefix, *entry)
+                           for entry in entries)
+
+    return results
+
+
+def _is_thread_monkey_patched():
+    # multiprocessing.Pool hangs if threads are eventlet green threads
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+    return patcher.is_monkey_patched('thread')
+
+
+class IndexedReader(object):
+    """
+    MRT format file reader which decodes records in parallel.
+
+    The records of the file are first indexed by MrtIndex, then decoded in
+    chunks by a pool of processes. Records can also be accessed randomly
+    by record number, prefix or peer index.
+
+    ============ ================================================
+    Argument     Description
+    ============ ================================================
+    filename     Name of MRT format file. Must not be compressed,
+                 as records are read at their offsets.
+    index_file   (Optional) Name of sidecar file to load the index
+                 from, or to save the index to if it does not
+                 exist or is outdated.
+    processes    (Optional) Number of processes decoding records.
+                 The default is the number of CPUs. If 1 or less,
+                 or if threads are monkey patched by eventlet (e.g.
+                 in ryu-manager), records are decoded in the
+                 current process.
+    chunk_size   (Optional) Number of records decoded at once by
+                 a process.
+    ============ ================================================
+
+    Example of Usage::
+
+        from ryu.lib import mrtlib
+
+        reader = mrtlib.IndexedReader('rib.YYYYMMDD.hhmm',
+                                      index_file='rib.YYYYMMDD.hhmm.idx')
+        peers = reader.peers
+        for entry in reader.rib_entries():
+            print("%s via %s" % (entry.prefix,
+                                 peers[entry.peer_index].ip_addr))
+        reader.close()
+    """
+
+    def __init__(self, filename, index_file=None, processes=None,
+                 chunk_size=1000):
+        self.filename = filename
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._peers = None
+
+        stat = os.stat(filename)
+        self.index = None
+        if index_file is not None:
+            self.index = MrtIndex.load(index_file, stat)
+        if self.index is None:
+            with open(filename, 'rb') as f:
+                self.index = MrtIndex.build(f)
+            if index_file is not None:
+                self.index.save(index_file, stat)
+
+    def __len__(self):
+        return len(self.index)
+
+    def records(self, numbers=None):
+        """
+        Yields decoded records of the given record numbers, or all records
+        if omitted, in order.
+        """
+        return self._decode(numbers, raw=False)
+
+    def rib_entries(self, numbers=None):
+        """
+        Yields RibEntry of AFI/SAFI-specific RIB records of the given record
+        numbers, or all records if omitted, in order, without decoding BGP
+        Attributes. The other records are skipped.
+        """
+        return self._decode(numbers, raw=True)
+
+    def record(self, number):
+        """
+        Returns the decoded record of the given record number.
+        """
+        return _decode_records(
+            (self.filename, [self._location(number)], False))[0]
+
+    def find_prefix(self, prefix, raw=False):
+        """
+        Returns RIB records for the given prefix (e.g. '10.0.0.0/24'), or
+        their RibEntry list if raw is True.
+        """
+        numbers = self.index.find_prefix(prefix)
+        return list(self._decode(numbers, raw=raw, parallel=False))
+
+    def find_peer(self, peer_index):
+        """
+        Yields RibEntry of the given peer index.
+        """
+        for entry in self.rib_entries(self.index.find_peer(peer_index)):
+            if entry.peer_index == peer_index:
+                yield entry
+
+    @property
+    def peers(self):
+        """
+        Peer entries of the PEER_INDEX_TABLE record, which peer_index of
+        RIB entries refers to.
+        """
+        if self._peers is None:
+            numbers = self.index.find_type(
+                MrtRecord.TYPE_TABLE_DUMP_V2,
+                TableDump2MrtRecord.SUBTYPE_PEER_INDEX_TABLE)
+            self._peers = []
+            if numbers:
+                self._peers = self.record(numbers[0]).message.peer_entries
+        return self._peers
+
+    def _location(self, number):
+        return self.index.offsets[number], self.index.sizes[number]
+
+    def _decode(self, numbers, raw, parallel=True):
+        if numbers is None:
+            numbers = range(len(self.index))
+        chunks = []
+        for i in range(0, len(numbers), self.chunk_size):
+            locations = [self._location(number)
+                         for number in numbers[i:i + self.chunk_size]]
+            chunks.append((self.filename, locations, raw))
+
+        if (not parallel or len(chunks) <= 1 or
+                (self.processes is not None and self.processes <= 1) or
+                _is_thread_monkey_patched()):
+            results = (_decode_records(chunk) for chunk in chunks)
+        else:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.processes)
+            results = self._pool.imap(_decode_records, chunks)
+
+        for result in results:
+            for item in result:
+                yield item
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __del__(self):
+        self.close()
+
+
 class Writer(object):
     """
     MRT format file writer.
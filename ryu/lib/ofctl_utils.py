@@ -242,24 +242,94 @@ def send_msg(dp, msg, logger=None):
     dp.send_msg(msg)
 
 
-def send_stats_request(dp, stats, waiters, msgs, logger=None):
+class StatsFuture(object):
+    """Pending reply of a request sent by send_stats_request_async().
+
+    The reply handler of the application appends each reply to ``msgs``
+    and sets ``lock`` when the final reply (the one without the
+    REPLY_MORE flag) arrives, exactly as for ``send_stats_request()``.
+    """
+
+    def __init__(self, dp, xid, waiters, msgs):
+        self.dp = dp
+        self.xid = xid
+        self.waiters = waiters
+        self.msgs = msgs
+        self.lock = hub.Event()
+
+    def done(self):
+        return self.lock.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the final reply.
+
+        Gives up when no reply has arrived for ``timeout`` seconds, so a
+        long multipart reply is not cut off while parts keep coming.
+        Returns True if the final reply arrived.
+        """
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+        previous_msg_len = -1
+        while not self.lock.is_set() and previous_msg_len < len(self.msgs):
+            previous_msg_len = len(self.msgs)
+            self.lock.wait(timeout=timeout)
+
+        if not self.lock.is_set():
+            self.cancel()
+            return False
+        return True
+
+    def result(self, timeout=None):
+        """Wait for the replies and return the list of reply messages."""
+        self.wait(timeout)
+        return self.msgs
+
+    def cancel(self):
+        """Stop collecting replies for this request."""
+        waiters_per_dp = self.waiters.get(self.dp.id, {})
+        waiters_per_dp.pop(self.xid, None)
+
+
+def send_stats_request_async(dp, stats, waiters, msgs=None, logger=None):
+    """Send a stats (multipart) request without waiting for the reply.
+
+    Returns a StatsFuture. Requests to many datapaths can be sent first
+    and waited for afterwards, so that they are served in parallel.
+    """
+    if msgs is None:
+        msgs = []
     dp.set_xid(stats)
-    waiters_per_dp = waiters.setdefault(dp.id, {})
-    lock = hub.Event()
-    previous_msg_len = len(msgs)
-    waiters_per_dp[stats.xid] = (lock, msgs)
+    future = StatsFuture(dp, stats.xid, waiters, msgs)
+    waiters.setdefault(dp.id, {})[stats.xid] = (future.lock, msgs)
     send_msg(dp, stats, logger)
+    return future
+
+
+def wait_stats_futures(futures, timeout=None):
+    """Wait for all the given StatsFutures and return their replies.
+
+    The requests are already in flight, so the total wait is about one
+    round trip of the slowest datapath rather than the sum of them.
+    """
+    return [future.result(timeout) for future in futures]
+
+
+def send_stats_request(dp, stats, waiters, msgs, logger=None):
+    send_stats_request_async(dp, stats, waiters, msgs, logger).wait()
 
-    lock.wait(timeout=DEFAULT_TIMEOUT)
-    current_msg_len = len(msgs)
 
-    while current_msg_len > previous_msg_len:
-        previous_msg_len = current_msg_len
-        lock.wait(timeout=DEFAULT_TIMEOUT)
-        current_msg_len = len(msgs)
+def get_stats_concurrently(method, dps, waiters, *args, **kwargs):
+    """Call an ofctl getter on many datapaths at once.
 
-    if not lock.is_set():
-        del waiters_per_dp[stats.xid]
+    ``method`` is one of the ofctl_v1_x getters taking ``(dp, waiters,
+    ...)``, e.g. ``ofctl_v1_3.get_port_stats``. Each call runs in its own
+    green thread, so all the requests are in flight together. Returns a
+    dict of datapath id to the getter's return value.
+    """
+    threads = dict((dp.id, hub.spawn(method, dp, waiters, *args,
+                                     raise_error=True, **kwargs))
+                   for dp in dps)
+    return dict((dpid, thread.wait()) for dpid, thread in threads.items())
 
 
 def str_to_int(str_num):
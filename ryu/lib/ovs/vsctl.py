@@ -175,9 +175,16 @@ def not_reached():
     os.abort()
 
 
+class VSCtlError(Exception):
+    """
+    Error of a command or a transaction raised by ``vsctl_fatal``.
+    """
+    pass
+
+
 def vsctl_fatal(msg):
     LOG.error(msg)
-    raise Exception(msg)        # not call ovs.utils.ovs_fatal for reusability
+    raise VSCtlError(msg)       # not call ovs.utils.ovs_fatal for reusability
 
 
 class VSCtlBridge(object):
@@ -234,12 +241,13 @@ class VSCtlQueue(object):
 class VSCtlContext(object):
 
     def _invalidate_cache(self):
+        # Rebinds the dicts, because they might be shared with the replica
         self.cache_valid = False
-        self.bridges.clear()
-        self.ports.clear()
-        self.ifaces.clear()
+        self.bridges = {}
+        self.ports = {}
+        self.ifaces = {}
 
-    def __init__(self, idl_, txn, ovsrec_open_vswitch):
+    def __init__(self, idl_, txn, ovsrec_open_vswitch, replica=None):
         super(VSCtlContext, self).__init__()
 
         # Modifiable state
@@ -247,6 +255,8 @@ class VSCtlContext(object):
         self.idl = idl_
         self.txn = txn
         self.ovs = ovsrec_open_vswitch
+        # _VSCtlReplica whose caches may be used, only for read-only commands
+        self.replica = replica
         self.symtab = None      # TODO:XXX
         self.verified_ports = False
 
@@ -355,7 +365,16 @@ class VSCtlContext(object):
         self._invalidate_cache()
 
     def populate_cache(self):
+        replica = self.replica
+        if replica is not None and not self.cache_valid:
+            cache = replica.get_cache()
+            if cache is not None:
+                self.bridges, self.ports, self.ifaces = cache
+                self.cache_valid = True
+                return
         self._populate_cache(self.idl.tables[vswitch_idl.OVSREC_TABLE_BRIDGE])
+        if replica is not None:
+            replica.set_cache((self.bridges, self.ports, self.ifaces))
 
     @staticmethod
     def port_is_fake_bridge(ovsrec_port):
@@ -881,9 +900,15 @@ class VSCtlContext(object):
                 return None
             referrer = values[0]
         else:
+            if self.replica is not None:
+                ovsrec_rows = self.replica.index(
+                    vsctl_row_id.table,
+                    vsctl_row_id.name_column).get(record_id, [])
+            else:
+                ovsrec_rows = self.idl.tables[
+                    vsctl_row_id.table].rows.values()
             referrer = None
-            for ovsrec_row in self.idl.tables[
-                    vsctl_row_id.table].rows.values():
+            for ovsrec_row in ovsrec_rows:
                 name = getattr(ovsrec_row, vsctl_row_id.name_column)
                 assert isinstance(name, (list, str, six.text_type))
                 if not isinstance(name, list) and name == record_id:
@@ -1008,6 +1033,65 @@ class VSCtlCommand(StringifyMixin):
         return option in self.options
 
 
+class _VSCtlReplica(idl.Idl):
+    """
+    Long-lived IDL which monitors all the tables of the database, shared by
+    the commands of VSCtl in the replica mode.
+    """
+
+    def __init__(self, remote, schema_helper):
+        super(_VSCtlReplica, self).__init__(remote, schema_helper)
+        # Serializes the accesses of the commands and of the update thread
+        self.lock = hub.Semaphore()
+        self.listeners = []
+
+        # Caches built from the rows, which are valid until the next change
+        self._cache_seqno = None
+        self._cache = None
+        self._indexes = {}      # (table name, column) -> {value: [row]}
+
+    def notify(self, event, row, updates=None):
+        for listener in self.listeners:
+            try:
+                listener(event, row, updates)
+            except Exception:
+                LOG.exception('Error in the listener of %s', row._table.name)
+
+    def _check_cache(self):
+        if self._cache_seqno != self.change_seqno:
+            self._cache_seqno = self.change_seqno
+            self._cache = None
+            self._indexes = {}
+
+    def get_cache(self):
+        """
+        Returns (bridges, ports, ifaces) cached by VSCtlContext, or None.
+        """
+        self._check_cache()
+        return self._cache
+
+    def set_cache(self, cache):
+        self._check_cache()
+        self._cache = cache
+
+    def index(self, table_name, column):
+        """
+        Returns a dict from the values of the given column to the list of
+        the rows which have the value.
+        Rows of which value is a list (optional or set column) are omitted.
+        """
+        self._check_cache()
+        index = self._indexes.get((table_name, column))
+        if index is None:
+            index = {}
+            for ovsrec_row in self.tables[table_name].rows.values():
+                value = getattr(ovsrec_row, column)
+                if not isinstance(value, list):
+                    index.setdefault(value, []).append(ovsrec_row)
+            self._indexes[(table_name, column)] = index
+        return index
+
+
 class VSCtl(object):
     """
     A class to describe an Open vSwitch instance.
@@ -1015,8 +1099,21 @@ class VSCtl(object):
     ``remote`` specifies the address of the OVS instance.
     :py:mod:`ryu.lib.ovs.vsctl.valid_ovsdb_addr` is a convenient function to
     validate this address.
+
+    By default, every call of ``run_command`` connects to the OVS instance
+    and fetches the tables required by the commands. After
+    ``start_replica`` is called, the instance keeps a local replica of the
+    database instead, see ``start_replica`` for details.
     """
 
+    # Commands which never modify the database
+    _READ_ONLY_COMMANDS = frozenset([
+        'show', 'list-br', 'br-exists', 'br-to-vlan', 'br-to-parent',
+        'br-get-external-id', 'list-ports', 'port-to-br', 'list-ifaces',
+        'iface-to-br', 'get-controller', 'get-fail-mode', 'list', 'find',
+        'get', 'list-ifaces-verbose',
+    ])
+
     def _reset(self):
         self.schema_helper = None
         self.ovs = None
@@ -1036,6 +1133,9 @@ class VSCtl(object):
         self.wait_for_reload = True
         self.dry_run = False
 
+        self.replica = None
+        self._replica_thread = None
+
     def _rpc_get_schema_json(self, database):
         LOG.debug('remote %s', self.remote)
         error, stream_ = stream.Stream.open_block(
@@ -1164,6 +1264,45 @@ class VSCtl(object):
 
         return True
 
+    def _do_vsctl_read_only(self, idl_, commands):
+        # The transaction is only for Row.verify() called by the commands
+        # and never committed.
+        txn = idl.Transaction(idl_)
+        ovs_rows = idl_.tables[vswitch_idl.OVSREC_TABLE_OPEN_VSWITCH].rows
+        ovs_ = next(iter(ovs_rows.values()), None)
+        ctx = VSCtlContext(idl_, txn, ovs_, replica=idl_)
+        ctx.verified_ports = True   # nothing to verify without commit
+        try:
+            for command in commands:
+                if command._run:
+                    command._run(ctx, command)
+            LOG.debug('result:\n%s', [command.result for command in commands])
+            ctx.done()
+        finally:
+            txn.abort()
+
+    def _do_main_replica(self, commands):
+        replica = self.replica
+        with replica.lock:
+            replica.run()
+            if all(command.command in self._READ_ONLY_COMMANDS
+                   for command in commands):
+                self._do_vsctl_read_only(replica, commands)
+                return
+
+            try:
+                seqno = replica.change_seqno
+                while not self._do_vsctl(replica, commands):
+                    if self.txn:
+                        self.txn.abort()
+                        self.txn = None
+                    self._idl_wait(replica, seqno)
+                    seqno = replica.change_seqno
+            finally:
+                if self.txn:
+                    self.txn.abort()
+                    self.txn = None
+
     def _do_main(self, commands):
         """
         :type commands: list of VSCtlCommand
@@ -1172,6 +1311,10 @@ class VSCtl(object):
         self._init_schema_helper()
         self._run_prerequisites(commands)
 
+        if self.replica is not None:
+            self._do_main_replica(commands)
+            return
+
         idl_ = idl.Idl(self.remote, self.schema_helper)
         seqno = idl_.change_seqno
         while True:
@@ -1294,6 +1437,128 @@ class VSCtl(object):
             with hub.Timeout(timeout_sec, exception):
                 self._run_command(commands)
 
+    def start_replica(self):
+        """
+        Starts the replica mode.
+
+        In the replica mode, this instance keeps a connection to the OVS
+        instance and a local replica of all the tables, which is kept up to
+        date by the monitor updates in a background thread. Commands are run
+        on the replica instead of fetching the tables for every call of
+        ``run_command``, and read-only commands (e.g., "list-br",
+        "list-ports", "find" and "get") are answered from the replica
+        without any transaction. Bridges, ports and interfaces, and rows by
+        name are indexed until the next change of the database.
+
+        Blocks until the replica is initialized.
+        Call ``stop_replica`` to close the connection.
+        """
+        if self.replica is not None:
+            return
+
+        self._init_schema_helper()
+        schema_helper = idl.SchemaHelper(None, self.schema_json)
+        schema_helper.register_all()
+        replica = _VSCtlReplica(self.remote, schema_helper)
+        self._idl_wait(replica, replica.change_seqno)
+
+        self.replica = replica
+        self._replica_thread = hub.spawn(self._replica_loop, replica)
+
+    def stop_replica(self):
+        """
+        Stops the replica mode started by ``start_replica``.
+        """
+        if self.replica is None:
+            return
+
+        replica = self.replica
+        with replica.lock:
+            hub.kill(self._replica_thread)
+            self._replica_thread = None
+            self.replica = None
+            replica.close()
+
+    @staticmethod
+    def _replica_loop(replica):
+        while True:
+            with replica.lock:
+                replica.run()
+                poller = ovs.poller.Poller()
+                replica.wait(poller)
+            poller.block()
+
+    def add_listener(self, listener):
+        """
+        Registers a listener of the changes of the database in the replica
+        mode.
+
+        ``listener`` is called with ``(event, row, updates)`` for every
+        change applied to the replica, where ``event`` is one of
+        ``ovs.db.idl.ROW_CREATE``, ``ROW_UPDATE`` or ``ROW_DELETE``, ``row``
+        is the row after the change and ``updates`` is the row with only
+        the old values of the changed columns, for ``ROW_UPDATE``.
+        Listeners are called while the replica is being updated, and must
+        not call ``run_command`` or ``stop_replica``.
+
+        Raises ``ValueError`` unless the replica mode is started.
+        """
+        if self.replica is None:
+            raise ValueError('Replica mode is not started')
+        self.replica.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Unregisters the listener registered by ``add_listener``.
+        """
+        if self.replica is not None:
+            self.replica.listeners.remove(listener)
+
+    def run_commands(self, command_lists, timeout_sec=None, exception=None):
+        """
+        Executes the given lists of commands in a single transaction.
+
+        ``command_lists`` must be a list of lists of
+        :py:mod:`ryu.lib.ovs.vsctl.VSCtlCommand`. The commands are executed
+        in order as one list, like commands separated by ``--`` of
+        ``ovs-vsctl``, so a command sees the changes of the previous
+        commands. This needs a single connection and round trip to OVSDB
+        instead of one per list.
+
+        If the transaction fails with ``VSCtlError``, nothing is committed
+        and each list of commands is executed again in its own transaction,
+        so that one failing list does not prevent the others from being
+        applied.
+
+        ``timeout_sec`` and ``exception`` are applied to each execution as
+        in ``run_command``. The timeout is raised as is, without executing
+        the lists again, because OVSDB may have committed the transaction
+        already.
+
+        Returns a list of the ``VSCtlError`` raised by each list of commands,
+        ``None`` for the succeeded ones, and fills ``result`` attribute for
+        each command instance.
+        """
+        commands = [command for commands in command_lists
+                    for command in commands]
+        try:
+            self.run_command(commands, timeout_sec, exception)
+            return [None] * len(command_lists)
+        except VSCtlError as e:
+            if len(command_lists) == 1:
+                return [e]
+            LOG.debug('batch of %d command lists failed, running them one '
+                      'by one: %s', len(command_lists), e)
+
+        errors = []
+        for commands in command_lists:
+            try:
+                self.run_command(commands, timeout_sec, exception)
+                errors.append(None)
+            except VSCtlError as e:
+                errors.append(e)
+        return errors
+
     # Open vSwitch commands:
 
     def _cmd_init(self, _ctx, _command):
@@ -2114,6 +2379,10 @@ class VSCtl(object):
         self._pre_get_table(ctx, table_name)
 
     def _list(self, ctx, table_name, record_id=None):
+        if record_id is not None and ctx.replica is not None:
+            return list(ctx.replica.index(table_name, 'name').get(
+                record_id, []))
+
         result = []
         for ovsrec_row in ctx.idl.tables[table_name].rows.values():
             if record_id is not None and ovsrec_row.name != record_id:
@@ -73,6 +73,17 @@ class ethernet(packet_base.PacketBase):
                            addrconv.mac.text_to_bin(self.src),
                            self.ethertype)
 
+    def serialized_len(self, payload_len):
+        # Includes padding if the payload is less than 46 bytes long
+        return self._MIN_LEN + max(payload_len, self._MIN_PAYLOAD_LEN)
+
+    def serialize_into(self, buf, offset, payload_len, prev):
+        # The padding is already zero-filled in buf.
+        struct.pack_into(ethernet._PACK_STR, buf, offset,
+                         addrconv.mac.text_to_bin(self.dst),
+                         addrconv.mac.text_to_bin(self.src),
+                         self.ethertype)
+
     @classmethod
     def get_packet_type(cls, type_):
         """Override method for the ethernet IEEE802.3 Length/Type
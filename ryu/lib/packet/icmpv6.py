@@ -149,6 +149,23 @@ class icmpv6(packet_base.PacketBase):
 
         return hdr
 
+    def serialize_into(self, buf, offset, payload_len, prev):
+        struct.pack_into(icmpv6._PACK_STR, buf, offset, self.type_,
+                         self.code, self.csum)
+        hdr_len = self._MIN_LEN
+        if self.data:
+            if self.type_ in icmpv6._ICMPV6_TYPES:
+                assert isinstance(self.data, _ICMPv6Payload)
+                data = self.data.serialize()
+            else:
+                data = self.data
+            buf[offset + hdr_len:offset + hdr_len + len(data)] = data
+            hdr_len += len(data)
+        if self.csum == 0:
+            view = memoryview(buf)[offset:offset + hdr_len + payload_len]
+            self.csum = packet_utils.checksum_ip_view(prev, hdr_len, view)
+            struct.pack_into('!H', buf, offset + 2, self.csum)
+
     def __len__(self):
         return self._MIN_LEN + len(self.data)
 
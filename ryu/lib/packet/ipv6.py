@@ -137,6 +137,22 @@ class ipv6(packet_base.PacketBase):
             struct.pack_into('!H', hdr, 4, self.payload_length)
         return hdr
 
+    def serialize_into(self, buf, offset, payload_len, prev):
+        hdr_len = self._MIN_LEN
+        for ext_hdr in self.ext_hdrs:
+            ext_hdr_len = len(ext_hdr)
+            buf[offset + hdr_len:offset + hdr_len + ext_hdr_len] = \
+                ext_hdr.serialize()
+            hdr_len += ext_hdr_len
+        if 0 == self.payload_length:
+            self.payload_length = payload_len + hdr_len - self._MIN_LEN
+        v_tc_flow = (self.version << 28 | self.traffic_class << 20 |
+                     self.flow_label)
+        struct.pack_into(ipv6._PACK_STR, buf, offset, v_tc_flow,
+                         self.payload_length, self.nxt, self.hop_limit,
+                         addrconv.ipv6.text_to_bin(self.src),
+                         addrconv.ipv6.text_to_bin(self.dst))
+
     def __len__(self):
         ext_hdrs_len = 0
         for ext_hdr in self.ext_hdrs:
@@ -114,6 +114,10 @@ class LLDPBasicTLV(stringify.StringifyMixin):
     def _len_valid(self):
         return self._LEN_MIN <= self.len and self.len <= self._LEN_MAX
 
+    def serialize_into(self, buf, offset):
+        data = self.serialize()
+        buf[offset:offset + len(data)] = data
+
 
 class lldp(packet_base.PacketBase):
     """LLDPDU encoder/decoder class.
@@ -178,6 +182,11 @@ class lldp(packet_base.PacketBase):
 
         return data
 
+    def serialize_into(self, buf, offset, payload_len, prev):
+        for tlv in self.tlvs:
+            tlv.serialize_into(buf, offset)
+            offset += LLDP_TLV_SIZE + tlv.len
+
     @classmethod
     def set_type(cls, tlv_cls):
         cls._tlv_parsers[tlv_cls.tlv_type] = tlv_cls
@@ -220,6 +229,9 @@ class End(LLDPBasicTLV):
     def serialize(self):
         return struct.pack('!H', self.typelen)
 
+    def serialize_into(self, buf, offset):
+        struct.pack_into('!H', buf, offset, self.typelen)
+
 
 @lldp.set_tlv_type(LLDP_TLV_CHASSIS_ID)
 class ChassisID(LLDPBasicTLV):
@@ -265,6 +277,10 @@ class ChassisID(LLDPBasicTLV):
     def serialize(self):
         return struct.pack('!HB', self.typelen, self.subtype) + self.chassis_id
 
+    def serialize_into(self, buf, offset):
+        struct.pack_into('!HB%ds' % len(self.chassis_id), buf, offset,
+                         self.typelen, self.subtype, self.chassis_id)
+
 
 @lldp.set_tlv_type(LLDP_TLV_PORT_ID)
 class PortID(LLDPBasicTLV):
@@ -310,6 +326,10 @@ class PortID(LLDPBasicTLV):
     def serialize(self):
         return struct.pack('!HB', self.typelen, self.subtype) + self.port_id
 
+    def serialize_into(self, buf, offset):
+        struct.pack_into('!HB%ds' % len(self.port_id), buf, offset,
+                         self.typelen, self.subtype, self.port_id)
+
 
 @lldp.set_tlv_type(LLDP_TLV_TTL)
 class TTL(LLDPBasicTLV):
@@ -341,6 +361,9 @@ class TTL(LLDPBasicTLV):
     def serialize(self):
         return struct.pack('!HH', self.typelen, self.ttl)
 
+    def serialize_into(self, buf, offset):
+        struct.pack_into('!HH', buf, offset, self.typelen, self.ttl)
+
 
 @lldp.set_tlv_type(LLDP_TLV_PORT_DESCRIPTION)
 class PortDescription(LLDPBasicTLV):
@@ -86,8 +86,18 @@ class Packet(StringifyMixin):
         """Encode a packet and store the resulted bytearray in self.data.
 
         This method is legal only when encoding a packet.
+
+        If all of the protocol headers support serialize_into, the packet
+        is encoded in a single pass into one preallocated buffer.
+        Otherwise, each protocol header is encoded with serialize.
         """
 
+        if all(map(_supports_serialize_into, self.protocols)):
+            self._serialize_into()
+        else:
+            self._serialize_each()
+
+    def _serialize_each(self):
         self.data = bytearray()
         r = self.protocols[::-1]
         for i, p in enumerate(r):
@@ -101,6 +111,44 @@ class Packet(StringifyMixin):
                 data = six.binary_type(p)
             self.data = bytearray(data + self.data)
 
+    def _serialize_into(self):
+        protocols = self.protocols
+        num = len(protocols)
+
+        # The header length of each protocol and its on-wire length
+        # including what follows it.
+        hdr_lens = [0] * num
+        total_lens = [0] * (num + 1)
+        for i in range(num - 1, -1, -1):
+            p = protocols[i]
+            hdr_lens[i] = len(p)
+            if isinstance(p, _RAW_TYPES):
+                total_lens[i] = hdr_lens[i] + total_lens[i + 1]
+            else:
+                total_lens[i] = p.serialized_len(total_lens[i + 1])
+        offset = sum(hdr_lens)
+
+        buf = bytearray(total_lens[0])
+        for i in range(num - 1, -1, -1):
+            p = protocols[i]
+            offset -= hdr_lens[i]
+            if isinstance(p, _RAW_TYPES):
+                buf[offset:offset + hdr_lens[i]] = p
+                continue
+            prev = protocols[i - 1] if i > 0 else None
+            state = dict(p.__dict__)
+            p.serialize_into(buf, offset, total_lens[i + 1], prev)
+            # The length of some headers is known only after encoding them,
+            # e.g. MLDv2 report with auxiliary data.  If the header was not
+            # encoded in the length reported beforehand, the lengths of the
+            # outer headers are wrong, so encode the packet layer by layer.
+            if len(p) != hdr_lens[i] or len(buf) != total_lens[0]:
+                p.__dict__.clear()
+                p.__dict__.update(state)
+                self._serialize_each()
+                return
+        self.data = buf
+
     @classmethod
     def from_jsondict(cls, dict_, decode_string=base64.b64decode,
                       **additional_args):
@@ -178,6 +226,30 @@ class Packet(StringifyMixin):
     __repr__ = __str__  # note: str(list) uses __repr__ for elements
 
 
+_RAW_TYPES = (six.binary_type, bytearray)
+_SERIALIZE_INTO_SUPPORT = dict((t, True) for t in _RAW_TYPES)
+
+
+def _supports_serialize_into(proto):
+    cls = proto.__class__
+    supported = _SERIALIZE_INTO_SUPPORT.get(cls)
+    if supported is None:
+        # serialize_into is used only if it is implemented by the same class
+        # as serialize or by a subclass of it, so that a subclass which
+        # overrides serialize alone is still encoded by its own serialize.
+        def _owner(name):
+            for c in cls.__mro__:
+                if name in vars(c):
+                    return c
+        supported = False
+        if issubclass(cls, packet_base.PacketBase):
+            into_owner = _owner('serialize_into')
+            supported = (into_owner is not packet_base.PacketBase and
+                         issubclass(into_owner, _owner('serialize')))
+        _SERIALIZE_INTO_SUPPORT[cls] = supported
+    return supported
+
+
 # XXX: Hack for preventing recursive import
 def _PacketBase__div__(self, trailer):
     pkt = Packet()
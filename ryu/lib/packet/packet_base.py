@@ -86,3 +86,30 @@ class PacketBase(stringify.StringifyMixin):
         For example, *prev* is ipv4 or ipv6 for tcp.serialize.
         """
         pass
+
+    def serialized_len(self, payload_len):
+        """Return the on-wire length of this header and its payload.
+
+        This method is used only when encoding a packet.
+
+        *payload_len* is the length of the rest of the packet which will
+        immediately follow this header.  Protocols which append a trailer
+        or padding to their payload should override this method.
+        """
+        return len(self) + payload_len
+
+    def serialize_into(self, buf, offset, payload_len, prev):
+        """Encode a protocol header into a preallocated buffer.
+
+        This method is used only when encoding a packet.
+
+        A single-pass alternative to serialize, used by Packet.serialize
+        when all of the protocol headers of a packet implement it.
+
+        Encode a protocol header of len(self) bytes at *offset* in the
+        bytearray *buf*.  The header is immediately followed by
+        *payload_len* bytes of already encoded payload in *buf*.
+
+        *prev* is the same as for serialize.
+        """
+        raise NotImplementedError()
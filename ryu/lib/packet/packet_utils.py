@@ -100,6 +100,43 @@ def checksum_ip(ipvx, length, payload):
     return checksum(buf)
 
 
+def _int_sum16(data):
+    # A 16 bit one's complement sum is congruent modulo 0xffff to the
+    # big-endian integer value of the data, since 0x10000 % 0xffff == 1.
+    value = int.from_bytes(data, 'big')
+    if len(data) % 2:
+        value <<= 8
+    return value
+
+
+def checksum_ip_view(ipvx, length, view):
+    """
+    calculate checksum of IP pseudo header and *view*
+
+    Same as checksum_ip, but *view* is a memoryview (or any other
+    bytes-like object) of the upper-layer packet which is summed in place
+    instead of being concatenated to the pseudo header.
+    """
+    if ipvx.version == 4:
+        header = struct.pack(_IPV4_PSEUDO_HEADER_PACK_STR,
+                             addrconv.ipv4.text_to_bin(ipvx.src),
+                             addrconv.ipv4.text_to_bin(ipvx.dst),
+                             ipvx.proto, length)
+    elif ipvx.version == 6:
+        header = struct.pack(_IPV6_PSEUDO_HEADER_PACK_STR,
+                             addrconv.ipv6.text_to_bin(ipvx.src),
+                             addrconv.ipv6.text_to_bin(ipvx.dst),
+                             length, ipvx.nxt)
+    else:
+        raise ValueError('Unknown IP version %d' % ipvx.version)
+
+    value = _int_sum16(header) + _int_sum16(view)
+    s = value % 0xffff
+    if s == 0 and value:
+        s = 0xffff
+    return ~s & 0xffff
+
+
 _MODX = 4102
 
 
@@ -54,6 +54,10 @@ class _vlan(packet_base.PacketBase):
         tci = self.pcp << 13 | self.cfi << 12 | self.vid
         return struct.pack(vlan._PACK_STR, tci, self.ethertype)
 
+    def serialize_into(self, buf, offset, payload_len, prev):
+        tci = self.pcp << 13 | self.cfi << 12 | self.vid
+        struct.pack_into(vlan._PACK_STR, buf, offset, tci, self.ethertype)
+
 
 class vlan(_vlan):
     """VLAN (IEEE 802.1Q) header encoder/decoder class.
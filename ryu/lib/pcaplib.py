@@ -37,10 +37,16 @@ Reference source: http://wiki.wireshark.org/Development/LibpcapFileFormat
                 +---------------------+
 """
 
+import array
+import collections
+import io
+import mmap
 import struct
 import sys
 import time
 
+from ryu.lib import hub
+
 
 class PcapFileHdr(object):
     """
@@ -190,6 +196,10 @@ class PcapPktHdr(object):
                            self.incl_len, self.orig_len)
 
 
+PcapBatch = collections.namedtuple(
+    'PcapBatch', ['timestamps', 'incl_lens', 'orig_lens', 'offsets'])
+
+
 class Reader(object):
     """
     PCAP file reader
@@ -199,8 +209,16 @@ class Reader(object):
     ================ ===================================
     file_obj         File object which reading PCAP file
                      in binary mode
+    zero_copy        If True, yields memoryview objects of
+                     packet data instead of bytes objects
     ================ ===================================
 
+    The PCAP file is memory-mapped if possible, otherwise it is read
+    record by record, so that reading a capture takes time proportional
+    to its size.
+    With zero_copy, the yielded memoryview objects refer to the mapped
+    file and are valid until the reader is closed.
+
     Example of usage::
 
         from ryu.lib import pcaplib
@@ -213,48 +231,157 @@ class Reader(object):
             frame_count += 1
             pkt = packet.Packet(buf)
             print("%d, %f, %s" % (frame_count, ts, pkt))
+
+    To get the timestamps and the lengths of packets without packet data,
+    use next_batch()::
+
+        reader = pcaplib.Reader(open('test.pcap', 'rb'))
+        batch = reader.next_batch()
+        print(max(batch.incl_lens), batch.timestamps[-1])
     """
 
-    def __init__(self, file_obj):
+    def __init__(self, file_obj, zero_copy=False):
         self._fp = file_obj
         buf = self._fp.read(PcapFileHdr.FILE_HDR_SIZE)
         # Read only pcap file header
         self.pcap_header, self._file_byteorder = PcapFileHdr.parser(buf)
-        # Read pcap data with out header
-        self._pcap_body = self._fp.read()
-        self._fp.close()
-        self._next_pos = 0
+        if self._file_byteorder == 'big':
+            fmt = PcapPktHdr._PKT_HDR_FMT_BIG_ENDIAN
+        else:
+            fmt = PcapPktHdr._PKT_HDR_FMT_LITTLE_ENDIAN
+        self._pkt_hdr = struct.Struct(fmt)
+        self._zero_copy = zero_copy
+        try:
+            self._next_pos = self._fp.tell()
+        except (AttributeError, EnvironmentError, io.UnsupportedOperation):
+            self._next_pos = PcapFileHdr.FILE_HDR_SIZE
+        self._mmap = None
+        self._buf = None
+        try:
+            self._mmap = mmap.mmap(self._fp.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except (AttributeError, EnvironmentError, ValueError,
+                io.UnsupportedOperation):
+            # Not a regular file; e.g. BytesIO, pipe or empty file
+            pass
+        else:
+            self._buf = memoryview(self._mmap)
 
     def __iter__(self):
         return self
 
-    def next(self):
-        try:
-            pkt_hdr, pkt_data = PcapPktHdr.parser(
-                self._pcap_body[self._next_pos:], self._file_byteorder)
-            self._next_pos += pkt_hdr.incl_len + PcapPktHdr.PKT_HDR_SIZE
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def close(self):
+        """
+        Closes the PCAP file.
+        """
+        if self._buf is not None:
+            self._buf.release()
+            self._buf = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Packet data yielded with zero_copy are still referred.
+                # The mapping is released when they are collected.
+                pass
+            self._mmap = None
+        self._fp.close()
+
+    def _next_hdr(self):
+        # Returns the record header and the offset of the packet data, or
+        # None at the end of the file.
+        hdr_size = PcapPktHdr.PKT_HDR_SIZE
+        if self._buf is not None:
+            pos = self._next_pos
+            if pos >= len(self._buf):
+                return None
+            hdr = self._pkt_hdr.unpack_from(self._buf, pos)
+        else:
+            if self._fp.closed:
+                return None
+            buf = self._fp.read(hdr_size)
+            if not buf:
+                return None
+            hdr = self._pkt_hdr.unpack_from(buf)
+        data_pos = self._next_pos + hdr_size
+        self._next_pos = data_pos + hdr[2]
+        return hdr, data_pos
 
-        except IndexError:
+    def next(self):
+        rec = self._next_hdr()
+        if rec is None:
+            self.close()
             raise StopIteration()
+        (ts_sec, ts_usec, incl_len, _orig_len), data_pos = rec
+
+        if self._buf is not None:
+            pkt_data = self._buf[data_pos:data_pos + incl_len]
+            if not self._zero_copy:
+                pkt_data = pkt_data.tobytes()
+        else:
+            pkt_data = self._fp.read(incl_len)
+            if self._zero_copy:
+                pkt_data = memoryview(pkt_data)
 
-        return pkt_hdr.ts_sec + (pkt_hdr.ts_usec / 1e6), pkt_data
+        return ts_sec + (ts_usec / 1e6), pkt_data
 
     # for Python 3 compatible
     __next__ = next
 
+    def next_batch(self, count=None):
+        """
+        Reads up to *count* records (all of the rest if None) without
+        copying packet data.
+
+        Returns a PcapBatch of arrays: timestamps (array of 'd'), incl_lens
+        and orig_lens (array of 'I') and offsets (array of 'Q') which are
+        the file offsets of packet data.  The arrays are empty at the end
+        of the file.
+        """
+        batch = PcapBatch(array.array('d'), array.array('I'),
+                          array.array('I'), array.array('Q'))
+        while count is None or len(batch.offsets) < count:
+            rec = self._next_hdr()
+            if rec is None:
+                break
+            (ts_sec, ts_usec, incl_len, orig_len), data_pos = rec
+            if self._buf is None:
+                self._skip(incl_len)
+            batch.timestamps.append(ts_sec + (ts_usec / 1e6))
+            batch.incl_lens.append(incl_len)
+            batch.orig_lens.append(orig_len)
+            batch.offsets.append(data_pos)
+        return batch
+
+    def _skip(self, length):
+        try:
+            self._fp.seek(length, io.SEEK_CUR)
+        except (AttributeError, EnvironmentError, io.UnsupportedOperation):
+            self._fp.read(length)
+
 
 class Writer(object):
     """
     PCAP file writer
 
-    ========== ==================================================
-    Argument   Description
-    ========== ==================================================
-    file_obj   File object which writing PCAP file in binary mode
-    snaplen    Max length of captured packets (in octets)
-    network    Data link type. (e.g. 1 for Ethernet,
-               see `tcpdump.org`_ for details)
-    ========== ==================================================
+    ============== ==================================================
+    Argument       Description
+    ============== ==================================================
+    file_obj       File object which writing PCAP file in binary mode
+    snaplen        Max length of captured packets (in octets)
+    network        Data link type. (e.g. 1 for Ethernet,
+                   see `tcpdump.org`_ for details)
+    buffer_size    Size of the internal buffer (in octets).
+                   If 0, packets are written to file_obj immediately.
+    flush_interval Max seconds to keep packets in the internal buffer.
+                   Checked when writing packets.
+    ============== ==================================================
 
     .. _tcpdump.org: http://www.tcpdump.org/linktypes.html
 
@@ -283,18 +410,36 @@ class Writer(object):
                 self.pcap_writer.write_pkt(ev.msg.data)
 
                 ...
+
+    At high packet-in rates, buffer packets and write them from
+    a background thread with AsyncWriter::
+
+        self.pcap_writer = pcaplib.AsyncWriter(
+            pcaplib.Writer(open('mypcap.pcap', 'wb'),
+                           buffer_size=1024 * 1024, flush_interval=1))
     """
 
-    def __init__(self, file_obj, snaplen=65535, network=1):
+    def __init__(self, file_obj, snaplen=65535, network=1, buffer_size=0,
+                 flush_interval=None):
         self._f = file_obj
         self.snaplen = snaplen
         self.network = network
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buf = bytearray()
+        self._last_flush = time.time()
         self._write_pcap_file_hdr()
 
+    def _write(self, buf):
+        if self.buffer_size:
+            self._buf += buf
+        else:
+            self._f.write(buf)
+
     def _write_pcap_file_hdr(self):
         pcap_file_hdr = PcapFileHdr(snaplen=self.snaplen,
                                     network=self.network)
-        self._f.write(pcap_file_hdr.serialize())
+        self._write(pcap_file_hdr.serialize())
 
     def _write_pkt_hdr(self, ts, buf_len):
         sec = int(ts)
@@ -303,10 +448,11 @@ class Writer(object):
         pc_pkt_hdr = PcapPktHdr(ts_sec=sec, ts_usec=usec,
                                 incl_len=buf_len, orig_len=buf_len)
 
-        self._f.write(pc_pkt_hdr.serialize())
+        self._write(pc_pkt_hdr.serialize())
 
     def write_pkt(self, buf, ts=None):
-        ts = time.time() if ts is None else ts
+        now = time.time()
+        ts = now if ts is None else ts
 
         # Check the max length of captured packets
         buf_len = len(buf)
@@ -316,7 +462,168 @@ class Writer(object):
 
         self._write_pkt_hdr(ts, buf_len)
 
-        self._f.write(buf)
+        self._write(buf)
+
+        if self.buffer_size and (
+                len(self._buf) >= self.buffer_size or
+                (self.flush_interval is not None and
+                 now - self._last_flush >= self.flush_interval)):
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered packets into the file.
+        """
+        self._last_flush = time.time()
+        if self._buf:
+            buf = self._buf
+            self._buf = bytearray()
+            self._f.write(buf)
+        if hasattr(self._f, 'flush') and not getattr(self._f, 'closed', False):
+            self._f.flush()
+
+    def close(self):
+        """
+        Flushes the buffered packets and closes the file.
+        """
+        self.flush()
+        self._f.close()
 
     def __del__(self):
+        if self._buf:
+            self.flush()
         self._f.close()
+
+
+class RotatingWriter(Writer):
+    """
+    PCAP file writer which rotates a ring of files
+
+    The packets are written into file_name.0, file_name.1, ...,
+    file_name.<backup_count - 1> and then file_name.0 again, so that the
+    disk usage is bounded.
+
+    ============== ==================================================
+    Argument       Description
+    ============== ==================================================
+    file_name      Base name of the PCAP files
+    max_bytes      Max size of a file (in octets) before rotation
+    interval       Max seconds to write into a file before rotation
+    backup_count   Number of the files in the ring
+    ============== ==================================================
+
+    The other keyword arguments are the same as Writer.
+    """
+
+    def __init__(self, file_name, max_bytes=None, interval=None,
+                 backup_count=2, **kwargs):
+        assert backup_count > 0
+        self.file_name = file_name
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self._index = 0
+        self._file_bytes = 0
+        self._opened_at = time.time()
+        super(RotatingWriter, self).__init__(
+            open(self._ring_file_name(self._index), 'wb'), **kwargs)
+
+    def _ring_file_name(self, index):
+        return '%s.%d' % (self.file_name, index)
+
+    def _write(self, buf):
+        self._file_bytes += len(buf)
+        super(RotatingWriter, self)._write(buf)
+
+    def _should_rotate(self, now, buf_len):
+        if self._file_bytes <= PcapFileHdr.FILE_HDR_SIZE:
+            # Writes at least one packet into a file.
+            return False
+        if (self.max_bytes is not None and
+                self._file_bytes + PcapPktHdr.PKT_HDR_SIZE + buf_len >
+                self.max_bytes):
+            return True
+        return (self.interval is not None and
+                now - self._opened_at >= self.interval)
+
+    def rotate(self):
+        """
+        Closes the current file and starts writing the next file.
+        """
+        self.close()
+        self._index = (self._index + 1) % self.backup_count
+        self._f = open(self._ring_file_name(self._index), 'wb')
+        self._file_bytes = 0
+        self._opened_at = time.time()
+        self._write_pcap_file_hdr()
+
+    def write_pkt(self, buf, ts=None):
+        if self._should_rotate(time.time(), min(len(buf), self.snaplen)):
+            self.rotate()
+        super(RotatingWriter, self).write_pkt(buf, ts)
+
+
+class AsyncWriter(object):
+    """
+    PCAP writer which writes packets in a native thread
+
+    write_pkt() only queues a packet, so that capturing does not block
+    the caller.  A greenthread takes the queued packets and writes them
+    with *writer* through hub.execute_in_thread(), so that the file I/O
+    does not block the other greenthreads either.
+    If the queue is full, the packet is dropped and counted in
+    self.dropped.
+
+    ============== ==================================================
+    Argument       Description
+    ============== ==================================================
+    writer         Writer or RotatingWriter instance
+    queue_size     Max number of queued packets
+    flush_interval Seconds to flush writer when no packet is queued
+    ============== ==================================================
+    """
+
+    def __init__(self, writer, queue_size=10000, flush_interval=1):
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = hub.Queue(queue_size)
+        self._thread = hub.spawn(self._write_loop)
+
+    def _write_loop(self):
+        while True:
+            try:
+                pkts = [self._queue.get(timeout=self.flush_interval)]
+            except hub.QueueEmpty:
+                hub.execute_in_thread(self.writer.flush)
+                continue
+            # Hands all the queued packets to the thread at once
+            while pkts[-1] is not None:
+                try:
+                    pkts.append(self._queue.get_nowait())
+                except hub.QueueEmpty:
+                    break
+            if pkts[-1] is None:
+                hub.execute_in_thread(self._write_pkts, pkts[:-1])
+                break
+            hub.execute_in_thread(self._write_pkts, pkts)
+
+    def _write_pkts(self, pkts):
+        # Called in the native thread
+        for buf, ts in pkts:
+            self.writer.write_pkt(buf, ts)
+
+    def write_pkt(self, buf, ts=None):
+        ts = time.time() if ts is None else ts
+        try:
+            self._queue.put_nowait((buf, ts))
+        except hub.QueueFull:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Writes all the queued packets and closes the writer.
+        """
+        self._queue.put(None)
+        hub.joinall([self._thread])
+        hub.execute_in_thread(self.writer.close)
@@ -0,0 +1,208 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Radix tree (path compressed binary trie) of IP prefixes for longest prefix
+match lookups.
+"""
+
+import socket
+
+
+class _Node(object):
+    __slots__ = ('network', 'length', 'prefix', 'value', 'children')
+
+    def __init__(self, network, length, prefix=None, value=None):
+        self.network = network
+        self.length = length
+        # None for glue nodes, which only join their children
+        self.prefix = prefix
+        self.value = value
+        self.children = [None, None]
+
+
+class RadixTree(object):
+    """
+    Mapping of IPv4 or IPv6 prefixes (e.g. "10.0.0.0/8") to values, with
+    longest prefix match lookup of addresses.
+
+    Host bits of prefixes are ignored, so "10.0.0.1/8" and "10.0.0.0/8"
+    are the same key. Insertion, deletion and lookup visit at most one
+    node per distinct prefix length on the path.
+
+    Example of Usage::
+
+        from ryu.lib import radix
+
+        tree = radix.RadixTree(socket.AF_INET)
+        tree['10.0.0.0/8'] = 'a'
+        tree['10.1.0.0/16'] = 'b'
+        tree.lookup('10.1.2.3')  # -> ('10.1.0.0/16', 'b')
+        tree.lookup('10.2.2.3')  # -> ('10.0.0.0/8', 'a')
+    """
+
+    def __init__(self, family=socket.AF_INET):
+        self.family = family
+        self.bits = 32 if family == socket.AF_INET else 128
+        self._masks = [((1 << length) - 1) << (self.bits - length)
+                       for length in range(self.bits + 1)]
+        self._root = None
+        self._len = 0
+
+    def _parse(self, prefix):
+        addr, _, length = prefix.partition('/')
+        length = int(length) if length else self.bits
+        if not 0 <= length <= self.bits:
+            raise ValueError('Invalid prefix length: %s' % prefix)
+        network = int.from_bytes(socket.inet_pton(self.family, addr), 'big')
+        return network & self._masks[length], length
+
+    def _bit(self, network, pos):
+        return (network >> (self.bits - 1 - pos)) & 1
+
+    def _common_length(self, network1, network2, length):
+        diff = (network1 ^ network2) & self._masks[length]
+        if not diff:
+            return length
+        return self.bits - diff.bit_length()
+
+    def _find(self, network, length):
+        """Returns the path of nodes to the node of the prefix, or None."""
+        path = []
+        node = self._root
+        while node is not None and node.length <= length:
+            if network & self._masks[node.length] != node.network:
+                return None
+            path.append(node)
+            if node.length == length:
+                return path
+            node = node.children[self._bit(network, node.length)]
+        return None
+
+    def __setitem__(self, prefix, value):
+        network, length = self._parse(prefix)
+        parent = None
+        node = self._root
+        while node is not None:
+            common = self._common_length(network, node.network,
+                                         min(length, node.length))
+            if common < node.length:
+                # the new prefix leaves the path before node
+                if common == length:
+                    new = _Node(network, length, prefix, value)
+                    new.children[self._bit(node.network, length)] = node
+                else:
+                    new = _Node(network & self._masks[common], common)
+                    new.children[self._bit(node.network, common)] = node
+                    new.children[self._bit(network, common)] = _Node(
+                        network, length, prefix, value)
+                self._replace(parent, node, new)
+                self._len += 1
+                return
+            if node.length == length:
+                if node.prefix is None:
+                    self._len += 1
+                node.prefix = prefix
+                node.value = value
+                return
+            parent = node
+            node = node.children[self._bit(network, node.length)]
+
+        self._replace(parent, None, _Node(network, length, prefix, value),
+                      network)
+        self._len += 1
+
+    def _replace(self, parent, old, new, network=None):
+        if parent is None:
+            self._root = new
+        elif old is None:
+            parent.children[self._bit(network, parent.length)] = new
+        else:
+            parent.children[parent.children.index(old)] = new
+
+    def __getitem__(self, prefix):
+        path = self._find(*self._parse(prefix))
+        if path is None or path[-1].prefix is None:
+            raise KeyError(prefix)
+        return path[-1].value
+
+    def get(self, prefix, default=None):
+        try:
+            return self[prefix]
+        except KeyError:
+            return default
+
+    def __contains__(self, prefix):
+        path = self._find(*self._parse(prefix))
+        return path is not None and path[-1].prefix is not None
+
+    def __delitem__(self, prefix):
+        path = self._find(*self._parse(prefix))
+        if path is None or path[-1].prefix is None:
+            raise KeyError(prefix)
+        node = path[-1]
+        node.prefix = None
+        node.value = None
+        self._len -= 1
+
+        # remove the node if it is no longer needed to join its children,
+        # then its parent if it was a glue node left with one child.
+        while node is not None and node.prefix is None:
+            parent = path[-2] if len(path) > 1 else None
+            children = [child for child in node.children if child]
+            if len(children) == 2:
+                break
+            self._replace(parent, node, children[0] if children else None)
+            path.pop()
+            node = parent
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for prefix, _ in self.items():
+            yield prefix
+
+    def items(self):
+        """Yields (prefix, value) in address order."""
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.prefix is not None:
+                yield node.prefix, node.value
+            stack.extend(child for child in reversed(node.children)
+                         if child is not None)
+
+    def lookup(self, address):
+        """
+        Returns (prefix, value) of the longest prefix matching the given
+        address, or None if no prefix matches.
+        """
+        network, _ = self._parse(address)
+        masks = self._masks
+        top = self.bits - 1
+        best = None
+        node = self._root
+        while node is not None:
+            if network & masks[node.length] != node.network:
+                break
+            if node.prefix is not None:
+                best = node
+            if node.length > top:
+                break
+            node = node.children[(network >> (top - node.length)) & 1]
+        if best is None:
+            return None
+        return best.prefix, best.value
@@ -14,7 +14,6 @@
 # limitations under the License.
 
 
-import datetime
 import logging
 
 from ryu.base import app_manager
@@ -26,6 +25,7 @@ from ryu.exception import RyuException
 from ryu.exception import OFPUnknownVersion
 from ryu.lib import hub
 from ryu.lib import mac
+from ryu.lib import timerwheel
 from ryu.lib.dpid import dpid_to_str
 from ryu.lib.packet import bpdu
 from ryu.lib.packet import ethernet
@@ -42,6 +42,9 @@ MAX_PORT_NO = 0xfff
 BPDU_PKT_IN_PRIORITY = 0xffff
 NO_PKT_IN_PRIORITY = 0xfffe
 
+# Resolution [sec] of the timers of ports
+TIMER_RESOLUTION = 0.1
+
 
 # Result of compared config BPDU priority.
 SUPERIOR = -1
@@ -177,6 +180,13 @@ def cmp(a, b):
     return (a > b) - (a < b)
 
 
+def pack_root_path(path_cost, bridge_id, port_id):
+    """ Packs root path cost, bridge ID value (64 bits) and port ID value
+         (16 bits) into an integer, which is compared as the tuple of them.
+        Path cost may be negative. """
+    return (path_cost << 80) + (bridge_id << 16) + port_id
+
+
 class Stp(app_manager.RyuApp):
     """ STP(spanning tree) library. """
 
@@ -190,10 +200,14 @@ class Stp(app_manager.RyuApp):
         self._set_logger()
         self.config = {}
         self.bridge_list = {}
+        # Drives the timers of all the ports of all the bridges
+        self.timer_wheel = timerwheel.TimerWheel(TIMER_RESOLUTION)
+        self.timer_wheel.start()
 
     def close(self):
-        for dpid in self.bridge_list:
+        for dpid in list(self.bridge_list):
             self._unregister_bridge(dpid)
+        self.timer_wheel.stop()
 
     def _set_logger(self):
         self.logger.propagate = False
@@ -257,7 +271,8 @@ class Stp(app_manager.RyuApp):
         try:
             bridge = Bridge(dp, self.logger,
                             self.config.get(dp.id, {}),
-                            self.send_event_to_observers)
+                            self.send_event_to_observers,
+                            self.timer_wheel)
         except OFPUnknownVersion as message:
             self.logger.error(str(message), extra=dpid_str)
             return
@@ -320,12 +335,8 @@ class Stp(app_manager.RyuApp):
              1. root path cost
              2. designated bridge ID value
              3. designated port ID value """
-        result = Stp._cmp_value(path_cost1, path_cost2)
-        if not result:
-            result = Stp._cmp_value(bridge_id1, bridge_id2)
-            if not result:
-                result = Stp._cmp_value(port_id1, port_id2)
-        return result
+        return Stp._cmp_value(pack_root_path(path_cost1, bridge_id1, port_id1),
+                              pack_root_path(path_cost2, bridge_id2, port_id2))
 
     @staticmethod
     def compare_bpdu_info(my_priority, my_times, rcv_priority, rcv_times):
@@ -339,28 +350,20 @@ class Stp(app_manager.RyuApp):
         if my_priority is None:
             result = SUPERIOR
         else:
-            result = Stp._cmp_value(rcv_priority.root_id.value,
-                                    my_priority.root_id.value)
+            # The packed values are compared in the order above.
+            result = Stp._cmp_value(rcv_priority.value, my_priority.value)
             if not result:
-                result = Stp.compare_root_path(
-                    rcv_priority.root_path_cost,
-                    my_priority.root_path_cost,
+                result1 = Stp._cmp_value(
                     rcv_priority.designated_bridge_id.value,
-                    my_priority.designated_bridge_id.value,
+                    mac.haddr_to_int(
+                        my_priority.designated_bridge_id.mac_addr))
+                result2 = Stp._cmp_value(
                     rcv_priority.designated_port_id.value,
-                    my_priority.designated_port_id.value)
-                if not result:
-                    result1 = Stp._cmp_value(
-                        rcv_priority.designated_bridge_id.value,
-                        mac.haddr_to_int(
-                            my_priority.designated_bridge_id.mac_addr))
-                    result2 = Stp._cmp_value(
-                        rcv_priority.designated_port_id.value,
-                        my_priority.designated_port_id.port_no)
-                    if not result1 and not result2:
-                        result = SUPERIOR
-                    else:
-                        result = Stp._cmp_obj(rcv_times, my_times)
+                    my_priority.designated_port_id.port_no)
+                if not result1 and not result2:
+                    result = SUPERIOR
+                else:
+                    result = Stp._cmp_obj(rcv_times, my_times)
         return result
 
     @staticmethod
@@ -389,12 +392,13 @@ class Bridge(object):
                       'hello_time': bpdu.DEFAULT_HELLO_TIME,
                       'fwd_delay': bpdu.DEFAULT_FORWARD_DELAY}
 
-    def __init__(self, dp, logger, config, send_ev_func):
+    def __init__(self, dp, logger, config, send_ev_func, timer_wheel):
         super(Bridge, self).__init__()
         self.dp = dp
         self.logger = logger
         self.dpid_str = {'dpid': dpid_to_str(dp.id)}
         self.send_event = send_ev_func
+        self.timer_wheel = timer_wheel
 
         # Bridge data
         bridge_conf = config.get('bridge', {})
@@ -442,7 +446,7 @@ class Bridge(object):
                                               self.topology_change_notify,
                                               self.bridge_id,
                                               self.bridge_times,
-                                              ofport)
+                                              ofport, self.timer_wheel)
             self.ports_state[ofport.port_no] = ofport.state
 
     def port_delete(self, ofp_port):
@@ -485,21 +489,27 @@ class Bridge(object):
         if in_port.state == PORT_STATE_DISABLE:
             return
 
-        pkt = packet.Packet(msg.data)
-        if bpdu.ConfigurationBPDUs in pkt:
+        # Designated bridges send the same BPDU every hello time,
+        # so that it is not parsed again.
+        bpdu_pkt = in_port.get_config_bpdu(msg.data)
+        if bpdu_pkt is None:
+            pkt = packet.Packet(msg.data)
+            if bpdu.ConfigurationBPDUs in pkt:
+                (bpdu_pkt, ) = pkt.get_protocols(bpdu.ConfigurationBPDUs)
+
+        if bpdu_pkt is not None:
             # Received Configuration BPDU.
             # - If received superior BPDU:
             #    Re-calculates spanning tree.
             # - If received Topology Change BPDU:
             #    Throws EventTopologyChange.
             #    Forwards Topology Change BPDU.
-            (bpdu_pkt, ) = pkt.get_protocols(bpdu.ConfigurationBPDUs)
             if bpdu_pkt.message_age > bpdu_pkt.max_age:
                 log_msg = 'Drop BPDU packet which message_age exceeded.'
                 self.logger.debug(log_msg, extra=self.dpid_str)
                 return
 
-            rcv_info, rcv_tc = in_port.rcv_config_bpdu(bpdu_pkt)
+            rcv_info, rcv_tc = in_port.rcv_config_bpdu(bpdu_pkt, msg.data)
 
             if rcv_info is SUPERIOR:
                 self.logger.info('[port=%d] Receive superior BPDU.',
@@ -613,23 +623,10 @@ class Bridge(object):
             port_msg = port.designated_priority
             if port.state is PORT_STATE_DISABLE or port_msg is None:
                 continue
-            if root_msg.root_id.value > port_msg.root_id.value:
-                result = SUPERIOR
-            elif root_msg.root_id.value == port_msg.root_id.value:
-                if root_msg.designated_bridge_id is None:
-                    result = INFERIOR
-                else:
-                    result = Stp.compare_root_path(
-                        port_msg.root_path_cost,
-                        root_msg.root_path_cost,
-                        port_msg.designated_bridge_id.value,
-                        root_msg.designated_bridge_id.value,
-                        port_msg.designated_port_id.value,
-                        root_msg.designated_port_id.value)
-            else:
-                result = INFERIOR
-
-            if result is SUPERIOR:
+            # Compares the packed priority vectors. The vector of this
+            # bridge without designated bridge is never inferior to the
+            # vectors which have the same root bridge.
+            if port_msg.value < root_msg.value:
                 root_port = port
 
         return root_port
@@ -703,7 +700,8 @@ class Port(object):
                       'enable': True}
 
     def __init__(self, dp, logger, config, send_ev_func, timeout_func,
-                 topology_change_func, bridge_id, bridge_times, ofport):
+                 topology_change_func, bridge_id, bridge_times, ofport,
+                 timer_wheel):
         super(Port, self).__init__()
         self.dp = dp
         self.logger = logger
@@ -713,6 +711,7 @@ class Port(object):
         self.send_event = send_ev_func
         self.wait_bpdu_timeout = timeout_func
         self.topology_change_notify = topology_change_func
+        self.timer_wheel = timer_wheel
         self.ofctl = (OfCtl_v1_0(dp) if dp.ofproto == ofproto_v1_0
                       else OfCtl_v1_2later(dp))
 
@@ -745,42 +744,51 @@ class Port(object):
         # Receive BPDU data
         self.designated_priority = None
         self.designated_times = None
-        # BPDU handling threads
-        self.send_bpdu_thread = PortThread(self._transmit_bpdu)
-        self.wait_bpdu_thread = PortThread(self._wait_bpdu_timer)
+        # (data, ConfigurationBPDUs, Priority, Times) of the last received
+        # config BPDU
+        self.rcv_bpdu_cache = None
+        # Serialized config BPDUs to send, by flags
+        self.send_bpdu_cache = {}
+        # BPDU handling timers
+        self.send_bpdu_timer = None
+        self.wait_bpdu_timer = None
         self.send_tc_flg = None
         self.send_tc_timer = None
         self.send_tcn_flg = None
-        self.wait_timer_event = None
-        # State machine thread
-        self.state_machine = PortThread(self._state_machine)
-        self.state_event = None
+        # State machine timer
+        self.state_timer = None
 
         self.up(DESIGNATED_PORT,
                 Priority(bridge_id, 0, None, None),
                 bridge_times)
+        if self.state is PORT_STATE_DISABLE:
+            self.ofctl.set_port_status(self.ofport, self.state)
 
-        self.state_machine.start()
         self.logger.debug('[port=%d] Start port state machine.',
                           self.ofport.port_no, extra=self.dpid_str)
 
+    @staticmethod
+    def _cancel_timer(timer):
+        if timer is not None:
+            timer.cancel()
+
     def delete(self):
-        self.state_machine.stop()
-        self.send_bpdu_thread.stop()
-        self.wait_bpdu_thread.stop()
-        if self.state_event is not None:
-            self.state_event.set()
-            self.state_event = None
-        if self.wait_timer_event is not None:
-            self.wait_timer_event.set()
-            self.wait_timer_event = None
-        self.logger.debug('[port=%d] Stop port threads.',
+        self._cancel_timer(self.state_timer)
+        self._cancel_timer(self.send_bpdu_timer)
+        self._cancel_timer(self.wait_bpdu_timer)
+        self._cancel_timer(self.send_tc_timer)
+        self.state_timer = None
+        self.send_bpdu_timer = None
+        self.wait_bpdu_timer = None
+        self.send_tc_timer = None
+        self.logger.debug('[port=%d] Stop port timers.',
                           self.ofport.port_no, extra=self.dpid_str)
 
     def up(self, role, root_priority, root_times):
         """ A port is started in the state of LISTEN.  """
         self.port_priority = root_priority
         self.port_times = root_times
+        self.send_bpdu_cache.clear()
 
         state = (PORT_STATE_LISTEN if self.config_enable
                  else PORT_STATE_DISABLE)
@@ -798,14 +806,15 @@ class Port(object):
         if msg_init:
             self.designated_priority = None
             self.designated_times = None
+            self.rcv_bpdu_cache = None
 
         self._change_role(DESIGNATED_PORT)
         self._change_status(state)
 
-    def _state_machine(self):
+    def _start_state_timer(self):
         """ Port state machine.
-             Change next status when timer is exceeded
-             or _change_status() method is called."""
+             Change next status when the timer started by
+             _change_status() is exceeded."""
         role_str = {ROOT_PORT: 'ROOT_PORT          ',
                     DESIGNATED_PORT: 'DESIGNATED_PORT    ',
                     NON_DESIGNATED_PORT: 'NON_DESIGNATED_PORT'}
@@ -815,32 +824,20 @@ class Port(object):
                      PORT_STATE_LEARN: 'LEARN',
                      PORT_STATE_FORWARD: 'FORWARD'}
 
-        if self.state is PORT_STATE_DISABLE:
-            self.ofctl.set_port_status(self.ofport, self.state)
+        self.logger.info('[port=%d] %s / %s', self.ofport.port_no,
+                         role_str[self.role], state_str[self.state],
+                         extra=self.dpid_str)
 
-        while True:
-            self.logger.info('[port=%d] %s / %s', self.ofport.port_no,
-                             role_str[self.role], state_str[self.state],
-                             extra=self.dpid_str)
-
-            self.state_event = hub.Event()
-            timer = self._get_timer()
-            if timer:
-                timeout = hub.Timeout(timer)
-                try:
-                    self.state_event.wait()
-                except hub.Timeout as t:
-                    if t is not timeout:
-                        err_msg = 'Internal error. Not my timeout.'
-                        raise RyuException(msg=err_msg)
-                    new_state = self._get_next_state()
-                    self._change_status(new_state, thread_switch=False)
-                finally:
-                    timeout.cancel()
-            else:
-                self.state_event.wait()
+        self._cancel_timer(self.state_timer)
+        self.state_timer = None
+        timer = self._get_timer()
+        if timer:
+            self.state_timer = self.timer_wheel.schedule(
+                timer, self._state_timeout)
 
-            self.state_event = None
+    def _state_timeout(self):
+        self.state_timer = None
+        self._change_status(self._get_next_state())
 
     def _get_timer(self):
         timer = {PORT_STATE_DISABLE: None,
@@ -861,7 +858,7 @@ class Port(object):
                       PORT_STATE_FORWARD: None}
         return next_state[self.state]
 
-    def _change_status(self, new_state, thread_switch=True):
+    def _change_status(self, new_state):
         if new_state is not PORT_STATE_DISABLE:
             self.ofctl.set_port_status(self.ofport, new_state)
 
@@ -874,20 +871,18 @@ class Port(object):
         if (new_state is PORT_STATE_DISABLE
                 or new_state is PORT_STATE_BLOCK):
             self.send_tc_flg = False
+            self._cancel_timer(self.send_tc_timer)
             self.send_tc_timer = None
             self.send_tcn_flg = False
-            self.send_bpdu_thread.stop()
+            self._cancel_timer(self.send_bpdu_timer)
+            self.send_bpdu_timer = None
         elif new_state is PORT_STATE_LISTEN:
-            self.send_bpdu_thread.start()
+            self._cancel_timer(self.send_bpdu_timer)
+            self._transmit_bpdu()
 
         self.state = new_state
         self.send_event(EventPortStateChange(self.dp, self))
-
-        if self.state_event is not None:
-            self.state_event.set()
-            self.state_event = None
-        if thread_switch:
-            hub.sleep(0)  # For thread switching.
+        self._start_state_timer()
 
     def _change_role(self, new_role):
         if self.role is new_role:
@@ -895,30 +890,47 @@ class Port(object):
         self.role = new_role
         if (new_role is ROOT_PORT
                 or new_role is NON_DESIGNATED_PORT):
-            self.wait_bpdu_thread.start()
+            self._start_wait_bpdu_timer()
         else:
             assert new_role is DESIGNATED_PORT
-            self.wait_bpdu_thread.stop()
-
-    def rcv_config_bpdu(self, bpdu_pkt):
+            self._cancel_timer(self.wait_bpdu_timer)
+            self.wait_bpdu_timer = None
+
+    def get_config_bpdu(self, data):
+        """ Returns ConfigurationBPDUs of the last received config BPDU
+             if the given data is the same as it, otherwise None. """
+        cache = self.rcv_bpdu_cache
+        if cache is not None and cache[0] == data:
+            return cache[1]
+        return None
+
+    def rcv_config_bpdu(self, bpdu_pkt, data=None):
         # Check received BPDU is superior to currently held BPDU.
-        root_id = BridgeId(bpdu_pkt.root_priority,
-                           bpdu_pkt.root_system_id_extension,
-                           bpdu_pkt.root_mac_address)
-        root_path_cost = bpdu_pkt.root_path_cost
-        designated_bridge_id = BridgeId(bpdu_pkt.bridge_priority,
-                                        bpdu_pkt.bridge_system_id_extension,
-                                        bpdu_pkt.bridge_mac_address)
-        designated_port_id = PortId(bpdu_pkt.port_priority,
-                                    bpdu_pkt.port_number)
-
-        msg_priority = Priority(root_id, root_path_cost,
-                                designated_bridge_id,
-                                designated_port_id)
-        msg_times = Times(bpdu_pkt.message_age,
-                          bpdu_pkt.max_age,
-                          bpdu_pkt.hello_time,
-                          bpdu_pkt.forward_delay)
+        cache = self.rcv_bpdu_cache
+        if cache is not None and cache[1] is bpdu_pkt:
+            msg_priority, msg_times = cache[2], cache[3]
+        else:
+            root_id = BridgeId(bpdu_pkt.root_priority,
+                               bpdu_pkt.root_system_id_extension,
+                               bpdu_pkt.root_mac_address)
+            root_path_cost = bpdu_pkt.root_path_cost
+            designated_bridge_id = BridgeId(
+                bpdu_pkt.bridge_priority,
+                bpdu_pkt.bridge_system_id_extension,
+                bpdu_pkt.bridge_mac_address)
+            designated_port_id = PortId(bpdu_pkt.port_priority,
+                                        bpdu_pkt.port_number)
+
+            msg_priority = Priority(root_id, root_path_cost,
+                                    designated_bridge_id,
+                                    designated_port_id)
+            msg_times = Times(bpdu_pkt.message_age,
+                              bpdu_pkt.max_age,
+                              bpdu_pkt.hello_time,
+                              bpdu_pkt.forward_delay)
+            if data is not None:
+                self.rcv_bpdu_cache = (bytes(data), bpdu_pkt,
+                                       msg_priority, msg_times)
 
         rcv_info = Stp.compare_bpdu_info(self.designated_priority,
                                          self.designated_times,
@@ -954,78 +966,62 @@ class Port(object):
         return rcv_info, rcv_tc
 
     def _update_wait_bpdu_timer(self):
-        if self.wait_timer_event is not None:
-            self.wait_timer_event.set()
-            self.wait_timer_event = None
+        if self.wait_bpdu_timer is not None:
+            self._start_wait_bpdu_timer()
             self.logger.debug('[port=%d] Wait BPDU timer is updated.',
                               self.ofport.port_no, extra=self.dpid_str)
-        hub.sleep(0)  # For thread switching.
-
-    def _wait_bpdu_timer(self):
-        time_exceed = False
-
-        while True:
-            self.wait_timer_event = hub.Event()
-            message_age = (self.designated_times.message_age
-                           if self.designated_times else 0)
-            timer = self.port_times.max_age - message_age
-            timeout = hub.Timeout(timer)
-            try:
-                self.wait_timer_event.wait()
-            except hub.Timeout as t:
-                if t is not timeout:
-                    err_msg = 'Internal error. Not my timeout.'
-                    raise RyuException(msg=err_msg)
-                self.logger.info('[port=%d] Wait BPDU timer is exceeded.',
-                                 self.ofport.port_no, extra=self.dpid_str)
-                time_exceed = True
-            finally:
-                timeout.cancel()
-                self.wait_timer_event = None
-
-            if time_exceed:
-                break
 
-        if time_exceed:  # Bridge.recalculate_spanning_tree
-            hub.spawn(self.wait_bpdu_timeout)
+    def _start_wait_bpdu_timer(self):
+        self._cancel_timer(self.wait_bpdu_timer)
+        message_age = (self.designated_times.message_age
+                       if self.designated_times else 0)
+        timer = self.port_times.max_age - message_age
+        self.wait_bpdu_timer = self.timer_wheel.schedule(
+            timer, self._wait_bpdu_timer_exceeded)
+
+    def _wait_bpdu_timer_exceeded(self):
+        self.wait_bpdu_timer = None
+        self.logger.info('[port=%d] Wait BPDU timer is exceeded.',
+                         self.ofport.port_no, extra=self.dpid_str)
+        self.wait_bpdu_timeout()  # Bridge.recalculate_spanning_tree
 
     def _transmit_bpdu(self):
-        while True:
-            # Send config BPDU packet if port role is DESIGNATED_PORT.
-            if self.role == DESIGNATED_PORT:
-                now = datetime.datetime.today()
-                if self.send_tc_timer and self.send_tc_timer < now:
-                    self.send_tc_timer = None
-                    self.send_tc_flg = False
-
-                if not self.send_tc_flg:
-                    flags = 0b00000000
-                    log_msg = '[port=%d] Send Config BPDU.'
-                else:
-                    flags = 0b00000001
-                    log_msg = '[port=%d] Send TopologyChange BPDU.'
-                bpdu_data = self._generate_config_bpdu(flags)
-                self.ofctl.send_packet_out(self.ofport.port_no, bpdu_data)
-                self.logger.debug(log_msg, self.ofport.port_no,
-                                  extra=self.dpid_str)
-
-            # Send Topology Change Notification BPDU until receive Ack.
-            if self.send_tcn_flg:
-                bpdu_data = self._generate_tcn_bpdu()
-                self.ofctl.send_packet_out(self.ofport.port_no, bpdu_data)
-                self.logger.debug('[port=%d] Send TopologyChangeNotify BPDU.',
-                                  self.ofport.port_no, extra=self.dpid_str)
+        # Send config BPDU packet if port role is DESIGNATED_PORT.
+        if self.role == DESIGNATED_PORT:
+            if not self.send_tc_flg:
+                flags = 0b00000000
+                log_msg = '[port=%d] Send Config BPDU.'
+            else:
+                flags = 0b00000001
+                log_msg = '[port=%d] Send TopologyChange BPDU.'
+            bpdu_data = self._generate_config_bpdu(flags)
+            self.ofctl.send_packet_out(self.ofport.port_no, bpdu_data)
+            self.logger.debug(log_msg, self.ofport.port_no,
+                              extra=self.dpid_str)
+
+        # Send Topology Change Notification BPDU until receive Ack.
+        if self.send_tcn_flg:
+            bpdu_data = self._generate_tcn_bpdu()
+            self.ofctl.send_packet_out(self.ofport.port_no, bpdu_data)
+            self.logger.debug('[port=%d] Send TopologyChangeNotify BPDU.',
+                              self.ofport.port_no, extra=self.dpid_str)
 
-            hub.sleep(self.port_times.hello_time)
+        self.send_bpdu_timer = self.timer_wheel.schedule(
+            self.port_times.hello_time, self._transmit_bpdu)
 
     def transmit_tc_bpdu(self):
         """ Set send_tc_flg to send Topology Change BPDU. """
         if not self.send_tc_flg:
-            timer = datetime.timedelta(seconds=self.port_times.max_age
-                                       + self.port_times.forward_delay)
-            self.send_tc_timer = datetime.datetime.today() + timer
+            timer = (self.port_times.max_age
+                     + self.port_times.forward_delay)
+            self.send_tc_timer = self.timer_wheel.schedule(
+                timer, self._send_tc_timer_exceeded)
             self.send_tc_flg = True
 
+    def _send_tc_timer_exceeded(self):
+        self.send_tc_timer = None
+        self.send_tc_flg = False
+
     def transmit_ack_bpdu(self):
         """ Send Topology Change Ack BPDU. """
         ack_flags = 0b10000001
@@ -1036,6 +1032,12 @@ class Port(object):
         self.send_tcn_flg = True
 
     def _generate_config_bpdu(self, flags):
+        # Caches BPDUs until the next up(), which updates port_priority
+        # and port_times.
+        data = self.send_bpdu_cache.get(flags)
+        if data is not None:
+            return data
+
         src_mac = self.ofport.hw_addr
         dst_mac = bpdu.BRIDGE_GROUP_ADDRESS
         length = (bpdu.bpdu._PACK_LEN + bpdu.ConfigurationBPDUs.PACK_LEN
@@ -1063,6 +1065,7 @@ class Port(object):
         pkt.add_protocol(b)
         pkt.serialize()
 
+        self.send_bpdu_cache[flags] = pkt.data
         return pkt.data
 
     def _generate_tcn_bpdu(self):
@@ -1085,23 +1088,6 @@ class Port(object):
         return pkt.data
 
 
-class PortThread(object):
-    def __init__(self, function):
-        super(PortThread, self).__init__()
-        self.function = function
-        self.thread = None
-
-    def start(self):
-        self.stop()
-        self.thread = hub.spawn(self.function)
-
-    def stop(self):
-        if self.thread is not None:
-            hub.kill(self.thread)
-            hub.joinall([self.thread])
-            self.thread = None
-
-
 class BridgeId(object):
     def __init__(self, priority, system_id_extension, mac_addr):
         super(BridgeId, self).__init__()
@@ -1128,6 +1114,12 @@ class Priority(object):
         self.root_path_cost = root_path_cost
         self.designated_bridge_id = designated_bridge_id
         self.designated_port_id = designated_port_id
+        # Packed priority vector, which is compared as an integer.
+        # Missing designated IDs are packed as zero.
+        self.value = (root_id.value << 112) + pack_root_path(
+            root_path_cost,
+            designated_bridge_id.value if designated_bridge_id else 0,
+            designated_port_id.value if designated_port_id else 0)
 
 
 class Times(object):
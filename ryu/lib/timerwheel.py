@@ -0,0 +1,144 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Hashed timer wheel, which runs many timers on a single thread.
+"""
+
+import logging
+import math
+import time
+
+from ryu.lib import hub
+
+
+LOG = logging.getLogger(__name__)
+
+
+class Timer(object):
+    """
+    Timer scheduled by TimerWheel.schedule().
+    """
+
+    __slots__ = ('deadline', 'callback', 'args', 'active')
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        # False if cancelled or expired
+        self.active = True
+
+    def cancel(self):
+        """Cancels the timer. Does nothing if the timer has expired."""
+        self.active = False
+
+
+class TimerWheel(object):
+    """
+    Hashed timer wheel.
+
+    Runs the callbacks of any number of timers on a single thread with
+    the resolution of ``resolution`` seconds, instead of a thread or a
+    ``hub.Timeout`` per timer. Scheduling and cancelling a timer are O(1),
+    and each tick only visits the timers in one of ``slots`` slots.
+
+    Callbacks are called on the thread started by start() and must not
+    block. Delays are rounded up to the resolution.
+
+    Example of Usage::
+
+        from ryu.lib import timerwheel
+
+        wheel = timerwheel.TimerWheel(resolution=0.1)
+        wheel.start()
+        timer = wheel.schedule(2.0, func, arg)  # calls func(arg) after 2 sec
+        timer.cancel()
+    """
+
+    def __init__(self, resolution=0.1, slots=512):
+        self.resolution = resolution
+        self._slots = [[] for _ in range(slots)]
+        self._tick = 0
+        self._thread = None
+
+    def time(self):
+        """Returns the time of the wheel in seconds."""
+        return self._tick * self.resolution
+
+    def schedule(self, delay, callback, *args):
+        """
+        Calls ``callback(*args)`` after ``delay`` seconds.
+        Returns the Timer instance to cancel it.
+        """
+        ticks = max(1, int(math.ceil(delay / self.resolution)))
+        timer = Timer(self._tick + ticks, callback, args)
+        self._slots[timer.deadline % len(self._slots)].append(timer)
+        return timer
+
+    def advance(self, ticks=1):
+        """
+        Advances the wheel by the given number of ticks, and runs the
+        callbacks of the expired timers.
+        """
+        slots = self._slots
+        for _ in range(ticks):
+            self._tick += 1
+            tick = self._tick
+            index = tick % len(slots)
+            if not slots[index]:
+                continue
+
+            expired = []
+            remaining = []
+            for timer in slots[index]:
+                if not timer.active:
+                    continue
+                if timer.deadline <= tick:
+                    expired.append(timer)
+                else:
+                    remaining.append(timer)
+            # Callbacks may schedule timers into this slot.
+            slots[index] = remaining
+
+            for timer in expired:
+                # May be cancelled by the callback of the previous timer
+                if not timer.active:
+                    continue
+                timer.active = False
+                try:
+                    timer.callback(*timer.args)
+                except Exception:
+                    LOG.exception('Error in timer callback %s',
+                                  timer.callback)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = hub.spawn(self._run)
+
+    def stop(self):
+        if self._thread is not None:
+            hub.kill(self._thread)
+            self._thread = None
+
+    def _run(self):
+        start = time.monotonic() - self.time()
+        while True:
+            hub.sleep(max(0, start + self.time() + self.resolution
+                          - time.monotonic()))
+            # Catches up with the ticks lost by a busy thread
+            ticks = int((time.monotonic() - start) / self.resolution)
+            if ticks > self._tick:
+                self.advance(ticks - self._tick)
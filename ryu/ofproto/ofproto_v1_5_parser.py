@@ -742,8 +742,17 @@ class OFPMatch(StringifyMixin):
                 VLAN-tagged(vlan_id=3) MATCH
                 VLAN-tagged(vlan_id=5)   x
                 ====================== =====
+
+    .. Note::
+
+        To compose many matches having the same set of fields,
+        use OFPMatchTemplate.
     """
 
+    # ofproto.oxm_compile_template() result when composed by
+    # OFPMatchTemplate.
+    _template = None
+
     def __init__(self, type_=None, length=None, _ordered_fields=None,
                  **kwargs):
         super(OFPMatch, self).__init__()
@@ -797,6 +806,12 @@ class OFPMatch(StringifyMixin):
         the buf.
         Returns the output length.
         """
+        if self._template is not None:
+            self.length = self._template.length
+            return self._template.serialize(
+                ofproto.OFPMT_OXM, [uv for (_k, uv) in self._fields2],
+                buf, offset)
+
         fields = [ofproto.oxm_from_user(k, uv) for (k, uv)
                   in self._fields2]
 
@@ -856,6 +871,48 @@ class OFPMatch(StringifyMixin):
         return OFPMatch(_ordered_fields=fields)
 
 
+class OFPMatchTemplate(object):
+    """
+    Flow Match Template
+
+    This class compiles the encoding of the flow match structure for a
+    fixed set of match fields once, and composes OFPMatch instances which
+    are serialized by a single struct.pack_into of their values.
+
+    *fields* are the names of the match fields accepted by OFPMatch.
+    A field with a mask is given as a tuple (name, True) and its value
+    must be given as a tuple (value, mask).
+
+    Unlike OFPMatch, the values are used as they are given.  e.g., the
+    masked bits of a value are cleared only in the wire format.
+
+    Example::
+
+        >>> template = parser.OFPMatchTemplate(
+        ...     'in_port', 'eth_type', 'ipv6_dst', ('ipv6_flabel', True))
+        >>> match = template.match(in_port=1, eth_type=0x86dd,
+        ...                        ipv6_dst='ff38::5',
+        ...                        ipv6_flabel=(0x10000, 0xf0000))
+    """
+
+    def __init__(self, *fields):
+        self._oxm = ofproto.oxm_compile_template(fields)
+        self.fields = self._oxm.names
+
+    def match(self, **kwargs):
+        """
+        Returns an OFPMatch which has the values given by the keyword
+        arguments for all the fields of this template.
+        """
+        if len(kwargs) != len(self.fields):
+            raise TypeError('match fields %s are required, got %s'
+                            % (list(self.fields), list(kwargs)))
+        match = OFPMatch(_ordered_fields=[(k, kwargs[k]) for k
+                                          in self.fields])
+        match._template = self._oxm
+        return match
+
+
 class OFPStats(StringifyMixin):
     """
     Flow Stats Structure
@@ -64,6 +64,11 @@
 # | reserved, should be zero      | pbb_uca       |
 # +-------------------------------+---------------+
 
+import six
+import struct
+
+from ryu.lib import type_desc
+from ryu.lib.pack_utils import msg_pack_into
 from ryu.ofproto.oxx_fields import (
     _get_field_info_by_name,
     _from_user,
@@ -71,6 +76,7 @@ from ryu.ofproto.oxx_fields import (
     _to_user,
     _to_user_header,
     _field_desc,
+    _make_exp_hdr,
     _normalize_user,
     _parse,
     _parse_header,
@@ -205,10 +211,108 @@ def generate(modname):
     add_attr('oxm_serialize_header',
              functools.partial(_serialize_header, oxx, mod))
 
+    add_attr('oxm_compile_template',
+             functools.partial(OxmTemplate, mod))
+
     add_attr('oxm_to_jsondict', _to_jsondict)
     add_attr('oxm_from_jsondict', _from_jsondict)
 
 
+# struct format characters for the integer fields which can be packed
+# without going through type_desc.IntDescr.from_user.
+_INT_PACK_STR = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+
+class OxmTemplate(object):
+    """Precompiled OXM encoder for a fixed set of fields.
+
+    *fields* is a sequence of field names or (name, hasmask) tuples.
+    The field order, the OXM headers, the struct format and the padding
+    of ofp_match are computed once here, so that encoding a match
+    consists of converting the user values and a single struct.pack_into.
+    """
+
+    _HDR_PACK_STR = '!HH'
+    _HDR_LEN = struct.calcsize(_HDR_PACK_STR)
+
+    def __init__(self, mod, fields):
+        compiled = []
+        for f in fields:
+            if isinstance(f, tuple):
+                (name, hasmask) = f
+            else:
+                (name, hasmask) = (f, False)
+            (num, t) = mod.oxm_get_field_info_by_name(name)
+            if t is type_desc.UnknownType:
+                raise ValueError('unsupported OXM field for template: %s'
+                                 % name)
+            n, exp_hdr = _make_exp_hdr('oxm', mod, num)
+            value_len = t.size
+            oxm_len = len(exp_hdr) + value_len * (2 if hasmask else 1)
+            header = (n << 9) | (int(bool(hasmask)) << 8) | oxm_len
+            compiled.append((num, name, bool(hasmask), t, header,
+                             bytes(exp_hdr)))
+        # Same ordering as OFPMatch.
+        compiled.sort(key=lambda x: x[0][0] if isinstance(x[0], tuple)
+                      else x[0])
+
+        pack_str = self._HDR_PACK_STR
+        self._fields = []
+        for (_num, name, hasmask, t, header, exp_hdr) in compiled:
+            if isinstance(t, type_desc.IntDescr) and t.size in _INT_PACK_STR:
+                value_pack_str = _INT_PACK_STR[t.size]
+                from_user = None
+            else:
+                value_pack_str = '%ds' % t.size
+                from_user = t.from_user
+            pack_str += 'I'
+            if exp_hdr:
+                pack_str += '%ds' % len(exp_hdr)
+            pack_str += value_pack_str * (2 if hasmask else 1)
+            self._fields.append((name, hasmask, from_user, header, exp_hdr))
+
+        self.names = tuple(f[0] for f in self._fields)
+        self.length = struct.calcsize(pack_str)
+        pad_len = (self.length + 7) // 8 * 8 - self.length
+        self._pack_str = pack_str + '%dx' % pad_len
+        self.size = self.length + pad_len
+
+    def serialize(self, oxm_type, user_values, buf, offset):
+        """Encode ofp_match with *user_values* given in the order of
+        self.names into *buf* at *offset*.
+
+        Returns the output length including padding.
+        """
+        args = [oxm_type, self.length]
+        for (name, hasmask, from_user, header, exp_hdr), uv in zip(
+                self._fields, user_values):
+            args.append(header)
+            if exp_hdr:
+                args.append(exp_hdr)
+            if hasmask:
+                (value, mask) = uv
+                if from_user is None:
+                    args.append(value & mask)
+                    args.append(mask)
+                else:
+                    value = from_user(value)
+                    mask = from_user(mask)
+                    args.append(b''.join(six.int2byte(x & y) for (x, y)
+                                         in zip(bytearray(value),
+                                                bytearray(mask))))
+                    args.append(mask)
+            elif from_user is None:
+                args.append(uv)
+            else:
+                value = from_user(uv)
+                if isinstance(value, tuple):
+                    raise ValueError('%s is masked but compiled without '
+                                     'a mask: %s' % (name, uv))
+                args.append(value)
+        msg_pack_into(self._pack_str, buf, offset, *args)
+        return self.size
+
+
 def _to_jsondict(k, uv):
     if isinstance(uv, tuple):
         (value, mask) = uv
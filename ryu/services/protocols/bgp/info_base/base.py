@@ -24,6 +24,7 @@ from abc import abstractmethod
 from copy import copy
 import logging
 import functools
+import weakref
 import netaddr
 import six
 
@@ -31,6 +32,8 @@ from ryu.lib.packet.bgp import RF_IPv4_UC
 from ryu.lib.packet.bgp import RouteTargetMembershipNLRI
 from ryu.lib.packet.bgp import BGP_ATTR_TYPE_EXTENDED_COMMUNITIES
 from ryu.lib.packet.bgp import BGPPathAttributeLocalPref
+from ryu.lib.packet.bgp import BGPPathAttributeMpReachNLRI
+from ryu.lib.packet.bgp import BGPPathAttributeMpUnreachNLRI
 from ryu.lib.packet.bgp import BGP_ATTR_TYPE_AS_PATH
 
 from ryu.services.protocols.bgp.base import OrderedDict
@@ -223,6 +226,7 @@ class NonVrfPathProcessingMixin(object):
     Applies to most of Destinations except for VrfDest
     because they are processed at VRF level, so different logic applies.
     """
+    __slots__ = ()
 
     def __init__(self):
         self._core_service = None  # not assigned yet
@@ -283,7 +287,10 @@ class Destination(object):
     For example, an IP prefix. This is the data-structure that is hung of the
     a routing information base table *Table*.
     """
-
+    __slots__ = ('_table', '_core_service', '_nlri', '_known_path_list',
+                 '_new_path_list', '_best_path', '_best_path_reason',
+                 '_withdraw_list', '_sent_routes', '_best_path_by_key',
+                 'next_dest_to_process', 'prev_dest_to_process')
     ROUTE_FAMILY = RF_IPv4_UC
 
     def __init__(self, table, nlri):
@@ -311,6 +318,10 @@ class Destination(object):
         # Reason current best path was chosen as best path.
         self._best_path_reason = None
 
+        # True if best-path was selected by comparing decision keys, in
+        # which case new paths only need to be compared with it.
+        self._best_path_by_key = False
+
         # List of withdrawn paths.
         self._withdraw_list = []
 
@@ -318,10 +329,6 @@ class Destination(object):
         # destination. (key/value: peer/sent_route)
         self._sent_routes = {}
 
-        # This is an (optional) list of paths that were created as a
-        # result of exporting this route to other tables.
-        # self.exported_paths = None
-
         # Automatically generated
         #
         # On work queue for BGP processor.
@@ -496,7 +503,8 @@ class Destination(object):
         self._remove_old_paths()
 
         # Collect all new paths into known paths.
-        self._known_path_list.extend(self._new_path_list)
+        new_paths = self._new_path_list[:]
+        self._known_path_list.extend(new_paths)
 
         # Clear new paths as we copied them.
         del(self._new_path_list[:])
@@ -507,7 +515,7 @@ class Destination(object):
             return None, BPR_UNKNOWN
 
         # Compute new best path
-        current_best_path, reason = self._compute_best_known_path()
+        current_best_path, reason = self._compute_best_known_path(new_paths)
         return current_best_path, reason
 
     def _remove_withdrawals(self):
@@ -590,9 +598,13 @@ class Destination(object):
                 LOG.debug('Implicit withdrawal of old path, since we have'
                           ' learned new path from same source: %s', old_path)
 
-    def _compute_best_known_path(self):
+    def _compute_best_known_path(self, new_paths=None):
         """Computes the best path among known paths.
 
+        If current best path is still known and was selected by decision
+        keys, only *new_paths* are compared with it. Otherwise all known
+        paths are compared.
+
         Returns current best path among `known_paths`.
         """
         if not self._known_path_list:
@@ -600,6 +612,19 @@ class Destination(object):
             raise BgpProcessorError(desc='Need at-least one known path to'
                                     ' compute best path')
 
+        # VrfPath defines __eq__, so look for best path by identity.
+        best_path = self._best_path
+        if (new_paths is not None and self._best_path_by_key and
+                best_path is not None and
+                any(path is best_path for path in self._known_path_list)):
+            result = self._compute_best_path_by_key(best_path, new_paths)
+        else:
+            result = self._compute_best_path_by_key(
+                self._known_path_list[0], self._known_path_list[1:])
+        self._best_path_by_key = result is not None
+        if result is not None:
+            return result
+
         # We pick the first path as current best path. This helps in breaking
         # tie between two new paths learned in one cycle for which best-path
         # calculation steps lead to tie.
@@ -617,6 +642,39 @@ class Destination(object):
 
         return current_best_path, best_path_reason
 
+    def _compute_best_path_by_key(self, current_best_path, paths):
+        """Selects the best path among *current_best_path* and *paths* by
+        comparing their decision keys.
+
+        On tie, the path seen first is kept, as `compute_best_path()` does.
+        Returns None if the paths cannot be compared by their keys, i.e.
+        some carry LOCAL_PREF and others do not.
+        """
+        from ryu.services.protocols.bgp.processor import best_path_key
+        from ryu.services.protocols.bgp.processor import best_path_key_reason
+        local_asn = self._core_service.asn
+        router_id = self._core_service.router_id
+        best_key = best_path_key(local_asn, router_id, current_best_path)
+        # Key of the best path among the others.
+        second_key = None
+        for path in paths:
+            key = best_path_key(local_asn, router_id, path)
+            if (key[0] is None) != (best_key[0] is None):
+                return None
+            if key > best_key:
+                current_best_path, best_key, key = path, key, best_key
+            if second_key is None or key > second_key:
+                second_key = key
+
+        if second_key is not None:
+            reason = best_path_key_reason(best_key, second_key)
+        elif len(self._known_path_list) == 1:
+            reason = BPR_ONLY_PATH
+        else:
+            # Only other paths were withdrawn.
+            reason = self._best_path_reason
+        return current_best_path, reason
+
     def withdraw_uninteresting_paths(self, interested_rts):
         """Withdraws paths that are no longer interesting.
 
@@ -688,6 +746,120 @@ class Destination(object):
         return str(self) >= str(other)
 
 
+class PathAttributeSet(object):
+    """Immutable set of path attributes shared between paths.
+
+    Paths learned from full feeds mostly carry the same path attributes, so
+    instead of keeping a copy of them per path, `intern()` returns one shared
+    instance for path attributes which serialize to the same bytes.
+    An interned set is dropped from the interning table once the last path
+    referring to it is freed, so the table never outlives the RIB.
+
+    MP_REACH_NLRI and MP_UNREACH_NLRI are kept without their NLRI, as each
+    path carries its own prefix.
+
+    Equal sets are the same object, so paths can be compared with `is`.
+    The attribute objects must not be modified in place; use
+    `Path.pathattr_map` to get a copy to modify.
+    """
+    __slots__ = ('_attrs', '_key', '_hash', '__weakref__')
+
+    # key -> PathAttributeSet
+    _interned = weakref.WeakValueDictionary()
+
+    def __init__(self, pattrs, key):
+        self._attrs = OrderedDict(pattrs)
+        self._key = key
+        self._hash = hash(key)
+
+    @classmethod
+    def intern(cls, pattrs=None):
+        """Returns shared set of given path attributes.
+
+        *pattrs* is a mapping or a sequence of (type, attribute) pairs as
+        accepted by `OrderedDict`, or another `PathAttributeSet`.
+        """
+        if isinstance(pattrs, PathAttributeSet):
+            return pattrs
+        pattrs = [(attr_type, cls._without_nlri(attr))
+                  for attr_type, attr in (pattrs.items()
+                                          if hasattr(pattrs, 'items')
+                                          else pattrs or [])]
+        key = tuple((attr_type, cls._attr_key(attr))
+                    for attr_type, attr in pattrs)
+        attr_set = cls._interned.get(key)
+        if attr_set is None:
+            attr_set = cls(pattrs, key)
+            cls._interned[key] = attr_set
+        return attr_set
+
+    @staticmethod
+    def _without_nlri(attr):
+        # Paths learned from one UPDATE share its MP_(UN)REACH_NLRI
+        # attribute.  Keeping all prefixes of the UPDATE would serialize
+        # them once per path, and paths from different UPDATEs would never
+        # share a set.
+        if isinstance(attr, BGPPathAttributeMpReachNLRI) and attr.nlri:
+            attr = copy(attr)
+            attr.nlri = []
+        elif (isinstance(attr, BGPPathAttributeMpUnreachNLRI) and
+              attr.withdrawn_routes):
+            attr = copy(attr)
+            attr.withdrawn_routes = []
+        return attr
+
+    @staticmethod
+    def _attr_key(attr):
+        try:
+            # Serializes a copy, as serialize() updates flags and length.
+            return bytes(copy(attr).serialize())
+        except Exception:
+            # Attributes which can not be serialized on their own are
+            # only equal to themselves.  The set keeps the attribute alive,
+            # so its id is not reused while the set is interned.
+            return id(attr)
+
+    def get(self, attr_type, default=None):
+        return self._attrs.get(attr_type, default)
+
+    def keys(self):
+        return self._attrs.keys()
+
+    def values(self):
+        return self._attrs.values()
+
+    def items(self):
+        return self._attrs.items()
+
+    def __getitem__(self, attr_type):
+        return self._attrs[attr_type]
+
+    def __contains__(self, attr_type):
+        return attr_type in self._attrs
+
+    def __iter__(self):
+        return iter(self._attrs)
+
+    def __len__(self):
+        return len(self._attrs)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, PathAttributeSet):
+            return NotImplemented
+        return self._key == other._key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'PathAttributeSet(%s)' % list(self._attrs.values())
+
+
 @six.add_metaclass(ABCMeta)
 class Path(object):
     """Represents a way of reaching an IP destination.
@@ -697,7 +869,7 @@ class Path(object):
     """
     __slots__ = ('_source', '_path_attr_map', '_nlri', '_source_version_num',
                  '_exported_from', '_nexthop', 'next_path', 'prev_path',
-                 '_is_withdraw', 'med_set_by_target_neighbor')
+                 '_is_withdraw', 'med_set_by_target_neighbor', 'decision_key')
     ROUTE_FAMILY = RF_IPv4_UC
 
     def __init__(self, source, nlri, src_ver_num, pattrs=None, nexthop=None,
@@ -711,7 +883,8 @@ class Path(object):
             - `nlri`: (Vpnv4) Nlri instance for Vpnv4 route family.
             - `src_ver_num`: (int) version number of *source* when this path
             was learned.
-            - `pattrs`: (OrderedDict) various path attributes for this path.
+            - `pattrs`: (OrderedDict) various path attributes for this path,
+            interned as `PathAttributeSet`.
             - `nexthop`: (str) nexthop advertised for this path.
             - `is_withdraw`: (bool) True if this represents a withdrawal.
         """
@@ -740,11 +913,9 @@ class Path(object):
         # The entity (peer) that gave us this path.
         self._source = source
 
-        # Path attribute of this path.
-        if pattrs:
-            self._path_attr_map = copy(pattrs)
-        else:
-            self._path_attr_map = OrderedDict()
+        # Path attribute of this path, shared with other paths having the
+        # same path attributes.
+        self._path_attr_map = PathAttributeSet.intern(pattrs)
 
         # NLRI that this path represents.
         self._nlri = nlri
@@ -765,6 +936,10 @@ class Path(object):
         # The Destination from which this path was exported, if any.
         self._exported_from = None
 
+        # Cached best path decision key.
+        # @see processor.best_path_key
+        self.decision_key = None
+
     @property
     def source_version_num(self):
         return self._source_version_num
@@ -791,7 +966,12 @@ class Path(object):
 
     @property
     def pathattr_map(self):
-        return copy(self._path_attr_map)
+        return OrderedDict(self._path_attr_map.items())
+
+    @property
+    def pathattrs(self):
+        """Returns the shared, read-only `PathAttributeSet` of this path."""
+        return self._path_attr_map
 
     @property
     def nexthop(self):
@@ -34,6 +34,7 @@ class EvpnDest(VpnDest):
 
     Store EVPN Paths.
     """
+    __slots__ = ()
     ROUTE_FAMILY = RF_L2_EVPN
 
 
@@ -49,6 +50,7 @@ class EvpnTable(VpnTable):
 
 class EvpnPath(VpnPath):
     """Represents a way of reaching an EVPN destination."""
+    __slots__ = ()
     ROUTE_FAMILY = RF_L2_EVPN
     VRF_PATH_CLASS = None  # defined in init - anti cyclic import hack
     NLRI_CLASS = EvpnNLRI
@@ -56,4 +58,4 @@ class EvpnPath(VpnPath):
     def __init__(self, *args, **kwargs):
         super(EvpnPath, self).__init__(*args, **kwargs)
         from ryu.services.protocols.bgp.info_base.vrfevpn import VrfEvpnPath
-        self.VRF_PATH_CLASS = VrfEvpnPath
+        self.__class__.VRF_PATH_CLASS = VrfEvpnPath
@@ -59,6 +59,7 @@ class VpnTable(Table):
 
 @six.add_metaclass(abc.ABCMeta)
 class VpnPath(Path):
+    __slots__ = ()
     ROUTE_FAMILY = None
     VRF_PATH_CLASS = None
     NLRI_CLASS = None
@@ -93,6 +94,7 @@ class VpnPath(Path):
 @six.add_metaclass(abc.ABCMeta)
 class VpnDest(Destination, NonVrfPathProcessingMixin):
     """Base class for VPN destinations."""
+    __slots__ = ()
 
     def _best_path_lost(self):
         old_best_path = self._best_path
@@ -35,6 +35,7 @@ class VPNv4FlowSpecDest(VpnDest):
 
     Store Flow Specification Paths.
     """
+    __slots__ = ()
     ROUTE_FAMILY = RF_VPNv4_FLOWSPEC
 
 
@@ -50,6 +51,7 @@ class VPNv4FlowSpecTable(VpnTable):
 
 class VPNv4FlowSpecPath(VpnPath):
     """Represents a way of reaching an VPNv4 Flow Specification destination."""
+    __slots__ = ()
     ROUTE_FAMILY = RF_VPNv4_FLOWSPEC
     VRF_PATH_CLASS = None  # defined in init - anti cyclic import hack
     NLRI_CLASS = FlowSpecVPNv4NLRI
@@ -60,7 +62,7 @@ class VPNv4FlowSpecPath(VpnPath):
         super(VPNv4FlowSpecPath, self).__init__(*args, **kwargs)
         from ryu.services.protocols.bgp.info_base.vrf4fs import (
             Vrf4FlowSpecPath)
-        self.VRF_PATH_CLASS = Vrf4FlowSpecPath
+        self.__class__.VRF_PATH_CLASS = Vrf4FlowSpecPath
         # Because the IPv4 Flow Specification does not require nexthop,
         # initialize with None.
         self._nexthop = None
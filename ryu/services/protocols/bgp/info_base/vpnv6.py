@@ -34,6 +34,7 @@ class Vpnv6Dest(VpnDest):
 
     Stores IPv6 paths.
     """
+    __slots__ = ()
     ROUTE_FAMILY = RF_IPv6_VPN
 
 
@@ -49,6 +50,7 @@ class Vpnv6Table(VpnTable):
 
 class Vpnv6Path(VpnPath):
     """Represents a way of reaching an VPNv4 destination."""
+    __slots__ = ()
     ROUTE_FAMILY = RF_IPv6_VPN
     VRF_PATH_CLASS = None  # defined in init - anti cyclic import hack
     NLRI_CLASS = IP6AddrPrefix
@@ -56,4 +58,4 @@ class Vpnv6Path(VpnPath):
     def __init__(self, *args, **kwargs):
         super(Vpnv6Path, self).__init__(*args, **kwargs)
         from ryu.services.protocols.bgp.info_base.vrf6 import Vrf6Path
-        self.VRF_PATH_CLASS = Vrf6Path
+        self.__class__.VRF_PATH_CLASS = Vrf6Path
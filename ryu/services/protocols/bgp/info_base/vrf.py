@@ -365,6 +365,7 @@ class VrfTable(Table):
 @six.add_metaclass(abc.ABCMeta)
 class VrfDest(Destination):
     """Base class for VRF destination."""
+    __slots__ = ('_route_dist',)
 
     def __init__(self, table, nlri):
         super(VrfDest, self).__init__(table, nlri)
@@ -635,7 +636,7 @@ class VrfPath(Path):
             return False
         if not self.nexthop == b_path.nexthop:
             return False
-        if not self.pathattr_map == b_path.pathattr_map:
+        if self.pathattrs is not b_path.pathattrs:
             return False
 
         return True
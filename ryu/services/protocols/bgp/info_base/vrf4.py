@@ -37,12 +37,14 @@ LOG = logging.getLogger('bgpspeaker.info_base.vrf4')
 
 class Vrf4Path(VrfPath):
     """Represents a way of reaching an IP destination with a VPN."""
+    __slots__ = ()
     ROUTE_FAMILY = RF_IPv4_UC
     VPN_PATH_CLASS = Vpnv4Path
     VPN_NLRI_CLASS = LabelledVPNIPAddrPrefix
 
 
 class Vrf4Dest(VrfDest):
+    __slots__ = ()
     ROUTE_FAMILY = RF_IPv4_UC
 
 
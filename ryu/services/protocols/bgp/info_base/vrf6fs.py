@@ -40,12 +40,14 @@ class Vrf6FlowSpecPath(VRFFlowSpecPath):
     """Represents a way of reaching an IP destination with
     a VPN Flow Specification.
     """
+    __slots__ = ()
     ROUTE_FAMILY = RF_IPv6_FLOWSPEC
     VPN_PATH_CLASS = VPNv6FlowSpecPath
     VPN_NLRI_CLASS = FlowSpecVPNv6NLRI
 
 
 class Vrf6FlowSpecDest(VRFFlowSpecDest):
+    __slots__ = ()
     ROUTE_FAMILY = RF_IPv6_FLOWSPEC
 
 
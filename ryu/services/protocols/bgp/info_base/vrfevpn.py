@@ -34,6 +34,7 @@ LOG = logging.getLogger('bgpspeaker.info_base.vrfevpn')
 
 class VrfEvpnPath(VrfPath):
     """Represents a way of reaching an EVPN destination with a VPN."""
+    __slots__ = ()
     ROUTE_FAMILY = RF_L2_EVPN
     VPN_PATH_CLASS = EvpnPath
     VPN_NLRI_CLASS = EvpnNLRI
@@ -41,6 +42,7 @@ class VrfEvpnPath(VrfPath):
 
 class VrfEvpnDest(VrfDest):
     """Destination for EVPN VRFs."""
+    __slots__ = ()
     ROUTE_FAMILY = RF_L2_EVPN
 
 
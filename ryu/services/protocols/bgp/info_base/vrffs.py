@@ -83,6 +83,7 @@ class VRFFlowSpecTable(VrfTable):
 @six.add_metaclass(abc.ABCMeta)
 class VRFFlowSpecDest(VrfDest):
     """Base class for VRF Flow Specification."""
+    __slots__ = ()
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -90,3 +91,4 @@ class VRFFlowSpecPath(VrfPath):
     """Represents a way of reaching an IP destination with
     a VPN Flow Specification.
     """
+    __slots__ = ()
@@ -38,12 +38,14 @@ class L2vpnFlowSpecPath(VRFFlowSpecPath):
     """Represents a way of reaching an IP destination with
     a L2VPN Flow Specification.
     """
+    __slots__ = ()
     ROUTE_FAMILY = RF_L2VPN_FLOWSPEC
     VPN_PATH_CLASS = L2VPNFlowSpecPath
     VPN_NLRI_CLASS = FlowSpecL2VPNNLRI
 
 
 class L2vpnFlowSpecDest(VRFFlowSpecDest):
+    __slots__ = ()
     ROUTE_FAMILY = RF_L2VPN_FLOWSPEC
 
 
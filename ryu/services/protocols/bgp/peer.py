@@ -16,6 +16,7 @@
  BGP peer related classes and utils.
 """
 from collections import namedtuple
+from copy import copy
 import logging
 import socket
 import time
@@ -299,6 +300,9 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
 
     RTC_EOR_TIMER_NAME = 'RTC_EOR_Timer'
 
+    # Max. number of queued routes packed into UPDATEs at a time.
+    OUTGOING_ROUTE_BATCH_SIZE = 1000
+
     def __init__(self, common_conf, neigh_conf,
                  core_service, signal_bus, peer_manager):
         peer_activity_name = 'Peer: %s' % neigh_conf.ip_address
@@ -706,41 +710,84 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
                               self._enqueue_eor_msg, rr_msg)
             LOG.debug('Enhanced RR max. EOR timer set.')
 
-    def _send_outgoing_route(self, outgoing_route):
-        """Constructs `Update` message from given `outgoing_route` and sends
-        it to peer.
+    def _send_outgoing_routes(self, outgoing_routes):
+        """Sends given `outgoing_routes` packed into as few `Update` messages
+        as possible.
 
-        Also, checks if any policies prevent sending this message.
-        Populates Adj-RIB-out with corresponding `SentRoute`.
+        Routes sharing the same path attributes are sent in one UPDATE. If a
+        prefix appears more than once, the routes queued before it are sent
+        first so that the peer sees the updates of the prefix in order.
+        """
+        batch = []
+        prefixes = set()
+        for outgoing_route in outgoing_routes:
+            path = outgoing_route.path
+            prefix = (path.route_family, path.nlri.formatted_nlri_str)
+            if prefix in prefixes:
+                self._send_packed_routes(batch)
+                batch = []
+                prefixes.clear()
+            prefixes.add(prefix)
+            batch.append(outgoing_route)
+        self._send_packed_routes(batch)
+
+    def _send_packed_routes(self, outgoing_routes):
+        """Constructs `Update` messages from given `outgoing_routes` and sends
+        them to peer.
+
+        Also, checks if any policies prevent sending these routes.
+        Populates Adj-RIB-out with corresponding `SentRoute`s.
+        The prefixes of `outgoing_routes` must be distinct.
         """
+        packer = bgp_utils.UpdatePacker()
+        sent_routes = []
+        for outgoing_route in outgoing_routes:
+            path = outgoing_route.path
+            block, blocked_cause = self._apply_out_filter(path)
 
-        path = outgoing_route.path
-        block, blocked_cause = self._apply_out_filter(path)
+            nlri_str = path.nlri.formatted_nlri_str
+            sent_route = SentRoute(path, self, block)
+            self._adj_rib_out[nlri_str] = sent_route
+            self._signal_bus.adj_rib_out_changed(self, sent_route)
 
-        nlri_str = outgoing_route.path.nlri.formatted_nlri_str
-        sent_route = SentRoute(outgoing_route.path, self, block)
-        self._adj_rib_out[nlri_str] = sent_route
-        self._signal_bus.adj_rib_out_changed(self, sent_route)
+            if not block:
+                packer.add(self._construct_update(outgoing_route))
+            else:
+                LOG.debug('prefix : %s is not sent by filter : %s',
+                          path.nlri, blocked_cause)
 
-        # TODO(PH): optimized by sending several prefixes per update.
-        # Construct and send update message.
-        if not block:
-            update_msg = self._construct_update(outgoing_route)
+            # We have to create sent_route for every OutgoingRoute which is
+            # not a withdraw or was for route-refresh msg.
+            if not path.is_withdraw and not outgoing_route.for_route_refresh:
+                sent_routes.append(sent_route)
+
+        for update_msg in packer.updates():
             self._protocol.send(update_msg)
             # Collect update statistics.
             self.state.incr(PeerCounterNames.SENT_UPDATES)
-        else:
-            LOG.debug('prefix : %s is not sent by filter : %s',
-                      path.nlri, blocked_cause)
-
-        # We have to create sent_route for every OutgoingRoute which is
-        # not a withdraw or was for route-refresh msg.
-        if (not outgoing_route.path.is_withdraw and
-                not outgoing_route.for_route_refresh):
-            # Update the destination with new sent route.
-            tm = self._core_service.table_manager
+
+        # Update the destination with new sent route.
+        tm = self._core_service.table_manager
+        for sent_route in sent_routes:
             tm.remember_sent_route(sent_route)
 
+    def _pop_outgoing_routes(self, outgoing_route):
+        """Pops the `OutgoingRoute`s queued right after `outgoing_route`.
+
+        Returns the routes, starting with `outgoing_route`, and the first
+        queued message which is not an `OutgoingRoute`, if any, so that the
+        caller can send it after the routes.
+        """
+        outgoing_routes = [outgoing_route]
+        while len(outgoing_routes) < self.OUTGOING_ROUTE_BATCH_SIZE:
+            outgoing_msg = self.outgoing_msg_list.pop_first()
+            if outgoing_msg is None:
+                break
+            if not isinstance(outgoing_msg, OutgoingRoute):
+                return outgoing_routes, outgoing_msg
+            outgoing_routes.append(outgoing_msg)
+        return outgoing_routes, None
+
     def _process_outgoing_msg_list(self):
         while True:
             outgoing_msg = None
@@ -755,6 +802,14 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
                 self.outgoing_msg_event.wait()
                 continue
 
+            # Routes queued back to back are sent packed together.
+            if isinstance(outgoing_msg, OutgoingRoute):
+                outgoing_routes, outgoing_msg = self._pop_outgoing_routes(
+                    outgoing_msg)
+                self._send_outgoing_routes(outgoing_routes)
+                if outgoing_msg is None:
+                    continue
+
             # Check currently supported out-going msgs.
             assert isinstance(
                 outgoing_msg,
@@ -765,8 +820,6 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             # Send msg. to peer.
             if isinstance(outgoing_msg, BGPRouteRefresh):
                 self._send_outgoing_route_refresh_msg(outgoing_msg)
-            elif isinstance(outgoing_msg, OutgoingRoute):
-                self._send_outgoing_route(outgoing_msg)
 
             # EOR are enqueued as plain Update messages.
             elif isinstance(outgoing_msg, BGPUpdate):
@@ -988,7 +1041,12 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
                 new_pathattr.append(mpunreach_attr)
         elif self.is_route_server_client:
             nlri_list = [path.nlri]
-            new_pathattr.extend(pathattr_map.values())
+            for attr in pathattr_map.values():
+                if isinstance(attr, BGPPathAttributeMpReachNLRI):
+                    # The path keeps MP_REACH_NLRI without NLRI.
+                    attr = copy(attr)
+                    attr.nlri = [path.nlri]
+                new_pathattr.append(attr)
         else:
             if self.is_route_reflector_client:
                 # Append ORIGINATOR_ID attribute if not already exist.
@@ -1186,7 +1244,8 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             if path_extcomm_attr:
                 # SOO list can be configured per VRF and/or per Neighbor.
                 # NeighborConf has this setting we add this to existing list.
-                communities = path_extcomm_attr.communities
+                # Copy the list, the attribute is shared with other paths.
+                communities = list(path_extcomm_attr.communities)
                 if self._neigh_conf.soo_list:
                     # construct extended community
                     soo_list = self._neigh_conf.soo_list
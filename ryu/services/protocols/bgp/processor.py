@@ -36,6 +36,7 @@ from ryu.lib.packet.bgp import BGP_ATTR_ORIGIN_IGP
 from ryu.lib.packet.bgp import BGP_ATTR_ORIGIN_EGP
 from ryu.lib.packet.bgp import BGP_ATTR_ORIGIN_INCOMPLETE
 
+from ryu.services.protocols.bgp.constants import VPN_TABLE
 from ryu.services.protocols.bgp.constants import VRF_TABLE
 
 LOG = logging.getLogger('bgpspeaker.processor')
@@ -268,6 +269,94 @@ def compute_best_path(local_asn, path1, path2):
     return best_path, best_path_reason
 
 
+# Decision steps of `compute_best_path()` covered by `best_path_key()`, in
+# the order of the key items.  Steps which never decide are left out.
+_KEY_REASONS = (BPR_LOCAL_PREF, BPR_LOCAL_ORIGIN, BPR_ASPATH, BPR_ORIGIN,
+                BPR_MED, BPR_ASN, BPR_ROUTER_ID, BPR_CLUSTER_LIST)
+
+_ORIGIN_PREF = {
+    BGP_ATTR_ORIGIN_IGP: 3,
+    BGP_ATTR_ORIGIN_EGP: 2,
+    BGP_ATTR_ORIGIN_INCOMPLETE: 1,
+}
+
+
+def best_path_key(local_asn, local_router_id, path):
+    """Returns the decision key of given path.
+
+    Keys compare like `compute_best_path()` compares paths: the better path
+    has the larger key.  The exception is LOCAL_PREF, which
+    `compute_best_path()` only compares when both paths carry it; its item
+    is None for paths without LOCAL_PREF, so keys of paths with and without
+    it must not be compared with each other.
+
+    The key is computed once and cached in the path, until the local AS
+    number or router ID changes.
+    """
+    cached = path.decision_key
+    if cached is not None and cached[0] == (local_asn, local_router_id):
+        return cached[1]
+
+    lp = path.get_pattr(BGP_ATTR_TYPE_LOCAL_PREF)
+
+    as_path = path.get_pattr(BGP_ATTR_TYPE_AS_PATH)
+    assert as_path
+    as_path_len = as_path.get_as_path_len()
+    assert as_path_len is not None
+
+    origin = path.get_pattr(BGP_ATTR_TYPE_ORIGIN)
+    assert origin is not None
+
+    med = path.get_pattr(BGP_ATTR_TYPE_MULTI_EXIT_DISC)
+
+    source = path.source
+    is_local_source = source is None or source in (VRF_TABLE, VPN_TABLE)
+    if is_local_source:
+        asn = local_asn
+    else:
+        asn = source.remote_as
+    is_ebgp = asn != local_asn
+
+    # Router ID is not used to break tie between eBGP paths (RFC 5004).
+    router_id = 0
+    if not is_ebgp:
+        from ryu.services.protocols.bgp.utils.bgp import from_inet_ptoi
+        bgp_id = local_router_id
+        if not is_local_source:
+            originator_id = path.get_pattr(BGP_ATTR_TYPE_ORIGINATOR_ID)
+            if originator_id:
+                bgp_id = originator_id.value
+            elif source.protocol and source.protocol.recv_open_msg:
+                bgp_id = source.protocol.recv_open_msg.bgp_identifier
+            else:
+                bgp_id = None
+        # Unknown router ID is least preferred.
+        router_id = -(from_inet_ptoi(bgp_id) if bgp_id else 0xffffffff)
+
+    cluster_list = path.get_pattr(BGP_ATTR_TYPE_CLUSTER_LIST)
+
+    key = (
+        lp.value if lp else None,
+        1 if source is None else 0,
+        -as_path_len,
+        _ORIGIN_PREF.get(origin.value, 0),
+        -(med.value if med else 0),
+        1 if is_ebgp else 0,
+        router_id,
+        -(len(cluster_list.value) if cluster_list else 0),
+    )
+    path.decision_key = ((local_asn, local_router_id), key)
+    return key
+
+
+def best_path_key_reason(key1, key2):
+    """Returns the reason deciding between paths with given keys."""
+    for reason, item1, item2 in zip(_KEY_REASONS, key1, key2):
+        if item1 != item2:
+            return reason
+    return BPR_UNKNOWN
+
+
 def _cmp_by_reachable_nh(path1, path2):
     """Compares given paths and selects best path based on reachable next-hop.
 
@@ -16,6 +16,7 @@
 """
  Utilities related to bgp data types and models.
 """
+import copy
 import logging
 
 import netaddr
@@ -37,6 +38,7 @@ from ryu.lib.packet.bgp import (
     RouteTargetMembershipNLRI,
     BGP_ATTR_TYPE_MULTI_EXIT_DISC,
     BGPPathAttributeMultiExitDisc,
+    BGPPathAttributeMpReachNLRI,
     BGPPathAttributeMpUnreachNLRI,
     BGPPathAttributeAs4Path,
     BGPPathAttributeAs4Aggregator,
@@ -155,6 +157,130 @@ def get_unknown_opttrans_attr(path):
     return unknown_opt_tran_attrs
 
 
+# Maximum BGP message size (RFC 4271).
+BGP_MAX_MESSAGE_LEN = 4096
+
+# BGP header (19) + withdrawn routes length (2) + path attributes length (2)
+_UPDATE_HEADER_LEN = 23
+
+
+class UpdatePacker(object):
+    """Packs single-route UPDATE messages into as few UPDATEs as possible.
+
+    Each UPDATE given to `add()` is expected to carry exactly one route, as
+    built by `Peer._construct_update()`. Routes whose path attributes
+    serialize to the same bytes (ignoring the NLRI carried in
+    MP_REACH_NLRI) are merged into one UPDATE, as are withdrawals of the
+    same address family, without exceeding `max_len` bytes per message.
+
+    The caller is responsible for not adding two routes for the same
+    prefix, as the order between them is not preserved.
+
+    Attributes taken as is from the paths' shared `PathAttributeSet`s are
+    the same objects for all routes, so they are serialized only once per
+    packer.
+    """
+
+    def __init__(self, max_len=BGP_MAX_MESSAGE_LEN):
+        self.max_len = max_len
+        # key -> [template update, [nlri, ...], message length]
+        self._groups = {}
+        self._updates = []
+        # id(attribute) -> (attribute, serialized attribute)
+        self._attr_bytes = {}
+
+    def add(self, update):
+        key, template, nlri = self._split(update)
+        nlri_len = len(nlri.serialize())
+        group = self._groups.get(key)
+        if group is not None and group[2] + nlri_len > self.max_len:
+            self._updates.append(self._build(*group[:2]))
+            group = None
+        if group is None:
+            group = self._groups[key] = [
+                template, [], self._base_len(key, template)]
+        group[1].append(nlri)
+        group[2] += nlri_len
+
+    def updates(self):
+        """Returns packed UPDATEs, withdrawals first, and resets packer."""
+        updates = self._updates
+        for template, nlri_list, _ in self._groups.values():
+            updates.append(self._build(template, nlri_list))
+        self._groups = {}
+        self._updates = []
+        self._attr_bytes = {}
+        updates.sort(key=lambda u: not (u.withdrawn_routes or any(
+            isinstance(a, BGPPathAttributeMpUnreachNLRI)
+            for a in u.path_attributes)))
+        return updates
+
+    def _serialize_attr(self, attr):
+        # Keeps the attribute referenced so that its id is not reused.
+        cached = self._attr_bytes.get(id(attr))
+        if cached is None:
+            cached = self._attr_bytes[id(attr)] = (attr, attr.serialize())
+        return cached[1]
+
+    def _split(self, update):
+        """Returns (grouping key, template update, nlri) of `update`."""
+        if update.withdrawn_routes:
+            return ('withdraw',), update, update.withdrawn_routes[0]
+        if update.nlri:
+            attrs = b''.join(self._serialize_attr(a)
+                             for a in update.path_attributes)
+            return ('nlri', attrs), update, update.nlri[0]
+
+        attrs = []
+        mp_attr = None
+        for attr in update.path_attributes:
+            if isinstance(attr, (BGPPathAttributeMpReachNLRI,
+                                 BGPPathAttributeMpUnreachNLRI)):
+                mp_attr = attr
+            else:
+                attrs.append(self._serialize_attr(attr))
+        if isinstance(mp_attr, BGPPathAttributeMpUnreachNLRI):
+            key = ('mp_unreach', mp_attr.afi, mp_attr.safi)
+            return key, update, mp_attr.withdrawn_routes[0]
+
+        nlri = mp_attr.nlri[0]
+        mp_attr = copy.copy(mp_attr)
+        mp_attr.nlri = []
+        # Includes AFI/SAFI and next hop.
+        attrs.append(mp_attr.serialize())
+        return ('mp_reach', b''.join(attrs)), update, nlri
+
+    @staticmethod
+    def _base_len(key, template):
+        if key[0] == 'withdraw':
+            return _UPDATE_HEADER_LEN
+        if key[0] == 'mp_unreach':
+            # Attribute header with extended length and AFI/SAFI.
+            return _UPDATE_HEADER_LEN + 4 + 3
+        # The MP_REACH_NLRI attribute may need the extended length flag
+        # once it carries more prefixes.
+        return _UPDATE_HEADER_LEN + len(key[1]) + 1
+
+    @staticmethod
+    def _build(template, nlri_list):
+        if template.withdrawn_routes:
+            return BGPUpdate(withdrawn_routes=nlri_list)
+        if template.nlri:
+            return BGPUpdate(path_attributes=template.path_attributes,
+                             nlri=nlri_list)
+
+        path_attributes = []
+        for attr in template.path_attributes:
+            if isinstance(attr, BGPPathAttributeMpReachNLRI):
+                attr = copy.copy(attr)
+                attr.nlri = nlri_list
+            elif isinstance(attr, BGPPathAttributeMpUnreachNLRI):
+                attr = copy.copy(attr)
+                attr.withdrawn_routes = nlri_list
+            path_attributes.append(attr)
+        return BGPUpdate(path_attributes=path_attributes)
+
+
 def create_end_of_rib_update():
     """Construct end-of-rib (EOR) Update instance."""
     mpunreach_attr = BGPPathAttributeMpUnreachNLRI(RF_IPv4_VPN.afi,
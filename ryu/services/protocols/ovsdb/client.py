@@ -61,6 +61,10 @@ def dictify(row):
 
 def transact_block(request, connection):
     """Emulate jsonrpc.Connection.transact_block without blocking eventlet.
+
+    Waits for the reply with the id of the request, blocking on the socket
+    (which yields to other threads when eventlet is in use) instead of
+    polling. Other messages received meanwhile are discarded.
     """
     error = connection.send(request)
     reply = None
@@ -69,27 +73,23 @@ def transact_block(request, connection):
         return error, reply
 
     ovs_poller = poller.Poller()
-    while not error:
-        ovs_poller.immediate_wake()
+    while True:
         error, reply = connection.recv()
 
-        if error != errno.EAGAIN:
-            break
-
-        if (reply and
-            reply.id == request.id and
-            reply.type in (jsonrpc.Message.T_REPLY,
-                           jsonrpc.Message.T_ERROR)):
-            break
+        if error == errno.EAGAIN:
+            connection.run()
+            connection.wait(ovs_poller)
+            connection.recv_wait(ovs_poller)
+            ovs_poller.block()
+            continue
 
-        connection.run()
-        connection.wait(ovs_poller)
-        connection.recv_wait(ovs_poller)
-        ovs_poller.block()
+        if error:
+            return error, None
 
-        hub.sleep(0)
-
-    return error, reply
+        if (reply.id == request.id and
+                reply.type in (jsonrpc.Message.T_REPLY,
+                               jsonrpc.Message.T_ERROR)):
+            return 0, reply
 
 
 def discover_schemas(connection):
@@ -366,6 +366,12 @@ class RemoteOvsdb(app_manager.RyuApp):
         self.system_id = kwargs['system_id']
         self.name = kwargs['name']
         self._txn_q = collections.deque()
+        # (transaction, [(request, uuids)]) waiting for their reply
+        self._txns = collections.deque()
+        self.max_outstanding_txns = kwargs.get('max_outstanding_txns', 1)
+        self.max_batch_txns = kwargs.get('max_batch_txns', 100)
+        # number of queued requests to run in their own transaction
+        self._unbatched = 0
 
     def _event_proxy_loop(self):
         while self.is_active:
@@ -413,37 +419,73 @@ class RemoteOvsdb(app_manager.RyuApp):
             self.stop()
 
     def _transactions(self):
-        if not self._txn_q:
-            return
+        # Reply to the transactions completed by the last Idl.run(), then
+        # send the queued requests.
+        while self._txns and self._txns[0][0].commit() != \
+                idl.Transaction.INCOMPLETE:
+            self._transaction_done(*self._txns.popleft())
 
-        # NOTE(jkoelker) possibly run multiple transactions per loop?
-        self._transaction()
+        while self._txn_q and len(self._txns) < self.max_outstanding_txns:
+            self._transaction()
 
     def _transaction(self):
-        req = self._txn_q.popleft()
+        """Runs up to max_batch_txns queued requests in a transaction."""
+        reqs = []
         txn = idl.Transaction(self._idl)
+        max_batch_txns = 1 if self._unbatched else self.max_batch_txns
 
-        uuids = req.func(self._idl.tables, txn.insert)
-        status = txn.commit_block()
+        while self._txn_q and len(reqs) < max_batch_txns:
+            req = self._txn_q.popleft()
+            self._unbatched = max(self._unbatched - 1, 0)
+            try:
+                uuids = req.func(self._idl.tables, txn.insert)
+            except Exception as e:
+                self.logger.exception('Error in modify request %s', req)
+                txn.abort()
+                # run the other requests again without the failed one
+                self._txn_q.extendleft(reversed([r for r, _ in reqs]))
+                rep = event.EventModifyReply(
+                    self.system_id, idl.Transaction.ERROR, {}, str(e))
+                self.reply_to_request(req, rep)
+                return
+
+            reqs.append((req, uuids))
+
+        status = txn.commit()
+        if status == idl.Transaction.INCOMPLETE:
+            self._txns.append((txn, reqs))
+        else:
+            self._transaction_done(txn, reqs)
 
-        insert_uuids = {}
-        err_msg = None
+    def _transaction_done(self, txn, reqs):
+        status = txn.commit()
 
-        if status in (idl.Transaction.SUCCESS,
-                      idl.Transaction.UNCHANGED):
-            if uuids:
-                if isinstance(uuids, uuid.UUID):
-                    insert_uuids[uuids] = txn.get_insert_uuid(uuids)
+        if status == idl.Transaction.ERROR and len(reqs) > 1:
+            # The batch fails as a whole, so run the requests again one by
+            # one for each of them to get its own result.
+            self._txn_q.extendleft(reversed([req for req, _ in reqs]))
+            self._unbatched += len(reqs)
+            return
 
-                else:
-                    insert_uuids = dict((uuid, txn.get_insert_uuid(uuid))
-                                        for uuid in uuids)
-        else:
-            err_msg = txn.get_error()
+        for req, uuids in reqs:
+            insert_uuids = {}
+            err_msg = None
+
+            if status in (idl.Transaction.SUCCESS,
+                          idl.Transaction.UNCHANGED):
+                if uuids:
+                    if isinstance(uuids, uuid.UUID):
+                        insert_uuids[uuids] = txn.get_insert_uuid(uuids)
+
+                    else:
+                        insert_uuids = dict((uuid, txn.get_insert_uuid(uuid))
+                                            for uuid in uuids)
+            else:
+                err_msg = txn.get_error()
 
-        rep = event.EventModifyReply(self.system_id, status, insert_uuids,
-                                     err_msg)
-        self.reply_to_request(req, rep)
+            rep = event.EventModifyReply(self.system_id, status,
+                                         insert_uuids, err_msg)
+            self.reply_to_request(req, rep)
 
     def modify_request_handler(self, ev):
         self._txn_q.append(ev)
@@ -67,6 +67,11 @@ class EventModifyRequest(ryu_event.EventRequestBase):
     UUID's. The execution of `func` will be wrapped in a single transaction
     and the reply will include a dict of temporary UUID to real UUID mappings.
 
+    Requests queued for the same OVSDB are run in order in a single
+    transaction, and see the changes of the previous requests. If that
+    transaction fails, `func` of each request is called again in its own
+    transaction, so `func` must not depend on being called once.
+
     e.g.
 
         new_port_uuid = uuid.uuid4()
@@ -43,7 +43,15 @@ opts = (cfg.StrOpt('address', default='0.0.0.0', help='OVSDB address'),
         cfg.ListOpt('schema-exclude-columns', default=[],
                     help='Table columns in the OVSDB schema to filter out.  '
                          'Values should be in the format: <table>.<column>.'
-                         'Ex: Bridge.netflow,Interface.statistics')
+                         'Ex: Bridge.netflow,Interface.statistics'),
+        cfg.IntOpt('max-outstanding-txns', default=1,
+                   help=('Maximum number of transactions waiting for their '
+                         'reply per OVSDB connection. Requests in a '
+                         'transaction do not see the changes of the other '
+                         'outstanding transactions')),
+        cfg.IntOpt('max-batch-txns', default=100,
+                   help=('Maximum number of queued modify requests run in '
+                         'a single transaction'))
         )
 
 cfg.CONF.register_opts(opts, 'ovsdb')
@@ -147,7 +155,11 @@ class OVSDB(app_manager.RyuApp):
                                          min_backoff=self._min_backoff,
                                          max_backoff=self._max_backoff,
                                          schema_tables=schema_tables,
-                                         schema_exclude_columns=schema_ex_col)
+                                         schema_exclude_columns=schema_ex_col,
+                                         max_outstanding_txns=(
+                                             cfg.CONF.ovsdb.max_outstanding_txns),
+                                         max_batch_txns=(
+                                             cfg.CONF.ovsdb.max_batch_txns))
 
         if app:
             self._clients[app.name] = app
@@ -39,4 +39,5 @@ Session class connecting to database
 from . import base
 from . import interface
 from . import route
+from . import route_store
 base.Base.metadata.create_all(ENGINE)
@@ -0,0 +1,318 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-memory route table for Zebra protocol service.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import socket
+
+from ryu.lib import hub
+from ryu.lib import radix
+from ryu.lib.packet import safi as packet_safi
+from ryu.lib.packet import zebra
+
+from . import interface
+from .route import Route
+
+
+LOG = logging.getLogger(__name__)
+
+_COLUMNS = ('id', 'family', 'safi', 'destination', 'gateway', 'ifindex',
+            'source', 'route_type', 'is_selected')
+
+# Number of ids in one "IN" clause, below the limit of SQLite
+_DELETE_CHUNK = 500
+
+
+class RouteEntry(object):
+    """
+    Route record of RouteStore.
+
+    Has the same attributes as the "Route" table.
+    """
+
+    __slots__ = _COLUMNS
+
+    def __init__(self, id, family, safi, destination, gateway, ifindex,
+                 source, route_type, is_selected):
+        self.id = id
+        self.family = family
+        self.safi = safi
+        self.destination = destination
+        self.gateway = gateway
+        self.ifindex = ifindex
+        self.source = source
+        self.route_type = route_type
+        self.is_selected = is_selected
+
+    def to_dict(self):
+        return dict((k, getattr(self, k)) for k in _COLUMNS)
+
+    def __repr__(self):
+        return '%s(%s)' % (
+            self.__class__.__name__,
+            ', '.join('%s=%r' % (k, getattr(self, k)) for k in _COLUMNS))
+
+
+class RouteStore(object):
+    """
+    In-memory route table for Zebra protocol service.
+
+    This class provides the same functions as the "route" module, so that
+    it can replace the module for callers, but keeps the routes in memory
+    and only writes the changes behind to the "route" table.
+
+    Routes are indexed by destination, by ifindex and by a radix tree per
+    address family for longest prefix match with ip_route_lookup().
+    Changes are journaled and written in one transaction by flush(), which
+    is called every flush_interval seconds by the thread started by
+    start(). Changes of the same route between two flushes are coalesced.
+
+    The given session is only used to load the routes at initialization,
+    to resolve device names and to write the journal.
+    """
+
+    def __init__(self, session, flush_interval=1.0):
+        self.session = session
+        self.flush_interval = flush_interval
+        # id -> RouteEntry
+        self.routes = {}
+        # destination -> [RouteEntry]
+        self._by_destination = {}
+        # ifindex -> {id: RouteEntry}
+        self._by_ifindex = {}
+        # family -> RadixTree of {network: [RouteEntry]}
+        self._trees = {
+            socket.AF_INET: radix.RadixTree(socket.AF_INET),
+            socket.AF_INET6: radix.RadixTree(socket.AF_INET6),
+        }
+        # id -> RouteEntry, or None if deleted, since the last flush
+        self._journal = {}
+        self._next_id = 1
+        self._thread = None
+
+        for route in session.query(Route).all():
+            self._insert(RouteEntry(*[getattr(route, k) for k in _COLUMNS]))
+            self._next_id = max(self._next_id, route.id + 1)
+
+    def start(self):
+        self._thread = hub.spawn(self._flush_loop)
+
+    def stop(self):
+        if self._thread is not None:
+            hub.kill(self._thread)
+            self._thread = None
+        self.flush()
+
+    def _flush_loop(self):
+        while True:
+            hub.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Writes the journaled changes to the database."""
+        if not self._journal:
+            return
+        journal, self._journal = self._journal, {}
+        ids = list(journal)
+        try:
+            for i in range(0, len(ids), _DELETE_CHUNK):
+                self.session.query(Route).filter(
+                    Route.id.in_(ids[i:i + _DELETE_CHUNK])).delete(
+                        synchronize_session=False)
+            self.session.bulk_insert_mappings(
+                Route, [route.to_dict() for route in journal.values()
+                        if route is not None])
+            self.session.commit()
+        except Exception as e:
+            LOG.error('Error in writing %d routes: %s', len(journal), e)
+            self.session.rollback()
+            # keep the changes for the next flush, unless overwritten
+            journal.update(self._journal)
+            self._journal = journal
+
+    def _insert(self, route):
+        self.routes[route.id] = route
+        self._by_destination.setdefault(route.destination, []).append(route)
+        self._by_ifindex.setdefault(route.ifindex, {})[route.id] = route
+        tree = self._trees[route.family]
+        routes = tree.get(route.destination)
+        if routes is None:
+            tree[route.destination] = [route]
+        else:
+            routes.append(route)
+
+    def _remove(self, route):
+        del self.routes[route.id]
+        self._discard(self._by_destination, route.destination, route)
+        ifindex_routes = self._by_ifindex[route.ifindex]
+        del ifindex_routes[route.id]
+        if not ifindex_routes:
+            del self._by_ifindex[route.ifindex]
+        self._discard(self._trees[route.family], route.destination, route)
+        self._journal[route.id] = None
+
+    @staticmethod
+    def _discard(index, key, route):
+        routes = index[key]
+        for i, other in enumerate(routes):
+            if other is route:
+                del routes[i]
+                break
+        if not routes:
+            del index[key]
+
+    @staticmethod
+    def _family(destination):
+        addr, _, length = destination.partition('/')
+        for family, bits in ((socket.AF_INET, 32), (socket.AF_INET6, 128)):
+            try:
+                socket.inet_pton(family, addr)
+            except (socket.error, ValueError):
+                continue
+            try:
+                if 0 <= int(length) <= bits:
+                    return family
+            except ValueError:
+                pass
+            return None
+        return None
+
+    def ip_route_show(self, session, destination, device, **kwargs):
+        """
+        Returns a selected route record matching the given filtering rules.
+
+        See "route.ip_route_show()".
+        """
+        intf = interface.ip_link_show(session, ifname=device)
+        if not intf:
+            LOG.debug('Interface "%s" does not exist', device)
+            return None
+
+        routes = self.ip_route_show_all(
+            session, destination=destination, ifindex=intf.ifindex, **kwargs)
+        return routes[0] if routes else None
+
+    def ip_route_show_all(self, session, **kwargs):
+        """
+        Returns a list of route records matching the given filtering rules.
+
+        See "route.ip_route_show_all()".
+        """
+        if 'destination' in kwargs:
+            routes = self._by_destination.get(kwargs.pop('destination'), ())
+        elif 'ifindex' in kwargs:
+            routes = self._by_ifindex.get(kwargs.pop('ifindex'), {}).values()
+        else:
+            routes = self.routes.values()
+        # "id" is the first column, so routes keep their order of insertion
+        return sorted((route for route in routes
+                       if all(getattr(route, k) == v
+                              for k, v in kwargs.items())),
+                      key=lambda route: route.id)
+
+    def ip_route_lookup(self, session, address, **kwargs):
+        """
+        Returns the selected route record with the longest destination
+        prefix matching the given address, or "None" if no route matches.
+
+        :param session: Session instance connecting to database.
+        :param address: IPv4 or IPv6 address.
+        :param kwargs: Filtering rules of routes.
+        :return: Instance of route record or "None" if failed.
+        """
+        kwargs.setdefault('is_selected', True)
+        family = socket.AF_INET6 if ':' in address else socket.AF_INET
+        try:
+            match = self._trees[family].lookup(address)
+        except (socket.error, ValueError):
+            LOG.debug('Invalid IP address: %s', address)
+            return None
+        if match is None:
+            return None
+        for route in match[1]:
+            if all(getattr(route, k) == v for k, v in kwargs.items()):
+                return route
+        return None
+
+    def ip_route_add(self, session, destination, device=None, gateway='',
+                     source='', ifindex=0, route_type=zebra.ZEBRA_ROUTE_KERNEL,
+                     is_selected=True):
+        """
+        Adds a route record into Zebra protocol service database.
+
+        See "route.ip_route_add()".
+        """
+        if device:
+            intf = interface.ip_link_show(session, ifname=device)
+            if not intf:
+                LOG.debug('Interface "%s" does not exist', device)
+                return None
+            ifindex = ifindex or intf.ifindex
+
+            route = self.ip_route_show(
+                session, destination=destination, device=device)
+            if route:
+                LOG.debug(
+                    'Route to "%s" already exists on "%s" device',
+                    destination, device)
+                return route
+
+        family = self._family(destination)
+        if family is None:
+            LOG.debug('Invalid IP address for "prefix": %s', destination)
+            return None
+
+        if is_selected:
+            for old_route in self._by_destination.get(destination, ()):
+                if old_route.is_selected:
+                    LOG.debug('Set existing route to unselected: %s',
+                              old_route)
+                    old_route.is_selected = False
+                    self._journal[old_route.id] = old_route
+
+        new_route = RouteEntry(
+            id=self._next_id,
+            family=family,
+            safi=packet_safi.UNICAST,
+            destination=destination,
+            gateway=gateway,
+            ifindex=ifindex,
+            source=source,
+            route_type=route_type,
+            is_selected=is_selected)
+        self._next_id += 1
+
+        self._insert(new_route)
+        self._journal[new_route.id] = new_route
+
+        return new_route
+
+    def ip_route_delete(self, session, destination, **kwargs):
+        """
+        Deletes route record(s) from Zebra protocol service database.
+
+        See "route.ip_route_delete()".
+        """
+        routes = self.ip_route_show_all(
+            session, destination=destination, **kwargs)
+        for route in routes:
+            self._remove(route)
+
+        return routes
@@ -196,9 +196,17 @@ class ZServer(RyuApp):
         # Initial Router ID for Zebra server
         self.router_id = CONF.router_id
 
+        # Route table, "route" module or in-memory RouteStore
+        self.route_db = db.route
+        if CONF.route_store == 'memory':
+            self.route_db = db.route_store.RouteStore(SESSION)
+
     def start(self):
         super(ZServer, self).start()
 
+        if self.route_db is not db.route:
+            self.route_db.start()
+
         if self.zapi_connection_family == socket.AF_UNIX:
             unix_sock_dir = os.path.dirname(CONF.server_host)
             # Makes sure the unix socket does not already exist
@@ -223,12 +231,18 @@ class ZServer(RyuApp):
 
         return hub.spawn(self.zserv.serve_forever)
 
+    def stop(self):
+        if self.route_db is not db.route:
+            # writes the journaled routes
+            self.route_db.stop()
+        super(ZServer, self).stop()
+
     def _add_lo_interface(self):
         intf = db.interface.ip_link_add(SESSION, 'lo')
         if intf:
             self.logger.debug('Added interface "%s": %s', intf.ifname, intf)
 
-        route = db.route.ip_route_add(
+        route = self.route_db.ip_route_add(
             SESSION,
             destination='127.0.0.0/8',
             device='lo',
@@ -286,7 +300,7 @@ class ZServer(RyuApp):
                     hw_addr=intf.hw_addr))
             ev.zclient.send_msg(msg)
 
-            routes = db.route.ip_route_show_all(
+            routes = self.route_db.ip_route_show_all(
                 SESSION, ifindex=intf.ifindex, is_selected=True)
             self.logger.debug('Server will response routes: %s', routes)
             for route in routes:
@@ -307,7 +321,7 @@ class ZServer(RyuApp):
             'Client %s advertised IP route: %s', ev.zclient, ev.body)
 
         for nexthop in ev.body.nexthops:
-            route = db.route.ip_route_add(
+            route = self.route_db.ip_route_add(
                 SESSION,
                 destination=ev.body.prefix,
                 gateway=nexthop.addr,
@@ -324,7 +338,7 @@ class ZServer(RyuApp):
             'Client %s withdrew IP route: %s', ev.zclient, ev.body)
 
         for nexthop in ev.body.nexthops:
-            routes = db.route.ip_route_delete(
+            routes = self.route_db.ip_route_delete(
                 SESSION,
                 destination=ev.body.prefix,
                 gateway=nexthop.addr,
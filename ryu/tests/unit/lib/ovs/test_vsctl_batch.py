@@ -0,0 +1,75 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from nose.tools import eq_
+
+from ryu.lib.ovs import vsctl
+
+try:
+    import mock  # Python 2
+except ImportError:
+    from unittest import mock  # Python 3
+
+
+LOG = logging.getLogger(__name__)
+
+OVSDB_SWITCH_ADDR = 'tcp:0.0.0.0:6640'
+
+
+class TestVSCtlRunCommands(unittest.TestCase):
+    """
+    Test cases for ryu.lib.ovs.vsctl.VSCtl.run_commands()
+    """
+
+    def setUp(self):
+        self.vsctl = vsctl.VSCtl(OVSDB_SWITCH_ADDR)
+        self.lists = [[vsctl.VSCtlCommand('add-port', ('s1', 'p%d' % i))]
+                      for i in range(3)]
+
+    def test_run_commands(self):
+        with mock.patch.object(self.vsctl, 'run_command') as run_command:
+            eq_([None, None, None], self.vsctl.run_commands(self.lists))
+
+        # executed in a single transaction
+        run_command.assert_called_once_with(
+            [commands[0] for commands in self.lists], None, None)
+
+    def test_run_commands_error(self):
+        error = vsctl.VSCtlError('port p1 already exists')
+
+        def run_command(commands, timeout_sec, exception):
+            if self.lists[1][0] in commands:
+                raise error
+
+        with mock.patch.object(self.vsctl, 'run_command',
+                               side_effect=run_command) as run_command_:
+            eq_([None, error, None], self.vsctl.run_commands(self.lists))
+
+        eq_(4, run_command_.call_count)
+
+    def test_run_commands_timeout(self):
+        # OVSDB may have committed the transaction, so it is not run again
+        class _Timeout(Exception):
+            pass
+
+        with mock.patch.object(self.vsctl, 'run_command',
+                               side_effect=_Timeout) as run_command:
+            self.assertRaises(_Timeout, self.vsctl.run_commands,
+                              self.lists, 1, _Timeout)
+
+        eq_(1, run_command.call_count)
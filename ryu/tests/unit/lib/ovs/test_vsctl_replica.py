@@ -0,0 +1,180 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from nose.tools import eq_
+from nose.tools import ok_
+
+from ryu.lib.ovs import vsctl
+
+try:
+    import mock  # Python 2
+except ImportError:
+    from unittest import mock  # Python 3
+
+
+LOG = logging.getLogger(__name__)
+
+OVSDB_SWITCH_ADDR = 'tcp:0.0.0.0:6640'
+
+
+def _ref(table, refs=None):
+    return {'type': {'key': {'type': 'uuid', 'refTable': table},
+                     'min': 0, 'max': 'unlimited' if refs is None else refs}}
+
+
+def _optional(type_):
+    return {'type': {'key': type_, 'min': 0, 'max': 1}}
+
+
+_STR_MAP = {'type': {'key': 'string', 'value': 'string',
+                     'min': 0, 'max': 'unlimited'}}
+
+# Subset of the schema of Open_vSwitch database
+_SCHEMA_JSON = {
+    'name': 'Open_vSwitch',
+    'version': '7.15.1',
+    'tables': {
+        'Open_vSwitch': {'columns': {
+            'bridges': _ref('Bridge'),
+            'cur_cfg': {'type': 'integer'},
+            'next_cfg': {'type': 'integer'}}},
+        'Bridge': {'columns': {
+            'name': {'type': 'string'},
+            'ports': _ref('Port'),
+            'controller': _ref('Controller'),
+            'fail_mode': _optional('string'),
+            'datapath_id': _optional('string'),
+            'external_ids': _STR_MAP}},
+        'Port': {'columns': {
+            'name': {'type': 'string'},
+            'interfaces': _ref('Interface'),
+            'fake_bridge': {'type': 'boolean'},
+            'tag': _optional('integer'),
+            'qos': _ref('QoS', 1)}},
+        'Interface': {'columns': {
+            'name': {'type': 'string'},
+            'type': {'type': 'string'},
+            'ofport': _optional('integer'),
+            'options': _STR_MAP,
+            'external_ids': _STR_MAP}},
+        'Controller': {'columns': {
+            'target': {'type': 'string'}}},
+        'QoS': {'columns': {
+            'queues': {'type': {'key': 'integer',
+                                'value': {'type': 'uuid',
+                                          'refTable': 'Queue'},
+                                'min': 0, 'max': 'unlimited'}}}},
+        'Queue': {'columns': {
+            'other_config': _STR_MAP}},
+    },
+}
+
+_OVS_UUID = '00000000-0000-0000-0000-000000000001'
+
+
+def _uuid(table, i):
+    return '%08x-0000-0000-0000-%012x' % (len(table), i)
+
+
+def _uuid_set(table, indexes):
+    return ['set', [['uuid', _uuid(table, i)] for i in indexes]]
+
+
+class TestVSCtlReplica(unittest.TestCase):
+    """
+    Test cases for the replica mode of ryu.lib.ovs.vsctl.VSCtl
+    """
+
+    def setUp(self):
+        self.vsctl = vsctl.VSCtl(OVSDB_SWITCH_ADDR)
+        with mock.patch.object(self.vsctl, '_rpc_get_schema_json',
+                               return_value=_SCHEMA_JSON), \
+                mock.patch.object(vsctl.VSCtl, '_idl_wait'), \
+                mock.patch('ryu.lib.hub.spawn'):
+            self.vsctl.start_replica()
+        self.replica = self.vsctl.replica
+        self.replica.run = mock.MagicMock(return_value=False)
+
+        self.events = []
+        self.vsctl.add_listener(
+            lambda event, row, updates: self.events.append(
+                (event, row._table.name)))
+
+        update = {
+            'Open_vSwitch': {_OVS_UUID: {'new': {
+                'bridges': _uuid_set('Bridge', [1]),
+                'cur_cfg': 1, 'next_cfg': 1}}},
+            'Bridge': {_uuid('Bridge', 1): {'new': {
+                'name': 's1', 'ports': _uuid_set('Port', [1, 2, 3])}}},
+            'Port': {},
+            'Interface': {},
+        }
+        for i, name in enumerate(['s1', 's1-eth1', 's1-eth2'], 1):
+            update['Port'][_uuid('Port', i)] = {'new': {
+                'name': name, 'interfaces': _uuid_set('Interface', [i]),
+                'fake_bridge': False}}
+            update['Interface'][_uuid('Interface', i)] = {'new': {
+                'name': name, 'type': 'internal' if i == 1 else ''}}
+        self._update(update)
+
+    def tearDown(self):
+        self.vsctl.stop_replica()
+
+    def _update(self, update):
+        # Emulates Idl.run() receiving the update from OVSDB server
+        self.replica._Idl__parse_update(update, vsctl.idl.OVSDB_UPDATE)
+        self.replica.change_seqno += 1
+
+    def _run_command(self, command, args):
+        command = vsctl.VSCtlCommand(command, args)
+        with mock.patch.object(self.vsctl, '_do_vsctl') as _do_vsctl:
+            self.vsctl.run_command([command])
+        # read-only commands never make a transaction
+        eq_(0, _do_vsctl.call_count)
+        ok_(self.replica.txn is None)
+        return command.result
+
+    def test_read_only_commands(self):
+        eq_(['s1'], self._run_command('list-br', ()))
+        eq_(['s1-eth1', 's1-eth2'], self._run_command('list-ports', ('s1',)))
+        eq_('s1', self._run_command('port-to-br', ('s1-eth2',)))
+        eq_(['s1-eth1'], self._run_command('get', ('Port', 's1-eth1',
+                                                   'name')))
+        eq_(['internal'], self._run_command('get', ('Interface', 's1',
+                                                    'type')))
+        eq_([_uuid('Port', 3)],
+            [str(row.uuid) for row in self._run_command(
+                'list', ('Port', 's1-eth2'))])
+
+    def test_update(self):
+        eq_(8, len(self.events))
+        eq_(['s1-eth1', 's1-eth2'], self._run_command('list-ports', ('s1',)))
+
+        del self.events[:]
+        self._update({
+            'Bridge': {_uuid('Bridge', 1): {
+                'old': {'ports': _uuid_set('Port', [1, 2, 3])},
+                'new': {'name': 's1', 'ports': _uuid_set('Port', [1, 2])}}},
+            'Port': {_uuid('Port', 3): {'old': {'name': 's1-eth2'}}},
+        })
+
+        eq_(sorted([(vsctl.idl.ROW_UPDATE, 'Bridge'),
+                    (vsctl.idl.ROW_DELETE, 'Port')]),
+            sorted(self.events))
+        eq_(['s1-eth1'], self._run_command('list-ports', ('s1',)))
+        eq_([], self._run_command('list', ('Port', 's1-eth2')))
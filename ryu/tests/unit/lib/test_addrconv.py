@@ -16,6 +16,9 @@
 
 import unittest
 from nose.tools import eq_
+from nose.tools import raises
+
+import netaddr
 
 from ryu.lib import addrconv
 
@@ -54,3 +57,42 @@ class Test_addrconv(unittest.TestCase):
     def test_mac(self):
         self._test_conv(addrconv.mac, 'f2:0b:a4:01:0a:23',
                         b'\xf2\x0b\xa4\x01\x0a\x23')
+
+    def test_ipv6_prefix(self):
+        eq_(addrconv.ipv6.text_to_bin('ff38::5/ffff::'),
+            ((b'\xff\x38\x00\x00\x00\x00\x00\x00'
+              b'\x00\x00\x00\x00\x00\x00\x00\x05'),
+             (b'\xff\xff\x00\x00\x00\x00\x00\x00'
+              b'\x00\x00\x00\x00\x00\x00\x00\x00')))
+
+    @raises(netaddr.AddrFormatError)
+    def test_ipv6_invalid(self):
+        addrconv.ipv6.text_to_bin('1::2::3')
+
+    def test_ipv6_bytearray(self):
+        eq_(addrconv.ipv6.bin_to_text(bytearray(b'\xff\x02' + b'\x00' * 13 +
+                                                b'\x01')),
+            'ff02::1')
+
+    def test_mac_dialects(self):
+        bin_value = b'\xf2\x0b\xa4\x01\x0a\x23'
+        eq_(addrconv.mac.text_to_bin('F2:0B:A4:01:0A:23'), bin_value)
+        eq_(addrconv.mac.text_to_bin('f2-0b-a4-01-0a-23'), bin_value)
+        eq_(addrconv.mac.text_to_bin('f20b.a401.0a23'), bin_value)
+        eq_(addrconv.mac.bin_to_text(bytearray(bin_value)),
+            'f2:0b:a4:01:0a:23')
+
+    @raises(netaddr.AddrFormatError)
+    def test_mac_invalid(self):
+        addrconv.mac.text_to_bin('f2:0b:a4:01:0a:2g')
+
+    def test_cache(self):
+        conv = addrconv.MACAddressConverter(
+            netaddr.EUI, netaddr.strategy.eui48, cache_size=2, version=48,
+            dialect=addrconv.mac_mydialect)
+        for _ in range(3):
+            self._test_conv(conv, 'f2:0b:a4:01:0a:23',
+                            b'\xf2\x0b\xa4\x01\x0a\x23')
+        eq_(conv.text_to_bin.cache_info().hits, 2)
+        conv.cache_clear()
+        eq_(conv.text_to_bin.cache_info().currsize, 0)
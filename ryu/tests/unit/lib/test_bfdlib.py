@@ -0,0 +1,194 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from nose.tools import eq_
+from nose.tools import ok_
+
+from ryu.lib import bfdlib
+from ryu.lib.packet import bfd
+from ryu.lib.packet import ipv4
+from ryu.lib.packet import packet
+from ryu.lib.packet import packet_utils
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+
+try:
+    import mock  # Python 2
+except ImportError:
+    from unittest import mock  # Python 3
+
+
+LOG = logging.getLogger(__name__)
+
+SRC_MAC = '00:00:00:00:00:01'
+SRC_IP = '192.168.1.1'
+DST_MAC = '00:00:00:00:00:02'
+DST_IP = '192.168.1.2'
+REMOTE_DISCR = 0x1234
+
+
+class Test_BFDPacket(unittest.TestCase):
+    """
+    Test case for ryu.lib.bfdlib.BFDPacket.
+    """
+
+    def test_set_ipv4_id(self):
+        kwargs = dict(src_mac=SRC_MAC, dst_mac=DST_MAC,
+                      src_ip=SRC_IP, dst_ip=DST_IP,
+                      src_port=49152, dst_port=bfdlib.BFD_CONTROL_UDP_PORT,
+                      state=bfd.BFD_STATE_UP, detect_mult=3,
+                      my_discr=1, your_discr=2)
+        data = bfdlib.BFDPacket.bfd_packet(ipv4_id=1, **kwargs)
+
+        eq_(bfdlib.BFDPacket.bfd_packet(ipv4_id=0xbeef, **kwargs),
+            bfdlib.BFDPacket.set_ipv4_id(data, 0xbeef))
+
+
+class Test_BFDLib(unittest.TestCase):
+    """
+    Test case for BFD sessions of ryu.lib.bfdlib.BFDLib.
+    """
+
+    def setUp(self):
+        self.lib = bfdlib.BFDLib()
+        # advance the timer wheel by hand
+        self.lib.timer_wheel.stop()
+        self.lib.send_event_to_observers = mock.MagicMock()
+
+        self.datapath = mock.MagicMock()
+        self.datapath.id = 1
+        self.datapath.ofproto = ofproto_v1_3
+        self.datapath.ofproto_parser = ofproto_v1_3_parser
+
+    def _advance(self, seconds):
+        self.lib.timer_wheel.advance(
+            int(round(seconds / bfdlib.TIMER_RESOLUTION)))
+
+    def _packet_in(self, state, your_discr=0, ipv4_id=0):
+        data = bfdlib.BFDPacket.bfd_packet(
+            src_mac=DST_MAC, dst_mac=SRC_MAC, src_ip=DST_IP, dst_ip=SRC_IP,
+            ipv4_id=ipv4_id, src_port=49153,
+            dst_port=bfdlib.BFD_CONTROL_UDP_PORT,
+            state=state, detect_mult=3,
+            my_discr=REMOTE_DISCR, your_discr=your_discr,
+            desired_min_tx_interval=50000,
+            required_min_rx_interval=50000)
+        ev = mock.MagicMock()
+        ev.msg.datapath = self.datapath
+        ev.msg.match = {'in_port': 1}
+        ev.msg.data = data
+        self.lib._packet_in_handler(ev)
+
+    def _sent(self, cls):
+        return [args[0] for args, _ in self.datapath.send_msg.call_args_list
+                if isinstance(args[0], cls)]
+
+    def _states(self):
+        return [args[0].new_state for args, _ in
+                self.lib.send_event_to_observers.call_args_list]
+
+    def test_session_up_and_timeout(self):
+        my_discr = self.lib.add_bfd_session(
+            dpid=1, ofport=1, src_mac=SRC_MAC, src_ip=SRC_IP)
+
+        # received packets are processed in the next batch
+        self._packet_in(bfd.BFD_STATE_DOWN)
+        eq_([], self._states())
+        self._advance(bfdlib.TIMER_RESOLUTION)
+        eq_([bfd.BFD_STATE_INIT], self._states())
+
+        sess = self.lib.session[my_discr]
+        eq_(REMOTE_DISCR, sess.your_discr)
+        eq_((DST_MAC, DST_IP), (sess.dst_mac, sess.dst_ip))
+
+        self._packet_in(bfd.BFD_STATE_INIT, your_discr=my_discr)
+        self._advance(bfdlib.TIMER_RESOLUTION)
+        eq_([bfd.BFD_STATE_INIT, bfd.BFD_STATE_UP], self._states())
+
+        # each received packet restarts the Detection Time of 150 ms
+        for _ in range(5):
+            self._advance(0.1)
+            self._packet_in(bfd.BFD_STATE_UP, your_discr=my_discr)
+        eq_(2, len(self._states()))
+
+        # packets waiting for the next batch are still in time
+        self._advance(0.15)
+        eq_(2, len(self._states()))
+
+        self._advance(0.15)
+        eq_([bfd.BFD_STATE_INIT, bfd.BFD_STATE_UP, bfd.BFD_STATE_DOWN],
+            self._states())
+        eq_(bfd.BFD_DIAG_CTRL_DETECT_TIME_EXPIRED, sess._local_diag)
+
+    def test_send(self):
+        self.lib.switch_features_handler(
+            mock.MagicMock(msg=mock.MagicMock(datapath=self.datapath)))
+        my_discr = self.lib.add_bfd_session(
+            dpid=1, ofport=1, src_mac=SRC_MAC, src_ip=SRC_IP,
+            dst_mac=DST_MAC, dst_ip=DST_IP)
+        sess = self.lib.session[my_discr]
+
+        self._packet_in(bfd.BFD_STATE_DOWN)
+        for _ in range(30):
+            self._advance(0.1)
+            self._packet_in(bfd.BFD_STATE_INIT, your_discr=my_discr)
+        self._advance(bfdlib.TIMER_RESOLUTION)
+        eq_(bfd.BFD_STATE_UP, sess._session_state)
+
+        outs = self._sent(ofproto_v1_3_parser.OFPPacketOut)
+        ok_(len(outs) >= 3)
+        ids = []
+        for out in outs:
+            pkt = packet.Packet(out.data)
+            ids.append(pkt.get_protocol(ipv4.ipv4).identification)
+            bfd_pkt = bfdlib.BFDPacket.bfd_parse(out.data)
+            eq_(my_discr, bfd_pkt.my_discr)
+            eq_([1], [action.port for action in out.actions])
+            # valid IPv4 header checksum
+            eq_(0, packet_utils.checksum(out.data[14:34]))
+        eq_(list(range(ids[0], ids[0] + len(ids))), ids)
+
+        # no echo flow without offload
+        eq_(2, len(self._sent(ofproto_v1_3_parser.OFPFlowMod)))
+        eq_(0, bfd_pkt.required_min_echo_rx_interval)
+
+    def test_offload(self):
+        my_discr = self.lib.add_bfd_session(
+            dpid=1, ofport=1, src_mac=SRC_MAC, src_ip=SRC_IP, offload=True)
+        self.lib.switch_features_handler(
+            mock.MagicMock(msg=mock.MagicMock(datapath=self.datapath)))
+        eq_(2, len(self._sent(ofproto_v1_3_parser.OFPFlowMod)))
+
+        # installed when the remote addresses are learned
+        self._packet_in(bfd.BFD_STATE_DOWN)
+        self._advance(bfdlib.TIMER_RESOLUTION)
+        mods = self._sent(ofproto_v1_3_parser.OFPFlowMod)
+        eq_(3, len(mods))
+        match = mods[-1].match
+        eq_((1, SRC_MAC, DST_IP, bfdlib.BFD_ECHO_UDP_PORT),
+            (match['in_port'], match['eth_dst'], match['ipv4_dst'],
+             match['udp_dst']))
+        actions = mods[-1].instructions[0].actions
+        eq_([SRC_MAC, DST_MAC], [action.value for action in actions[:2]])
+        eq_(ofproto_v1_3.OFPP_IN_PORT, actions[2].port)
+
+        self._advance(1.0)
+        out = self._sent(ofproto_v1_3_parser.OFPPacketOut)[-1]
+        bfd_pkt = bfdlib.BFDPacket.bfd_parse(out.data)
+        eq_(my_discr, bfd_pkt.my_discr)
+        ok_(bfd_pkt.required_min_echo_rx_interval > 0)
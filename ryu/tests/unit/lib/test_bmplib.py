@@ -0,0 +1,205 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import gzip
+import io
+import logging
+import shutil
+import tempfile
+import unittest
+
+from nose.tools import eq_
+from nose.tools import ok_
+
+from ryu.lib import bmplib
+from ryu.lib.packet import afi
+from ryu.lib.packet import bgp
+from ryu.lib.packet import bmp
+from ryu.lib.packet import safi
+
+
+LOG = logging.getLogger(__name__)
+
+
+def _route_monitoring(peer_address, nlri=(), withdrawn=(), mp_nlri=(),
+                      as_path=(65001,), timestamp=1500000000.25):
+    path_attributes = [
+        bgp.BGPPathAttributeOrigin(bgp.BGP_ATTR_ORIGIN_IGP),
+        bgp.BGPPathAttributeAsPath([list(as_path)]),
+        bgp.BGPPathAttributeNextHop('192.0.2.254'),
+        bgp.BGPPathAttributeCommunities([65001 << 16 | 100]),
+    ]
+    if mp_nlri:
+        path_attributes.append(bgp.BGPPathAttributeMpReachNLRI(
+            afi.IP6, safi.UNICAST, '2001:db8::1',
+            [bgp.IP6AddrPrefix(64, prefix) for prefix in mp_nlri]))
+    update = bgp.BGPUpdate(
+        withdrawn_routes=[bgp.BGPWithdrawnRoute(24, prefix)
+                          for prefix in withdrawn],
+        path_attributes=path_attributes if nlri or mp_nlri else [],
+        nlri=[bgp.BGPNLRI(24, prefix) for prefix in nlri])
+    msg = bmp.BMPRouteMonitoring(
+        bgp_update=update, peer_type=bmp.BMP_PEER_TYPE_GLOBAL,
+        is_post_policy=False, peer_distinguisher=0,
+        peer_address=peer_address, peer_as=65001,
+        peer_bgp_id='192.0.2.1', timestamp=timestamp)
+    return bytes(msg.serialize())
+
+
+def _peer_down(peer_address):
+    msg = bmp.BMPPeerDownNotification(
+        reason=bmp.BMP_PEER_DOWN_REASON_REMOTE_NO_NOTIFICATION, data=None,
+        peer_type=bmp.BMP_PEER_TYPE_GLOBAL, is_post_policy=False,
+        peer_distinguisher=0, peer_address=peer_address, peer_as=65001,
+        peer_bgp_id='192.0.2.1', timestamp=1500000001.0)
+    return bytes(msg.serialize())
+
+
+class Test_BMPFramer(unittest.TestCase):
+    """
+    Test case for ryu.lib.bmplib.BMPFramer.
+    """
+
+    def test_feed(self):
+        msgs = [_route_monitoring('10.0.0.1', nlri=['172.16.%d.0' % i])
+                for i in range(3)]
+        data = b''.join(msgs)
+        framer = bmplib.BMPFramer()
+
+        frames = []
+        for i in range(0, len(data), 7):
+            frames.extend(framer.feed(data[i:i + 7]))
+
+        eq_(msgs, frames)
+        eq_(0, len(framer))
+
+        # messages in one chunk refer to the chunk
+        frames = framer.feed(data)
+        eq_(msgs, frames)
+        ok_(all(frame.obj is data for frame in frames))
+
+    def test_unsupported_version(self):
+        data = bytearray(_route_monitoring('10.0.0.1', nlri=['172.16.0.0']))
+        data[0] = 1
+
+        self.assertRaises(ValueError, bmplib.BMPFramer().feed, bytes(data))
+
+
+class Test_BMPCollector(unittest.TestCase):
+    """
+    Test case for ryu.lib.bmplib.BMPCollector.
+    """
+
+    def setUp(self):
+        self.events = []
+        self.collector = bmplib.BMPCollector('127.0.0.1', exporter=self,
+                                             batch_size=2)
+
+    def write(self, events):
+        self.events.extend(events)
+
+    def test_adj_rib_in(self):
+        self.collector.feed(b''.join([
+            _route_monitoring('10.0.0.1', nlri=['172.16.0.0', '172.16.1.0']),
+            _route_monitoring('10.0.0.2', nlri=['172.16.0.0']),
+            _route_monitoring('10.0.0.1', withdrawn=['172.16.1.0'],
+                              mp_nlri=['2001:db8:1::']),
+        ]))
+        # the last message waits for the rest of its batch
+        eq_(3, len(self.events))
+        self.collector.flush()
+
+        eq_([(e.peer.peer_address, e.action, e.prefix) for e in self.events],
+            [('10.0.0.1', 'A', '172.16.0.0/24'),
+             ('10.0.0.1', 'A', '172.16.1.0/24'),
+             ('10.0.0.2', 'A', '172.16.0.0/24'),
+             ('10.0.0.1', 'W', '172.16.1.0/24'),
+             ('10.0.0.1', 'A', '2001:db8:1::/64')])
+        rib = self.collector.rib('10.0.0.1')
+        eq_(['172.16.0.0/24', '2001:db8:1::/64'], sorted(rib))
+        eq_('192.0.2.254', rib['172.16.0.0/24'].next_hop)
+        eq_('2001:db8::1', rib['2001:db8:1::/64'].next_hop)
+        # routes with the same attributes share them
+        ok_(self.events[0].attrs is self.events[2].attrs)
+        eq_(('192.0.2.254', '65001', 'i', '', '', '65001:100'),
+            self.events[0].attrs.columns)
+
+    def test_peer_down(self):
+        self.collector.feed(b''.join([
+            _route_monitoring('10.0.0.1', nlri=['172.16.0.0', '172.16.1.0']),
+            _route_monitoring('10.0.0.2', nlri=['172.16.0.0']),
+            _peer_down('10.0.0.1'),
+        ]))
+
+        eq_([(e.peer.peer_address, e.action, e.prefix)
+             for e in self.events[3:]],
+            [('10.0.0.1', 'W', '172.16.0.0/24'),
+             ('10.0.0.1', 'W', '172.16.1.0/24')])
+        eq_({}, self.collector.rib('10.0.0.1'))
+        eq_(['172.16.0.0/24'], list(self.collector.rib('10.0.0.2')))
+
+    def test_failed_message(self):
+        failed = []
+        collector = bmplib.BMPCollector(
+            '127.0.0.1', exporter=self,
+            error_handler=lambda frame, e: failed.append(frame))
+        data = bytearray(_route_monitoring('10.0.0.1', nlri=['172.16.0.0']))
+        data[bmplib._BGP_OFFSET + 18] = bgp.BGP_MSG_KEEPALIVE
+        good = _route_monitoring('10.0.0.1', nlri=['172.16.1.0'])
+
+        eq_(1, bmplib.replay(io.BytesIO(bytes(data) + good), collector))
+        eq_([bytes(data)], failed)
+        eq_(1, collector.failed_count)
+
+
+class Test_RotatingCSVExporter(unittest.TestCase):
+    """
+    Test case for ryu.lib.bmplib.RotatingCSVExporter.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_rotate(self):
+        exporter = bmplib.RotatingCSVExporter(self.tmp_dir, max_rows=2)
+        collector = bmplib.BMPCollector('127.0.0.1', exporter=exporter)
+        bmplib.replay(io.BytesIO(b''.join([
+            _route_monitoring('10.0.0.1', nlri=['172.16.0.0', '172.16.1.0'],
+                              as_path=(65001, 65002)),
+            _route_monitoring('10.0.0.1', withdrawn=['172.16.0.0']),
+        ])), collector)
+        exporter.close()
+
+        eq_(2, len(exporter.files))
+        rows = []
+        for filename in exporter.files:
+            with io.TextIOWrapper(gzip.open(filename, 'rb'),
+                                  newline='') as f:
+                reader = csv.reader(f)
+                eq_(list(bmplib.RotatingCSVExporter.COLUMNS), next(reader))
+                rows.extend(reader)
+        eq_([['1500000000.250000', '127.0.0.1', '10.0.0.1', '65001', '0',
+              'A', '172.16.0.0/24', '192.0.2.254', '65001 65002', 'i', '',
+              '', '65001:100'],
+             ['1500000000.250000', '127.0.0.1', '10.0.0.1', '65001', '0',
+              'A', '172.16.1.0/24', '192.0.2.254', '65001 65002', 'i', '',
+              '', '65001:100'],
+             ['1500000000.250000', '127.0.0.1', '10.0.0.1', '65001', '0',
+              'W', '172.16.0.0/24', '', '', '', '', '', '']],
+            rows)
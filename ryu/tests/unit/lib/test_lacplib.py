@@ -0,0 +1,152 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from nose.tools import eq_
+from nose.tools import ok_
+
+from ryu.lib import lacplib
+from ryu.lib.packet import ethernet
+from ryu.lib.packet import packet
+from ryu.lib.packet import slow
+from ryu.ofproto import ether
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+
+try:
+    import mock  # Python 2
+except ImportError:
+    from unittest import mock  # Python 3
+
+
+LOG = logging.getLogger(__name__)
+
+PARTNER_MAC = '00:00:00:00:00:0a'
+
+
+def _lacp_packet(timeout):
+    pkt = packet.Packet()
+    pkt.add_protocol(ethernet.ethernet(slow.SLOW_PROTOCOL_MULTICAST,
+                                       PARTNER_MAC, ether.ETH_TYPE_SLOW))
+    pkt.add_protocol(slow.lacp(
+        actor_system_priority=0xffff, actor_system=PARTNER_MAC,
+        actor_key=1, actor_port_priority=0xff, actor_port=1,
+        actor_state_activity=slow.lacp.LACP_STATE_ACTIVE,
+        actor_state_timeout=timeout,
+        actor_state_aggregation=slow.lacp.LACP_STATE_AGGREGATEABLE,
+        partner_system='00:00:00:00:00:00'))
+    pkt.serialize()
+    return bytes(pkt.data)
+
+
+class Test_LacpLib(unittest.TestCase):
+    """
+    Test case for ryu.lib.lacplib.LacpLib.
+    """
+
+    def setUp(self):
+        self.lib = lacplib.LacpLib()
+        # advance the timer wheel by hand
+        self.lib.timer_wheel.stop()
+        self.lib.send_event_to_observers = mock.MagicMock()
+        self.lib.add(dpid=1, ports=[1, 2])
+
+        self.datapath = mock.MagicMock()
+        self.datapath.id = 1
+        self.datapath.ofproto = ofproto_v1_3
+        self.datapath.ofproto_parser = ofproto_v1_3_parser
+        self.datapath.ports = {
+            1: mock.MagicMock(hw_addr='00:00:00:00:00:01'),
+            2: mock.MagicMock(hw_addr='00:00:00:00:00:02'),
+            ofproto_v1_3.OFPP_LOCAL: mock.MagicMock(
+                hw_addr='00:00:00:00:00:ff'),
+        }
+
+    def _packet_in(self, data, port=1):
+        ev = mock.MagicMock()
+        ev.msg.datapath = self.datapath
+        ev.msg.match = {'in_port': port}
+        ev.msg.data = data
+        self.lib.packet_in_handler(ev)
+
+    def _flow_removed(self, port=1):
+        ev = mock.MagicMock()
+        ev.msg.datapath = self.datapath
+        ev.msg.match = {'in_port': port, 'eth_type': ether.ETH_TYPE_SLOW}
+        self.lib.flow_removed_handler(ev)
+
+    def _sent(self, cls):
+        return [args[0] for args, _ in self.datapath.send_msg.call_args_list
+                if isinstance(args[0], cls)]
+
+    def _events(self):
+        return [(args[0].port, args[0].enabled) for args, _ in
+                self.lib.send_event_to_observers.call_args_list]
+
+    def test_response(self):
+        data = _lacp_packet(slow.lacp.LACP_STATE_SHORT_TIMEOUT)
+        self._packet_in(data)
+        eq_([(1, True)], self._events())
+
+        mods = self._sent(ofproto_v1_3_parser.OFPFlowMod)
+        eq_([slow.lacp.SHORT_TIMEOUT_TIME], [m.idle_timeout for m in mods])
+
+        outs = self._sent(ofproto_v1_3_parser.OFPPacketOut)
+        eq_(1, len(outs))
+        res = packet.Packet(outs[0].data).get_protocol(slow.lacp)
+        eq_(PARTNER_MAC, res.partner_system)
+        eq_(1, res.actor_port)
+
+        # the same LACP is answered by the same response without parsing
+        with mock.patch.object(lacplib.packet, 'Packet') as packet_cls:
+            self._packet_in(data)
+            ok_(not packet_cls.called)
+        outs = self._sent(ofproto_v1_3_parser.OFPPacketOut)
+        eq_(2, len(outs))
+        eq_(outs[0].data, outs[1].data)
+        eq_(1, outs[1].in_port)
+        eq_(1, len(self._sent(ofproto_v1_3_parser.OFPFlowMod)))
+        eq_([(1, True)], self._events())
+
+        # another LACP is parsed
+        self._packet_in(_lacp_packet(slow.lacp.LACP_STATE_LONG_TIMEOUT))
+        mods = self._sent(ofproto_v1_3_parser.OFPFlowMod)
+        eq_(slow.lacp.LONG_TIMEOUT_TIME, mods[-1].idle_timeout)
+
+    def test_timeout(self):
+        data = _lacp_packet(slow.lacp.LACP_STATE_SHORT_TIMEOUT)
+        ticks = int(slow.lacp.SHORT_TIMEOUT_TIME / lacplib.TIMER_RESOLUTION)
+
+        self._packet_in(data)
+        self.lib.timer_wheel.advance(ticks - 1)
+        self._packet_in(data)
+        self.lib.timer_wheel.advance(ticks - 1)
+        eq_([(1, True)], self._events())
+
+        self.lib.timer_wheel.advance(1)
+        eq_([(1, True), (1, False)], self._events())
+
+        # already detected by the timer
+        self._flow_removed()
+        eq_([(1, True), (1, False)], self._events())
+
+        # up again, and detected by the switch
+        self._packet_in(data)
+        eq_(2, len(self._sent(ofproto_v1_3_parser.OFPFlowMod)))
+        self._flow_removed()
+        self.lib.timer_wheel.advance(ticks)
+        eq_([(1, True), (1, False), (1, True), (1, False)], self._events())
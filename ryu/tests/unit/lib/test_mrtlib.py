@@ -19,8 +19,10 @@ import bz2
 import io
 import logging
 import os
+import shutil
 import struct
 import sys
+import tempfile
 import unittest
 
 try:
@@ -93,6 +95,91 @@ class TestMrtlib(unittest.TestCase):
             eq_(True, mrt_writer._f.closed)
 
 
+class TestMrtlibIndexedReader(unittest.TestCase):
+    """
+    Test case for ryu.lib.mrtlib.IndexedReader.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _decompress(self, name):
+        filename = os.path.join(self.tmp_dir, name[:-len('.bz2')])
+        with open(filename, 'wb') as f:
+            f.write(bz2.BZ2File(os.path.join(MRT_DATA_DIR, name)).read())
+        return filename
+
+    def test_records(self):
+        filename = self._decompress('updates.20161101.0000.bz2')
+        expected = [str(record) for record in
+                    mrtlib.Reader(open(filename, 'rb'))]
+
+        reader = mrtlib.IndexedReader(filename, processes=2, chunk_size=500)
+        eq_(len(expected), len(reader))
+        eq_(expected, [str(record) for record in reader.records()])
+        eq_(expected[100], str(reader.record(100)))
+        eq_([], list(reader.rib_entries()))
+        reader.close()
+
+    def test_rib_entries(self):
+        filename = self._decompress('rib.20161101.0000_pick.bz2')
+        records = list(mrtlib.Reader(open(filename, 'rb')))
+        expected = []
+        for record in records[1:]:
+            for rib_entry in record.message.rib_entries:
+                expected.append((record.message.prefix.prefix,
+                                 rib_entry.peer_index,
+                                 str(rib_entry.bgp_attributes)))
+
+        reader = mrtlib.IndexedReader(filename, processes=1)
+        eq_([str(peer) for peer in records[0].message.peer_entries],
+            [str(peer) for peer in reader.peers])
+        entries = list(reader.rib_entries())
+        eq_(expected, [
+            (entry.prefix, entry.peer_index,
+             str(mrtlib.MrtRibEntry.parse_bgp_attributes(
+                 entry.bgp_attributes)))
+            for entry in entries])
+
+        prefix = records[2].message.prefix.prefix
+        eq_([str(records[2])],
+            [str(record) for record in reader.find_prefix(prefix)])
+        eq_([], reader.find_prefix('192.0.2.0/24'))
+
+        peer_index = entries[0].peer_index
+        eq_([entry for entry in entries if entry.peer_index == peer_index],
+            list(reader.find_peer(peer_index)))
+
+    def test_index_file(self):
+        filename = self._decompress('rib.20161101.0000_pick.bz2')
+        index_file = filename + '.idx'
+        reader = mrtlib.IndexedReader(filename, index_file=index_file,
+                                      processes=1)
+        ok_(os.path.exists(index_file))
+
+        with mock.patch.object(mrtlib.MrtIndex, 'build') as mock_build:
+            loaded = mrtlib.IndexedReader(filename, index_file=index_file,
+                                          processes=1)
+        ok_(not mock_build.called)
+        eq_(list(reader.index.offsets), list(loaded.index.offsets))
+        eq_(list(reader.rib_entries()), list(loaded.rib_entries()))
+        prefix = loaded.index._prefixes[1]
+        eq_(reader.index.find_prefix(prefix), loaded.index.find_prefix(prefix))
+        eq_(reader.index.find_peer(3), loaded.index.find_peer(3))
+
+        # Outdated index file is rebuilt.
+        with open(filename, 'ab') as f:
+            f.write(reader.record(1).serialize())
+        rebuilt = mrtlib.IndexedReader(filename, index_file=index_file,
+                                       processes=1)
+        eq_(len(reader) + 1, len(rebuilt))
+        eq_(len(rebuilt), len(mrtlib.MrtIndex.load(
+            index_file, os.stat(filename))))
+
+
 class TestMrtlibMrtRecord(unittest.TestCase):
     """
     Test case for ryu.lib.mrtlib.MrtRecord.
@@ -14,10 +14,15 @@
 # limitations under the License.
 
 import logging
+import time
 import unittest
 
+from ryu.lib import hub
 from ryu.lib import ofctl_utils
+from ryu.lib import ofctl_v1_3
 from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.ofproto.ofproto_protocol import ProtocolDesc
 
 
 LOG = logging.getLogger(__name__)
@@ -140,3 +145,104 @@ class Test_ofctl_utils(unittest.TestCase):
             'ALL',
             self.util.ofp_queue_to_user(ofproto_v1_3.OFPQ_ALL)
         )
+
+
+class _Datapath(ProtocolDesc):
+    # replies to each request after a delay, from a separate green thread
+
+    def __init__(self, dpid, waiters, delay=0.1, parts=1):
+        super(_Datapath, self).__init__(ofproto_v1_3.OFP_VERSION)
+        self.id = dpid
+        self.xid = 0
+        self.waiters = waiters
+        self.delay = delay
+        self.parts = parts
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.set_xid(self.xid)
+        return self.xid
+
+    def send_msg(self, msg):
+        hub.spawn(self._reply, msg.xid)
+
+    def _reply(self, xid):
+        for i in range(self.parts):
+            hub.sleep(self.delay)
+            flags = 0
+            if i < self.parts - 1:
+                flags = ofproto_v1_3.OFPMPF_REPLY_MORE
+            body = [ofproto_v1_3_parser.OFPPortStats(
+                port_no=1, rx_packets=self.id, tx_packets=0, rx_bytes=0,
+                tx_bytes=0, rx_dropped=0, tx_dropped=0, rx_errors=0,
+                tx_errors=0, rx_frame_err=0, rx_over_err=0, rx_crc_err=0,
+                collisions=0, duration_sec=0, duration_nsec=0)]
+            reply = ofproto_v1_3_parser.OFPPortStatsReply(
+                self, flags=flags, body=body)
+            reply.xid = xid
+            # same as ofctl_rest.stats_reply_handler
+            if xid not in self.waiters.get(self.id, {}):
+                return
+            lock, msgs = self.waiters[self.id][xid]
+            msgs.append(reply)
+            if flags:
+                continue
+            del self.waiters[self.id][xid]
+            lock.set()
+
+
+class Test_stats_future(unittest.TestCase):
+
+    def _request(self, dp):
+        return dp.ofproto_parser.OFPPortStatsRequest(
+            dp, 0, dp.ofproto.OFPP_ANY)
+
+    def test_pipelined(self):
+        waiters = {}
+        dps = [_Datapath(i, waiters) for i in range(1, 51)]
+
+        start = time.time()
+        futures = [ofctl_utils.send_stats_request_async(
+            dp, self._request(dp), waiters) for dp in dps]
+        results = ofctl_utils.wait_stats_futures(futures)
+        elapsed = time.time() - start
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(list(range(1, 51)),
+                         [msgs[0].body[0].rx_packets for msgs in results])
+        # one round trip for all the datapaths, not one per datapath
+        self.assertTrue(elapsed < 1.0)
+
+    def test_multipart(self):
+        waiters = {}
+        dp = _Datapath(1, waiters, delay=0.01, parts=3)
+        future = ofctl_utils.send_stats_request_async(
+            dp, self._request(dp), waiters)
+
+        self.assertEqual(3, len(future.result()))
+        self.assertTrue(future.done())
+        self.assertEqual({}, waiters[dp.id])
+
+    def test_timeout(self):
+        waiters = {}
+        dp = _Datapath(1, waiters, delay=0.5)
+        future = ofctl_utils.send_stats_request_async(
+            dp, self._request(dp), waiters)
+
+        self.assertFalse(future.wait(timeout=0.05))
+        self.assertFalse(future.done())
+        self.assertEqual({}, waiters[dp.id])
+
+    def test_get_stats_concurrently(self):
+        waiters = {}
+        dps = [_Datapath(i, waiters) for i in range(1, 11)]
+
+        start = time.time()
+        stats = ofctl_utils.get_stats_concurrently(
+            ofctl_v1_3.get_port_stats, dps, waiters)
+        elapsed = time.time() - start
+
+        self.assertEqual(sorted(stats.keys()), list(range(1, 11)))
+        for dpid, value in stats.items():
+            self.assertEqual(dpid, value[str(dpid)][0]['rx_packets'])
+        self.assertTrue(elapsed < 1.0)
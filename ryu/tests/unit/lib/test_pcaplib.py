@@ -15,10 +15,14 @@
 
 from __future__ import print_function
 
+import io
 import logging
 import os
+import shutil
 import struct
 import sys
+import tempfile
+import threading
 import unittest
 
 try:
@@ -27,6 +31,7 @@ except ImportError:
     from unittest import mock  # Python 3
 
 from nose.tools import eq_
+from nose.tools import ok_
 from nose.tools import raises
 
 from ryu.utils import binary_str
@@ -182,6 +187,38 @@ class Test_pcaplib_Reader(unittest.TestCase):
     def test_with_little_endian(self):
         self._test(os.path.join(PCAP_PACKET_DATA_DIR, 'little_endian.pcap'))
 
+    def test_zero_copy(self):
+        file_name = os.path.join(PCAP_PACKET_DATA_DIR, 'little_endian.pcap')
+        with pcaplib.Reader(open(file_name, 'rb'), zero_copy=True) as reader:
+            outputs = [(ts, buf.tobytes()) for ts, buf in reader]
+
+        eq_(self.expected_outputs, outputs)
+
+    def test_stream(self):
+        file_name = os.path.join(PCAP_PACKET_DATA_DIR, 'big_endian.pcap')
+        with open(file_name, 'rb') as f:
+            stream = io.BytesIO(f.read())
+        outputs = list(pcaplib.Reader(stream))
+
+        eq_(self.expected_outputs, outputs)
+
+    def _test_next_batch(self, file_obj):
+        reader = pcaplib.Reader(file_obj)
+        batch = reader.next_batch(1)
+        eq_([self.expected_outputs[0][0]], list(batch.timestamps))
+        batch = reader.next_batch()
+        eq_([self.expected_outputs[1][0]], list(batch.timestamps))
+        eq_([len(self.expected_outputs[1][1])], list(batch.incl_lens))
+        # record headers of 16 bytes follow the file header of 24 bytes
+        eq_([24 + 16 + 11 + 16], list(batch.offsets))
+        eq_(0, len(reader.next_batch().offsets))
+
+    def test_next_batch(self):
+        file_name = os.path.join(PCAP_PACKET_DATA_DIR, 'big_endian.pcap')
+        self._test_next_batch(open(file_name, 'rb'))
+        with open(file_name, 'rb') as f:
+            self._test_next_batch(io.BytesIO(f.read()))
+
 
 class DummyFile(object):
 
@@ -228,3 +265,98 @@ class Test_pcaplib_Writer(unittest.TestCase):
         expected_buf = b'hoge'  # b'hogehoge'[:snaplen]
         eq_(expected_buf, f.buf)
         eq_(snaplen, len(f.buf))
+
+    @staticmethod
+    def test_with_buffer():
+        f = DummyFile()
+        w = pcaplib.Writer(f, buffer_size=100)
+        eq_(b'', f.buf)
+        w.write_pkt(b'test_data_1', ts=0)
+        eq_(b'', f.buf)
+        w.write_pkt(b'x' * 100, ts=0)
+        # 24 + (16 + 11) + (16 + 100) octets
+        eq_(167, len(f.buf))
+        w.write_pkt(b'test_data_2', ts=0)
+        w.close()
+        eq_(194, len(f.buf))
+
+    @staticmethod
+    def test_with_flush_interval():
+        f = DummyFile()
+        w = pcaplib.Writer(f, buffer_size=1000, flush_interval=0)
+        w.write_pkt(b'test_data_1', ts=0)
+        eq_(51, len(f.buf))
+
+
+class Test_pcaplib_RotatingWriter(unittest.TestCase):
+    """
+    Test case for pcaplib.RotatingWriter class
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.tmp_dir, 'test.pcap')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _read(self, index):
+        reader = pcaplib.Reader(open('%s.%d' % (self.file_name, index), 'rb'))
+        return [buf for _ts, buf in reader]
+
+    def test_rotate_by_size(self):
+        # file header (24) + 2 * (packet header (16) + packet (10))
+        w = pcaplib.RotatingWriter(self.file_name, max_bytes=76,
+                                   backup_count=2)
+        for i in range(5):
+            w.write_pkt(b'packet_%03d' % i, ts=0)
+        w.close()
+
+        eq_([b'packet_004'], self._read(0))
+        eq_([b'packet_002', b'packet_003'], self._read(1))
+        ok_(not os.path.exists('%s.2' % self.file_name))
+
+    def test_rotate_by_interval(self):
+        w = pcaplib.RotatingWriter(self.file_name, interval=0,
+                                   backup_count=3)
+        for i in range(3):
+            w.write_pkt(b'packet_%03d' % i, ts=0)
+        w.close()
+
+        for i in range(3):
+            eq_([b'packet_%03d' % i], self._read(i))
+
+
+class Test_pcaplib_AsyncWriter(unittest.TestCase):
+    """
+    Test case for pcaplib.AsyncWriter class
+    """
+
+    def test_write(self):
+        f = DummyFile()
+        w = pcaplib.AsyncWriter(pcaplib.Writer(f, buffer_size=1000))
+        w.write_pkt(b'test_data_1', ts=0)
+        w.write_pkt(b'test_data_2', ts=0)
+        eq_(b'', f.buf)
+        w.close()
+        eq_(24 + 2 * (16 + 11), len(f.buf))
+        eq_(0, w.dropped)
+
+    def test_write_in_thread(self):
+        f = DummyFile()
+        w = pcaplib.AsyncWriter(pcaplib.Writer(f))
+        threads = []
+        f.write = lambda buf: threads.append(threading.current_thread())
+        w.write_pkt(b'test_data_1', ts=0)
+        w.close()
+        ok_(threads)
+        ok_(threading.current_thread() not in threads)
+
+    def test_queue_full(self):
+        f = DummyFile()
+        w = pcaplib.AsyncWriter(pcaplib.Writer(f), queue_size=1)
+        w.write_pkt(b'test_data_1', ts=0)
+        w.write_pkt(b'test_data_2', ts=0)
+        eq_(1, w.dropped)
+        w.close()
+        eq_(24 + 16 + 11, len(f.buf))
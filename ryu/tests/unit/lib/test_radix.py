@@ -0,0 +1,90 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import socket
+import unittest
+
+from nose.tools import eq_
+from nose.tools import ok_
+from nose.tools import raises
+
+from ryu.lib import radix
+
+
+LOG = logging.getLogger(__name__)
+
+
+class Test_RadixTree(unittest.TestCase):
+    """
+    Test case for ryu.lib.radix.RadixTree.
+    """
+
+    def setUp(self):
+        self.tree = radix.RadixTree(socket.AF_INET)
+        for prefix in ['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24',
+                       '10.128.0.0/9', '192.168.0.0/24', '0.0.0.0/0']:
+            self.tree[prefix] = prefix
+
+    def test_lookup(self):
+        eq_(('10.1.2.0/24', '10.1.2.0/24'), self.tree.lookup('10.1.2.3'))
+        eq_(('10.1.0.0/16', '10.1.0.0/16'), self.tree.lookup('10.1.3.3'))
+        eq_(('10.128.0.0/9', '10.128.0.0/9'), self.tree.lookup('10.200.0.1'))
+        eq_(('10.0.0.0/8', '10.0.0.0/8'), self.tree.lookup('10.2.0.1'))
+        eq_(('0.0.0.0/0', '0.0.0.0/0'), self.tree.lookup('192.168.1.1'))
+
+        del self.tree['0.0.0.0/0']
+        eq_(None, self.tree.lookup('192.168.1.1'))
+
+    def test_mapping(self):
+        eq_(6, len(self.tree))
+        eq_('10.1.0.0/16', self.tree['10.1.0.0/16'])
+        # host bits are ignored
+        ok_('10.1.2.128/24' in self.tree)
+        ok_('10.1.2.0/25' not in self.tree)
+        eq_(None, self.tree.get('10.1.2.0/25'))
+        eq_(['0.0.0.0/0', '10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24',
+             '10.128.0.0/9', '192.168.0.0/24'], list(self.tree))
+
+        self.tree['10.1.0.0/16'] = 'b'
+        eq_(6, len(self.tree))
+        eq_('b', self.tree['10.1.0.0/16'])
+
+    def test_delete(self):
+        for prefix in ['10.1.0.0/16', '10.0.0.0/8', '0.0.0.0/0',
+                       '10.1.2.0/24']:
+            del self.tree[prefix]
+        eq_(['10.128.0.0/9', '192.168.0.0/24'], list(self.tree))
+        eq_(None, self.tree.lookup('10.1.2.3'))
+
+        del self.tree['10.128.0.0/9']
+        del self.tree['192.168.0.0/24']
+        eq_(0, len(self.tree))
+        eq_(None, self.tree._root)
+
+    @raises(KeyError)
+    def test_delete_missing(self):
+        # 0.0.0.0/0 is kept as a glue node joining the other prefixes
+        del self.tree['0.0.0.0/0']
+        del self.tree['0.0.0.0/0']
+
+    def test_ipv6(self):
+        tree = radix.RadixTree(socket.AF_INET6)
+        tree['2001:db8::/32'] = 'a'
+        tree['2001:db8:1::/48'] = 'b'
+
+        eq_(('2001:db8:1::/48', 'b'), tree.lookup('2001:db8:1::1'))
+        eq_(('2001:db8::/32', 'a'), tree.lookup('2001:db8:2::1'))
+        eq_(None, tree.lookup('2001:db9::1'))
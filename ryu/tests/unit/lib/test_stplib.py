@@ -0,0 +1,165 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import random
+import unittest
+
+from nose.tools import eq_
+from nose.tools import ok_
+
+from ryu.lib import stplib
+from ryu.lib import timerwheel
+from ryu.lib.packet import bpdu
+from ryu.lib.packet import ethernet
+from ryu.lib.packet import llc
+from ryu.lib.packet import packet
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+
+try:
+    import mock  # Python 2
+except ImportError:
+    from unittest import mock  # Python 3
+
+
+LOG = logging.getLogger(__name__)
+
+
+def _config_bpdu(root_priority, root_mac, root_path_cost, bridge_mac,
+                 port_number, flags=0):
+    length = (bpdu.bpdu._PACK_LEN + bpdu.ConfigurationBPDUs.PACK_LEN
+              + llc.llc._PACK_LEN + llc.ControlFormatU._PACK_LEN)
+    pkt = packet.Packet()
+    pkt.add_protocol(ethernet.ethernet(bpdu.BRIDGE_GROUP_ADDRESS,
+                                       bridge_mac, length))
+    pkt.add_protocol(llc.llc(llc.SAP_BPDU, llc.SAP_BPDU,
+                             llc.ControlFormatU()))
+    pkt.add_protocol(bpdu.ConfigurationBPDUs(
+        flags=flags, root_priority=root_priority, root_mac_address=root_mac,
+        root_path_cost=root_path_cost, bridge_priority=root_priority,
+        bridge_mac_address=bridge_mac, port_number=port_number,
+        message_age=1))
+    pkt.serialize()
+    return bytes(pkt.data)
+
+
+class Test_Stp(unittest.TestCase):
+    """
+    Test case for comparisons of ryu.lib.stplib.Stp.
+    """
+
+    def test_compare_root_path(self):
+        for _ in range(1000):
+            args = [random.choice([0, 1, 19, 0xffffffff]),
+                    random.choice([0, 1, 19, 0xffffffff]),
+                    random.choice([0, 1, 0xffffffffffffffff]),
+                    random.choice([0, 1, 0xffffffffffffffff]),
+                    random.choice([0, 1, 0xffff]),
+                    random.choice([0, 1, 0xffff])]
+            expected = stplib.Stp._cmp_value(args[0::2], args[1::2])
+            eq_(expected, stplib.Stp.compare_root_path(*args))
+
+    def test_priority_value(self):
+        low = stplib.BridgeId(4096, 0, '00:00:00:00:00:02')
+        high = stplib.BridgeId(32768, 0, '00:00:00:00:00:01')
+        port_id = stplib.PortId(128, 1)
+
+        ok_(stplib.Priority(low, 100, high, port_id).value
+            < stplib.Priority(high, 0, low, port_id).value)
+        ok_(stplib.Priority(high, 0, None, None).value
+            < stplib.Priority(high, 0, low, port_id).value)
+
+
+class Test_Bridge(unittest.TestCase):
+    """
+    Test case for ryu.lib.stplib.Bridge driven by a timer wheel.
+    """
+
+    def setUp(self):
+        self.dp = mock.MagicMock()
+        self.dp.id = 1
+        self.dp.ofproto = ofproto_v1_3
+        self.dp.ofproto_parser = ofproto_v1_3_parser
+        self.dp.ports = {}
+        for port_no in (1, 2):
+            self.dp.ports[port_no] = ofproto_v1_3_parser.OFPPort(
+                port_no=port_no, hw_addr='00:00:00:00:01:%02x' % port_no,
+                name=b'eth%d' % port_no, config=0, state=0,
+                curr=ofproto_v1_3.OFPPF_1GB_FD, advertised=0, supported=0,
+                peer=0, curr_speed=0, max_speed=0)
+
+        self.events = []
+        self.wheel = timerwheel.TimerWheel(stplib.TIMER_RESOLUTION)
+        self.bridge = stplib.Bridge(self.dp, LOG, {}, self.events.append,
+                                    self.wheel)
+
+    def _advance(self, seconds):
+        self.wheel.advance(int(round(seconds / self.wheel.resolution)))
+
+    def _packet_in(self, port_no, data):
+        field = mock.MagicMock(header=ofproto_v1_3.OXM_OF_IN_PORT,
+                               value=port_no)
+        msg = mock.MagicMock(datapath=self.dp, data=data)
+        msg.match.fields = [field]
+        self.bridge.packet_in_handler(msg)
+
+    def _states(self):
+        return dict((port_no, (port.role, port.state))
+                    for port_no, port in self.bridge.ports.items())
+
+    def test_state_machine(self):
+        eq_({1: (stplib.DESIGNATED_PORT, stplib.PORT_STATE_LISTEN),
+             2: (stplib.DESIGNATED_PORT, stplib.PORT_STATE_LISTEN)},
+            self._states())
+        self._advance(bpdu.DEFAULT_FORWARD_DELAY)
+        eq_(stplib.PORT_STATE_LEARN, self.bridge.ports[1].state)
+        self._advance(bpdu.DEFAULT_FORWARD_DELAY)
+        eq_(stplib.PORT_STATE_FORWARD, self.bridge.ports[1].state)
+
+        # config BPDUs of each port every hello time, sent once at start
+        eq_(2 * (1 + 2 * bpdu.DEFAULT_FORWARD_DELAY //
+                 bpdu.DEFAULT_HELLO_TIME),
+            self.dp.send_packet_out.call_count)
+
+    def test_root_port(self):
+        data = _config_bpdu(4096, '00:00:00:00:00:01', 0,
+                            '00:00:00:00:00:01', 1)
+        self._packet_in(1, data)
+        ok_(not self.bridge.is_root_bridge)
+        eq_({1: (stplib.ROOT_PORT, stplib.PORT_STATE_LISTEN),
+             2: (stplib.DESIGNATED_PORT, stplib.PORT_STATE_LISTEN)},
+            self._states())
+
+        # repeated BPDUs are not parsed again and keep the root port
+        with mock.patch.object(stplib.packet, 'Packet') as packet_:
+            for _ in range(10):
+                self._advance(bpdu.DEFAULT_HELLO_TIME)
+                self._packet_in(1, data)
+        eq_(0, packet_.call_count)
+        eq_(stplib.ROOT_PORT, self.bridge.ports[1].role)
+
+        # no BPDU until max age
+        self._advance(bpdu.DEFAULT_MAX_AGE)
+        ok_(self.bridge.is_root_bridge)
+        eq_(stplib.DESIGNATED_PORT, self.bridge.ports[1].role)
+
+    def test_delete(self):
+        self.bridge.delete()
+        count = self.dp.send_packet_out.call_count
+        self._advance(bpdu.DEFAULT_MAX_AGE)
+
+        eq_(count, self.dp.send_packet_out.call_count)
+        eq_(stplib.PORT_STATE_LISTEN, self.bridge.ports[1].state)
@@ -0,0 +1,91 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+
+from nose.tools import eq_
+
+from ryu.lib import hub
+from ryu.lib import timerwheel
+
+
+LOG = logging.getLogger(__name__)
+
+
+class Test_TimerWheel(unittest.TestCase):
+    """
+    Test case for ryu.lib.timerwheel.TimerWheel.
+    """
+
+    def setUp(self):
+        self.wheel = timerwheel.TimerWheel(resolution=0.1, slots=8)
+        self.fired = []
+
+    def _callback(self, name):
+        self.fired.append((name, self.wheel.time()))
+
+    def test_schedule(self):
+        # longer than a round of the wheel
+        self.wheel.schedule(1.5, self._callback, 'a')
+        self.wheel.schedule(0.25, self._callback, 'b')
+        self.wheel.schedule(0, self._callback, 'c')
+
+        self.wheel.advance(20)
+
+        eq_([('c', 0.1), ('b', 0.3), ('a', 1.5)],
+            [(name, round(t, 1)) for name, t in self.fired])
+
+    def test_cancel(self):
+        timer = self.wheel.schedule(0.3, self._callback, 'a')
+        self.wheel.schedule(0.3, lambda: timer2.cancel())
+        timer2 = self.wheel.schedule(0.3, self._callback, 'b')
+        self.wheel.schedule(0.1, timer.cancel)
+
+        self.wheel.advance(10)
+
+        eq_([], self.fired)
+
+    def test_reschedule_in_callback(self):
+        def callback():
+            self._callback('a')
+            if len(self.fired) < 3:
+                self.wheel.schedule(0.8, callback)
+
+        self.wheel.schedule(0.8, callback)
+        self.wheel.advance(30)
+
+        eq_([0.8, 1.6, 2.4],
+            [round(t, 1) for _, t in self.fired])
+
+    def test_error_in_callback(self):
+        def error():
+            raise ValueError()
+
+        self.wheel.schedule(0.1, error)
+        self.wheel.schedule(0.1, self._callback, 'a')
+        self.wheel.advance()
+
+        eq_(['a'], [name for name, _ in self.fired])
+
+    def test_start(self):
+        self.wheel.schedule(0.2, self._callback, 'a')
+        self.wheel.start()
+        try:
+            hub.sleep(0.5)
+        finally:
+            self.wheel.stop()
+
+        eq_(['a'], [name for name, _ in self.fired])
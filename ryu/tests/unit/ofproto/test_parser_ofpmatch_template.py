@@ -0,0 +1,73 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from ryu.ofproto import ofproto_v1_5 as ofp
+from ryu.ofproto import ofproto_v1_5_parser as ofpp
+
+
+class Test_Parser_OFPMatchTemplate(unittest.TestCase):
+    def _test(self, fields, kwargs):
+        template = ofpp.OFPMatchTemplate(*fields)
+        match = template.match(**kwargs)
+        buf = bytearray()
+        length = match.serialize(buf, 0)
+
+        expected = ofpp.OFPMatch(**kwargs)
+        expected_buf = bytearray()
+        expected_length = expected.serialize(expected_buf, 0)
+
+        self.assertEqual(expected_length, length)
+        self.assertEqual(expected_buf, buf)
+        self.assertEqual(expected.length, match.length)
+        self.assertEqual(ofp.OFPMT_OXM, match.type)
+        return match
+
+    def test_multicast_flabel(self):
+        match = self._test(
+            ['in_port', 'eth_type', 'ipv6_dst', ('ipv6_flabel', True)],
+            {'in_port': 1, 'eth_type': 0x86dd, 'ipv6_dst': 'ff38::5',
+             'ipv6_flabel': (0x10000, 0xf0000)})
+        self.assertEqual('ff38::5', match['ipv6_dst'])
+        self.assertEqual((0x10000, 0xf0000), match['ipv6_flabel'])
+
+    def test_field_order(self):
+        # the fields are sorted as OFPMatch does
+        template = ofpp.OFPMatchTemplate('ipv6_dst', 'eth_type', 'in_port')
+        self.assertEqual(('in_port', 'eth_type', 'ipv6_dst'),
+                         template.fields)
+        self._test(['ipv6_dst', 'eth_type', 'in_port'],
+                   {'in_port': 1, 'eth_type': 0x86dd,
+                    'ipv6_dst': 'ff38::5'})
+
+    def test_masked_addrs(self):
+        # the masked bits are cleared in the wire format
+        self._test([('eth_src', True), ('ipv6_src', True), 'pbb_isid'],
+                   {'eth_src': ('aa:bb:cc:dd:ee:ff', 'ff:ff:ff:00:00:00'),
+                    'ipv6_src': ('2001:db8::1', 'ffff::'),
+                    'pbb_isid': 0x123456})
+
+    def test_experimenter(self):
+        self._test(['in_port', ('pbb_uca', True), '_dp_hash'],
+                   {'in_port': 2, 'pbb_uca': (1, 1),
+                    '_dp_hash': 0x12345678})
+
+    def test_missing_field(self):
+        template = ofpp.OFPMatchTemplate('in_port', 'eth_type')
+        self.assertRaises(TypeError, template.match, in_port=1)
+
+    def test_unknown_field(self):
+        self.assertRaises(KeyError, ofpp.OFPMatchTemplate, 'no_such_field')
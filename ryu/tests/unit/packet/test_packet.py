@@ -15,6 +15,7 @@
 
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
+import copy
 import unittest
 import logging
 import struct
@@ -28,6 +29,7 @@ from ryu.lib.packet import ethernet
 from ryu.lib.packet import icmp, icmpv6
 from ryu.lib.packet import ipv4, ipv6
 from ryu.lib.packet import llc
+from ryu.lib.packet import lldp
 from ryu.lib.packet import packet, packet_utils
 from ryu.lib.packet import sctp
 from ryu.lib.packet import tcp, udp
@@ -1551,3 +1553,81 @@ class TestPacket(unittest.TestCase):
         ok_(isinstance(pkt.protocols[0], ethernet.ethernet))
         ok_(isinstance(pkt.protocols[1], ipv4.ipv4))
         ok_(isinstance(pkt.protocols[2], udp.udp))
+
+    def _serialize_both(self, protocols):
+        single = packet.Packet(protocols=copy.deepcopy(protocols))
+        single.serialize()
+        each = packet.Packet(protocols=copy.deepcopy(protocols))
+        each._serialize_each()
+        eq_(each.data, single.data)
+        return single
+
+    def test_serialize_into_lldp(self):
+        e = ethernet.ethernet(lldp.LLDP_MAC_NEAREST_BRIDGE, self.src_mac,
+                              ether.ETH_TYPE_LLDP)
+        tlvs = (lldp.ChassisID(subtype=lldp.ChassisID.SUB_LOCALLY_ASSIGNED,
+                               chassis_id=b'dpid:0000000000000001'),
+                lldp.PortID(subtype=lldp.PortID.SUB_PORT_COMPONENT,
+                            port_id=struct.pack('!I', 1)),
+                lldp.TTL(ttl=120),
+                lldp.SystemName(system_name=b'switch1'),
+                lldp.End())
+        l = lldp.lldp(tlvs)
+        ok_(packet._supports_serialize_into(e))
+        ok_(packet._supports_serialize_into(l))
+
+        p = self._serialize_both([e, l])
+        eq_(60, len(p.data))
+        pkt = packet.Packet(p.data)
+        eq_(b'switch1', pkt.get_protocol(lldp.lldp).tlvs[3].system_name)
+
+    def test_serialize_into_mldv2_report_aux(self):
+        e = ethernet.ethernet('33:33:00:00:00:16', self.src_mac,
+                              ether.ETH_TYPE_IPV6)
+        ip = ipv6.ipv6(nxt=inet.IPPROTO_ICMPV6, src='fe80::1', dst='ff02::16')
+        records = [icmpv6.mldv2_report_group(
+            type_=icmpv6.MODE_IS_INCLUDE, address='ff00::1',
+            srcs=['fe80::2'], aux=b'\x01\x02\x03\x04')]
+        ic = icmpv6.icmpv6(type_=icmpv6.MLDV2_LISTENER_REPORT,
+                           data=icmpv6.mldv2_report(records=records))
+
+        # the length of aux data is known only after encoding it
+        p = self._serialize_both([e, ip, ic])
+        eq_(14 + 40 + 48, len(p.data))
+        pkt = packet.Packet(p.data)
+        p_ipv6 = pkt.get_protocol(ipv6.ipv6)
+        eq_(48, p_ipv6.payload_length)
+        p_icmpv6 = pkt.get_protocol(icmpv6.icmpv6)
+        eq_(b'\x01\x02\x03\x04', p_icmpv6.data.records[0].aux)
+
+    def test_serialize_into_ipv6_icmpv6(self):
+        e = ethernet.ethernet(self.dst_mac, self.src_mac,
+                              ether.ETH_TYPE_8021Q)
+        v = vlan.vlan(vid=10, ethertype=ether.ETH_TYPE_IPV6)
+        hop_opts = ipv6.hop_opts(inet.IPPROTO_ICMPV6, 0, None)
+        ip = ipv6.ipv6(nxt=ipv6.hop_opts.TYPE, src='fe80::1',
+                       dst='ff02::1:ff00:2', ext_hdrs=[hop_opts])
+        nd = icmpv6.nd_neighbor(
+            dst='fe80::2', option=icmpv6.nd_option_sla(hw_src=self.src_mac))
+        ic = icmpv6.icmpv6(type_=icmpv6.ND_NEIGHBOR_SOLICIT, data=nd)
+
+        p = self._serialize_both([e, v, ip, ic, self.payload])
+        pkt = packet.Packet(p.data)
+        p_ipv6 = pkt.get_protocol(ipv6.ipv6)
+        p_icmpv6 = pkt.get_protocol(icmpv6.icmpv6)
+        eq_(len(hop_opts) + len(ic) + len(self.payload),
+            p_ipv6.payload_length)
+        eq_(p.protocols[3].csum, p_icmpv6.csum)
+
+    def test_serialize_into_fallback(self):
+        e = ethernet.ethernet(self.dst_mac, self.src_mac, ether.ETH_TYPE_IP)
+        i = ipv4.ipv4(proto=inet.IPPROTO_UDP)
+        u = udp.udp(self.src_port, self.dst_port)
+        ok_(not packet._supports_serialize_into(i))
+
+        p = packet.Packet()
+        p.add_protocol(e)
+        p.add_protocol(i)
+        p.add_protocol(u)
+        p.serialize()
+        eq_(self.src_port, packet.Packet(p.data).get_protocol(udp.udp).src_port)
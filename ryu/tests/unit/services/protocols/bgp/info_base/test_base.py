@@ -0,0 +1,255 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+import gc
+import logging
+import unittest
+import weakref
+try:
+    import mock  # Python 2
+except ImportError:
+    from unittest import mock  # Python 3
+
+from nose.tools import eq_, ok_
+
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_ORIGIN
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_AS_PATH
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MULTI_EXIT_DISC
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_LOCAL_PREF
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_REACH_NLRI
+from ryu.lib.packet.bgp import BGPPathAttributeOrigin
+from ryu.lib.packet.bgp import BGPPathAttributeAsPath
+from ryu.lib.packet.bgp import BGPPathAttributeMultiExitDisc
+from ryu.lib.packet.bgp import BGPPathAttributeLocalPref
+from ryu.lib.packet.bgp import BGPPathAttributeMpReachNLRI
+from ryu.lib.packet.bgp import IPAddrPrefix
+from ryu.lib.packet.bgp import IP6AddrPrefix
+from ryu.lib.packet.bgp import RF_IPv4_UC
+from ryu.lib.packet.bgp import RF_IPv6_UC
+from ryu.services.protocols.bgp import processor
+from ryu.services.protocols.bgp.info_base.base import PathAttributeSet
+from ryu.services.protocols.bgp.info_base.ipv4 import IPv4Dest
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.info_base.ipv6 import Ipv6Path
+
+
+LOG = logging.getLogger(__name__)
+
+
+class Test_PathAttributeSet(unittest.TestCase):
+    """
+    Test case for ryu.services.protocols.bgp.info_base.base.PathAttributeSet
+    """
+
+    def _pattrs(self, as_path=None):
+        pattrs = OrderedDict()
+        pattrs[BGP_ATTR_TYPE_ORIGIN] = BGPPathAttributeOrigin(0)
+        pattrs[BGP_ATTR_TYPE_AS_PATH] = BGPPathAttributeAsPath(
+            as_path or [[65001, 65002]])
+        return pattrs
+
+    def _path(self, prefix, pattrs):
+        return Ipv4Path(None, IPAddrPrefix(24, prefix), 0,
+                        pattrs=pattrs, nexthop='10.0.0.1')
+
+    def test_intern_equal_attributes(self):
+        attrs1 = PathAttributeSet.intern(self._pattrs())
+        attrs2 = PathAttributeSet.intern(self._pattrs())
+        ok_(attrs1 is attrs2)
+        ok_(PathAttributeSet.intern(attrs1) is attrs1)
+
+        attrs3 = PathAttributeSet.intern(self._pattrs([[65001]]))
+        ok_(attrs1 is not attrs3)
+        ok_(attrs1 != attrs3)
+
+    def test_intern_does_not_modify_attributes(self):
+        pattrs = self._pattrs()
+        PathAttributeSet.intern(pattrs)
+        eq_(None, pattrs[BGP_ATTR_TYPE_ORIGIN].length)
+
+    def test_paths_share_attributes(self):
+        path1 = self._path('10.1.0.0', self._pattrs())
+        path2 = self._path('10.2.0.0', self._pattrs())
+        ok_(path1.pathattrs is path2.pathattrs)
+        eq_(65002, path2.get_pattr(BGP_ATTR_TYPE_AS_PATH).value[0][1])
+        ok_(not hasattr(path1, '__dict__'))
+
+        # Modifying a copy does not change the shared attributes.
+        pattrs = path1.pathattr_map
+        pattrs[BGP_ATTR_TYPE_MULTI_EXIT_DISC] = \
+            BGPPathAttributeMultiExitDisc(100)
+        path3 = self._path('10.1.0.0', pattrs)
+        ok_(path3.pathattrs is not path1.pathattrs)
+        ok_(BGP_ATTR_TYPE_MULTI_EXIT_DISC not in path1.pathattrs)
+        eq_([BGP_ATTR_TYPE_ORIGIN, BGP_ATTR_TYPE_AS_PATH,
+             BGP_ATTR_TYPE_MULTI_EXIT_DISC], list(path3.pathattrs))
+
+    def test_mp_reach_update(self):
+        def update_pattrs(first):
+            pattrs = self._pattrs()
+            nlri = [IP6AddrPrefix(64, '2001:db8:%x::' % i)
+                    for i in range(first, first + 400)]
+            pattrs[BGP_ATTR_TYPE_MP_REACH_NLRI] = BGPPathAttributeMpReachNLRI(
+                RF_IPv6_UC.afi, RF_IPv6_UC.safi, '2001:db8::1', nlri)
+            return pattrs
+
+        pattrs = update_pattrs(0)
+        mp_reach = pattrs[BGP_ATTR_TYPE_MP_REACH_NLRI]
+        with mock.patch.object(BGPPathAttributeMpReachNLRI, 'serialize',
+                               autospec=True,
+                               wraps=BGPPathAttributeMpReachNLRI.serialize
+                               ) as serialize:
+            paths = [Ipv6Path(None, nlri, 0, pattrs=pattrs,
+                              nexthop='2001:db8::1')
+                     for nlri in mp_reach.nlri]
+        # The prefixes of the UPDATE are not serialized per path.
+        ok_(all(not call[0][0].nlri for call in serialize.call_args_list))
+
+        ok_(all(path.pathattrs is paths[0].pathattrs for path in paths))
+        attr = paths[0].get_pattr(BGP_ATTR_TYPE_MP_REACH_NLRI)
+        eq_([], attr.nlri)
+        eq_('2001:db8::1', attr.next_hop)
+        eq_(400, len(mp_reach.nlri))
+
+        # Paths from another UPDATE with the same attributes share the set.
+        pattrs = update_pattrs(400)
+        path = Ipv6Path(None, pattrs[BGP_ATTR_TYPE_MP_REACH_NLRI].nlri[0], 0,
+                        pattrs=pattrs, nexthop='2001:db8::1')
+        ok_(path.pathattrs is paths[0].pathattrs)
+
+    def test_released_with_last_path(self):
+        path1 = self._path('10.1.0.0', self._pattrs([[65003]]))
+        path2 = path1.clone()
+        ok_(path1.pathattrs is path2.pathattrs)
+        attrs = weakref.ref(path1.pathattrs)
+        key = attrs()._key
+        ok_(key in PathAttributeSet._interned)
+
+        del path1
+        gc.collect()
+        ok_(attrs() is not None)
+        del path2
+        gc.collect()
+        ok_(attrs() is None)
+        ok_(key not in PathAttributeSet._interned)
+
+
+class Test_Destination(unittest.TestCase):
+    """
+    Test case for best path selection of
+    ryu.services.protocols.bgp.info_base.base.Destination
+    """
+
+    LOCAL_ASN = 65000
+
+    def setUp(self):
+        self.table = mock.MagicMock()
+        self.table.route_family = RF_IPv4_UC
+        self.table.core_service.asn = self.LOCAL_ASN
+        self.table.core_service.router_id = '10.0.0.1'
+        self.nlri = IPAddrPrefix(24, '10.1.0.0')
+        self.dest = IPv4Dest(self.table, self.nlri)
+
+    def _peer(self, remote_as, router_id):
+        peer = mock.MagicMock()
+        peer.remote_as = remote_as
+        peer.version_num = 1
+        peer.protocol.recv_open_msg.bgp_identifier = router_id
+        return peer
+
+    def _path(self, source, as_path=None, med=None, local_pref=None):
+        pattrs = OrderedDict()
+        pattrs[BGP_ATTR_TYPE_ORIGIN] = BGPPathAttributeOrigin(0)
+        pattrs[BGP_ATTR_TYPE_AS_PATH] = BGPPathAttributeAsPath(
+            [as_path or []])
+        if med is not None:
+            pattrs[BGP_ATTR_TYPE_MULTI_EXIT_DISC] = \
+                BGPPathAttributeMultiExitDisc(med)
+        if local_pref is not None:
+            pattrs[BGP_ATTR_TYPE_LOCAL_PREF] = \
+                BGPPathAttributeLocalPref(local_pref)
+        return Ipv4Path(source, self.nlri, 1, pattrs=pattrs,
+                        nexthop='10.0.0.2')
+
+    def _process(self, new_paths=(), withdraws=()):
+        for path in new_paths:
+            self.dest.add_new_path(path)
+        for path in withdraws:
+            self.dest.add_withdraw(path.clone(for_withdrawal=True))
+        return self.dest._process_paths()
+
+    def test_best_path_key(self):
+        ibgp = self._peer(self.LOCAL_ASN, '10.0.0.9')
+        ebgp = self._peer(65001, '10.0.0.3')
+        path1 = self._path(ibgp, [65001], med=10)
+        path2 = self._path(ebgp, [65001], med=10)
+        path3 = self._path(ebgp, [65001], med=5)
+        path4 = self._path(ebgp, [65001, 65002])
+
+        def key(path):
+            return processor.best_path_key(
+                self.LOCAL_ASN, '10.0.0.1', path)
+
+        ok_(key(path2) > key(path1))
+        ok_(key(path3) > key(path2))
+        ok_(key(path3) > key(path4))
+        eq_(processor.BPR_ASN,
+            processor.best_path_key_reason(key(path2), key(path1)))
+        eq_(processor.BPR_MED,
+            processor.best_path_key_reason(key(path3), key(path2)))
+        eq_(processor.BPR_UNKNOWN,
+            processor.best_path_key_reason(key(path3), key(path3)))
+
+        # Keys are cached until local router ID changes.
+        local_path = self._path(None, [65001])
+        ok_(key(local_path) is key(local_path))
+        ok_(key(local_path) >
+            processor.best_path_key(self.LOCAL_ASN, '10.0.0.10', local_path))
+        eq_((self.LOCAL_ASN, '10.0.0.10'), local_path.decision_key[0])
+
+    def test_incremental_best_path(self):
+        peers = [self._peer(65001 + i, '10.0.0.%d' % (i + 2))
+                 for i in range(4)]
+        path1 = self._path(peers[0], [65001, 65010])
+        path2 = self._path(peers[1], [65002])
+        path3 = self._path(peers[2], [65003, 65010, 65011])
+        eq_((path2, processor.BPR_ASPATH),
+            self._process([path1, path2, path3]))
+        self.dest._best_path = path2
+
+        # A worse path is compared with best path only.
+        path4 = self._path(peers[3], [65004, 65010])
+        with mock.patch.object(processor, 'best_path_key',
+                               wraps=processor.best_path_key) as key:
+            eq_((path2, processor.BPR_ASPATH), self._process([path4]))
+        eq_(set([path2, path4]),
+            set(call[0][2] for call in key.call_args_list))
+
+        # Withdrawing best path selects among remaining paths.
+        eq_((path1, processor.BPR_UNKNOWN),
+            self._process(withdraws=[path2]))
+        eq_([path1, path3, path4], self.dest.known_path_list)
+
+    def test_mixed_local_pref(self):
+        ibgp = self._peer(self.LOCAL_ASN, '10.0.0.9')
+        ebgp = self._peer(65001, '10.0.0.3')
+        path1 = self._path(ibgp, [65001], local_pref=200)
+        path2 = self._path(ebgp, [65001])
+        with mock.patch.object(processor, 'compute_best_path',
+                               wraps=processor.compute_best_path) as cmp_:
+            eq_((path2, processor.BPR_ASN), self._process([path1, path2]))
+        eq_(1, cmp_.call_count)
+        ok_(not self.dest._best_path_by_key)
@@ -20,10 +20,11 @@ try:
 except ImportError:
     from unittest import mock  # Python 3
 
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 from ryu.lib.packet import bgp
 from ryu.services.protocols.bgp import peer
+from ryu.services.protocols.bgp.model import OutgoingRoute
 
 
 LOG = logging.getLogger(__name__)
@@ -373,3 +374,40 @@ class Test_Peer(unittest.TestCase):
         self._test_extract_and_reconstruct_as_path(
             path_attributes, ex_as_path_value,
             ex_aggregator_as_number, ex_aggregator_addr)
+
+    def _outgoing_route(self, prefix):
+        path = mock.MagicMock()
+        path.route_family = bgp.RF_IPv4_UC
+        path.nlri.formatted_nlri_str = prefix
+        return OutgoingRoute(path)
+
+    @mock.patch.object(
+        peer.Peer, '__init__', mock.MagicMock(return_value=None))
+    def test_send_outgoing_routes_split_on_same_prefix(self):
+        _peer = peer.Peer(None, None, None, None, None)
+        _peer._send_packed_routes = mock.MagicMock()
+        routes = [self._outgoing_route(p) for p in
+                  ('10.0.0.0/24', '10.0.1.0/24', '10.0.0.0/24', '10.0.2.0/24')]
+
+        # TEST
+        _peer._send_outgoing_routes(routes)
+
+        eq_([mock.call(routes[:2]), mock.call(routes[2:])],
+            _peer._send_packed_routes.call_args_list)
+
+    @mock.patch.object(
+        peer.Peer, '__init__', mock.MagicMock(return_value=None))
+    def test_pop_outgoing_routes(self):
+        _peer = peer.Peer(None, None, None, None, None)
+        _peer.outgoing_msg_list = peer.Peer.OutgoingMsgList()
+        routes = [self._outgoing_route('10.0.%d.0/24' % i) for i in range(3)]
+        eor = bgp.BGPUpdate()
+        for msg in routes[1:] + [eor, self._outgoing_route('10.1.0.0/24')]:
+            _peer.outgoing_msg_list.append(msg)
+
+        # TEST
+        popped, next_msg = _peer._pop_outgoing_routes(routes[0])
+
+        eq_(routes, popped)
+        eq_(eor, next_msg)
+        ok_(not _peer.outgoing_msg_list.is_empty())
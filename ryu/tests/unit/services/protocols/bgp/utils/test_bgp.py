@@ -17,9 +17,17 @@
 import logging
 import unittest
 
-from nose.tools import eq_, raises
+from nose.tools import eq_, ok_, raises
 
 from ryu.lib.packet.bgp import (
+    BGPUpdate,
+    BGPPathAttributeOrigin,
+    BGPPathAttributeAsPath,
+    BGPPathAttributeNextHop,
+    BGPPathAttributeMpReachNLRI,
+    BGPPathAttributeMpUnreachNLRI,
+    IPAddrPrefix,
+    IP6AddrPrefix,
     BGPFlowSpecTrafficRateCommunity,
     BGPFlowSpecTrafficActionCommunity,
     BGPFlowSpecRedirectCommunity,
@@ -32,6 +40,7 @@ from ryu.services.protocols.bgp.core import BgpCoreError
 from ryu.services.protocols.bgp.utils.bgp import create_v4flowspec_actions
 from ryu.services.protocols.bgp.utils.bgp import create_v6flowspec_actions
 from ryu.services.protocols.bgp.utils.bgp import create_l2vpnflowspec_actions
+from ryu.services.protocols.bgp.utils.bgp import UpdatePacker
 
 
 LOG = logging.getLogger(__name__)
@@ -209,3 +218,84 @@ class Test_Utils_BGP(unittest.TestCase):
         }
         expected_communities = []
         self._test_create_l2vpnflowspec_actions(actions, expected_communities)
+
+
+class Test_UpdatePacker(unittest.TestCase):
+    """
+    Test case for ryu.services.protocols.bgp.utils.bgp.UpdatePacker
+    """
+
+    def _ipv4_update(self, prefix, next_hop='10.0.0.1', as_path=None):
+        return BGPUpdate(
+            path_attributes=[
+                BGPPathAttributeNextHop(next_hop),
+                BGPPathAttributeOrigin(0),
+                BGPPathAttributeAsPath(as_path or [[65000]]),
+            ],
+            nlri=[IPAddrPrefix(24, prefix)])
+
+    def _ipv6_update(self, prefix, next_hop='2001:db8::1'):
+        return BGPUpdate(
+            path_attributes=[
+                BGPPathAttributeMpReachNLRI(
+                    2, 1, next_hop, [IP6AddrPrefix(64, prefix)]),
+                BGPPathAttributeOrigin(0),
+                BGPPathAttributeAsPath([[65000]]),
+            ])
+
+    def test_pack_same_attributes(self):
+        packer = UpdatePacker()
+        for i in range(10):
+            packer.add(self._ipv4_update('10.1.%d.0' % i))
+        packer.add(self._ipv4_update('10.2.0.0', as_path=[[65001]]))
+
+        updates = packer.updates()
+        eq_(2, len(updates))
+        eq_(10, len(updates[0].nlri))
+        eq_(['10.2.0.0/24'], [n.prefix for n in updates[1].nlri])
+        eq_([a.serialize() for a in updates[0].path_attributes],
+            [a.serialize() for a in
+             self._ipv4_update('10.1.0.0').path_attributes])
+        eq_([], packer.updates())
+
+    def test_pack_mp_reach(self):
+        packer = UpdatePacker()
+        for i in range(5):
+            packer.add(self._ipv6_update('2001:db8:%x::' % i))
+        packer.add(self._ipv6_update('2001:db8:ff::', next_hop='2001:db8::2'))
+
+        updates = packer.updates()
+        eq_(2, len(updates))
+        mp_reach = updates[0].path_attributes[0]
+        eq_(5, len(mp_reach.nlri))
+        eq_('2001:db8::1', mp_reach.next_hop)
+        eq_(1, len(updates[1].path_attributes[0].nlri))
+
+    def test_pack_withdraws_first(self):
+        packer = UpdatePacker()
+        packer.add(self._ipv4_update('10.1.0.0'))
+        packer.add(BGPUpdate(withdrawn_routes=[IPAddrPrefix(24, '10.3.0.0')]))
+        packer.add(BGPUpdate(withdrawn_routes=[IPAddrPrefix(24, '10.4.0.0')]))
+        packer.add(BGPUpdate(path_attributes=[BGPPathAttributeMpUnreachNLRI(
+            2, 1, [IP6AddrPrefix(64, '2001:db8::')])]))
+
+        updates = packer.updates()
+        eq_(3, len(updates))
+        eq_(2, len(updates[0].withdrawn_routes))
+        eq_(1, len(updates[1].path_attributes[0].withdrawn_routes))
+        eq_(1, len(updates[2].nlri))
+
+    def test_pack_max_len(self):
+        packer = UpdatePacker()
+        for i in range(2000):
+            packer.add(self._ipv4_update('10.%d.%d.0' % (i // 256, i % 256)))
+            packer.add(self._ipv6_update('2001:db8:%x::' % i))
+
+        updates = packer.updates()
+        sizes = sorted(len(u.serialize()) for u in updates)
+        ok_(sizes[-1] <= 4096)
+        eq_(2000, sum(len(u.nlri) for u in updates))
+        eq_(2000, sum(len(u.path_attributes[0].nlri)
+                      for u in updates if not u.nlri))
+        # Only the last UPDATE of each group may be partially filled.
+        ok_(all(size > 4096 - 16 for size in sizes[2:]))
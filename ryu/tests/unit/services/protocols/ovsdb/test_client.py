@@ -0,0 +1,186 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import errno
+import logging
+import unittest
+import uuid
+
+from nose.tools import eq_
+from ovs import jsonrpc
+from ovs.db import idl
+
+from ryu.services.protocols.ovsdb import client
+from ryu.services.protocols.ovsdb import event
+
+try:
+    import mock  # Python 2
+except ImportError:
+    from unittest import mock  # Python 3
+
+
+LOG = logging.getLogger(__name__)
+
+
+class _Transaction(idl.Transaction):
+    """
+    Fake of idl.Transaction, completed with the next of ``statuses`` at
+    the second call of commit().
+    """
+    statuses = []
+    instances = []
+
+    def __init__(self, idl_):
+        self.inserted = []
+        self._status = idl.Transaction.UNCOMMITTED
+        self.instances.append(self)
+
+    def insert(self, table, new_uuid=None):
+        self.inserted.append((table, new_uuid))
+
+    def commit(self):
+        if self._status == idl.Transaction.UNCOMMITTED:
+            self._status = idl.Transaction.INCOMPLETE
+        elif self._status == idl.Transaction.INCOMPLETE:
+            self._status = self.statuses.pop(0)
+        return self._status
+
+    def abort(self):
+        self._status = idl.Transaction.ABORTED
+
+    def get_insert_uuid(self, uuid_):
+        return 'real-%s' % uuid_
+
+    def get_error(self):
+        return 'error'
+
+
+class Test_transact_block(unittest.TestCase):
+    """
+    Test case for ryu.services.protocols.ovsdb.client.transact_block.
+    """
+
+    def test_transact_block(self):
+        request = jsonrpc.Message.create_request('list_dbs', [])
+        other = jsonrpc.Message.create_request('echo', [])
+        reply = jsonrpc.Message.create_reply(['Open_vSwitch'], request.id)
+        connection = mock.MagicMock()
+        connection.send.return_value = 0
+        connection.recv.side_effect = [(errno.EAGAIN, None), (0, other),
+                                       (errno.EAGAIN, None), (0, reply)]
+        connection.recv_wait.side_effect = (
+            lambda poller: poller.immediate_wake())
+
+        eq_((0, reply), client.transact_block(request, connection))
+        eq_(2, connection.recv_wait.call_count)
+
+    def test_transact_block_error(self):
+        request = jsonrpc.Message.create_request('list_dbs', [])
+        connection = mock.MagicMock()
+        connection.send.return_value = 0
+        connection.recv.return_value = (errno.ECONNRESET, None)
+
+        eq_((errno.ECONNRESET, None), client.transact_block(request, connection))
+
+
+@mock.patch('ryu.services.protocols.ovsdb.client.idl.Transaction',
+            _Transaction)
+class Test_RemoteOvsdb(unittest.TestCase):
+    """
+    Test case for transactions of ryu.services.protocols.ovsdb.client.
+    """
+
+    def setUp(self):
+        _Transaction.statuses = []
+        _Transaction.instances = []
+        self.app = client.RemoteOvsdb(
+            socket=None, address=('127.0.0.1', 6640),
+            idl=mock.MagicMock(), system_id='system', name='ovsdb',
+            max_batch_txns=3)
+        self.app.reply_to_request = mock.MagicMock()
+
+    def _request(self, port=None):
+        port_uuid = uuid.uuid4()
+
+        def modify(tables, insert):
+            if port is None:
+                raise ValueError('no port')
+            insert(port, port_uuid)
+            return (port_uuid, )
+
+        req = event.EventModifyRequest('system', modify)
+        req.port_uuid = port_uuid
+        self.app.modify_request_handler(req)
+        return req
+
+    def _replies(self):
+        return dict((call[0][0], call[0][1])
+                    for call in self.app.reply_to_request.call_args_list)
+
+    def test_batch(self):
+        reqs = [self._request('p%d' % i) for i in range(4)]
+        _Transaction.statuses = [idl.Transaction.SUCCESS,
+                                 idl.Transaction.SUCCESS]
+
+        self.app._transactions()
+        # one outstanding transaction at most by default
+        eq_(1, len(_Transaction.instances))
+        eq_([('p0', reqs[0].port_uuid), ('p1', reqs[1].port_uuid),
+             ('p2', reqs[2].port_uuid)], _Transaction.instances[0].inserted)
+        eq_(0, self.app.reply_to_request.call_count)
+
+        self.app._transactions()
+        self.app._transactions()
+        eq_(2, len(_Transaction.instances))
+        replies = self._replies()
+        for req in reqs:
+            eq_(idl.Transaction.SUCCESS, replies[req].status)
+            eq_({req.port_uuid: 'real-%s' % req.port_uuid},
+                replies[req].insert_uuids)
+
+    def test_batch_error(self):
+        reqs = [self._request('p%d' % i) for i in range(3)]
+        _Transaction.statuses = [idl.Transaction.ERROR,
+                                 idl.Transaction.SUCCESS,
+                                 idl.Transaction.ERROR,
+                                 idl.Transaction.SUCCESS]
+        self.app.max_outstanding_txns = 3
+
+        for _ in range(3):
+            self.app._transactions()
+
+        # the failed batch is run again one request per transaction
+        eq_([1, 1, 1], [len(txn.inserted)
+                        for txn in _Transaction.instances[1:]])
+        replies = self._replies()
+        eq_([idl.Transaction.SUCCESS, idl.Transaction.ERROR,
+             idl.Transaction.SUCCESS],
+            [replies[req].status for req in reqs])
+        eq_('error', replies[reqs[1]].err_msg)
+
+    def test_func_error(self):
+        reqs = [self._request('p0'), self._request(), self._request('p2')]
+        _Transaction.statuses = [idl.Transaction.SUCCESS]
+
+        self.app._transactions()
+        self.app._transactions()
+
+        eq_(idl.Transaction.ABORTED, _Transaction.instances[0].commit())
+        eq_([('p0', reqs[0].port_uuid), ('p2', reqs[2].port_uuid)],
+            _Transaction.instances[1].inserted)
+        replies = self._replies()
+        eq_('no port', replies[reqs[1]].err_msg)
+        eq_(idl.Transaction.SUCCESS, replies[reqs[0]].status)
+        eq_(idl.Transaction.SUCCESS, replies[reqs[2]].status)
@@ -0,0 +1,115 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import socket
+import unittest
+
+from nose.tools import eq_
+from nose.tools import ok_
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from ryu import cfg
+from ryu import flags  # noqa: registers options of Zebra service
+from ryu.lib.packet import zebra
+
+# Do not create the default database file by importing "db"
+cfg.CONF.set_override('db_url', 'sqlite://', group='zapi')
+
+from ryu.services.protocols.zebra.db import base  # noqa: E402
+from ryu.services.protocols.zebra.db import interface  # noqa: E402
+from ryu.services.protocols.zebra.db import route  # noqa: E402
+from ryu.services.protocols.zebra.db import route_store  # noqa: E402
+
+
+LOG = logging.getLogger(__name__)
+
+
+class Test_RouteStore(unittest.TestCase):
+    """
+    Test case for ryu.services.protocols.zebra.db.route_store.RouteStore.
+    """
+
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        base.Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        interface.ip_link_add(self.session, 'eth0')
+        self.store = route_store.RouteStore(self.session)
+
+    def _db_routes(self):
+        return sorted((r.id, r.destination, r.gateway, r.is_selected)
+                      for r in route.ip_route_show_all(self.session))
+
+    def test_add_lookup(self):
+        store = self.store
+        store.ip_route_add(self.session, '10.0.0.0/8', gateway='192.0.2.1')
+        store.ip_route_add(self.session, '10.1.0.0/16', gateway='192.0.2.2',
+                           ifindex=2)
+        store.ip_route_add(self.session, '2001:db8::/32', gateway='fe80::1')
+        store.ip_route_add(self.session, '10.1.0.0/16', gateway='192.0.2.3')
+
+        eq_('192.0.2.3',
+            store.ip_route_lookup(self.session, '10.1.2.3').gateway)
+        eq_('192.0.2.1',
+            store.ip_route_lookup(self.session, '10.2.2.3').gateway)
+        eq_(socket.AF_INET6,
+            store.ip_route_lookup(self.session, '2001:db8::1').family)
+        eq_(None, store.ip_route_lookup(self.session, '192.0.2.1'))
+        eq_(['192.0.2.2'],
+            [r.gateway for r in store.ip_route_show_all(
+                self.session, ifindex=2)])
+        eq_(['192.0.2.3'],
+            [r.gateway for r in store.ip_route_show_all(
+                self.session, destination='10.1.0.0/16', is_selected=True)])
+        eq_(None, store.ip_route_add(self.session, '10.0.0.0/33'))
+
+    def test_device(self):
+        store = self.store
+        r1 = store.ip_route_add(self.session, '10.0.0.0/8', device='eth0')
+        r2 = store.ip_route_add(self.session, '10.0.0.0/8', device='eth0')
+
+        ok_(r1 is r2)
+        eq_(r1, store.ip_route_show(self.session, '10.0.0.0/8', 'eth0'))
+        eq_(None, store.ip_route_add(self.session, '10.0.0.0/8',
+                                     device='eth1'))
+
+    def test_write_behind(self):
+        store = self.store
+        store.ip_route_add(self.session, '10.0.0.0/8', gateway='192.0.2.1')
+        store.ip_route_add(self.session, '10.0.0.0/8', gateway='192.0.2.2')
+        store.ip_route_add(self.session, '10.1.0.0/16', gateway='192.0.2.3')
+        store.ip_route_delete(self.session, '10.1.0.0/16')
+        eq_([], self._db_routes())
+
+        store.flush()
+        eq_([(1, '10.0.0.0/8', '192.0.2.1', False),
+             (2, '10.0.0.0/8', '192.0.2.2', True)], self._db_routes())
+
+        deleted = store.ip_route_delete(self.session, '10.0.0.0/8',
+                                        gateway='192.0.2.2')
+        eq_([2], [r.id for r in deleted])
+        store.ip_route_add(self.session, '172.16.0.0/12',
+                           route_type=zebra.ZEBRA_ROUTE_BGP)
+        store.flush()
+        eq_([(1, '10.0.0.0/8', '192.0.2.1', False),
+             (4, '172.16.0.0/12', '', True)], self._db_routes())
+
+        # routes are loaded from the database
+        store = route_store.RouteStore(self.session)
+        eq_(['10.0.0.0/8', '172.16.0.0/12'],
+            [r.destination for r in store.ip_route_show_all(self.session)])
+        eq_(5, store.ip_route_add(self.session, '10.0.0.0/8').id)
@@ -0,0 +1,136 @@
+# Copyright (C) 2017 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import struct
+import unittest
+
+from nose.tools import eq_
+from nose.tools import ok_
+
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.ofproto import ofproto_protocol
+from ryu.topology import switches
+
+
+def _port(dpid, port_no):
+    ofpport = ofproto_v1_3_parser.OFPPort(
+        port_no=port_no, hw_addr='00:00:00:00:00:%02x' % port_no,
+        name=b'eth%d' % port_no, config=0, state=0, curr=0,
+        advertised=0, supported=0, peer=0, curr_speed=0, max_speed=0)
+    return switches.Port(dpid, ofproto_v1_3, ofpport)
+
+
+class _Datapath(ofproto_protocol.ProtocolDesc):
+    def __init__(self, dpid):
+        super(_Datapath, self).__init__(ofproto_v1_3.OFP_VERSION)
+        self.id = dpid
+        self.xid = 0
+        self.sent = []
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.set_xid(self.xid)
+        return self.xid
+
+    def send(self, buf):
+        self.sent.append(buf)
+        return True
+
+
+class Test_LinkState(unittest.TestCase):
+
+    def setUp(self):
+        self.links = switches.LinkState()
+        self.p1 = _port(1, 1)
+        self.p2 = _port(2, 1)
+
+    def test_expired(self):
+        self.links.update_link(self.p1, self.p2)
+        self.links.update_link(self.p2, self.p1)
+        link = switches.Link(self.p1, self.p2)
+        timestamp = self.links[link]
+
+        eq_([], self.links.expired(10, timestamp + 5))
+        eq_(timestamp + 10, self.links.next_expiry(10))
+
+        # refreshed link is re-armed instead of expired
+        self.links[link] = timestamp + 8
+        eq_([switches.Link(self.p2, self.p1)],
+            self.links.expired(10, timestamp + 11))
+        eq_(timestamp + 18, self.links.next_expiry(10))
+        eq_([link], self.links.expired(10, timestamp + 19))
+        eq_(None, self.links.next_expiry(10))
+
+    def test_rev_link_set_timestamp(self):
+        self.links.update_link(self.p1, self.p2)
+        link = switches.Link(self.p1, self.p2)
+        timestamp = self.links[link]
+
+        self.links.rev_link_set_timestamp(link, timestamp - 9)
+        eq_(timestamp + 1, self.links.next_expiry(10))
+        eq_([link], self.links.expired(10, timestamp + 2))
+
+    def test_link_down(self):
+        self.links.update_link(self.p1, self.p2)
+        link = switches.Link(self.p1, self.p2)
+        timestamp = self.links[link]
+
+        self.links.link_down(link)
+        eq_([], self.links.expired(10, timestamp + 20))
+        eq_(None, self.links.next_expiry(10))
+
+
+class Test_Switches(unittest.TestCase):
+
+    def setUp(self):
+        self.app = switches.Switches()
+        self.dp = _Datapath(1)
+        self.app.dps[1] = self.dp
+        self.ports = [_port(1, n) for n in range(1, 6)]
+        for port in self.ports:
+            self.app._port_added(port)
+
+    def test_send_lldp_packets(self):
+        consumed = self.app.send_lldp_packets(1, self.ports, 3)
+        eq_(3, consumed)
+        eq_(1, len(self.dp.sent))
+
+        # three OFPT_PACKET_OUT messages in a single write
+        buf = self.dp.sent[0]
+        offset = 0
+        xids = []
+        while offset < len(buf):
+            version, msg_type, msg_len, xid = struct.unpack_from(
+                '!BBHI', buf, offset)
+            eq_(ofproto_v1_3.OFPT_PACKET_OUT, msg_type)
+            xids.append(xid)
+            offset += msg_len
+        eq_([1, 2, 3], xids)
+
+        for port in self.ports[:3]:
+            ok_(self.app.ports[port].timestamp is not None)
+        for port in self.ports[3:]:
+            eq_(None, self.app.ports[port].timestamp)
+
+    def test_lldp_budget(self):
+        burst = self.app.LLDP_SEND_BURST
+        eq_(burst, self.app._lldp_budget(1, 100.))
+
+        self.app.lldp_tokens[1] = (0, 100.)
+        self.app.LLDP_SEND_BURST = burst = 1000
+        rate = self.app.LLDP_SEND_RATE_PER_DP
+        eq_(rate * .5, self.app._lldp_budget(1, 100.5))
+        eq_(burst, self.app._lldp_budget(1, 200.))
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import heapq
+import itertools
 import logging
 import six
 import struct
@@ -376,9 +378,20 @@ class PortDataState(dict):
 
 class LinkState(dict):
     # dict: Link class -> timestamp
+    # Expiry is tracked by a heap of (timestamp, seq, link) entries. Entries
+    # are not updated in place when a link is refreshed; a stale entry is
+    # re-pushed with the current timestamp when it reaches the top, so the
+    # heap holds about one entry per link.
     def __init__(self):
         super(LinkState, self).__init__()
         self._map = defaultdict(lambda: defaultdict(lambda: None))
+        self._timers = []       # heap of (timestamp, seq, link)
+        self._scheduled = {}    # Link class -> timestamp in self._timers
+        self._seq = itertools.count()
+
+    def _schedule(self, link, timestamp):
+        self._scheduled[link] = timestamp
+        heapq.heappush(self._timers, (timestamp, next(self._seq), link))
 
     def get_peers(self, src):
         return self._map[src].keys()
@@ -386,8 +399,11 @@ class LinkState(dict):
     def update_link(self, src, dst):
         link = Link(src, dst)
 
-        self[link] = time.time()
+        timestamp = time.time()
+        self[link] = timestamp
         self._map[src][dst] = link
+        if link not in self._scheduled:
+            self._schedule(link, timestamp)
 
         # return if the reverse link is also up or not
         rev_link = Link(dst, src)
@@ -396,11 +412,45 @@ class LinkState(dict):
     def link_down(self, link):
         del self[link]
         del self._map[link.src][link.dst]
+        self._scheduled.pop(link, None)
 
     def rev_link_set_timestamp(self, rev_link, timestamp):
         # rev_link may or may not in LinkSet
         if rev_link in self:
             self[rev_link] = timestamp
+            if timestamp < self._scheduled.get(rev_link, timestamp + 1):
+                self._schedule(rev_link, timestamp)
+
+    def expired(self, timeout, now=None):
+        """Return the links not refreshed within timeout seconds.
+
+        Only the heap entries due by now are visited, so the cost does not
+        depend on the number of live links.
+        """
+        if now is None:
+            now = time.time()
+        deleted = []
+        timers = self._timers
+        while timers and timers[0][0] + timeout < now:
+            scheduled, _seq, link = heapq.heappop(timers)
+            if self._scheduled.get(link) != scheduled:
+                # superseded by an earlier entry, or link already removed
+                continue
+            timestamp = self.get(link)
+            if timestamp is None:
+                del self._scheduled[link]
+            elif timestamp + timeout < now:
+                del self._scheduled[link]
+                deleted.append(link)
+            else:
+                self._schedule(link, timestamp)
+        return deleted
+
+    def next_expiry(self, timeout):
+        """Return the earliest time a link may expire, or None."""
+        if not self._timers:
+            return None
+        return self._timers[0][0] + timeout
 
     def port_deleted(self, src):
         dsts = self.get_peers(src)
@@ -411,6 +461,8 @@ class LinkState(dict):
             rev_link = Link(dst, src)
             del self[link]
             self.pop(rev_link, None)
+            self._scheduled.pop(link, None)
+            self._scheduled.pop(rev_link, None)
             if src in self._map[dst]:
                 del self._map[dst][src]
                 rev_link_dsts.append(dst)
@@ -509,10 +561,13 @@ class Switches(app_manager.RyuApp):
     DEFAULT_TTL = 120  # unused. ignored.
     LLDP_PACKET_LEN = len(LLDPPacket.lldp_packet(0, 0, DONTCARE_STR, 0))
 
-    LLDP_SEND_GUARD = .05
+    LLDP_SEND_GUARD = .05  # unused. superseded by LLDP_SEND_RATE_PER_DP
     LLDP_SEND_PERIOD_PER_PORT = .9
+    LLDP_SEND_RATE_PER_DP = 1000.  # packets per second per datapath
+    LLDP_SEND_BURST = 100          # max packet-outs in one batched send
     TIMEOUT_CHECK_PERIOD = 5.
     LINK_TIMEOUT = TIMEOUT_CHECK_PERIOD * 2
+    LINK_REPROBE_GUARD = 1.  # time given to a suspected link to answer
 
     def __init__(self, *args, **kwargs):
         super(Switches, self).__init__(*args, **kwargs)
@@ -523,6 +578,7 @@ class Switches(app_manager.RyuApp):
         self.ports = PortDataState()  # Port class -> PortData class
         self.links = LinkState()      # Link class -> timestamp
         self.hosts = HostState()      # mac address -> Host class list
+        self.lldp_tokens = {}         # datapath_id => (tokens, timestamp)
         self.is_active = True
 
         self.link_discovery = self.CONF.observe_links
@@ -680,6 +736,7 @@ class Switches(app_manager.RyuApp):
             if switch:
                 if switch.dp is dp:
                     self._unregister(dp)
+                    self.lldp_tokens.pop(dp.id, None)
                     LOG.debug('unregister %s', switch)
                     evt = event.EventSwitchLeave(switch)
                     self.send_event_to_observers(evt)
@@ -887,6 +944,23 @@ class Switches(app_manager.RyuApp):
             ipv6_pkt, _, _ = pkt_type.parser(pkt_data)
             self.hosts.update_ip(host, ip_v6=ipv6_pkt.src)
 
+    def _lldp_packet_out(self, dp, port, port_data):
+        # TODO:XXX
+        actions = [dp.ofproto_parser.OFPActionOutput(port.port_no)]
+        if dp.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
+            return dp.ofproto_parser.OFPPacketOut(
+                dp, 0xffffffff, dp.ofproto.OFPP_NONE, actions,
+                port_data.lldp_data)
+        elif dp.ofproto.OFP_VERSION >= ofproto_v1_2.OFP_VERSION:
+            return dp.ofproto_parser.OFPPacketOut(
+                datapath=dp, in_port=dp.ofproto.OFPP_CONTROLLER,
+                buffer_id=dp.ofproto.OFP_NO_BUFFER, actions=actions,
+                data=port_data.lldp_data)
+        else:
+            LOG.error('cannot send lldp packet. unsupported version. %x',
+                      dp.ofproto.OFP_VERSION)
+            return None
+
     def send_lldp_packet(self, port):
         try:
             port_data = self.ports.lldp_sent(port)
@@ -903,20 +977,49 @@ class Switches(app_manager.RyuApp):
             return
 
         # LOG.debug('lldp sent dpid=%s, port_no=%d', dp.id, port.port_no)
-        # TODO:XXX
-        if dp.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
-            actions = [dp.ofproto_parser.OFPActionOutput(port.port_no)]
-            dp.send_packet_out(actions=actions, data=port_data.lldp_data)
-        elif dp.ofproto.OFP_VERSION >= ofproto_v1_2.OFP_VERSION:
-            actions = [dp.ofproto_parser.OFPActionOutput(port.port_no)]
-            out = dp.ofproto_parser.OFPPacketOut(
-                datapath=dp, in_port=dp.ofproto.OFPP_CONTROLLER,
-                buffer_id=dp.ofproto.OFP_NO_BUFFER, actions=actions,
-                data=port_data.lldp_data)
+        out = self._lldp_packet_out(dp, port, port_data)
+        if out is not None:
             dp.send_msg(out)
-        else:
-            LOG.error('cannot send lldp packet. unsupported version. %x',
-                      dp.ofproto.OFP_VERSION)
+
+    def send_lldp_packets(self, dpid, ports, limit=None):
+        """Send LLDP out of ports of one datapath in a single write.
+
+        At most limit ports are probed; the ports beyond the limit are
+        left untouched and stay due. Returns the number of ports
+        consumed from the head of ports.
+        """
+        dp = self.dps.get(dpid, None)
+        bufs = []
+        consumed = 0
+        for port in ports:
+            if limit is not None and consumed >= limit:
+                break
+            consumed += 1
+            try:
+                port_data = self.ports.lldp_sent(port)
+            except KeyError:
+                continue
+            if port_data.is_down or dp is None:
+                continue
+            out = self._lldp_packet_out(dp, port, port_data)
+            if out is None:
+                continue
+            dp.set_xid(out)
+            out.serialize()
+            bufs.append(out.buf)
+
+        if bufs:
+            dp.send(b''.join(bufs))
+        return consumed
+
+    def _lldp_budget(self, dpid, now):
+        # token bucket: LLDP_SEND_RATE_PER_DP tokens per second,
+        # at most LLDP_SEND_BURST of them banked.
+        tokens, timestamp = self.lldp_tokens.get(
+            dpid, (self.LLDP_SEND_BURST, now))
+        tokens = min(self.LLDP_SEND_BURST,
+                     tokens + (now - timestamp) * self.LLDP_SEND_RATE_PER_DP)
+        return tokens
 
     def lldp_loop(self):
         while self.is_active:
@@ -924,29 +1027,27 @@ class Switches(app_manager.RyuApp):
 
             now = time.time()
             timeout = None
-            ports_now = []
-            ports = []
+            due = defaultdict(list)     # datapath_id => ports
             for (key, data) in self.ports.items():
-                if data.timestamp is None:
-                    ports_now.append(key)
-                    continue
-
-                expire = data.timestamp + self.LLDP_SEND_PERIOD_PER_PORT
-                if expire <= now:
-                    ports.append(key)
-                    continue
-
-                timeout = expire - now
-                break
-
-            for port in ports_now:
-                self.send_lldp_packet(port)
-            for port in ports:
-                self.send_lldp_packet(port)
-                hub.sleep(self.LLDP_SEND_GUARD)      # don't burst
+                if data.timestamp is not None:
+                    expire = data.timestamp + self.LLDP_SEND_PERIOD_PER_PORT
+                    if expire > now:
+                        timeout = expire - now
+                        break
+                due[key.dpid].append(key)
+
+            for dpid, ports in due.items():
+                tokens = self._lldp_budget(dpid, now)
+                sent = self.send_lldp_packets(dpid, ports, int(tokens))
+                tokens -= sent
+                self.lldp_tokens[dpid] = (tokens, now)
+                if sent < len(ports):
+                    # rate limited. wake up when the next batch is allowed
+                    batch = min(len(ports) - sent, self.LLDP_SEND_BURST)
+                    wait = (batch - tokens) / self.LLDP_SEND_RATE_PER_DP
+                    if timeout is None or wait < timeout:
+                        timeout = wait
 
-            if timeout is not None and ports:
-                timeout = 0     # We have already slept
             # LOG.debug('lldp sleep %s', timeout)
             self.lldp_event.wait(timeout=timeout)
 
@@ -955,11 +1056,7 @@ class Switches(app_manager.RyuApp):
             self.link_event.clear()
 
             now = time.time()
-            deleted = []
-            for (link, timestamp) in self.links.items():
-                # LOG.debug('%s timestamp %d (now %d)', link, timestamp, now)
-                if timestamp + self.LINK_TIMEOUT < now:
-                    deleted.append(link)
+            deleted = self.links.expired(self.LINK_TIMEOUT, now)
 
             for link in deleted:
                 self.links.link_down(link)
@@ -971,13 +1068,17 @@ class Switches(app_manager.RyuApp):
                 if rev_link not in deleted:
                     # It is very likely that the reverse link is also
                     # disconnected. Check it early.
-                    expire = now - self.LINK_TIMEOUT
+                    expire = now - self.LINK_TIMEOUT + self.LINK_REPROBE_GUARD
                     self.links.rev_link_set_timestamp(rev_link, expire)
                     if dst in self.ports:
                         self.ports.move_front(dst)
                         self.lldp_event.set()
 
-            self.link_event.wait(timeout=self.TIMEOUT_CHECK_PERIOD)
+            timeout = self.TIMEOUT_CHECK_PERIOD
+            expiry = self.links.next_expiry(self.LINK_TIMEOUT)
+            if expiry is not None:
+                timeout = max(0, min(timeout, expiry - now))
+            self.link_event.wait(timeout=timeout)
 
     @set_ev_cls(event.EventSwitchRequest)
     def switch_request_handler(self, req):